@@ -3,12 +3,14 @@ Signup Events Router for Control Core Business Admin
 Handles signup and provisioning events from cc-signup-service
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import SignupEvent, Customer, Tenant
 from app.schemas import SignupEventCreate, SignupEventResponse, CustomerSignupStats
 import uuid
+import gzip
+import json
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
@@ -211,6 +213,48 @@ async def log_stripe_event(
             detail="Failed to log Stripe event"
         )
 
+@router.post("/events/batch")
+async def log_event_batch(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Log a batch of events shipped by cc-signup-service
+
+    The body is a (optionally gzip compressed) JSON list of
+    {"endpoint": ..., "payload": ...} events, each logged as if posted to its
+    endpoint. Events that cannot be logged are reported by index, the
+    shipper does not retry them.
+    """
+    try:
+        body = await request.body()
+        if request.headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        events = json.loads(body)
+        if not isinstance(events, list):
+            raise ValueError("expected a list of events")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid event batch: {e}"
+        )
+
+    accepted = 0
+    rejected = []
+    for index, event in enumerate(events):
+        try:
+            handler = BATCH_EVENT_HANDLERS.get(event.get("endpoint"))
+            if handler is None:
+                raise ValueError(f"unknown event endpoint {event.get('endpoint')}")
+            await handler(event["payload"], db)
+            accepted += 1
+        except Exception as e:
+            logger.warning(f"Rejected batched event {index}: {e}")
+            db.rollback()
+            rejected.append(index)
+
+    logger.info(f"Logged event batch: {accepted} accepted, {len(rejected)} rejected")
+    return {"status": "success", "accepted": accepted, "rejected": rejected}
+
 @router.get("/events/signup-stats")
 async def get_signup_stats(
     start_date: str = None,
@@ -347,3 +391,12 @@ async def get_tenants(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get tenants"
         )
+
+# The event handlers of the batch endpoint, by the path of their own endpoint
+BATCH_EVENT_HANDLERS = {
+    "/api/events/customer-signup": lambda payload, db: log_customer_signup(SignupEventCreate(**payload), db),
+    "/api/events/deployment-event": log_deployment_event,
+    "/api/events/provisioning-event": log_provisioning_event,
+    "/api/events/package-download": log_package_download,
+    "/api/events/stripe-event": log_stripe_event
+}
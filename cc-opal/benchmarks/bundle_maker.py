@@ -0,0 +1,137 @@
+"""Benchmark of BundleMaker.make_bundle() on a large monorepo.
+
+Creates a git repo with --teams top level directories of --files policy
+files each (plus non policy files), and makes a bundle of one team's
+directory with a few ignore globs, comparing the indexed commit walk with
+the previous implementation (walking the whole commit tree, matching every
+file against the directories and each ignore glob in turn, and parsing the
+package name of every rego file).
+
+usage:
+    python benchmarks/bundle_maker.py [--teams 200] [--files 50] [--runs 5]
+"""
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from git import Repo
+from loguru import logger
+from opal_common.engine import get_rego_package, is_data_module, is_policy_module
+from opal_common.git_utils.bundle_maker import BundleMaker
+from opal_common.paths import PathUtils
+
+EXTENSIONS = [".rego", ".json"]
+BUNDLE_IGNORE = ["*_test.rego", "team-*/drafts/**", "*/fixtures/*.json"]
+
+
+def create_repo(root: Path, teams: int, files: int) -> Repo:
+    for team in range(teams):
+        for sub in ["policies", "policies/lib", "drafts", "fixtures", "docs"]:
+            (root / f"team-{team}" / sub).mkdir(parents=True)
+        for i in range(files):
+            directory = (
+                root / f"team-{team}" / ("policies/lib" if i % 2 else "policies")
+            )
+            (directory / f"policy_{i}.rego").write_text(
+                f'package team{team}.policy{i}\n\nallow {{\n    input.user == "{i}"\n}}\n'
+            )
+            (directory / f"policy_{i}_test.rego").write_text(
+                f"package team{team}.policy{i}_test\n"
+            )
+            (root / f"team-{team}" / "docs" / f"doc_{i}.md").write_text("docs\n")
+        (root / f"team-{team}" / "policies" / "data.json").write_text('{"a": 1}')
+        (root / f"team-{team}" / "drafts" / "draft.rego").write_text("package draft\n")
+        (root / f"team-{team}" / "fixtures" / "users.json").write_text("{}")
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    subprocess.run(["git", "-C", str(root), "add", "."], check=True)
+    subprocess.run(
+        [
+            "git",
+            "-C",
+            str(root),
+            "-c",
+            "user.name=bench",
+            "-c",
+            "user.email=bench@example.com",
+            "commit",
+            "-qm",
+            "init",
+        ],
+        check=True,
+    )
+    return Repo(str(root))
+
+
+def baseline_bundle_files(repo: Repo, directories, extensions, bundle_ignore):
+    """The previous file selection of make_bundle()."""
+
+    def nodes(tree):
+        yield tree
+        yield from tree.blobs
+        for subtree in tree.trees:
+            yield from nodes(subtree)
+
+    modules = []
+    for node in nodes(repo.head.commit.tree):
+        if node.type != "blob":
+            continue
+        path = Path(node.path)
+        if (
+            path.suffix in extensions
+            and PathUtils.is_child_of_directories(path, directories)
+            and PathUtils._glob_style_match_path_to_list(path.as_posix(), bundle_ignore)
+            is None
+        ):
+            contents = node.data_stream.read().decode("utf-8")
+            if is_policy_module(path):
+                modules.append((str(path), get_rego_package(contents)))
+            elif is_data_module(path):
+                modules.append((str(path), None))
+    return modules
+
+
+def timed(label: str, runs: int, fn):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    print(
+        f"    {label:<30} first {timings[0] * 1000:>8.1f}ms"
+        f"  then {min(timings[1:] or timings) * 1000:>8.1f}ms"
+    )
+    return result
+
+
+def main(teams: int, files: int, runs: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = create_repo(Path(tmp) / "repo", teams, files)
+        for directories in [{Path("team-7")}, {Path(".")}]:
+            print(f"bundle of {', '.join(str(d) for d in directories)}:")
+            baseline = timed(
+                "previous implementation",
+                runs,
+                lambda: baseline_bundle_files(
+                    repo, directories, EXTENSIONS, BUNDLE_IGNORE
+                ),
+            )
+            maker = BundleMaker(
+                repo, directories, extensions=EXTENSIONS, bundle_ignore=BUNDLE_IGNORE
+            )
+            bundle = timed(
+                "indexed walk", runs, lambda: maker.make_bundle(repo.head.commit)
+            )
+            assert len(bundle.manifest) == len(baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    logger.remove()
+    main(args.teams, args.files, args.runs)
@@ -0,0 +1,143 @@
+"""Benchmark of loading a complete policy bundle into OPA.
+
+Runs a fake OPA (policies REST API only) that, like OPA, recompiles all of its
+modules on every policy write (simulated as --compile-us microseconds of CPU per
+module), and loads a bundle of --modules modules with OpaClient.set_policies():
+- cold start: OPA has no policies yet
+- reload: OPA already has the bundle (as when the client reconnects or restarts
+  while OPA keeps running)
+Compares the current loader with the previous one (sorting the modules with a
+linear manifest lookup per module, and writing every module of the bundle).
+
+usage:
+    python benchmarks/opa_bundle_load.py [--modules 2000] [--compile-us 5]
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+from pathlib import Path
+
+from aiohttp import web
+from loguru import logger
+from opal_client.policy_store.opa_client import OpaClient
+from opal_common.schemas.policy import PolicyBundle, RegoModule
+
+PORT = 18181
+
+
+class FakeOpa:
+    def __init__(self, compile_us: float):
+        self.modules = {}
+        self.compiles = 0
+        self._compile_seconds = compile_us / 1e6
+
+    def _compile(self):
+        self.compiles += 1
+        deadline = time.perf_counter() + self._compile_seconds * len(self.modules)
+        while time.perf_counter() < deadline:
+            pass
+
+    async def get_policies(self, request):
+        return web.json_response(
+            {
+                "result": [
+                    {"id": module_id, "raw": raw}
+                    for module_id, raw in self.modules.items()
+                ]
+            }
+        )
+
+    async def put_policy(self, request):
+        self.modules[request.match_info["id"]] = await request.text()
+        self._compile()
+        return web.json_response({})
+
+    async def delete_policy(self, request):
+        self.modules.pop(request.match_info["id"], None)
+        self._compile()
+        return web.json_response({})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/policies", self.get_policies)
+        app.router.add_put("/v1/policies/{id:.*}", self.put_policy)
+        app.router.add_delete("/v1/policies/{id:.*}", self.delete_policy)
+        return app
+
+
+def make_bundle(modules: int) -> PolicyBundle:
+    paths = [f"team-{i % 50}/policy_{i}.rego" for i in range(modules)]
+    return PolicyBundle(
+        manifest=paths,
+        hash="abc",
+        data_modules=[],
+        policy_modules=[
+            RegoModule(
+                path=path,
+                package_name=f"team.policy{i}",
+                rego=f'package team.policy{i}\n\nallow {{\n    input.user == "{i}"\n}}\n',
+            )
+            for i, path in enumerate(paths)
+        ],
+        deleted_files=None,
+    )
+
+
+async def previous_set_policies(client: OpaClient, bundle: PolicyBundle):
+    """The previous complete bundle loader."""
+    module_ids_in_store = set(await client.get_policy_module_ids())
+    manifest_paths = [Path(path) for path in bundle.manifest]
+
+    def key_function(module: RegoModule) -> int:
+        try:
+            return manifest_paths.index(Path(module.path))
+        except ValueError:
+            return 10000
+
+    await OpaClient._attempt_operations_with_postponed_failure_retry(
+        [
+            functools.partial(
+                client.set_policy, policy_id=module.path, policy_code=module.rego
+            )
+            for module in sorted(bundle.policy_modules, key=key_function)
+        ]
+    )
+    for module_id in module_ids_in_store - {m.path for m in bundle.policy_modules}:
+        await client.delete_policy(policy_id=module_id)
+
+
+async def main(modules: int, compile_us: float):
+    bundle = make_bundle(modules)
+    for label, load in [
+        ("previous implementation", previous_set_policies),
+        ("current", lambda client, bundle: client.set_policies(bundle)),
+    ]:
+        print(f"{label}:")
+        opa = FakeOpa(compile_us)
+        runner = web.AppRunner(opa.app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", PORT).start()
+        client = OpaClient(f"http://127.0.0.1:{PORT}")
+        try:
+            for scenario in ["cold start", "reload"]:
+                opa.compiles = 0
+                start = time.perf_counter()
+                await load(client, bundle)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"    {scenario:<12} {elapsed * 1000:>9.1f}ms  {opa.compiles:>6} compiles"
+                )
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", type=int, default=2000)
+    parser.add_argument("--compile-us", type=float, default=5)
+    args = parser.parse_args()
+    logger.remove()
+    asyncio.run(main(args.modules, args.compile_us))
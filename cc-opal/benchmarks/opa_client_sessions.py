@@ -0,0 +1,72 @@
+"""Data-update throughput of OpaClient against a local stub OPA.
+
+Compares pooled (long-lived) sessions with the previous behavior of opening a
+new session (and connection) per request, which is emulated by closing the
+client's session after every write.
+
+usage:
+    python benchmarks/opa_client_sessions.py [--updates 2000] [--concurrency 1]
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+from opal_client.policy_store.opa_client import OpaClient
+
+HOST = "127.0.0.1"
+
+
+async def start_stub_opa(port: int) -> web.AppRunner:
+    async def write_data(request: web.Request):
+        await request.read()
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_route("PUT", "/v1/data/{path:.*}", write_data)
+    app.router.add_route("PATCH", "/v1/data/{path:.*}", write_data)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner
+
+
+async def run_updates(
+    client: OpaClient, updates: int, concurrency: int, reuse_session: bool
+) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def update(i: int):
+        async with semaphore:
+            await client.set_policy_data({"value": i}, path=f"/bench/{i % 100}")
+            if not reuse_session:
+                await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(update(i) for i in range(updates)))
+    return time.perf_counter() - start
+
+
+async def main(updates: int, concurrency: int, port: int):
+    runner = await start_stub_opa(port)
+    try:
+        for label, reuse_session in [("session per request", False), ("pooled", True)]:
+            client = OpaClient(f"http://{HOST}:{port}")
+            elapsed = await run_updates(client, updates, concurrency, reuse_session)
+            await client.close()
+            print(
+                f"{label:<20} {updates} updates in {elapsed:.2f}s "
+                f"({updates / elapsed:.0f} updates/s)"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--port", type=int, default=18181)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates, args.concurrency, args.port))
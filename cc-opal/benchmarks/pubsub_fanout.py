@@ -0,0 +1,131 @@
+"""Fan-out benchmark of the server pub/sub endpoint.
+
+Connects --subscribers in-process clients (rpc channels over fake sockets that
+answer every request immediately) to a topic, publishes --messages
+notifications and reports the latency until every client's socket was written
+to. Compares the server's rpc methods (notification encoded once, queued to
+each client's send queue) with the previous behavior (the library's methods:
+the notification is serialized for, and awaited on, every client in turn).
+
+usage:
+    python benchmarks/pubsub_fanout.py [--subscribers 1000 5000 10000] [--messages 5] [--entries 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi_websocket_pubsub.rpc_event_methods import RpcEventServerMethods
+from fastapi_websocket_rpc import RpcChannel
+from fastapi_websocket_rpc.simplewebsocket import JsonSerializingWebSocket
+from loguru import logger
+from opal_common.schemas.data import DataSourceEntry, DataUpdate
+from opal_server.pubsub import OpalEventNotifier, OpalRpcEventServerMethods
+
+
+class FakeClientSocket:
+    """Answers each notify request like a connected client would."""
+
+    def __init__(self, counter: "DeliveryCounter"):
+        self.channel: RpcChannel = None
+        self._counter = counter
+
+    async def send(self, text: str):
+        # (cheaper than parsing the message, which would dominate the measurement)
+        start = text.index('"call_id": "') + len('"call_id": "')
+        call_id = text[start : text.index('"', start)]
+        self._counter.delivered()
+        asyncio.create_task(
+            self.channel.on_message(
+                {"response": {"call_id": call_id, "result": None, "result_type": None}}
+            )
+        )
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+class DeliveryCounter:
+    def __init__(self):
+        self.expected = 0
+        self.count = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count: int):
+        self.expected, self.count = count, 0
+        self.done.clear()
+
+    def delivered(self):
+        self.count += 1
+        if self.count == self.expected:
+            self.done.set()
+
+
+def make_update(entries: int) -> dict:
+    return DataUpdate(
+        entries=[
+            DataSourceEntry(
+                url=f"https://api.example.com/tenants/{i}/users",
+                topics=["policy_data"],
+                dst_path=f"/tenants/{i}/users",
+            )
+            for i in range(entries)
+        ],
+        reason="benchmark",
+    ).dict()
+
+
+async def run(methods_class, subscribers: int, messages: int, entries: int):
+    notifier = OpalEventNotifier()
+    methods = methods_class(notifier)
+    counter = DeliveryCounter()
+    channels = []
+    for i in range(subscribers):
+        socket = FakeClientSocket(counter)
+        socket.channel = RpcChannel(
+            methods._copy_(), JsonSerializingWebSocket(socket), channel_id=f"c{i}"
+        )
+        await socket.channel.methods.subscribe(["policy_data"])
+        channels.append(socket.channel)
+
+    update = make_update(entries)
+    latencies = []
+    for _ in range(messages):
+        counter.expect(subscribers)
+        start = time.perf_counter()
+        await notifier.notify(["policy_data"], update)
+        await counter.done.wait()
+        latencies.append(time.perf_counter() - start)
+        # let the clients' responses settle before the next publish
+        await asyncio.sleep(0.1)
+    for channel in channels:
+        await channel.on_disconnect()
+    await asyncio.sleep(0)
+    return latencies
+
+
+async def main(subscriber_counts, messages: int, entries: int):
+    for subscribers in subscriber_counts:
+        print(f"{subscribers} subscribers:")
+        for label, methods_class in [
+            ("previous implementation", RpcEventServerMethods),
+            ("encode once + send queues", OpalRpcEventServerMethods),
+        ]:
+            latencies = await run(methods_class, subscribers, messages, entries)
+            print(
+                f"    {label:<26} median {statistics.median(latencies) * 1000:>8.1f}ms"
+                f"  max {max(latencies) * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--subscribers", type=int, nargs="+", default=[1000, 5000, 10000]
+    )
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--entries", type=int, default=20)
+    args = parser.parse_args()
+    logger.remove()
+    asyncio.run(main(args.subscribers, args.messages, args.entries))
@@ -0,0 +1,120 @@
+"""Benchmark of serving the same policy bundle from several server workers.
+
+Creates a git repo of --files policy files, and starts --workers processes
+that each serve the complete bundle of HEAD (as the /policy route does) once.
+Compares building the bundle in every worker (the previous behavior) with the
+host's shared bundle cache (built by a single worker, mapped by the others),
+reporting the wall time until all workers served the bundle and the total CPU
+time spent by the workers.
+
+usage:
+    python benchmarks/shared_bundle_cache.py [--workers 8] [--files 5000]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+
+def create_repo(root: Path, files: int):
+    for i in range(files):
+        directory = root / f"team-{i % 50}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"policy_{i}.rego").write_text(
+            f'package team.policy{i}\n\nallow {{\n    input.user == "{i}"\n}}\n'
+        )
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    subprocess.run(["git", "-C", str(root), "add", "."], check=True)
+    subprocess.run(
+        [
+            "git",
+            "-C",
+            str(root),
+            "-c",
+            "user.name=bench",
+            "-c",
+            "user.email=bench@example.com",
+            "commit",
+            "-qm",
+            "init",
+        ],
+        check=True,
+    )
+
+
+def serve_bundle(repo_path: str, cache_path: str, shared: bool, start, done):
+    logger.remove()
+    from git import Repo
+    from opal_server.policy.bundles.api import (
+        make_policy_bundle,
+        policy_bundle_cache_key,
+        render_policy_bundle,
+    )
+    from opal_server.policy.bundles.shared_cache import SharedBundleCache
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_before = usage.ru_utime + usage.ru_stime
+    start.wait()
+    commit_hash = Repo(repo_path).head.commit.hexsha
+    if shared:
+        cache = SharedBundleCache(cache_path)
+        asyncio.run(
+            cache.get_or_build(
+                policy_bundle_cache_key(repo_path, [Path(".")], commit_hash),
+                lambda: render_policy_bundle(repo_path, [Path(".")], commit_hash),
+            )
+        )
+    else:
+        repo = Repo(repo_path)
+        make_policy_bundle(repo, [Path(".")], repo.commit(commit_hash)).json()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    done.put(usage.ru_utime + usage.ru_stime - cpu_before)
+
+
+def run(repo_path: str, cache_path: str, workers: int, shared: bool):
+    start, done = multiprocessing.Event(), multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=serve_bundle, args=(repo_path, cache_path, shared, start, done)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # let the workers import before starting the clock
+    time.sleep(2)
+    began = time.perf_counter()
+    start.set()
+    cpu_times = [done.get() for _ in processes]
+    wall = time.perf_counter() - began
+    for process in processes:
+        process.join()
+    return wall, sum(cpu_times)
+
+
+def main(workers: int, files: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_path = Path(tmp) / "repo"
+        create_repo(repo_path, files)
+        for label, shared in [
+            ("built by every worker", False),
+            ("shared bundle cache", True),
+        ]:
+            wall, cpu = run(str(repo_path), str(Path(tmp) / "cache"), workers, shared)
+            print(f"{label:<24} wall {wall * 1000:>8.1f}ms  total cpu {cpu:>6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--files", type=int, default=5000)
+    args = parser.parse_args()
+    logger.remove()
+    main(args.workers, args.files)
@@ -0,0 +1,112 @@
+"""Microbenchmark of OpaStaticDataCache updates on large documents.
+
+Applies set / patch / delete updates to a document with --keys keys and
+compares the path-indexed cache (plain and compact) with the previous
+implementation (dpath for set / delete, patches re-serialized and parsed by
+jsonpatch). Also reports the memory held by the loaded document.
+
+usage:
+    python benchmarks/static_data_cache.py [--keys 1000000] [--updates 20000] [--baseline-updates 3]
+
+The baseline requires dpath (pip install "dpath>=2.1.5,<3").
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import dpath
+import jsonpatch
+from opal_client.policy_store.opa_client import OpaStaticDataCache
+
+
+class BaselineStaticDataCache:
+    """The previous OpaStaticDataCache implementation."""
+
+    def __init__(self):
+        self._root_data = {}
+
+    def set(self, path, data):
+        if not path or path == "/":
+            self._root_data = data.copy()
+        else:
+            dpath.new(self._root_data, path, data)
+
+    def patch(self, path, data: List[Dict]):
+        for action in data:
+            action["path"] = path + action["path"]
+        patch = jsonpatch.JsonPatch.from_string(json.dumps(data))
+        patch.apply(self._root_data, in_place=True)
+
+    def delete(self, path):
+        dpath.delete(self._root_data, path)
+
+    def get_data(self):
+        return self._root_data
+
+
+def make_document(keys: int) -> Dict:
+    return {
+        "users": {
+            f"user-{i}": {"roles": ["viewer", "editor"], "tenant": f"tenant-{i % 100}"}
+            for i in range(keys)
+        }
+    }
+
+
+def timed(label: str, updates: int, fn: Callable[[int], None]):
+    start = time.perf_counter()
+    for i in range(updates):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<8} {updates / elapsed:>12.1f} ops/s")
+
+
+def run(label: str, cache_factory: Callable, keys: int, updates: int):
+    print(f"{label}:")
+    tracemalloc.start()
+    cache = cache_factory()
+    cache.set("", make_document(keys))
+    print(f"    memory   {tracemalloc.get_traced_memory()[0] / 2**20:>10.0f} MiB")
+    tracemalloc.stop()
+
+    timed(
+        "set",
+        updates,
+        lambda i: cache.set(f"/users/user-{i}/roles", ["viewer", "admin"]),
+    )
+    timed(
+        "patch",
+        updates,
+        lambda i: cache.patch(
+            f"/users/user-{i}",
+            [
+                {"op": "add", "path": "/roles/-", "value": "owner"},
+                {"op": "replace", "path": "/tenant", "value": "tenant-0"},
+            ],
+        ),
+    )
+    timed("delete", updates, lambda i: cache.delete(f"/users/user-{i}"))
+
+
+def main(keys: int, updates: int, baseline_updates: int):
+    run("previous implementation", BaselineStaticDataCache, keys, baseline_updates)
+    run("path-indexed", OpaStaticDataCache, keys, updates)
+    run(
+        "path-indexed (compact)",
+        lambda: OpaStaticDataCache(compact=True),
+        keys,
+        updates,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=20_000)
+    # the previous implementation is orders of magnitude slower on large documents
+    parser.add_argument("--baseline-updates", type=int, default=3)
+    args = parser.parse_args()
+    main(args.keys, args.updates, args.baseline_updates)
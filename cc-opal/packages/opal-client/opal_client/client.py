@@ -7,8 +7,6 @@ import uuid
 from logging import disable
 from typing import Awaitable, Callable, List, Literal, Optional, Union
 
-import aiofiles
-import aiofiles.os
 import aiohttp
 import websockets
 from fastapi import FastAPI, status
@@ -27,6 +25,7 @@ from opal_client.limiter import StartupLoadLimiter
 from opal_client.policy.api import init_policy_router
 from opal_client.policy.updater import PolicyUpdater
 from opal_client.policy_store.api import init_policy_store_router
+from opal_client.policy_store.backup_log import StoreBackupLog
 from opal_client.policy_store.base_policy_store_client import BasePolicyStoreClient
 from opal_client.policy_store.policy_store_client_factory import (
     PolicyStoreClientFactory,
@@ -191,6 +190,10 @@ class OpalClient:
         self.store_backup_interval = (
             store_backup_interval or opal_client_config.STORE_BACKUP_INTERVAL
         )
+        self._store_backup_log = StoreBackupLog(
+            self.store_backup_path,
+            compaction_threshold=opal_client_config.STORE_BACKUP_COMPACTION_THRESHOLD,
+        )
         self._backup_loaded = False
 
         # init fastapi app
@@ -393,47 +396,36 @@ class OpalClient:
         except Exception:
             logger.exception("exception while shutting down updaters")
 
+        # closing pooled connections to the policy store
+        try:
+            await self.policy_store.close()
+        except Exception:
+            logger.exception("exception while closing policy store client")
+
     async def load_store_from_backup(self):
-        """Imports the backup file, if exists, to the policy store."""
+        """Imports the backup (snapshot and log), if exists, to the policy
+        store."""
         try:
-            if os.path.isfile(self.store_backup_path):
-                async with aiofiles.open(self.store_backup_path, "r") as backup_file:
-                    logger.info("importing policy store from backup file...")
-                    await self.policy_store.full_import(backup_file)
-                    logger.debug("import completed")
-                    self._backup_loaded = True
+            if self._store_backup_log.exists():
+                logger.info("importing policy store from backup...")
+                await self.policy_store.import_backup_log(self._store_backup_log)
+                logger.debug("import completed")
+                self._backup_loaded = True
             else:
                 logger.warning("policy store backup file wasn't found")
         except Exception:
             logger.exception("failed to load backup data to policy store")
 
     async def backup_store(self):
-        """Exports the policy store's data to a backup file."""
+        """Appends the policy store writes made since the last backup to the
+        backup log."""
         try:
-            async with self._backup_lock:
-                await aiofiles.os.makedirs(
-                    os.path.dirname(self.store_backup_path), exist_ok=True
-                )
-                tmp_backup_path = ""
-                async with aiofiles.tempfile.NamedTemporaryFile(
-                    "w",
-                    delete=False,
-                    dir=os.path.dirname(self.store_backup_path),
-                    suffix=".json.tmp",
-                ) as backup_file:
-                    tmp_backup_path = backup_file.name
-                    logger.debug("exporting policy store to backup file...")
-                    await self.policy_store.full_export(backup_file)
-                    logger.debug("export completed")
-
-                # Atomically replace the previous backup (only after the new one is ready)
-                await aiofiles.os.replace(tmp_backup_path, self.store_backup_path)
+            logger.debug("backing up policy store changes...")
+            await self._store_backup_log.flush()
         except Exception:
             logger.exception("failed to backup policy store")
 
     async def periodically_backup_store(self):
-        self._backup_lock = asyncio.Lock()
-
         # Backup store periodically
         while True:
             await asyncio.sleep(self.store_backup_interval)
@@ -450,6 +442,8 @@ class OpalClient:
         if self.offline_mode_enabled:
             # Immediately attempt loading from backup (waiting for failure loading from server would delay availability)
             await self.load_store_from_backup()
+            # from now on, every write to the policy store is recorded for the next backup
+            self.policy_store.set_backup_log(self._store_backup_log)
             asyncio.create_task(self.periodically_backup_store())
 
         try:
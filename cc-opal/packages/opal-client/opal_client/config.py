@@ -125,6 +125,25 @@ class OpalClientConfig(Confi):
         description="Path to the file containing the CA certificate(s) used for TLS authentication with the policy store",
     )
 
+    POLICY_STORE_CONN_POOL_SIZE = confi.int(
+        "POLICY_STORE_CONN_POOL_SIZE",
+        100,
+        description="Max number of open connections OPAL client keeps to the policy store "
+        "(the connections are pooled and reused across writes). 0 means unlimited.",
+    )
+    POLICY_STORE_CONN_KEEPALIVE_TIMEOUT = confi.float(
+        "POLICY_STORE_CONN_KEEPALIVE_TIMEOUT",
+        15,
+        description="Time in seconds an idle pooled connection to the policy store is kept open",
+    )
+    POLICY_STORE_DATA_CACHE_COMPACT = confi.bool(
+        "POLICY_STORE_DATA_CACHE_COMPACT",
+        False,
+        description="If set, the policy store data cache (kept for backups in offline mode) is stored "
+        "compactly: object keys are interned and arrays of scalars are frozen, at the cost of "
+        "converting values as they are written",
+    )
+
     EXCLUDE_POLICY_STORE_SECRETS = confi.bool(
         "EXCLUDE_POLICY_STORE_SECRETS",
         False,
@@ -306,6 +325,29 @@ class OpalClientConfig(Confi):
         description="Default URL to fetch data from",
     )
 
+    DATA_POLLING_CONDITIONAL_REQUESTS = confi.bool(
+        "DATA_POLLING_CONDITIONAL_REQUESTS",
+        True,
+        description="If set, polled data sources (with a periodic_update_interval) are fetched with "
+        "conditional requests (If-None-Match / If-Modified-Since), and a 304 Not Modified "
+        "answer leaves the data in the policy store as is",
+    )
+
+    DATA_POLLING_MAX_BACKOFF_FACTOR = confi.float(
+        "DATA_POLLING_MAX_BACKOFF_FACTOR",
+        4,
+        description="While a polled data source is unchanged, its polling interval doubles per poll, "
+        "up to this factor of its periodic_update_interval (a change restores the interval). "
+        "1 disables the backoff",
+    )
+
+    DATA_POLLING_JITTER = confi.float(
+        "DATA_POLLING_JITTER",
+        0.1,
+        description="Polling intervals of data sources are randomly spread by +/- this fraction, "
+        "so clients don't poll a data source in lockstep",
+    )
+
     SHOULD_REPORT_ON_DATA_UPDATES = confi.bool(
         "SHOULD_REPORT_ON_DATA_UPDATES",
         False,
@@ -366,6 +408,12 @@ class OpalClientConfig(Confi):
         60,
         description="Interval in seconds to backup policy store's data",
     )
+    STORE_BACKUP_COMPACTION_THRESHOLD = confi.int(
+        "STORE_BACKUP_COMPACTION_THRESHOLD",
+        64 * 1024 * 1024,
+        description="Size in bytes of the policy store backup log after which it is compacted "
+        "into the backup snapshot (in the background)",
+    )
     OFFLINE_MODE_ENABLED = confi.bool(
         "OFFLINE_MODE_ENABLED",
         False,
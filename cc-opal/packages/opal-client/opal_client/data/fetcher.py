@@ -7,6 +7,7 @@ from opal_common.config import opal_common_config
 from opal_common.fetcher import FetchingEngine
 from opal_common.fetcher.events import FetcherConfig
 from opal_common.fetcher.providers.http_fetch_provider import HttpFetcherConfig
+from opal_common.http_utils import url_origin
 from opal_common.logger import logger
 from opal_common.utils import get_authorization_header, tuple_to_dict
 
@@ -41,6 +42,7 @@ class DataFetcher:
         self._default_fetcher_config = HttpFetcherConfig(
             headers=self._auth_headers, is_json=True
         )
+        self._server_origin = url_origin(opal_client_config.SERVER_URL)
 
     async def __aenter__(self):
         await self.start()
@@ -58,9 +60,18 @@ class DataFetcher:
         await self._engine.terminate_workers()
 
     async def handle_url(
-        self, url: str, config: dict, data: Optional[JsonableValue]
+        self,
+        url: str,
+        config: dict,
+        data: Optional[JsonableValue],
+        validators_key: Optional[str] = None,
     ) -> Optional[JsonableValue]:
-        """Helper function wrapping self._engine.handle_url."""
+        """Helper function wrapping self._engine.handle_url.
+
+        If validators_key is given the url is fetched conditionally, and
+        NOT_MODIFIED is returned if it did not change since the last
+        fetch under that key.
+        """
         if data is not None:
             logger.info("Data provided inline for url: {url}", url=url)
             return data
@@ -69,15 +80,25 @@ class DataFetcher:
             logger.error("Invalid data update: no embedded data or URL")
             return None
 
+        if config is None and url_origin(url) == self._server_origin:
+            # i.e: sources proxied by the server, which requires our token
+            config = self._default_fetcher_config
+
         logger.info("Fetching data from url: {url}", url=url)
         try:
             # ask the engine to get our data
-            response = await self._engine.handle_url(url, config=config)
+            response = await self._engine.handle_url(
+                url, config=config, validators_key=validators_key
+            )
             return response
         except asyncio.TimeoutError as e:
             logger.exception("Timeout while fetching url: {url}", url=url)
             raise
 
+    def forget_validators(self, validators_key: str):
+        """The next fetch under validators_key will be a full fetch."""
+        self._engine.validators_cache.forget(validators_key)
+
     async def handle_urls(
         self, urls: List[Tuple[str, FetcherConfig, Optional[JsonableValue]]] = None
     ) -> List[Tuple[str, FetcherConfig, Any]]:
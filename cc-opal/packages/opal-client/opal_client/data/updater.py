@@ -2,7 +2,6 @@ import asyncio
 import hashlib
 import json
 import uuid
-from functools import partial
 from typing import Any, Dict, List, Optional
 
 import aiohttp
@@ -24,13 +23,15 @@ from opal_client.policy_store.base_policy_store_client import (
 from opal_client.policy_store.policy_store_client_factory import (
     DEFAULT_POLICY_STORE_GETTER,
 )
-from opal_common.async_utils import TasksPool, repeated_call
+from opal_common.async_utils import AdaptiveInterval, TasksPool
 from opal_common.config import opal_common_config
+from opal_common.fetcher.fetch_provider import NOT_MODIFIED
 from opal_common.http_utils import is_http_error_response
 from opal_common.schemas.data import (
     DataEntryReport,
     DataSourceConfig,
     DataSourceEntry,
+    DataSourceEntryWithPollingInterval,
     DataUpdate,
     DataUpdateReport,
 )
@@ -161,6 +162,8 @@ class DataUpdater:
 
         # References to repeated polling tasks (periodic data fetch)
         self._polling_update_tasks = []
+        # hash of the data last saved by each conditionally polled entry (by validators key)
+        self._polled_data_hashes: Dict[str, str] = {}
 
         # Optional user-defined hooks for connection lifecycle
         self._on_connect_callbacks = on_connect or []
@@ -190,10 +193,15 @@ class DataUpdater:
         update = DataUpdate.parse_obj(data)
         await self.trigger_data_update(update)
 
-    async def trigger_data_update(self, update: DataUpdate):
+    async def trigger_data_update(
+        self, update: DataUpdate, conditional: bool = False
+    ) -> asyncio.Task:
         """Queues up a data update to run in the background. If no update ID is
         provided, generate one for tracking/logging.
 
+        Returns the background task (resulting in the entries' reports). If
+        conditional, entries are fetched conditionally (@see _update_policy_data).
+
         Note:
             We spin off the data update in the background so that multiple updates
             can run concurrently. Internally, the `_update_policy_data` method uses
@@ -209,7 +217,9 @@ class DataUpdater:
         # Run the update in the background concurrently with other updates
         # The TaskGroup will manage the lifecycle of this task,
         # managing graceful shutdown of the updater without losing running data updates
-        self._tasks.add_task(self._update_policy_data(update))
+        return self._tasks.add_task(
+            self._update_policy_data(update, conditional=conditional)
+        )
 
     async def get_policy_data_config(self, url: str = None) -> DataSourceConfig:
         """Fetches the DataSourceConfig (list of DataSourceEntry) from the
@@ -282,18 +292,64 @@ class DataUpdater:
         await self.trigger_data_update(update)
 
         # Schedule repeated processing (polling) of periodic entries
-        async def _trigger_update_with_entry(entry: DataSourceEntry):
-            await self.trigger_data_update(
-                DataUpdate(reason="Periodic Update", entries=[entry])
-            )
-
         for entry in periodic_entries:
-            repeat_process_entry = repeated_call(
-                partial(_trigger_update_with_entry, entry),
-                entry.periodic_update_interval,
-                logger=logger,
+            self._polling_update_tasks.append(
+                asyncio.create_task(self._poll_data_entry(entry))
             )
-            self._polling_update_tasks.append(asyncio.create_task(repeat_process_entry))
+
+    async def _poll_data_entry(self, entry: DataSourceEntryWithPollingInterval):
+        """Periodically refreshes the data of a polled entry (one with a
+        'periodic_update_interval').
+
+        Polls are conditional (if DATA_POLLING_CONDITIONAL_REQUESTS), so an
+        unchanged source is neither re-downloaded nor re-written, and back
+        off while the entry's data is unchanged (@see AdaptiveInterval).
+        The first poll is always a full fetch, as the policy store may not
+        hold the entry's data (i.e: after reconnecting, or an OPA restart).
+        """
+        conditional = opal_client_config.DATA_POLLING_CONDITIONAL_REQUESTS
+        self._forget_polled_data(entry)
+        interval = AdaptiveInterval(
+            entry.periodic_update_interval,
+            max_factor=opal_client_config.DATA_POLLING_MAX_BACKOFF_FACTOR,
+            jitter=opal_client_config.DATA_POLLING_JITTER,
+        )
+        last_hash = None
+        while True:
+            changed = True
+            try:
+                update_task = await self.trigger_data_update(
+                    DataUpdate(reason="Periodic Update", entries=[entry]),
+                    conditional=conditional,
+                )
+                # shielded, stopping the polling must not interrupt a running update
+                reports = await asyncio.shield(update_task)
+                if reports:
+                    changed = not reports[0].saved or reports[0].hash != last_hash
+                    last_hash = reports[0].hash
+                else:
+                    # not an entry of our topics
+                    changed = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception(
+                    "Error during periodic update of {url}: {exc}",
+                    url=entry.url,
+                    exc=exc,
+                )
+            await asyncio.sleep(interval.next(changed))
+
+    def _validators_key(self, entry: DataSourceEntry) -> str:
+        """The key under which conditional fetches of an entry are
+        remembered."""
+        return self.calc_hash([entry.url, entry.dst_path, entry.config])
+
+    def _forget_polled_data(self, entry: DataSourceEntry):
+        """Makes the next conditional fetch of entry a full fetch."""
+        validators_key = self._validators_key(entry)
+        self._data_fetcher.forget_validators(validators_key)
+        self._polled_data_hashes.pop(validators_key, None)
 
     async def on_connect(self, client: PubSubClient, channel: RpcChannel):
         """Invoked when the Pub/Sub client establishes a connection to the
@@ -444,7 +500,9 @@ class DataUpdater:
             logger.exception(f"Failed to calculate hash for data {data}: {e}")
             return ""
 
-    async def _update_policy_data(self, update: DataUpdate) -> None:
+    async def _update_policy_data(
+        self, update: DataUpdate, conditional: bool = False
+    ) -> List[DataEntryReport]:
         """Performs the core data update process for the given DataUpdate
         object.
 
@@ -461,9 +519,11 @@ class DataUpdater:
 
         Args:
             update (DataUpdate): The data update instructions (entries, reason, etc.).
+            conditional (bool): Fetch entries conditionally, entries whose source did not change
+                since their last conditional fetch are left as is in the policy store.
 
         Returns:
-            None
+            List[DataEntryReport]: The reports of the processed entries.
         """
         reports: list[DataEntryReport] = []
 
@@ -489,11 +549,14 @@ class DataUpdater:
                 transaction_context as store_transaction,
                 self._dst_lock.lock(entry.dst_path),
             ):
-                report = await self._fetch_and_save_data(entry, store_transaction)
+                report = await self._fetch_and_save_data(
+                    entry, store_transaction, conditional=conditional
+                )
 
             reports.append(report)
 
         await self._send_reports(reports, update)
+        return reports
 
     async def _send_reports(self, reports: list[DataEntryReport], update: DataUpdate):
         """Handles the reporting of completed data updates back to callbacks.
@@ -519,6 +582,7 @@ class DataUpdater:
         self,
         entry: DataSourceEntry,
         store_transaction: PolicyStoreTransactionContextManager,
+        conditional: bool = False,
     ) -> DataEntryReport:
         """Orchestrates fetching data from a source and saving it into the
         policy store.
@@ -532,22 +596,47 @@ class DataUpdater:
             entry (DataSourceEntry): The configuration details of the data source entry.
             store_transaction (PolicyStoreTransactionContextManager): An active
                 transaction to the policy store.
+            conditional (bool): Fetch conditionally, if the source did not change since
+                the entry was last fetched conditionally, nothing is saved.
 
         Returns:
             DataEntryReport: Includes information about whether data was fetched,
                 saved, and the computed hash for the data if successfully saved.
         """
+        validators_key = (
+            self._validators_key(entry) if conditional and entry.data is None else None
+        )
         try:
-            result = await self._fetch_data(entry)
+            result = await self._fetch_data(entry, validators_key=validators_key)
         except Exception as e:
+            if validators_key is not None:
+                self._forget_polled_data(entry)
             store_transaction._update_remote_status(
                 url=entry.url, status=False, error=str(e)
             )
             return DataEntryReport(entry=entry, fetched=False, saved=False)
 
+        if result is NOT_MODIFIED:
+            logger.info(
+                "Data from url '{url}' was not modified since it was last fetched",
+                url=entry.url,
+            )
+            store_transaction._update_remote_status(
+                url=entry.url, status=True, error=""
+            )
+            return DataEntryReport(
+                entry=entry,
+                hash=self._polled_data_hashes.get(validators_key),
+                fetched=True,
+                saved=True,
+            )
+
         try:
             await self._store_fetched_data(entry, result, store_transaction)
         except Exception as e:
+            if validators_key is not None:
+                # the next poll must fetch (and save) the data in full
+                self._forget_polled_data(entry)
             logger.exception("Failed to save data update to policy-store: {exc}", exc=e)
             store_transaction._update_remote_status(
                 url=entry.url,
@@ -561,25 +650,32 @@ class DataUpdater:
             store_transaction._update_remote_status(
                 url=entry.url, status=True, error=""
             )
+            data_hash = self.calc_hash(result)
+            if validators_key is not None:
+                self._polled_data_hashes[validators_key] = data_hash
             return DataEntryReport(
-                entry=entry, hash=self.calc_hash(result), fetched=True, saved=True
+                entry=entry, hash=data_hash, fetched=True, saved=True
             )
 
-    async def _fetch_data(self, entry: DataSourceEntry) -> JsonableValue:
+    async def _fetch_data(
+        self, entry: DataSourceEntry, validators_key: Optional[str] = None
+    ) -> JsonableValue:
         """Fetches data from a data source using the configured data fetcher.
         Handles fetch errors, HTTP errors, and empty responses.
 
         Args:
             entry (DataSourceEntry): The configuration specifying how and where to fetch data.
+            validators_key (str, optional): Fetch conditionally under this key (@see DataFetcher.handle_url).
 
         Returns:
-            JsonableValue: The fetched data, as a JSON-serializable object.
+            JsonableValue: The fetched data, as a JSON-serializable object (or NOT_MODIFIED).
         """
         try:
             result = await self._data_fetcher.handle_url(
                 url=entry.url,
                 config=entry.config,
                 data=entry.data,
+                validators_key=validators_key,
             )
         except Exception as e:
             logger.exception(
@@ -0,0 +1,302 @@
+import asyncio
+import glob
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from opal_client.logger import logger
+
+
+class BackupOp:
+    """Operations recorded in the backup log."""
+
+    SET_POLICY = "set_policy"
+    DELETE_POLICY = "delete_policy"
+    SET_DATA = "set_data"
+    PATCH_DATA = "patch_data"
+    DELETE_DATA = "delete_data"
+    # snapshot only entries
+    SNAPSHOT = "snapshot"
+    SET_ROOT_KEY = "set_root_key"
+
+
+class StoreBackupState:
+    """The policy store state (policies and static data) folded from backup
+    log entries."""
+
+    # a root document that isn't an object (i.e: Cedar's list of entities) is kept under this key
+    LIST_ROOT_KEY = "__root__"
+
+    def __init__(self):
+        from opal_client.policy_store.opa_client import OpaStaticDataCache
+
+        self.policies: Dict[str, str] = {}
+        self.data = OpaStaticDataCache()
+
+    def get_data(self) -> Any:
+        """The root document of the store."""
+        data = self.data.get_data()
+        if list(data.keys()) == [self.LIST_ROOT_KEY]:
+            return data[self.LIST_ROOT_KEY]
+        return data
+
+    def apply(self, entry: Dict[str, Any]):
+        op = entry.get("op")
+        path = entry.get("path", "")
+        if op == BackupOp.SET_POLICY:
+            self.policies[path] = entry["data"]
+        elif op == BackupOp.DELETE_POLICY:
+            self.policies.pop(path, None)
+        elif op == BackupOp.SET_DATA and path == "" and isinstance(entry["data"], list):
+            self.data.set("", {self.LIST_ROOT_KEY: entry["data"]})
+        elif op == BackupOp.SET_DATA:
+            self.data.set(path, entry["data"])
+        elif op == BackupOp.PATCH_DATA:
+            self.data.patch(path, entry["data"])
+        elif op == BackupOp.DELETE_DATA:
+            self.data.delete(path)
+        elif op == BackupOp.SET_ROOT_KEY:
+            self.data.get_data()[entry["key"]] = entry["data"]
+        else:
+            raise ValueError(f"unknown backup log operation: {op}")
+
+
+class StoreBackupLog:
+    """Incremental (snapshot + write-ahead log) backup of the policy store.
+
+    Every write to the policy store is recorded as a json line (op, path, payload).
+    Recorded entries are appended to the current log segment on flush(), so the cost
+    of a backup is proportional to the changes since the previous one.
+
+    Once a segment grows beyond `compaction_threshold` bytes, a new segment is opened,
+    and the snapshot and all closed segments are folded into a new snapshot by a
+    background task (in a worker thread, reading only from the backup files).
+
+    Files (for backup_path=/opal/backup/opa.json):
+        /opal/backup/opa.json         - snapshot, json lines: a header with the last folded
+                                        segment number, followed by policies and data entries
+        /opal/backup/opa.json.wal.<n> - log segments (json lines), replayed in order on restore
+
+    A backup file written by older versions (a single json document with "policies" and
+    "data") is still accepted as a snapshot.
+    """
+
+    WAL_SUFFIX = ".wal."
+
+    def __init__(self, backup_path: str, compaction_threshold: int):
+        self._snapshot_path = backup_path
+        self._compaction_threshold = compaction_threshold
+        self._pending: List[str] = []
+        self._segment: Optional[int] = None
+        self._segment_size = 0
+        self._lock = asyncio.Lock()
+        self._compaction_lock = asyncio.Lock()
+        self._compaction_task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot_path(self) -> str:
+        return self._snapshot_path
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self._snapshot_path}{self.WAL_SUFFIX}{segment}"
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Existing log segments, sorted by their number."""
+        segments = []
+        for path in glob.glob(glob.escape(self._snapshot_path) + self.WAL_SUFFIX + "*"):
+            suffix = path[len(self._snapshot_path) + len(self.WAL_SUFFIX) :]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        return sorted(segments)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self._snapshot_path) or len(self._segments()) > 0
+
+    def record(self, op: str, path: str, data_json: Optional[str] = None):
+        """Records a write to the policy store (to be persisted on the next
+        flush).
+
+        Args:
+            op (str): one of BackupOp
+            path (str): policy id / data path
+            data_json (str, optional): the (already json serialized) payload of the write
+        """
+        entry = f'{{"op": {json.dumps(op)}, "path": {json.dumps(path)}'
+        if data_json is not None:
+            entry += f', "data": {data_json}'
+        self._pending.append(entry + "}\n")
+
+    async def flush(self):
+        """Appends all recorded entries to the current log segment."""
+        async with self._lock:
+            if not self._pending:
+                return
+
+            entries, self._pending = self._pending, []
+            if self._segment is None:
+                self._segment = self._last_folded_or_existing_segment() + 1
+
+            chunk = "".join(entries)
+            segment_path = self._segment_path(self._segment)
+            offset: Optional[int] = None
+            try:
+                await aiofiles.os.makedirs(
+                    os.path.dirname(self._snapshot_path) or ".", exist_ok=True
+                )
+                offset = (
+                    await aiofiles.os.path.getsize(segment_path)
+                    if await aiofiles.os.path.exists(segment_path)
+                    else 0
+                )
+                async with aiofiles.open(segment_path, "a") as f:
+                    await f.write(chunk)
+            except Exception:
+                # i.e: ENOSPC, entries are kept (ahead of the ones recorded meanwhile) for the next flush
+                self._pending[:0] = entries
+                self._truncate_segment(segment_path, offset)
+                raise
+            self._segment_size += len(chunk)
+
+            if self._segment_size >= self._compaction_threshold:
+                # following entries go to a new segment, closed ones are folded in the background
+                self._segment += 1
+                self._segment_size = 0
+                self._schedule_compaction()
+
+    @staticmethod
+    def _truncate_segment(segment_path: str, offset: Optional[int]):
+        """Drops a partially appended chunk, so that it isn't replayed
+        twice."""
+        if offset is None:
+            return
+        try:
+            os.truncate(segment_path, offset)
+        except OSError:
+            logger.exception("failed to truncate policy store backup log segment")
+
+    def _last_folded_or_existing_segment(self) -> int:
+        segments = self._segments()
+        if segments:
+            return segments[-1][0]
+        return self._read_snapshot_header().get("seq", 0)
+
+    def _schedule_compaction(self):
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self.compact())
+
+    async def compact(self):
+        """Folds the snapshot and all closed log segments into a new
+        snapshot."""
+        async with self._compaction_lock:
+            async with self._lock:
+                # the currently open segment (if any) is not folded
+                up_to = (
+                    self._segment - 1
+                    if self._segment is not None
+                    else self._last_folded_or_existing_segment()
+                )
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._compact_sync, up_to
+                )
+            except Exception:
+                logger.exception("failed to compact policy store backup")
+
+    def _compact_sync(self, up_to: int):
+        folded = self._read_snapshot_header().get("seq", 0)
+        segments = []
+        for seq, path in self._segments():
+            if seq <= folded:
+                # already folded (i.e: crashed right after the previous compaction)
+                os.remove(path)
+            elif seq <= up_to:
+                segments.append((seq, path))
+        if not segments:
+            return
+
+        state = StoreBackupState()
+        for entry in self._iter_entries(up_to=up_to):
+            state.apply(entry)
+
+        tmp_path = f"{self._snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"op": BackupOp.SNAPSHOT, "seq": up_to}) + "\n")
+            for policy_id, raw in state.policies.items():
+                f.write(
+                    json.dumps(
+                        {"op": BackupOp.SET_POLICY, "path": policy_id, "data": raw}
+                    )
+                    + "\n"
+                )
+            for key, value in state.data.get_data().items():
+                f.write(
+                    json.dumps(
+                        {"op": BackupOp.SET_ROOT_KEY, "key": key, "data": value},
+                        default=str,
+                    )
+                    + "\n"
+                )
+            f.flush()
+            os.fsync(f.fileno())
+
+        # atomically replace the previous snapshot, only then drop the folded segments
+        os.replace(tmp_path, self._snapshot_path)
+        for _, path in segments:
+            os.remove(path)
+        logger.debug(
+            "compacted {count} policy store backup log segments", count=len(segments)
+        )
+
+    def _read_snapshot_header(self) -> Dict[str, Any]:
+        if not os.path.isfile(self._snapshot_path):
+            return {}
+        with open(self._snapshot_path, "r") as f:
+            first_line = f.readline()
+        if not first_line.startswith('{"op": "snapshot"'):
+            return {}
+        return json.loads(first_line)
+
+    def _iter_entries(self, up_to: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Streams the entries of the snapshot and then of the log segments
+        that weren't folded into it (one line at a time)."""
+        folded = 0
+        if os.path.isfile(self._snapshot_path):
+            with open(self._snapshot_path, "r") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.get("op") == BackupOp.SNAPSHOT:
+                        folded = entry.get("seq", 0)
+                    elif "op" not in entry:
+                        # backup file written by an older version
+                        yield from self._legacy_entries(entry)
+                    else:
+                        yield entry
+
+        for seq, path in self._segments():
+            if seq <= folded or (up_to is not None and seq > up_to):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # torn write (i.e: crashed mid append), ignore
+                        break
+                    yield json.loads(line)
+
+    @staticmethod
+    def _legacy_entries(backup: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for policy_id, raw in backup.get("policies", {}).items():
+            yield {"op": BackupOp.SET_POLICY, "path": policy_id, "data": raw}
+        yield {"op": BackupOp.SET_DATA, "path": "", "data": backup.get("data", {})}
+
+    def _load_sync(self) -> StoreBackupState:
+        state = StoreBackupState()
+        for entry in self._iter_entries():
+            state.apply(entry)
+        return state
+
+    async def load(self) -> StoreBackupState:
+        """Replays the backup (snapshot and log) into a state that can be
+        imported to the policy store."""
+        return await asyncio.get_running_loop().run_in_executor(None, self._load_sync)
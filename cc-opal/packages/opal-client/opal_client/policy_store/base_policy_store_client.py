@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional, Union
 from aiofiles.threadpool.text import AsyncTextIOWrapper
 from opal_client.config import opal_client_config
 from opal_client.logger import logger
+from opal_client.policy_store.backup_log import StoreBackupLog
 from opal_common.schemas.data import JsonableValue
 from opal_common.schemas.policy import PolicyBundle
 from opal_common.schemas.store import RemoteStatus, StoreTransaction
@@ -76,6 +77,14 @@ class AbstractPolicyStore:
     async def full_import(self, reader: AsyncTextIOWrapper) -> None:
         raise NotImplementedError()
 
+    async def import_backup_log(self, backup_log: StoreBackupLog) -> None:
+        raise NotImplementedError()
+
+    async def close(self):
+        """Releases resources held by the store client (i.e: pooled
+        connections), called on shutdown."""
+        pass
+
 
 class PolicyStoreTransactionContextManager(AbstractPolicyStore):
     def __init__(
@@ -138,6 +147,14 @@ class PolicyStoreTransactionContextManager(AbstractPolicyStore):
 class BasePolicyStoreClient(AbstractPolicyStore):
     """An interface for policy and policy-data store."""
 
+    # as long as this is null, writes to the store are not recorded for backup
+    _backup_log: Optional[StoreBackupLog] = None
+
+    def set_backup_log(self, backup_log: Optional[StoreBackupLog]):
+        """Record every following write to the store in the given
+        (incremental) backup log."""
+        self._backup_log = backup_log
+
     def transaction_context(
         self, transaction_id: str, transaction_type: str
     ) -> PolicyStoreTransactionContextManager:
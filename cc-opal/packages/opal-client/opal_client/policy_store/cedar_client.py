@@ -8,6 +8,7 @@ from aiofiles.threadpool.text import AsyncTextIOWrapper
 from fastapi import status
 from opal_client.config import opal_client_config
 from opal_client.logger import logger
+from opal_client.policy_store.backup_log import BackupOp, StoreBackupLog
 from opal_client.policy_store.base_policy_store_client import (
     BasePolicyStoreClient,
     JsonableValue,
@@ -87,13 +88,18 @@ class CedarClient(BasePolicyStoreClient):
                     },
                     headers=headers,
                 ) as cedar_response:
-                    return await proxy_response_unless_invalid(
+                    response = await proxy_response_unless_invalid(
                         cedar_response,
                         accepted_status_codes=[
                             status.HTTP_200_OK,
                             status.HTTP_400_BAD_REQUEST,  # No point in immediate retry, this means erroneous policy (bad syntax, duplicated definition, etc)
                         ],
                     )
+                    if response.status_code == status.HTTP_200_OK:
+                        self._record_write(
+                            BackupOp.SET_POLICY, policy_id, json.dumps(policy_code)
+                        )
+                    return response
             except aiohttp.ClientError as e:
                 logger.warning("Cedar Agent connection error: {err}", err=repr(e))
                 raise
@@ -157,13 +163,15 @@ class CedarClient(BasePolicyStoreClient):
                     f"{self._cedar_url}/policies/{quote_plus(policy_id)}",
                     headers=headers,
                 ) as cedar_response:
-                    return await proxy_response_unless_invalid(
+                    response = await proxy_response_unless_invalid(
                         cedar_response,
                         accepted_status_codes=[
                             status.HTTP_204_NO_CONTENT,
                             status.HTTP_404_NOT_FOUND,
                         ],
                     )
+                    self._record_write(BackupOp.DELETE_POLICY, policy_id)
+                    return response
             except aiohttp.ClientError as e:
                 logger.warning("Cedar Agent connection error: {err}", err=repr(e))
                 raise
@@ -202,6 +210,9 @@ class CedarClient(BasePolicyStoreClient):
                             status.HTTP_304_NOT_MODIFIED,
                         ],
                     )
+                    self._record_write(
+                        BackupOp.SET_DATA, path, json.dumps(policy_data, default=str)
+                    )
                     return response
             except aiohttp.ClientError as e:
                 logger.warning("Cedar Agent connection error: {err}", err=repr(e))
@@ -231,11 +242,16 @@ class CedarClient(BasePolicyStoreClient):
                             status.HTTP_404_NOT_FOUND,
                         ],
                     )
+                    self._record_write(BackupOp.DELETE_DATA, path)
                     return response
             except aiohttp.ClientError as e:
                 logger.warning("Cedar Agent connection error: {err}", err=repr(e))
                 raise
 
+    def _record_write(self, op: str, path: str, data_json: Optional[str] = None):
+        if self._backup_log is not None:
+            self._backup_log.record(op, path, data_json)
+
     @fail_silently()
     @retry(**RETRY_CONFIG)
     async def get_data(self, path: str) -> Dict:
@@ -302,6 +318,14 @@ class CedarClient(BasePolicyStoreClient):
 
         await self.set_policy_data(import_data["data"])
 
+    async def import_backup_log(self, backup_log: StoreBackupLog) -> None:
+        state = await backup_log.load()
+
+        for id, raw in state.policies.items():
+            await self.set_policy(policy_id=id, policy_code=raw)
+
+        await self.set_policy_data(state.get_data())
+
     async def get_policy_version(self) -> Optional[str]:
         return self._policy_version
 
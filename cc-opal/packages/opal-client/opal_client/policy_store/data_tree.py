@@ -0,0 +1,221 @@
+import copy
+import sys
+from typing import Any, Dict, Iterable, List, Union
+
+Container = Union[dict, list]
+
+_SCALARS = (str, int, float, bool, type(None))
+
+# keys of small objects (records) tend to repeat across the document and are worth
+# interning, keys of large objects are usually unique ids (i.e: a map of users)
+_INTERN_MAX_KEYS = 64
+
+
+class DataTreeConflict(Exception):
+    """A JSON patch operation can't be applied to the current document."""
+
+
+def split_data_path(path: str) -> List[str]:
+    """Splits an OPA data path (i.e: /users/bob) into its keys."""
+    return [key for key in path.split("/") if key]
+
+
+def split_json_pointer(pointer: str) -> List[str]:
+    """Splits a JSON pointer (RFC 6901) into its (unescaped) reference
+    tokens."""
+    if not pointer:
+        return []
+    if not pointer.startswith("/"):
+        raise DataTreeConflict(f"invalid json pointer: {pointer}")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")
+    ]
+
+
+def _list_index(container: Union[list, tuple], key: str, allow_end: bool) -> int:
+    if key == "-" and allow_end:
+        return len(container)
+    if not key.isdigit() or (len(key) > 1 and key.startswith("0")):
+        raise DataTreeConflict(f"invalid array index: {key}")
+    index = int(key)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise DataTreeConflict(f"array index out of range: {key}")
+    return index
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """Equality that treats frozen leaves (tuples) as the lists they
+    represent."""
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    return a == b
+
+
+class DataTree:
+    """A JSON document that is modified in place by path.
+
+    set / delete / patch only walk the keys along the given path (O(depth)),
+    without copying or re-serializing the rest of the document, so the cost of an
+    update is independent of the size of the document.
+
+    With `compact=True`, values are stored in a more compact form as they are
+    written: keys of small objects are interned (shared across all objects having
+    the same keys) and arrays of scalars are frozen into tuples. A frozen array is thawed back
+    into a list only when an update targets an element inside it.
+    """
+
+    def __init__(self, compact: bool = False):
+        self._compact = compact
+        self._root: dict = {}
+
+    @property
+    def root(self) -> dict:
+        return self._root
+
+    def _store(self, value: Any) -> Any:
+        """Converts a value to its stored form (a no-op unless compact)."""
+        if not self._compact:
+            return value
+        if isinstance(value, dict):
+            if len(value) > _INTERN_MAX_KEYS:
+                return {k: self._store(v) for k, v in value.items()}
+            return {sys.intern(k): self._store(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if all(isinstance(item, _SCALARS) for item in value):
+                return tuple(value)
+            return [self._store(item) for item in value]
+        return value
+
+    @staticmethod
+    def _child(parent: Container, key: str, create: bool) -> Any:
+        """Returns the child container of parent at key (thawing frozen
+        arrays), optionally creating missing objects on the way."""
+        if isinstance(parent, dict):
+            child = parent.get(key)
+            if isinstance(child, tuple):
+                child = parent[key] = list(child)
+            elif not isinstance(child, (dict, list)):
+                if not create:
+                    raise DataTreeConflict(f"path not found: {key}")
+                child = parent[key] = {}
+            return child
+        index = _list_index(parent, key, allow_end=False)
+        child = parent[index]
+        if isinstance(child, tuple):
+            child = parent[index] = list(child)
+        elif not isinstance(child, (dict, list)):
+            raise DataTreeConflict(f"path not found: {key}")
+        return child
+
+    def _parent(self, keys: List[str], create: bool = False) -> Container:
+        node: Container = self._root
+        for key in keys[:-1]:
+            node = self._child(node, key, create)
+        return node
+
+    def get(self, keys: List[str]) -> Any:
+        node: Any = self._root
+        for key in keys:
+            if isinstance(node, dict):
+                if key not in node:
+                    raise DataTreeConflict(f"path not found: {key}")
+                node = node[key]
+            elif isinstance(node, (list, tuple)):
+                node = node[_list_index(node, key, allow_end=False)]
+            else:
+                raise DataTreeConflict(f"path not found: {key}")
+        return node
+
+    def set(self, path: str, value: Any):
+        """Sets the value at a data path, creating missing parent objects."""
+        keys = split_data_path(path)
+        if not keys:
+            if not isinstance(value, dict):
+                raise ValueError("Setting root document must be a dict")
+            self._root = self._store(value)
+            return
+        parent = self._parent(keys, create=True)
+        if isinstance(parent, dict):
+            parent[self._key(keys[-1])] = self._store(value)
+        else:
+            index = _list_index(parent, keys[-1], allow_end=True)
+            if index == len(parent):
+                parent.append(self._store(value))
+            else:
+                parent[index] = self._store(value)
+
+    def delete(self, path: str):
+        """Deletes the value at a data path (if it exists)."""
+        keys = split_data_path(path)
+        if not keys:
+            self._root = {}
+            return
+        try:
+            self._remove(keys)
+        except DataTreeConflict:
+            pass
+
+    def patch(self, operations: Iterable[Dict[str, Any]], prefix: str = ""):
+        """Applies a JSON patch document (RFC 6902) in place.
+
+        Args:
+            operations: the (json decoded) patch operations, their paths are relative to prefix
+            prefix (str): data path the patch applies to
+        """
+        base = split_data_path(prefix)
+        for operation in operations:
+            op = operation.get("op")
+            path = base + split_json_pointer(operation.get("path", ""))
+            if op == "add":
+                self._add(path, operation.get("value"))
+            elif op == "remove":
+                self._remove(path)
+            elif op == "replace":
+                self._remove(path)
+                self._add(path, operation.get("value"))
+            elif op in ("move", "copy"):
+                if "from" not in operation:
+                    raise DataTreeConflict(f"'from' is missing for {op} operation")
+                source = base + split_json_pointer(operation["from"])
+                if op == "move":
+                    if path[: len(source)] == source and len(path) > len(source):
+                        raise DataTreeConflict("can't move a value into its own child")
+                    value = self._remove(source)
+                else:
+                    value = copy.deepcopy(self.get(source))
+                self._add(path, value)
+            elif op == "test":
+                if not _json_equal(self.get(path), operation.get("value")):
+                    raise DataTreeConflict(f"test failed for path: {operation['path']}")
+            else:
+                raise DataTreeConflict(f"unknown patch operation: {op}")
+
+    def _key(self, key: str) -> str:
+        return sys.intern(key) if self._compact else key
+
+    def _add(self, keys: List[str], value: Any):
+        if not keys:
+            if not isinstance(value, dict):
+                raise ValueError("Setting root document must be a dict")
+            self._root = self._store(value)
+            return
+        parent = self._parent(keys)
+        if isinstance(parent, dict):
+            parent[self._key(keys[-1])] = self._store(value)
+        else:
+            parent.insert(
+                _list_index(parent, keys[-1], allow_end=True), self._store(value)
+            )
+
+    def _remove(self, keys: List[str]) -> Any:
+        if not keys:
+            value, self._root = self._root, {}
+            return value
+        parent = self._parent(keys)
+        if isinstance(parent, dict):
+            if keys[-1] not in parent:
+                raise DataTreeConflict(f"path not found: {keys[-1]}")
+            return parent.pop(keys[-1])
+        return parent.pop(_list_index(parent, keys[-1], allow_end=False))
@@ -3,20 +3,20 @@ import functools
 import json
 import ssl
 import time
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
 from urllib.parse import urlencode
 
 import aiohttp
-import dpath
-import jsonpatch
 from aiofiles.threadpool.text import AsyncTextIOWrapper
 from fastapi import Response, status
 from opal_client.config import opal_client_config
 from opal_client.logger import logger
+from opal_client.policy_store.backup_log import BackupOp, StoreBackupLog
 from opal_client.policy_store.base_policy_store_client import (
     BasePolicyStoreClient,
     JsonableValue,
 )
+from opal_client.policy_store.data_tree import DataTree
 from opal_client.policy_store.schemas import PolicyStoreAuth
 from opal_client.utils import exclude_none_fields, proxy_response
 from opal_common.engine.parsing import get_rego_package
@@ -263,36 +263,34 @@ class OpaStaticDataCache:
     """Caching OPA's static data, so we can back it up without querying.
 
     /v1/data which also includes virtual documents.
+
+    Updates are applied in place on a path-indexed tree (see DataTree), so their
+    cost depends on the depth of the updated path and not on the size of the data.
     """
 
-    def __init__(self):
-        self._root_data = {}
+    def __init__(self, compact: bool = False):
+        self._tree = DataTree(compact=compact)
 
     def set(self, path, data):
-        if not path or path == "/":
-            assert isinstance(data, dict), ValueError(
-                "Setting root document must be a dict"
-            )
-            self._root_data = data.copy()
-        else:
-            # This would overwrite already existing paths
-            dpath.new(self._root_data, path, data)
+        # This would overwrite already existing paths
+        self._tree.set(path, data)
 
-    def patch(self, path, data: List[JSONPatchAction]):
-        for i, _ in enumerate(data):
-            if not path == "/":
-                data[i].path = path + data[i].path
-        patch = jsonpatch.JsonPatch.from_string(json.dumps(exclude_none_fields(data)))
-        patch.apply(self._root_data, in_place=True)
+    def patch(self, path, data: List[Union[JSONPatchAction, Dict[str, Any]]]):
+        self._tree.patch(
+            [
+                exclude_none_fields(action)
+                if isinstance(action, JSONPatchAction)
+                else action
+                for action in data
+            ],
+            prefix=path,
+        )
 
     def delete(self, path):
-        if not path or path == "/":
-            self._root_data = {}
-        else:
-            dpath.delete(self._root_data, path)
+        self._tree.delete(path)
 
     def get_data(self):
-        return self._root_data
+        return self._tree.root
 
 
 class OpaClient(BasePolicyStoreClient):
@@ -387,7 +385,16 @@ class OpaClient(BasePolicyStoreClient):
 
         self._policy_data_cache: Optional[OpaStaticDataCache] = None
         if cache_policy_data:
-            self._policy_data_cache = OpaStaticDataCache()
+            self._policy_data_cache = OpaStaticDataCache(
+                compact=opal_client_config.POLICY_STORE_DATA_CACHE_COMPACT
+            )
+
+        # long-lived session (connection pool) to OPA, created on first use and closed by close()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._conn_pool_size = opal_client_config.POLICY_STORE_CONN_POOL_SIZE
+        self._conn_keepalive_timeout = (
+            opal_client_config.POLICY_STORE_CONN_KEEPALIVE_TIMEOUT
+        )
 
     def _get_custom_ssl_context(self) -> Optional[ssl.SSLContext]:
         if not self._tls_ca:
@@ -404,6 +411,24 @@ class OpaClient(BasePolicyStoreClient):
 
         return ssl_context
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the shared session to OPA, so consecutive writes reuse
+        open connections instead of opening a new session per request."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._conn_pool_size,
+                    keepalive_timeout=self._conn_keepalive_timeout,
+                ),
+                trust_env=True,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
     async def get_policy_version(self) -> Optional[str]:
         return self._policy_version
 
@@ -477,69 +502,68 @@ class OpaClient(BasePolicyStoreClient):
                 f"Ignoring setting policy - {policy_id}, set in POLICY_STORE_POLICY_PATHS_TO_IGNORE."
             )
             return
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-
-                async with session.put(
-                    f"{self._opa_url}/policies/{policy_id}",
-                    data=policy_code,
-                    headers={"content-type": "text/plain", **headers},
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    return await proxy_response_unless_invalid(
-                        opa_response,
-                        accepted_status_codes=[
-                            status.HTTP_200_OK,
-                            # No point in immediate retry, this means erroneous rego (bad syntax, duplicated definition, etc)
-                            status.HTTP_400_BAD_REQUEST,
-                        ],
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+
+            async with session.put(
+                f"{self._opa_url}/policies/{policy_id}",
+                data=policy_code,
+                headers={"content-type": "text/plain", **headers},
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                response = await proxy_response_unless_invalid(
+                    opa_response,
+                    accepted_status_codes=[
+                        status.HTTP_200_OK,
+                        # No point in immediate retry, this means erroneous rego (bad syntax, duplicated definition, etc)
+                        status.HTTP_400_BAD_REQUEST,
+                    ],
+                )
+                if response.status_code == status.HTTP_200_OK:
+                    self._record_policy_write(
+                        BackupOp.SET_POLICY, policy_id, policy_code
                     )
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+                return response
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @fail_silently()
     @retry(**RETRY_CONFIG)
     async def get_policy(self, policy_id: str) -> Optional[str]:
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-
-                async with session.get(
-                    f"{self._opa_url}/policies/{policy_id}",
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    result = await opa_response.json()
-                    return result.get("result", {}).get("raw", None)
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+
+            async with session.get(
+                f"{self._opa_url}/policies/{policy_id}",
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                result = await opa_response.json()
+                return result.get("result", {}).get("raw", None)
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @fail_silently()
     @retry(**RETRY_CONFIG)
     async def get_policies(self) -> Optional[Dict[str, str]]:
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-
-                async with session.get(
-                    f"{self._opa_url}/policies",
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    result = await opa_response.json()
-                    return OpaClient._extract_modules_from_policies_json(result)
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+
+            async with session.get(
+                f"{self._opa_url}/policies",
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                result = await opa_response.json()
+                return OpaClient._extract_modules_from_policies_json(result)
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @affects_transaction
     @retry(**RETRY_CONFIG)
@@ -553,27 +577,41 @@ class OpaClient(BasePolicyStoreClient):
             )
             return
 
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-
-                async with session.delete(
-                    f"{self._opa_url}/policies/{policy_id}",
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    return await proxy_response_unless_invalid(
-                        opa_response,
-                        accepted_status_codes=[
-                            status.HTTP_200_OK,
-                            status.HTTP_404_NOT_FOUND,
-                        ],
-                    )
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+
+            async with session.delete(
+                f"{self._opa_url}/policies/{policy_id}",
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                response = await proxy_response_unless_invalid(
+                    opa_response,
+                    accepted_status_codes=[
+                        status.HTTP_200_OK,
+                        status.HTTP_404_NOT_FOUND,
+                    ],
+                )
+                self._record_policy_write(BackupOp.DELETE_POLICY, policy_id)
+                return response
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
+
+    def _record_policy_write(
+        self, op: str, policy_id: str, policy_code: Optional[str] = None
+    ):
+        # builtin modules (i.e: our health check policy) are not backed up
+        if self._backup_log is None or policy_id in [
+            opal_client_config.OPA_HEALTH_CHECK_POLICY_PATH
+        ]:
+            return
+        self._backup_log.record(
+            op,
+            policy_id,
+            json.dumps(policy_code) if policy_code is not None else None,
+        )
 
     async def get_policy_module_ids(self) -> List[str]:
         modules = await self.get_policies()
@@ -655,13 +693,27 @@ class OpaClient(BasePolicyStoreClient):
             ops = failed_ops  # retry failed ops
 
     async def _set_policies_from_complete_bundle(self, bundle: PolicyBundle):
-        module_ids_in_store: Set[str] = set(await self.get_policy_module_ids())
+        modules_in_store: Dict[str, str] = await self.get_policies()
         module_ids_in_bundle: Set[str] = {
             module.path for module in bundle.policy_modules
         }
-        module_ids_to_delete: Set[str] = module_ids_in_store.difference(
+        module_ids_to_delete: Set[str] = set(modules_in_store.keys()).difference(
             module_ids_in_bundle
         )
+        # OPA recompiles all of its modules on every policy write, so modules
+        # the store already has (i.e: when reloading the complete bundle after
+        # a reconnect or a client restart) are not written again
+        modules_to_load: List[RegoModule] = []
+        for module in BundleUtils.sorted_policy_modules_to_load(bundle):
+            if modules_in_store.get(module.path) == module.rego:
+                self._record_policy_write(BackupOp.SET_POLICY, module.path, module.rego)
+            else:
+                modules_to_load.append(module)
+        logger.info(
+            "Loading {count} policy modules ({unchanged} unchanged in store)",
+            count=len(modules_to_load),
+            unchanged=len(bundle.policy_modules) - len(modules_to_load),
+        )
 
         async with self._lock:
             # save bundled policy *static* data into store
@@ -676,7 +728,7 @@ class OpaClient(BasePolicyStoreClient):
                     functools.partial(
                         self.set_policy, policy_id=module.path, policy_code=module.rego
                     )
-                    for module in BundleUtils.sorted_policy_modules_to_load(bundle)
+                    for module in modules_to_load
                 ]
             )
 
@@ -769,31 +821,32 @@ class OpaClient(BasePolicyStoreClient):
             )
             policy_data = {"items": policy_data}
 
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-                data = json.dumps(exclude_none_fields(policy_data))
-                async with session.put(
-                    f"{self._opa_url}/data{path}",
-                    data=data,
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    response = await proxy_response_unless_invalid(
-                        opa_response,
-                        accepted_status_codes=[
-                            status.HTTP_204_NO_CONTENT,
-                            status.HTTP_304_NOT_MODIFIED,
-                        ],
-                    )
-                    if self._policy_data_cache:
-                        self._policy_data_cache.set(path, json.loads(data))
-                    return response
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+            policy_data = exclude_none_fields(policy_data)
+            data = json.dumps(policy_data)
+            async with session.put(
+                f"{self._opa_url}/data{path}",
+                data=data,
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                response = await proxy_response_unless_invalid(
+                    opa_response,
+                    accepted_status_codes=[
+                        status.HTTP_204_NO_CONTENT,
+                        status.HTTP_304_NOT_MODIFIED,
+                    ],
+                )
+                if self._policy_data_cache:
+                    self._policy_data_cache.set(path, policy_data)
+                if self._backup_log:
+                    self._backup_log.record(BackupOp.SET_DATA, path, data)
+                return response
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @affects_transaction
     @retry(**RETRY_CONFIG)
@@ -812,32 +865,34 @@ class OpaClient(BasePolicyStoreClient):
             )
             policy_data = {"items": policy_data}
 
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-                headers["Content-Type"] = "application/json-patch+json"
-
-                async with session.patch(
-                    f"{self._opa_url}/data{path}",
-                    data=json.dumps(exclude_none_fields(policy_data)),
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    response = await proxy_response_unless_invalid(
-                        opa_response,
-                        accepted_status_codes=[
-                            status.HTTP_204_NO_CONTENT,
-                            status.HTTP_304_NOT_MODIFIED,
-                        ],
-                    )
-                    if self._policy_data_cache:
-                        self._policy_data_cache.patch(path, policy_data)
-                    return response
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+            headers["Content-Type"] = "application/json-patch+json"
+
+            policy_data = exclude_none_fields(policy_data)
+            data = json.dumps(policy_data)
+            async with session.patch(
+                f"{self._opa_url}/data{path}",
+                data=data,
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                response = await proxy_response_unless_invalid(
+                    opa_response,
+                    accepted_status_codes=[
+                        status.HTTP_204_NO_CONTENT,
+                        status.HTTP_304_NOT_MODIFIED,
+                    ],
+                )
+                if self._policy_data_cache:
+                    self._policy_data_cache.patch(path, policy_data)
+                if self._backup_log:
+                    self._backup_log.record(BackupOp.PATCH_DATA, path, data)
+                return response
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @affects_transaction
     @retry(**RETRY_CONFIG)
@@ -848,30 +903,30 @@ class OpaClient(BasePolicyStoreClient):
         if not path:
             return await self.set_policy_data({})
 
-        async with aiohttp.ClientSession(
-            trust_env=True,
-        ) as session:
-            try:
-                headers = await self._get_auth_headers()
-
-                async with session.delete(
-                    f"{self._opa_url}/data{path}",
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    response = await proxy_response_unless_invalid(
-                        opa_response,
-                        accepted_status_codes=[
-                            status.HTTP_204_NO_CONTENT,
-                            status.HTTP_404_NOT_FOUND,
-                        ],
-                    )
-                    if self._policy_data_cache:
-                        self._policy_data_cache.delete(path)
-                    return response
-            except aiohttp.ClientError as e:
-                logger.warning("Opa connection error: {err}", err=repr(e))
-                raise
+        session = self._get_session()
+        try:
+            headers = await self._get_auth_headers()
+
+            async with session.delete(
+                f"{self._opa_url}/data{path}",
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                response = await proxy_response_unless_invalid(
+                    opa_response,
+                    accepted_status_codes=[
+                        status.HTTP_204_NO_CONTENT,
+                        status.HTTP_404_NOT_FOUND,
+                    ],
+                )
+                if self._policy_data_cache:
+                    self._policy_data_cache.delete(path)
+                if self._backup_log:
+                    self._backup_log.record(BackupOp.DELETE_DATA, path)
+                return response
+        except aiohttp.ClientError as e:
+            logger.warning("Opa connection error: {err}", err=repr(e))
+            raise
 
     @fail_silently()
     @retry(**RETRY_CONFIG)
@@ -888,16 +943,14 @@ class OpaClient(BasePolicyStoreClient):
         try:
             headers = await self._get_auth_headers()
 
-            async with aiohttp.ClientSession(
-                trust_env=True,
-            ) as session:
-                async with session.get(
-                    f"{self._opa_url}/data{path}",
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    json_response = await opa_response.json()
-                    return json_response.get("result", {})
+            session = self._get_session()
+            async with session.get(
+                f"{self._opa_url}/data{path}",
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                json_response = await opa_response.json()
+                return json_response.get("result", {})
         except aiohttp.ClientError as e:
             logger.warning("Opa connection error: {err}", err=repr(e))
             raise
@@ -920,16 +973,14 @@ class OpaClient(BasePolicyStoreClient):
         try:
             headers = await self._get_auth_headers()
 
-            async with aiohttp.ClientSession(
-                trust_env=True,
-            ) as session:
-                async with session.post(
-                    f"{self._opa_url}/data/{path}",
-                    data=json.dumps(opa_input),
-                    headers=headers,
-                    **self._ssl_context_kwargs,
-                ) as opa_response:
-                    return await proxy_response(opa_response)
+            session = self._get_session()
+            async with session.post(
+                f"{self._opa_url}/data/{path}",
+                data=json.dumps(opa_input),
+                headers=headers,
+                **self._ssl_context_kwargs,
+            ) as opa_response:
+                return await proxy_response(opa_response)
         except aiohttp.ClientError as e:
             logger.warning("Opa connection error: {err}", err=repr(e))
             raise
@@ -989,3 +1040,15 @@ class OpaClient(BasePolicyStoreClient):
         )
 
         await self.set_policy_data(import_data["data"])
+
+    async def import_backup_log(self, backup_log: StoreBackupLog) -> None:
+        state = await backup_log.load()
+
+        await OpaClient._attempt_operations_with_postponed_failure_retry(
+            [
+                functools.partial(self.set_policy, policy_id=id, policy_code=raw)
+                for id, raw in state.policies.items()
+            ]
+        )
+
+        await self.set_policy_data(state.data.get_data())
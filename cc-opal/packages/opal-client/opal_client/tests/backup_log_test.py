@@ -0,0 +1,211 @@
+import errno
+import json
+import os
+import sys
+
+import aiofiles
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_client.policy_store.backup_log import BackupOp, StoreBackupLog
+from opal_client.policy_store.cedar_client import CedarClient
+
+
+def record_writes(log: StoreBackupLog):
+    log.record(BackupOp.SET_POLICY, "rbac.rego", json.dumps("package rbac"))
+    log.record(BackupOp.SET_POLICY, "old.rego", json.dumps("package old"))
+    log.record(BackupOp.SET_DATA, "", json.dumps({"users": {"bob": {"role": "a"}}}))
+    log.record(BackupOp.SET_DATA, "/roles", json.dumps(["a", "b"]))
+    log.record(
+        BackupOp.PATCH_DATA,
+        "/users",
+        json.dumps([{"op": "add", "path": "/alice", "value": {"role": "b"}}]),
+    )
+    log.record(BackupOp.DELETE_DATA, "/users/bob")
+    log.record(BackupOp.DELETE_POLICY, "old.rego")
+
+
+EXPECTED_POLICIES = {"rbac.rego": "package rbac"}
+EXPECTED_DATA = {"users": {"alice": {"role": "b"}}, "roles": ["a", "b"]}
+
+
+@pytest.mark.asyncio
+async def test_flush_appends_only_new_entries(tmp_path):
+    log = StoreBackupLog(str(tmp_path / "opa.json"), compaction_threshold=1 << 20)
+    assert not log.exists()
+
+    log.record(BackupOp.SET_DATA, "/a", json.dumps(1))
+    await log.flush()
+    log.record(BackupOp.SET_DATA, "/b", json.dumps(2))
+    await log.flush()
+    # nothing recorded, nothing written
+    await log.flush()
+
+    assert log.exists()
+    with open(tmp_path / "opa.json.wal.1") as f:
+        lines = f.readlines()
+    assert [json.loads(line)["path"] for line in lines] == ["/a", "/b"]
+
+    state = await log.load()
+    assert state.data.get_data() == {"a": 1, "b": 2}
+
+
+@pytest.mark.asyncio
+async def test_replay_log(tmp_path):
+    log = StoreBackupLog(str(tmp_path / "opa.json"), compaction_threshold=1 << 20)
+    record_writes(log)
+    await log.flush()
+
+    # a new instance (i.e: after restart) replays the log
+    state = await StoreBackupLog(str(tmp_path / "opa.json"), 1 << 20).load()
+    assert state.policies == EXPECTED_POLICIES
+    assert state.data.get_data() == EXPECTED_DATA
+
+
+@pytest.mark.asyncio
+async def test_compaction(tmp_path):
+    backup_path = str(tmp_path / "opa.json")
+    log = StoreBackupLog(backup_path, compaction_threshold=100)
+    record_writes(log)
+    await log.flush()  # crosses the threshold, the segment is closed
+    log.record(BackupOp.SET_DATA, "/extra", json.dumps(True))
+    await log.flush()
+    await log.compact()
+
+    # the folded segment was removed, the open one is kept
+    assert not os.path.exists(f"{backup_path}.wal.1")
+    assert os.path.exists(f"{backup_path}.wal.2")
+    with open(backup_path) as f:
+        assert json.loads(f.readline()) == {"op": "snapshot", "seq": 1}
+
+    state = await StoreBackupLog(backup_path, 1).load()
+    assert state.policies == EXPECTED_POLICIES
+    assert state.data.get_data() == {**EXPECTED_DATA, "extra": True}
+
+    # writes after a restart go to a new segment
+    log = StoreBackupLog(backup_path, compaction_threshold=1 << 20)
+    log.record(BackupOp.DELETE_DATA, "/extra")
+    await log.flush()
+    assert os.path.exists(f"{backup_path}.wal.3")
+    state = await log.load()
+    assert state.data.get_data() == EXPECTED_DATA
+
+
+@pytest.mark.asyncio
+async def test_load_legacy_backup(tmp_path):
+    backup_path = str(tmp_path / "opa.json")
+    with open(backup_path, "w") as f:
+        f.write(json.dumps({"policies": EXPECTED_POLICIES, "data": EXPECTED_DATA}))
+
+    log = StoreBackupLog(backup_path, compaction_threshold=1)
+    log.record(BackupOp.SET_DATA, "/roles", json.dumps(["c"]))
+    await log.flush()
+
+    state = await log.load()
+    assert state.policies == EXPECTED_POLICIES
+    assert state.data.get_data() == {**EXPECTED_DATA, "roles": ["c"]}
+
+    await log.compact()
+    state = await StoreBackupLog(backup_path, 1).load()
+    assert state.data.get_data() == {**EXPECTED_DATA, "roles": ["c"]}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_entries(tmp_path, monkeypatch):
+    log = StoreBackupLog(str(tmp_path / "opa.json"), compaction_threshold=1 << 20)
+    log.record(BackupOp.SET_DATA, "/a", json.dumps(1))
+    await log.flush()
+
+    def no_space(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    log.record(BackupOp.SET_DATA, "/b", json.dumps(2))
+    with monkeypatch.context() as m:
+        m.setattr(aiofiles, "open", no_space)
+        with pytest.raises(OSError):
+            await log.flush()
+
+    # written on the next flush, ahead of the writes recorded meanwhile
+    log.record(BackupOp.SET_DATA, "/b", json.dumps(3))
+    await log.flush()
+    with open(tmp_path / "opa.json.wal.1") as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line["path"], line["data"]) for line in lines] == [
+        ("/a", 1),
+        ("/b", 2),
+        ("/b", 3),
+    ]
+
+
+class FakeCedarAgent:
+    """Serves the cedar-agent endpoints used by CedarClient."""
+
+    def __init__(self):
+        self.policies = {}
+        self.data = []
+        self.app = web.Application()
+        self.app.router.add_get("/v1/policies", self.get_policies)
+        self.app.router.add_put("/v1/policies/{id}", self.put_policy)
+        self.app.router.add_delete("/v1/policies/{id}", self.delete_policy)
+        self.app.router.add_get("/v1/data", self.get_data)
+        self.app.router.add_put("/v1/data", self.put_data)
+        self.app.router.add_delete("/v1/data", self.delete_data)
+
+    async def get_policies(self, request):
+        return web.json_response(
+            [{"id": id, "content": content} for id, content in self.policies.items()]
+        )
+
+    async def put_policy(self, request):
+        self.policies[request.match_info["id"]] = (await request.json())["content"]
+        return web.json_response({})
+
+    async def delete_policy(self, request):
+        if self.policies.pop(request.match_info["id"], None) is None:
+            return web.Response(status=404)
+        return web.Response(status=204)
+
+    async def get_data(self, request):
+        return web.json_response(self.data)
+
+    async def put_data(self, request):
+        self.data = await request.json()
+        return web.Response(status=204)
+
+    async def delete_data(self, request):
+        self.data = []
+        return web.Response(status=204)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compact", [False, True])
+async def test_cedar_backup_and_restore(tmp_path, compact):
+    backup_path = str(tmp_path / "cedar.json")
+    entities = [{"uid": {"type": "User", "id": "alice"}, "attrs": {}, "parents": []}]
+
+    async with TestServer(FakeCedarAgent().app) as server:
+        client = CedarClient(str(server.make_url("")).rstrip("/"))
+        client.set_backup_log(StoreBackupLog(backup_path, compaction_threshold=1))
+        await client.set_policy("rbac.cedar", "permit(principal, action, resource);")
+        await client.set_policy("old.cedar", "forbid(principal, action, resource);")
+        await client.delete_policy("old.cedar")
+        await client.delete_policy_data()
+        await client.set_policy_data(entities)
+        await client._backup_log.flush()
+        if compact:
+            await client._backup_log.compact()
+
+    restored = FakeCedarAgent()
+    async with TestServer(restored.app) as server:
+        client = CedarClient(str(server.make_url("")).rstrip("/"))
+        await client.import_backup_log(StoreBackupLog(backup_path, 1 << 20))
+
+    assert restored.policies == {"rbac.cedar": "permit(principal, action, resource);"}
+    assert restored.data == entities
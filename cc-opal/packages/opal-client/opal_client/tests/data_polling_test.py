@@ -0,0 +1,158 @@
+import asyncio
+import os
+import sys
+from typing import List, Optional
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_client.config import opal_client_config
+from opal_client.data.updater import DataUpdate, DataUpdater
+from opal_client.policy_store.policy_store_client_factory import (
+    PolicyStoreClientFactory,
+)
+from opal_client.policy_store.schemas import PolicyStoreTypes
+from opal_common.async_utils import AdaptiveInterval
+from opal_common.fetcher.fetch_provider import NOT_MODIFIED
+from opal_common.schemas.data import DataSourceEntryWithPollingInterval
+
+DATA_TOPICS = ["policy_data"]
+DATA_URL = "http://localhost:7123/polled_data"
+
+
+class FakeDataFetcher:
+    """Serves `versions` of a source that supports conditional fetches."""
+
+    def __init__(self, versions: List[dict]):
+        self.versions = versions
+        self.requests: List[Optional[str]] = []
+        self._validators = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def forget_validators(self, validators_key: str):
+        self._validators.pop(validators_key, None)
+
+    async def handle_url(self, url, config, data, validators_key=None):
+        version = len(self.requests) if len(self.requests) < len(self.versions) else -1
+        self.requests.append(validators_key)
+        current = self.versions[version]
+        if validators_key is not None:
+            if self._validators.get(validators_key) == str(current):
+                return NOT_MODIFIED
+            self._validators[validators_key] = str(current)
+        return current
+
+
+def make_updater(fetcher: FakeDataFetcher):
+    policy_store = PolicyStoreClientFactory.create(store_type=PolicyStoreTypes.MOCK)
+    updater = DataUpdater(
+        data_fetcher=fetcher,
+        policy_store=policy_store,
+        data_topics=DATA_TOPICS,
+        should_send_reports=False,
+    )
+    policy_store.writes = []
+    set_policy_data = policy_store.set_policy_data
+
+    async def recording_set_policy_data(*args, **kwargs):
+        policy_store.writes.append(kwargs.get("path"))
+        await set_policy_data(*args, **kwargs)
+
+    policy_store.set_policy_data = recording_set_policy_data
+    return updater, policy_store
+
+
+def polled_entry(interval: float = 0.01) -> DataSourceEntryWithPollingInterval:
+    return DataSourceEntryWithPollingInterval(
+        url=DATA_URL,
+        topics=DATA_TOPICS,
+        dst_path="/polled",
+        periodic_update_interval=interval,
+    )
+
+
+def test_adaptive_interval():
+    interval = AdaptiveInterval(10, max_factor=4)
+    assert interval.next(changed=True) == 10
+    assert [interval.next(changed=False) for _ in range(4)] == [20, 40, 40, 40]
+    assert interval.next(changed=True) == 10
+
+    jittered = AdaptiveInterval(10, jitter=0.2)
+    seconds = {jittered.next() for _ in range(50)}
+    assert all(8 <= s <= 12 for s in seconds)
+    assert len(seconds) > 1
+
+
+@pytest.mark.asyncio
+async def test_not_modified_data_is_not_written():
+    fetcher = FakeDataFetcher([{"roles": ["admin"]}])
+    updater, policy_store = make_updater(fetcher)
+    entry = polled_entry()
+    first = await updater._update_policy_data(
+        DataUpdate(entries=[entry]), conditional=True
+    )
+    second = await updater._update_policy_data(
+        DataUpdate(entries=[entry]), conditional=True
+    )
+
+    assert policy_store.writes == ["/polled"]
+    assert await policy_store.get_data("/polled") == {"roles": ["admin"]}
+    assert second[0].saved and second[0].fetched
+    # the store still holds the data of the first fetch
+    assert second[0].hash == first[0].hash
+
+
+@pytest.mark.asyncio
+async def test_polling_backs_off_while_unchanged(monkeypatch):
+    monkeypatch.setattr(opal_client_config, "DATA_POLLING_JITTER", 0)
+    fetcher = FakeDataFetcher([{"v": 1}, {"v": 1}, {"v": 1}, {"v": 2}, {"v": 2}])
+    updater, policy_store = make_updater(fetcher)
+    changes = []
+    next_interval = AdaptiveInterval.next
+
+    def recording_next(self, changed=True):
+        changes.append(changed)
+        next_interval(self, changed)
+        return 0.001
+
+    monkeypatch.setattr(AdaptiveInterval, "next", recording_next)
+    poller = asyncio.create_task(updater._poll_data_entry(polled_entry()))
+    while len(changes) < 5:
+        await asyncio.sleep(0.01)
+    poller.cancel()
+    await asyncio.gather(poller, return_exceptions=True)
+    await updater._tasks.shutdown()
+
+    assert changes[:5] == [True, False, False, True, False]
+    # the first poll is a full fetch, later polls are conditional
+    assert fetcher.requests[0] is not None
+    assert len(set(fetcher.requests)) == 1
+    assert await policy_store.get_data("/polled") == {"v": 2}
+
+
+@pytest.mark.asyncio
+async def test_polling_restarts_with_a_full_fetch():
+    fetcher = FakeDataFetcher([{"v": 1}])
+    updater, policy_store = make_updater(fetcher)
+    entry = polled_entry(interval=10)
+    for _ in range(2):
+        # i.e: get_base_policy_data after reconnecting
+        poller = asyncio.create_task(updater._poll_data_entry(entry))
+        await asyncio.sleep(0.05)
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+
+    # both pollers fetched and wrote the data
+    assert len(fetcher.requests) == 2
+    assert policy_store.writes == ["/polled", "/polled"]
+    await updater._tasks.shutdown()
@@ -0,0 +1,119 @@
+import copy
+import json
+import os
+import sys
+
+import jsonpatch
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_client.policy_store.data_tree import DataTree, DataTreeConflict
+from opal_client.policy_store.opa_client import OpaStaticDataCache
+from opal_common.schemas.store import JSONPatchAction
+
+DOCUMENT = {
+    "users": {
+        "bob": {"roles": ["admin", "viewer"], "age": 42},
+        "alice": {"roles": ["viewer"], "tags": [{"k": "v"}]},
+    },
+    "a/b": {"~x": 1},
+}
+
+PATCHES = [
+    [{"op": "add", "path": "/users/carol", "value": {"roles": []}}],
+    [{"op": "add", "path": "/users/bob/roles/-", "value": "editor"}],
+    [{"op": "add", "path": "/users/bob/roles/0", "value": "owner"}],
+    [{"op": "remove", "path": "/users/bob/roles/1"}],
+    [{"op": "replace", "path": "/users/bob/age", "value": 43}],
+    [{"op": "move", "from": "/users/bob", "path": "/users/robert"}],
+    [{"op": "copy", "from": "/users/alice/tags", "path": "/tags"}],
+    [{"op": "test", "path": "/users/bob/roles", "value": ["admin", "viewer"]}],
+    [{"op": "add", "path": "/a~1b/~0x", "value": 2}],
+    [{"op": "add", "path": "", "value": {"fresh": True}}],
+]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("patch", PATCHES)
+def test_patch_matches_jsonpatch(patch, compact):
+    tree = DataTree(compact=compact)
+    tree.set("", copy.deepcopy(DOCUMENT))
+    tree.patch(copy.deepcopy(patch))
+
+    expected = jsonpatch.apply_patch(DOCUMENT, patch)
+    # frozen leaves serialize as the arrays they represent
+    assert json.loads(json.dumps(tree.root)) == expected
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        [{"op": "remove", "path": "/users/dave"}],
+        [{"op": "replace", "path": "/users/bob/roles/5", "value": "x"}],
+        [{"op": "add", "path": "/users/dave/roles", "value": []}],
+        [{"op": "test", "path": "/users/bob/age", "value": 7}],
+        [{"op": "move", "from": "/users", "path": "/users/bob/users"}],
+    ],
+)
+def test_patch_conflicts(patch):
+    tree = DataTree()
+    tree.set("", copy.deepcopy(DOCUMENT))
+    with pytest.raises(DataTreeConflict):
+        tree.patch(patch)
+
+
+def test_set_and_delete_by_path():
+    tree = DataTree()
+    tree.set("/users/bob/roles", ["admin"])
+    tree.set("/users/bob/roles/1", "viewer")
+    tree.set("/groups", {})
+    assert tree.root == {"users": {"bob": {"roles": ["admin", "viewer"]}}, "groups": {}}
+
+    tree.delete("/users/bob/roles/0")
+    tree.delete("/users/nobody")
+    tree.delete("/groups")
+    assert tree.root == {"users": {"bob": {"roles": ["viewer"]}}}
+
+    with pytest.raises(ValueError):
+        tree.set("", [])
+    tree.delete("/")
+    assert tree.root == {}
+
+
+def test_updates_do_not_copy_siblings():
+    tree = DataTree()
+    sibling = {"big": list(range(10))}
+    tree.set("", {"sibling": sibling, "target": {}})
+    tree.set("/target/x", 1)
+    tree.patch([{"op": "add", "path": "/y", "value": 2}], prefix="/target")
+    assert tree.root["sibling"] is sibling
+    assert tree.root["target"] == {"x": 1, "y": 2}
+
+
+def test_compact_storage():
+    tree = DataTree(compact=True)
+    key = "".join(["ro", "les"])
+    tree.set("/users", {"bob": {key: ["admin"]}, "alice": {"roles": ["viewer"]}})
+    bob_key = next(iter(tree.root["users"]["bob"]))
+    alice_key = next(iter(tree.root["users"]["alice"]))
+    assert bob_key is alice_key
+    assert tree.root["users"]["bob"]["roles"] == ("admin",)
+
+    # frozen leaves are thawed when updated
+    tree.patch([{"op": "add", "path": "/users/bob/roles/-", "value": "viewer"}])
+    assert tree.root["users"]["bob"]["roles"] == ["admin", "viewer"]
+
+
+def test_static_data_cache_accepts_patch_models():
+    cache = OpaStaticDataCache()
+    cache.set("/users", {"bob": {}})
+    action = JSONPatchAction(op="add", path="/role", value="admin")
+    cache.patch("/users/bob", [action])
+    assert cache.get_data() == {"users": {"bob": {"role": "admin"}}}
+    # the patch actions are not modified
+    assert action.path == "/role"
@@ -6,6 +6,7 @@ import pytest
 from fastapi import Response, status
 from opal_client.policy_store.opa_client import OpaClient, should_ignore_path
 from opal_client.policy_store.schemas import PolicyStoreAuth
+from opal_common.schemas.policy import PolicyBundle, RegoModule
 
 TEST_CA_CERT = """-----BEGIN CERTIFICATE-----
 MIIBdjCCAR2gAwIBAgIUaQ/M1qL0GzsTMChEAJsLLFgz7a4wCgYIKoZIzj0EAwIw
@@ -227,3 +228,64 @@ def test_should_ignore_path_keeping_higher_priority_to_ones_defined_as_not_to_ig
     )
     assert should_ignore_path("otherFolder", ignore_paths) == True
     assert should_ignore_path("otherFolder/file.txt", ignore_paths) == True
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_until_closed():
+    c = OpaClient("http://example.com")
+    session = c._get_session()
+    assert c._get_session() is session
+
+    await c.close()
+    assert session.closed
+    # a new session is opened if the client is used after close
+    new_session = c._get_session()
+    assert new_session is not session
+    await c.close()
+
+
+@pytest.mark.asyncio
+async def test_complete_bundle_skips_modules_unchanged_in_store():
+    client = OpaClient("http://example.com")
+    store = {"unchanged.rego": "package unchanged\n", "removed.rego": "package gone\n"}
+    writes = []
+
+    async def get_policies():
+        return dict(store)
+
+    async def set_policy(policy_id, policy_code, transaction_id=None):
+        writes.append(("set", policy_id))
+        store[policy_id] = policy_code
+        return Response(status_code=status.HTTP_200_OK)
+
+    async def delete_policy(policy_id, transaction_id=None):
+        writes.append(("delete", policy_id))
+        store.pop(policy_id)
+        return Response(status_code=status.HTTP_200_OK)
+
+    client.get_policies = get_policies
+    client.set_policy = set_policy
+    client.delete_policy = delete_policy
+
+    bundle = PolicyBundle(
+        manifest=["changed.rego", "unchanged.rego", "new.rego"],
+        hash="abc",
+        data_modules=[],
+        policy_modules=[
+            RegoModule(path="new.rego", package_name="new", rego="package new\n"),
+            RegoModule(
+                path="unchanged.rego",
+                package_name="unchanged",
+                rego="package unchanged\n",
+            ),
+        ],
+        deleted_files=None,
+    )
+    await client.set_policies(bundle)
+
+    assert writes == [("set", "new.rego"), ("delete", "removed.rego")]
+    assert store == {
+        "unchanged.rego": "package unchanged\n",
+        "new.rego": "package new\n",
+    }
+    assert await client.get_policy_version() == "abc"
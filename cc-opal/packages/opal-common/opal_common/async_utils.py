@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import random
 import sys
 from functools import partial
 from typing import Any, Callable, Coroutine, Optional, Set, Tuple, TypeVar
@@ -107,6 +108,7 @@ class TasksPool:
         t = asyncio.create_task(f)
         self._tasks.add(t)
         t.add_done_callback(self._cleanup_task)
+        return t
 
     async def shutdown(self, force: bool = False):
         """Wait for them to finish.
@@ -148,3 +150,42 @@ async def repeated_call(
                 func=func,
                 exc=exc,
             )
+
+
+class AdaptiveInterval:
+    """The interval between the calls of a polling loop.
+
+    While the polled source is unchanged, the interval grows by `backoff`
+    per poll (up to `max_factor` times the base interval), and a change
+    brings it back to the base interval. Each interval is randomly
+    spread by +/- `jitter` (a fraction of it), so many pollers started
+    together (i.e: clients reconnecting after a server restart) drift
+    apart instead of polling the source in lockstep.
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        max_factor: float = 1,
+        backoff: float = 2,
+        jitter: float = 0,
+    ):
+        self._seconds = seconds
+        self._max_factor = max(max_factor, 1)
+        self._backoff = backoff
+        self._jitter = min(max(jitter, 0), 1)
+        self._factor = 1.0
+
+    @property
+    def factor(self) -> float:
+        return self._factor
+
+    def next(self, changed: bool = True) -> float:
+        """Returns the seconds to wait before the next poll, given whether
+        the last poll found the source changed."""
+        if changed:
+            self._factor = 1.0
+        else:
+            self._factor = min(self._factor * self._backoff, self._max_factor)
+        seconds = self._seconds * self._factor
+        return seconds * random.uniform(1 - self._jitter, 1 + self._jitter)
@@ -220,6 +220,17 @@ class OpalCommonConfig(Confi):
         description="The timeout for the httpx or aiohttp fetcher provider, in seconds. "
         "if provided different value, 5 seconds will be used.",
     )
+    HTTP_FETCHER_POOL_SIZE = confi.int(
+        "HTTP_FETCHER_POOL_SIZE",
+        100,
+        description="Max number of open connections the fetching engine keeps per data source host "
+        "(sessions are reused across fetch events). 0 means unlimited (aiohttp only).",
+    )
+    HTTP_FETCHER_KEEPALIVE_TIMEOUT = confi.float(
+        "HTTP_FETCHER_KEEPALIVE_TIMEOUT",
+        15,
+        description="Time in seconds an idle pooled connection to a data source is kept open",
+    )
 
 
 opal_common_config = OpalCommonConfig(prefix="OPAL_")
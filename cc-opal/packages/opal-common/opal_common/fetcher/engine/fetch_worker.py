@@ -28,6 +28,8 @@ async def fetch_worker(queue: asyncio.Queue, engine):
         try:
             # get fetcher for the event
             fetcher = register.get_fetcher_for_event(event)
+            fetcher.set_session_pool(engine.session_pool)
+            fetcher.set_validators_cache(engine.validators_cache)
             # fetch
             async with fetcher:
                 res = await fetcher.fetch()
@@ -1,7 +1,8 @@
 import asyncio
 import uuid
-from typing import Coroutine, Dict, List, Union
+from typing import Coroutine, Dict, List, Optional, Union
 
+from opal_common.config import opal_common_config
 from opal_common.fetcher.engine.base_fetching_engine import BaseFetchingEngine
 from opal_common.fetcher.engine.core_callbacks import OnFetchFailureCallback
 from opal_common.fetcher.engine.fetch_worker import fetch_worker
@@ -9,6 +10,7 @@ from opal_common.fetcher.events import FetcherConfig, FetchEvent
 from opal_common.fetcher.fetch_provider import BaseFetchProvider
 from opal_common.fetcher.fetcher_register import FetcherRegister
 from opal_common.fetcher.logger import get_logger
+from opal_common.http_utils import HttpSessionPool, HttpValidatorsCache
 
 logger = get_logger("engine")
 
@@ -37,6 +39,7 @@ class FetchingEngine(BaseFetchingEngine):
         callback_timeout: int = DEFAULT_CALLBACK_TIMEOUT,
         enqueue_timeout: int = DEFAULT_ENQUEUE_TIMEOUT,
         retry_config=None,
+        session_pool: Optional[HttpSessionPool] = None,
     ) -> None:
         # The internal task queue (created at start_workers)
         self._queue: asyncio.Queue = None
@@ -53,10 +56,21 @@ class FetchingEngine(BaseFetchingEngine):
         # time in seconds before time out on adding a task to queue (when full)
         self._enqueue_timeout = enqueue_timeout
         self._retry_config = retry_config
+        # long-lived http sessions shared by all fetch events (created on start_workers if not given)
+        self._session_pool: Optional[HttpSessionPool] = session_pool
+        self._owns_session_pool = session_pool is None
+        # validators (i.e ETag) of fetched responses, for conditional fetches
+        self._validators_cache = HttpValidatorsCache()
 
     def start_workers(self):
         if self._queue is None:
             self._queue = asyncio.Queue()
+            if self._session_pool is None:
+                self._session_pool = HttpSessionPool(
+                    client=opal_common_config.HTTP_FETCHER_PROVIDER_CLIENT,
+                    pool_size=opal_common_config.HTTP_FETCHER_POOL_SIZE,
+                    keepalive_timeout=opal_common_config.HTTP_FETCHER_KEEPALIVE_TIMEOUT,
+                )
             # create worker tasks
             for _ in range(self._worker_count):
                 self.create_worker()
@@ -65,6 +79,14 @@ class FetchingEngine(BaseFetchingEngine):
     def register(self) -> FetcherRegister:
         return self._fetcher_register
 
+    @property
+    def session_pool(self) -> Optional[HttpSessionPool]:
+        return self._session_pool
+
+    @property
+    def validators_cache(self) -> HttpValidatorsCache:
+        return self._validators_cache
+
     async def __aenter__(self):
         """Async Context manager to cancel tasks on exit."""
         self.start_workers()
@@ -85,6 +107,11 @@ class FetchingEngine(BaseFetchingEngine):
             task.cancel()
         # Wait until all worker tasks are cancelled.
         await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # close pooled connections
+        if self._owns_session_pool and self._session_pool is not None:
+            await self._session_pool.close()
+            self._session_pool = None
         # reset queue
         self._queue = None
 
@@ -126,6 +153,7 @@ class FetchingEngine(BaseFetchingEngine):
         callback: Coroutine,
         config: Union[FetcherConfig, dict, None] = None,
         fetcher="HttpFetchProvider",
+        validators_key: Optional[str] = None,
     ) -> FetchEvent:
         """Simplified default fetching handler for queuing a fetch task.
 
@@ -134,6 +162,8 @@ class FetchingEngine(BaseFetchingEngine):
             callback (Coroutine): a callback to call with the fetched result
             config (FetcherConfig, optional): Configuration to be used by the fetcher. Defaults to None.
             fetcher (str, optional): Which fetcher class to use. Defaults to "HttpFetchProvider".
+            validators_key (str, optional): Fetch conditionally, against the last response fetched under this key
+                (@see FetchEvent.validators_key). Defaults to None (unconditional fetch).
         Returns:
             the queued event (which will be mutated to at least have an Id)
 
@@ -148,7 +178,11 @@ class FetchingEngine(BaseFetchingEngine):
 
         # init a URL event
         event = FetchEvent(
-            url=url, fetcher=fetcher, config=config, retry=self._retry_config
+            url=url,
+            fetcher=fetcher,
+            config=config,
+            retry=self._retry_config,
+            validators_key=validators_key,
         )
         return await self.queue_fetch_event(event, callback)
 
@@ -34,3 +34,7 @@ class FetchEvent(BaseModel):
     config: dict = None
     # Tenacity.retry - Override default retry configuration for this event
     retry: dict = None
+    # If set, the fetch is conditional: the validators (i.e ETag) of the last response
+    # fetched under this key are sent with the request, and the fetcher returns
+    # NOT_MODIFIED if the server answers the data did not change since
+    validators_key: Optional[str] = None
@@ -1,10 +1,25 @@
+from typing import Optional
+
 from opal_common.fetcher.events import FetchEvent
 from opal_common.fetcher.logger import get_logger
+from opal_common.http_utils import HttpSessionPool, HttpValidatorsCache
 from tenacity import retry, stop, wait
 
 logger = get_logger("opal.providers")
 
 
+class NotModified:
+    """Type of NOT_MODIFIED."""
+
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+
+# returned by a conditional fetch (see FetchEvent.validators_key) when the
+# source did not change since the last fetch under the same key
+NOT_MODIFIED = NotModified()
+
+
 class BaseFetchProvider:
     """Base class for data fetching providers.
 
@@ -31,6 +46,10 @@ class BaseFetchProvider:
         self._retry_config = (
             retry_config if retry_config is not None else self.DEFAULT_RETRY_CONFIG
         )
+        # shared (long-lived) http sessions, set by the fetching engine
+        self._session_pool: Optional[HttpSessionPool] = None
+        # validators of previous responses (for conditional fetches), set by the fetching engine
+        self._validators_cache: Optional[HttpValidatorsCache] = None
 
     def parse_event(self, event: FetchEvent) -> FetchEvent:
         """Parse the event (And config within it) into the right object type.
@@ -82,3 +101,23 @@ class BaseFetchProvider:
             retry_config (dict): Tenacity retry config
         """
         self._retry_config = retry_config
+
+    def set_session_pool(self, session_pool: Optional[HttpSessionPool]):
+        """Set a pool of long-lived http sessions the provider may reuse
+        instead of opening a new session per fetch (providers that don't
+        use http may ignore it).
+
+        Args:
+            session_pool (HttpSessionPool): pool owned by the caller (i.e: the fetching engine)
+        """
+        self._session_pool = session_pool
+
+    def set_validators_cache(self, validators_cache: Optional[HttpValidatorsCache]):
+        """Set the cache of response validators used for conditional fetches
+        (providers that can't fetch conditionally may ignore it, and always
+        fetch in full).
+
+        Args:
+            validators_cache (HttpValidatorsCache): cache owned by the caller (i.e: the fetching engine)
+        """
+        self._validators_cache = validators_cache
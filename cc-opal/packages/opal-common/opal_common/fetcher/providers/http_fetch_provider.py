@@ -7,7 +7,7 @@ import httpx
 from aiohttp import ClientResponse, ClientSession, ClientTimeout
 from opal_common.config import opal_common_config
 from opal_common.fetcher.events import FetcherConfig, FetchEvent
-from opal_common.fetcher.fetch_provider import BaseFetchProvider
+from opal_common.fetcher.fetch_provider import NOT_MODIFIED, BaseFetchProvider
 from opal_common.fetcher.logger import get_logger
 from opal_common.http_utils import is_http_error_response
 from opal_common.security.sslcontext import get_custom_ssl_context
@@ -58,6 +58,9 @@ class HttpFetchProvider(BaseFetchProvider):
             event.config = HttpFetcherConfig()
         super().__init__(event)
         self._session = None
+        self._owns_session = True
+        self._request_kwargs = {}
+        self._response = None
         self._custom_ssl_context = get_custom_ssl_context()
         self._ssl_context_kwargs = (
             {"ssl": self._custom_ssl_context}
@@ -73,6 +76,28 @@ class HttpFetchProvider(BaseFetchProvider):
         timeout = opal_common_config.HTTP_FETCHER_TIMEOUT
         if self._event.config.headers is not None:
             headers = self._event.config.headers
+        if self._is_conditional:
+            headers = {
+                **headers,
+                **self._validators_cache.conditional_headers(
+                    self._event.validators_key
+                ),
+            }
+        if self._session_pool is not None:
+            # reuse the long-lived session (and its open connections) for this target,
+            # event specific settings are passed per request instead of per session
+            self._session = self._session_pool.get(self._url)
+            self._owns_session = False
+            if self._session_pool.client == "httpx":
+                self._request_kwargs = {"headers": headers, "timeout": timeout}
+            else:
+                self._request_kwargs = {
+                    "headers": headers,
+                    "timeout": ClientTimeout(total=timeout),
+                    "raise_for_status": True,
+                }
+            return self
+
         if opal_common_config.HTTP_FETCHER_PROVIDER_CLIENT == "httpx":
             self._session = httpx.AsyncClient(
                 headers=headers, timeout=timeout, trust_env=True
@@ -85,10 +110,28 @@ class HttpFetchProvider(BaseFetchProvider):
                 trust_env=True,
             )
         self._session = await self._session.__aenter__()
+        self._owns_session = True
         return self
 
     async def __aexit__(self, exc_type=None, exc_val=None, tb=None):
-        await self._session.__aexit__(exc_type, exc_val, tb)
+        if self._owns_session:
+            await self._session.__aexit__(exc_type, exc_val, tb)
+        elif isinstance(self._response, ClientResponse):
+            # return the connection to the shared pool
+            self._response.release()
+
+    @property
+    def _is_conditional(self) -> bool:
+        return (
+            self._event.validators_key is not None
+            and self._validators_cache is not None
+            and HttpMethods(self._event.config.method)
+            in (HttpMethods.GET, HttpMethods.HEAD)
+        )
+
+    @staticmethod
+    def _status(res: Union[ClientResponse, httpx.Response]) -> int:
+        return res.status_code if isinstance(res, httpx.Response) else res.status
 
     async def _fetch_(self):
         logger.debug(f"{self.__class__.__name__} fetching from {self._url}")
@@ -97,10 +140,18 @@ class HttpFetchProvider(BaseFetchProvider):
         )
         if self._event.config.data is not None:
             result: Union[ClientResponse, httpx.Response] = await http_method(
-                self._url, data=self._event.config.data, **self._ssl_context_kwargs
+                self._url,
+                data=self._event.config.data,
+                **self._request_kwargs,
+                **self._ssl_context_kwargs,
             )
         else:
-            result = await http_method(self._url, **self._ssl_context_kwargs)
+            result = await http_method(
+                self._url, **self._request_kwargs, **self._ssl_context_kwargs
+            )
+        self._response = result
+        if self._is_conditional and self._status(result) == 304:
+            return result
         result.raise_for_status()
         return result
 
@@ -125,6 +176,11 @@ class HttpFetchProvider(BaseFetchProvider):
         if is_http_error_response(res):
             return res
 
+        if self._is_conditional:
+            if self._status(res) == 304:
+                return NOT_MODIFIED
+            self._validators_cache.remember(self._event.validators_key, res)
+
         # if we are asked to process the data before we return it
         if self._event.config.process_data:
             data = await self._response_to_data(res, is_json=self._event.config.is_json)
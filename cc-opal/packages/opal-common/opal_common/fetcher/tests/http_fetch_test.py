@@ -14,15 +14,19 @@ from multiprocessing import Process
 
 import pytest
 import uvicorn
-from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from opal_common.fetcher import FetchingEngine
+from opal_common.fetcher.fetch_provider import NOT_MODIFIED
 from opal_common.fetcher.providers.http_fetch_provider import HttpFetcherConfig
+from opal_common.http_utils import HttpSessionPool
 
 # Configurable
 PORT = int(os.environ.get("PORT") or "9110")
 BASE_URL = f"http://localhost:{PORT}"
 DATA_ROUTE = f"/data"
 AUTHORIZED_DATA_ROUTE = f"/data_authz"
+ETAG_DATA_ROUTE = f"/data_etag"
+DATA_ETAG = '"v1"'
 SECRET_TOKEN = "fake-super-secret-token"
 DATA_KEY = "Hello"
 DATA_VALUE = "World"
@@ -46,6 +50,16 @@ def setup_server():
     def get_authorized_data(token=Depends(check_token_header)):
         return {DATA_KEY: DATA_SECRET_VALUE}
 
+    @app.get(ETAG_DATA_ROUTE)
+    def get_etag_data(if_none_match: str = Header(None)):
+        if if_none_match == DATA_ETAG:
+            return Response(status_code=304, headers={"ETag": DATA_ETAG})
+        return Response(
+            content='{"%s": "%s"}' % (DATA_KEY, DATA_VALUE),
+            media_type="application/json",
+            headers={"ETag": DATA_ETAG},
+        )
+
     uvicorn.run(app, port=PORT)
 
 
@@ -123,6 +137,28 @@ async def test_authorized_http_get_from_dict(server):
         assert got_data_event.is_set()
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("client", ["aiohttp", "httpx"])
+async def test_conditional_http_get(server, client):
+    """Conditional fetches send the validators of the last response fetched
+    under the same key, and get NOT_MODIFIED for an unchanged source."""
+    url = f"{BASE_URL}{ETAG_DATA_ROUTE}"
+    session_pool = HttpSessionPool(client=client)
+    async with FetchingEngine(session_pool=session_pool) as engine:
+        data = await engine.handle_url(url, validators_key="entry")
+        assert data[DATA_KEY] == DATA_VALUE
+        assert await engine.handle_url(url, validators_key="entry") is NOT_MODIFIED
+        # other keys and unconditional fetches get the data
+        data = await engine.handle_url(url, validators_key="other")
+        assert data[DATA_KEY] == DATA_VALUE
+        data = await engine.handle_url(url)
+        assert data[DATA_KEY] == DATA_VALUE
+        engine.validators_cache.forget("entry")
+        data = await engine.handle_url(url, validators_key="entry")
+        assert data[DATA_KEY] == DATA_VALUE
+    await session_pool.close()
+
+
 @pytest.mark.flaky(reruns=1)
 @pytest.mark.asyncio
 async def test_external_http_get():
@@ -1,5 +1,7 @@
+from collections import OrderedDict
 from functools import partial
 from pathlib import Path
+from threading import Lock
 from typing import List, Optional, Set
 
 from ddtrace import tracer
@@ -10,9 +12,7 @@ from opal_common.git_utils.commit_viewer import (
     CommitViewer,
     VersionedDirectory,
     VersionedFile,
-    find_ignore_match,
     has_extension,
-    is_under_directories,
 )
 from opal_common.git_utils.diff_viewer import (
     DiffViewer,
@@ -20,7 +20,7 @@ from opal_common.git_utils.diff_viewer import (
     diffed_file_is_under_directories,
 )
 from opal_common.logger import logger
-from opal_common.paths import PathUtils
+from opal_common.paths import GlobStyleMatcher, PathUtils
 from opal_common.schemas.policy import (
     DataModule,
     DeletedFiles,
@@ -29,6 +29,32 @@ from opal_common.schemas.policy import (
 )
 
 
+class RegoPackageCache:
+    """An LRU cache of the package names of rego files, by blob sha (the same
+    file version has the same package in every commit)."""
+
+    def __init__(self, max_size: int = 100_000):
+        self._max_size = max_size
+        self._packages: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, blob_sha: bytes, contents: str) -> str:
+        with self._lock:
+            package_name = self._packages.get(blob_sha)
+            if package_name is not None:
+                self._packages.move_to_end(blob_sha)
+                return package_name
+        package_name = get_rego_package(contents) or ""
+        with self._lock:
+            self._packages[blob_sha] = package_name
+            if len(self._packages) > self._max_size:
+                self._packages.popitem(last=False)
+        return package_name
+
+
+rego_packages = RegoPackageCache()
+
+
 class BundleMaker:
     """creates a policy bundle based on:
 
@@ -64,9 +90,6 @@ class BundleMaker:
         self._repo = repo
         self._directories = in_directories
         self._has_extension = partial(has_extension, extensions=extensions)
-        self._is_under_directories = partial(
-            is_under_directories, directories=in_directories
-        )
         self._diffed_file_has_extension = partial(
             diffed_file_has_extension, extensions=extensions
         )
@@ -76,11 +99,13 @@ class BundleMaker:
         self._root_manifest_path = Path(root_manifest_path)
 
         self._bundle_ignore = bundle_ignore
-        self._find_ignore_match = partial(
-            find_ignore_match, bundle_ignore=bundle_ignore
+        # all ignore globs, compiled into one matcher
+        self._ignore_matcher = GlobStyleMatcher(bundle_ignore or [])
+        self._find_ignore_match = lambda path: self._ignore_matcher.match(
+            (path if isinstance(path, Path) else Path(path)).as_posix()
         )
-        self._diffed_file_find_ignore_match = lambda diff: find_ignore_match(
-            diff.b_path, bundle_ignore
+        self._diffed_file_find_ignore_match = lambda diff: self._find_ignore_match(
+            diff.b_path
         )
 
     def _get_explicit_manifest(self, viewer: CommitViewer) -> Optional[List[str]]:
@@ -141,9 +166,7 @@ class BundleMaker:
                             logger.warning(f"  Path '{path_entry}' does not exist")
                             continue
 
-                        ignore_path_match = find_ignore_match(
-                            Path(path_entry), self._bundle_ignore
-                        )
+                        ignore_path_match = self._find_ignore_match(path_entry)
                         if ignore_path_match != None:
                             logger.warning(
                                 f"  Path'{path_entry} is ignored by ignore glob '{ignore_path_match}'"
@@ -245,15 +268,15 @@ class BundleMaker:
         manifest = []
 
         with CommitViewer(commit) as viewer:
+            # the directories filter is applied by the viewer (skipping other subtrees entirely)
             filter = (
                 lambda f: self._has_extension(f)
-                and self._is_under_directories(f)
                 and self._find_ignore_match(f.path) == None
             )
             explicit_manifest = self._get_explicit_manifest(viewer)
             logger.debug(f"Explicit manifest to be used: {explicit_manifest}")
 
-            for source_file in viewer.files(filter):
+            for source_file in viewer.files(filter, in_directories=self._directories):
                 with tracer.trace(
                     "bundle_maker.git_file_read", resource=str(source_file.path)
                 ):
@@ -269,7 +292,9 @@ class BundleMaker:
                     policy_modules.append(
                         RegoModule(
                             path=str(path),
-                            package_name=get_rego_package(contents) or "",
+                            package_name=rego_packages.get(
+                                source_file.blob.binsha, contents
+                            ),
                             rego=contents,
                         )
                     )
@@ -333,7 +358,9 @@ class BundleMaker:
                     policy_modules.append(
                         RegoModule(
                             path=str(path),
-                            package_name=get_rego_package(contents) or "",
+                            package_name=rego_packages.get(
+                                source_file.blob.binsha, contents
+                            ),
                             rego=contents,
                         )
                     )
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from opal_common.schemas.policy import DataModule, PolicyBundle, RegoModule
 
@@ -7,12 +7,20 @@ from opal_common.schemas.policy import DataModule, PolicyBundle, RegoModule
 class BundleUtils:
     MAX_INDEX = 10000
 
+    @staticmethod
+    def _manifest_indices(bundle: PolicyBundle) -> Dict[Path, int]:
+        """The index of each path in the manifest (of its first occurrence)."""
+        indices: Dict[Path, int] = {}
+        for index, path in enumerate(bundle.manifest):
+            indices.setdefault(Path(path), index)
+        return indices
+
     @staticmethod
     def sorted_policy_modules_to_load(
         bundle: PolicyBundle, ignore=None
     ) -> List[RegoModule]:
         """Policy modules sorted according to manifest."""
-        manifest_paths = [Path(path) for path in bundle.manifest]
+        manifest_indices = BundleUtils._manifest_indices(bundle)
 
         def key_function(module: RegoModule) -> int:
             """This method reduces the module to a number that can be act as
@@ -21,23 +29,17 @@ class BundleUtils:
             the number is the index in the manifest list, so basically
             we sort according to manifest.
             """
-            try:
-                return manifest_paths.index(Path(module.path))
-            except ValueError:
-                return BundleUtils.MAX_INDEX
+            return manifest_indices.get(Path(module.path), BundleUtils.MAX_INDEX)
 
         return sorted(bundle.policy_modules, key=key_function)
 
     @staticmethod
     def sorted_data_modules_to_load(bundle: PolicyBundle) -> List[DataModule]:
         """Data modules sorted according to manifest."""
-        manifest_paths = [Path(path) for path in bundle.manifest]
+        manifest_indices = BundleUtils._manifest_indices(bundle)
 
         def key_function(module: DataModule) -> int:
-            try:
-                return manifest_paths.index(Path(module.path))
-            except ValueError:
-                return BundleUtils.MAX_INDEX
+            return manifest_indices.get(Path(module.path), BundleUtils.MAX_INDEX)
 
         return sorted(bundle.data_modules, key=key_function)
 
@@ -1,5 +1,7 @@
+from collections import OrderedDict
 from pathlib import Path
-from typing import IO, Callable, Generator, List, Optional, Set
+from threading import Lock
+from typing import IO, Callable, Dict, Generator, List, Optional, Set, Tuple, Union
 
 from git import Repo
 from git.objects import Blob, Commit, IndexObject, Tree
@@ -13,10 +15,13 @@ class VersionedNode:
     `VersionedDirectory`.
     """
 
-    def __init__(self, node: IndexObject, commit: Commit):
+    def __init__(
+        self, node: IndexObject, commit: Commit, path: Union[Path, str, None] = None
+    ):
         self._node = node
         self._commit = commit
         self._repo: Repo = commit.repo
+        self._path = path
 
     @property
     def repo(self) -> Repo:
@@ -37,15 +42,17 @@ class VersionedNode:
     def path(self) -> Path:
         """The relative path to the node (either file path or directory path),
         relative to the repo root."""
-        return Path(self._node.path)
+        if not isinstance(self._path, Path):
+            self._path = Path(self._node.path if self._path is None else self._path)
+        return self._path
 
 
 class VersionedFile(VersionedNode):
     """Each instance of this class represents *one version* of a file (blob) in
     a git repo (the version of the file for a specific git commit)."""
 
-    def __init__(self, blob: Blob, commit: Commit):
-        super().__init__(blob, commit)
+    def __init__(self, blob: Blob, commit: Commit, path: Union[Path, str, None] = None):
+        super().__init__(blob, commit, path)
         self._blob: Blob = blob
 
     @property
@@ -82,8 +89,10 @@ class VersionedDirectory(VersionedNode):
     tree) in a git repo (the version of the directory for a specific git
     commit)."""
 
-    def __init__(self, directory: Tree, commit: Commit):
-        super().__init__(directory, commit)
+    def __init__(
+        self, directory: Tree, commit: Commit, path: Union[Path, str, None] = None
+    ):
+        super().__init__(directory, commit, path)
         self._dir: Tree = directory
 
     @property
@@ -134,6 +143,67 @@ def is_under_directories(f: VersionedFile, directories: Set[Path]) -> bool:
     return PathUtils.is_child_of_directories(f.path, directories)
 
 
+# (name, binsha, mode) of a tree entry
+TreeEntry = Tuple[str, bytes, int]
+
+
+class TreeIndex:
+    """The parsed entries of one git tree (directory).
+
+    Trees are immutable and addressed by their sha, so the index of a
+    tree is shared by every commit (and repo) containing it, i.e:
+    commits only parse the trees they changed.
+    """
+
+    __slots__ = ("blobs", "trees", "by_name")
+
+    def __init__(self, tree: Tree):
+        self.blobs: List[TreeEntry] = [
+            (blob.name, blob.binsha, blob.mode) for blob in tree.blobs
+        ]
+        self.trees: List[TreeEntry] = [
+            (subtree.name, subtree.binsha, subtree.mode) for subtree in tree.trees
+        ]
+        # name -> (entry, whether it's a tree)
+        self.by_name: Dict[str, Tuple[TreeEntry, bool]] = {
+            entry[0]: (entry, False) for entry in self.blobs
+        }
+        self.by_name.update((entry[0], (entry, True)) for entry in self.trees)
+
+
+class TreeIndexCache:
+    """An LRU cache of tree indices by tree sha."""
+
+    def __init__(self, max_size: int = 100_000):
+        self._max_size = max_size
+        self._indices: "OrderedDict[bytes, TreeIndex]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, tree: Tree) -> TreeIndex:
+        with self._lock:
+            index = self._indices.get(tree.binsha)
+            if index is not None:
+                self._indices.move_to_end(tree.binsha)
+                return index
+        index = TreeIndex(tree)
+        with self._lock:
+            self._indices[tree.binsha] = index
+            if len(self._indices) > self._max_size:
+                self._indices.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indices.clear()
+
+
+tree_indices = TreeIndexCache()
+
+
+def _join(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+
 class CommitViewer:
     """This class allows us to view the repository files and directories from
     the perspective of a specific git commit (i.e: version).
@@ -184,17 +254,24 @@ class CommitViewer:
             return filter(predicate, nodes_generator)
 
     def files(
-        self, predicate: Optional[FileFilter] = None
+        self,
+        predicate: Optional[FileFilter] = None,
+        in_directories: Optional[Set[Path]] = None,
     ) -> Generator[VersionedFile, None, None]:
         """A generator yielding all the files found in the repository for the
         current commit, after applying the filter.
 
         Args:
             filter (Optional[FileFilter]): an optional predicate to filter only specific files.
+            in_directories (Optional[Set[Path]]): optionally, only yield files under these
+                directories (subtrees outside of them are not traversed at all).
 
         Yields:
             the next file found (only for files passing the filter).
         """
+        if in_directories is not None:
+            files = self._files_in_directories(in_directories)
+            return files if predicate is None else filter(predicate, files)
         return (
             node for node in self.nodes(predicate) if isinstance(node, VersionedFile)
         )
@@ -220,16 +297,40 @@ class CommitViewer:
         self, path: Path, filterable_gen: Optional[Callable] = None
     ) -> Optional[VersionedNode]:
         """Returns the node in the given path, None if it doesn't exist."""
-        return next(self.nodes(lambda n: n.path == path), None)
+        path = Path(path)
+        if path.is_absolute():
+            return None
+        tree, tree_path = self._root, ""
+        parts = path.parts
+        for i, name in enumerate(parts):
+            found = tree_indices.get(tree).by_name.get(name)
+            if found is None:
+                return None
+            (name, binsha, mode), is_tree = found
+            node_path = _join(tree_path, name)
+            if i == len(parts) - 1:
+                if is_tree:
+                    return VersionedDirectory(
+                        Tree(self._repo, binsha, mode, node_path), self._commit, path
+                    )
+                return VersionedFile(
+                    Blob(self._repo, binsha, mode, node_path), self._commit, path
+                )
+            if not is_tree:
+                return None
+            tree, tree_path = Tree(self._repo, binsha, mode, node_path), node_path
+        return VersionedDirectory(self._root, self._commit, path)
 
     def get_directory(self, path: Path) -> Optional[VersionedDirectory]:
         """Returns the directory in the given path, None if it doesn't
         exist."""
-        return next(self.directories(lambda n: n.path == path), None)
+        node = self.get_node(path)
+        return node if isinstance(node, VersionedDirectory) else None
 
     def get_file(self, path: Path) -> Optional[VersionedFile]:
         """Returns the file in the given path, None if it doesn't exist."""
-        return next(self.files(lambda n: n.path == path), None)
+        node = self.get_node(path)
+        return node if isinstance(node, VersionedFile) else None
 
     @property
     def paths(self) -> List[Path]:
@@ -240,16 +341,55 @@ class CommitViewer:
     def exists(self, path: Path) -> bool:
         """Checks if a certain path exists in the repo in the current
         commit."""
-        return path in self.paths
+        return self.get_node(path) is not None
 
-    def _nodes_in_tree(self, root: Tree) -> Generator[VersionedNode, None, None]:
+    def _nodes_in_tree(
+        self, root: Tree, root_path: str = ""
+    ) -> Generator[VersionedNode, None, None]:
         """A generator returning all the nodes (files and directories) under a
         certain git Tree (a versioned directory)."""
+        index = tree_indices.get(root)
         # yield current directory
-        yield VersionedDirectory(root, self._commit)
+        yield VersionedDirectory(root, self._commit, root_path)
         # yield files under current directory
-        for blob in root.blobs:
-            yield VersionedFile(blob, self._commit)
+        for name, binsha, mode in index.blobs:
+            path = _join(root_path, name)
+            yield VersionedFile(
+                Blob(self._repo, binsha, mode, path), self._commit, path
+            )
         # yield subdirectories (and their children etc) under current directory
-        for tree in root.trees:
-            yield from self._nodes_in_tree(tree)
+        for name, binsha, mode in index.trees:
+            path = _join(root_path, name)
+            yield from self._nodes_in_tree(Tree(self._repo, binsha, mode, path), path)
+
+    def _files_in_directories(
+        self, directories: Set[Path]
+    ) -> Generator[VersionedFile, None, None]:
+        """A generator returning the files under (any of) the given
+        directories, only descending into trees that are (or lead to) one of
+        them."""
+        targets = {Path(directory).parts for directory in directories}
+        # the trees on the way to one of the directories
+        on_the_way = {target[:i] for target in targets for i in range(len(target))}
+
+        def walk(tree: Tree, tree_path: str, parts: Tuple[str, ...], covered: bool):
+            index = tree_indices.get(tree)
+            if covered:
+                for name, binsha, mode in index.blobs:
+                    path = _join(tree_path, name)
+                    yield VersionedFile(
+                        Blob(self._repo, binsha, mode, path), self._commit, path
+                    )
+            for name, binsha, mode in index.trees:
+                child_parts = parts + (name,)
+                child_covered = covered or child_parts in targets
+                if child_covered or child_parts in on_the_way:
+                    path = _join(tree_path, name)
+                    yield from walk(
+                        Tree(self._repo, binsha, mode, path),
+                        path,
+                        child_parts,
+                        child_covered,
+                    )
+
+        return walk(self._root, "", (), () in targets)
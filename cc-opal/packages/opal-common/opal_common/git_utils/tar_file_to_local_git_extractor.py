@@ -1,7 +1,9 @@
+import hashlib
 import os
-import shutil
+import tarfile
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import git
 from opal_common.security.tarsafe import TarSafe
@@ -56,25 +58,110 @@ class TarFileToLocalGitExtractor:
             local_git = self.commit_local_git(should_init=True)
         return local_git
 
-    def extract_bundle_to_local_git(self, commit_msg: str):
+    def extract_bundle_to_local_git(self, commit_msg: str, mode: str = "r:gz"):
         """
         Update local git with new bundle
+
+        Only files that changed since the last commit are written (each tar member's
+        git blob digest is compared with the one in the index), and only they are staged.
+        Files missing from the bundle are removed.
         Args:
             commit_msg(str):  text of the commit msg
         """
-        tmp_path = f"{self.local_clone_path}.bak"
-        os.rename(self.local_clone_path, tmp_path)
-        try:
-            self.extract_bundle_tar()
-            shutil.move(
-                os.path.join(tmp_path, ".git"),
-                os.path.join(self.local_clone_path, ".git"),
+        local_git = git.Repo(self.local_clone_path)
+        prev_commit = local_git.head.commit if len(local_git.heads) else None
+        indexed: Dict[str, Tuple[int, bytes]] = {
+            path: (entry.mode, entry.binsha)
+            for (path, _stage), entry in local_git.index.entries.items()
+        }
+
+        with TarSafe.open(self.tmp_bundle_path, mode=mode) as tar_file:
+            members = tar_file.getmembers()
+            TarFileToLocalGitExtractor.validate_tar_or_throw(
+                [member.name for member in members]
             )
-        finally:
-            shutil.rmtree(tmp_path)
-        local_git, prev_commit, new_commit = self.commit_local_git(commit_msg)
+            bundle_paths = set()
+            changed_members: List[tarfile.TarInfo] = []
+            changed_paths: List[str] = []
+            for member in members:
+                if member.isdir():
+                    continue
+                path = Path(os.path.normpath(member.name)).as_posix()
+                bundle_paths.add(path)
+                digest = self._git_digest(tar_file, member)
+                if digest is None or indexed.get(path) != digest:
+                    changed_members.append(member)
+                    if self._is_added_by_pattern(path):
+                        changed_paths.append(path)
+
+            removed_paths = [
+                path
+                for path in indexed
+                if path not in bundle_paths and self._is_added_by_pattern(path)
+            ]
+            # remove first, a removed file may be replaced by a directory (or vice versa)
+            if removed_paths:
+                local_git.index.remove(removed_paths)
+                self._remove_from_working_tree(removed_paths)
+            if changed_members:
+                tar_file.extractall(path=self.local_clone_path, members=changed_members)
+
+        if changed_paths:
+            local_git.index.add(changed_paths)
+        new_commit = local_git.index.commit(commit_msg)
         return local_git, prev_commit, new_commit
 
+    @staticmethod
+    def _git_digest(
+        tar_file: tarfile.TarFile, member: tarfile.TarInfo
+    ) -> Optional[Tuple[int, bytes]]:
+        """The (mode, blob sha) git would index for the tar member, or None if
+        it can't be computed without extracting it."""
+        if member.issym():
+            mode, content = 0o120000, member.linkname.encode()
+            sha = hashlib.sha1(b"blob %d\0" % len(content))
+            sha.update(content)
+            return mode, sha.digest()
+        if not member.isfile():
+            return None
+        mode = 0o100755 if member.mode & 0o100 else 0o100644
+        sha = hashlib.sha1(b"blob %d\0" % member.size)
+        stream = tar_file.extractfile(member)
+        for chunk in iter(lambda: stream.read(65536), b""):
+            sha.update(chunk)
+        return mode, sha.digest()
+
+    def _is_added_by_pattern(self, path: str) -> bool:
+        """Whether `git add <policy_bundle_git_add_pattern>` stages the given
+        path (the pattern is globbed in the repo root, matched directories are
+        added recursively)."""
+        pattern = self.policy_bundle_git_add_pattern
+        if pattern in ("", ".", "./"):
+            return True
+        pattern_parts = pattern.split("/")
+        parts = path.split("/")
+        if len(parts) < len(pattern_parts):
+            return False
+        for part, part_pattern in zip(parts, pattern_parts):
+            # glob doesn't match hidden files unless explicitly asked to
+            if part.startswith(".") and not part_pattern.startswith("."):
+                return False
+            if not fnmatchcase(part, part_pattern):
+                return False
+        return True
+
+    def _remove_from_working_tree(self, paths: List[str]):
+        root = os.path.abspath(self.local_clone_path)
+        for path in paths:
+            full_path = os.path.join(root, path)
+            if os.path.lexists(full_path):
+                os.remove(full_path)
+            # remove the directories left empty
+            directory = os.path.dirname(full_path)
+            while directory != root and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+
     def extract_bundle_tar(self, mode: str = "r:gz") -> bool:
         """
         Extract bundle tar, tar path is at self.tmp_bundle_path
@@ -20,6 +20,7 @@ from typing import List
 from git import Repo
 from git.objects import Commit
 from opal_common.git_utils.commit_viewer import CommitViewer, VersionedNode
+from opal_common.paths import PathUtils
 
 
 def node_paths(nodes: List[VersionedNode]) -> List[Path]:
@@ -166,3 +167,48 @@ def test_file_removed_file_does_not_exist(local_repo: Repo, helpers):
         )
         assert len(paths) == 0
         assert Path("some/dir/to/file.rego") not in paths
+
+
+def test_commit_viewer_files_in_directories(local_repo: Repo):
+    """Test files() pruned to directories gives the same files as filtering
+    every file."""
+    repo: Repo = local_repo
+
+    with CommitViewer(repo.head.commit) as viewer:
+        for directories in [
+            {Path(".")},
+            {Path("other")},
+            {Path("some/dir")},
+            {Path("other"), Path("some/dir/to")},
+            {Path("some/dir/to/file.rego")},
+            {Path("nonexistent")},
+        ]:
+            expected = node_paths(
+                viewer.files(
+                    lambda f: PathUtils.is_child_of_directories(f.path, directories)
+                )
+            )
+            assert node_paths(viewer.files(in_directories=directories)) == expected
+
+        assert node_paths(
+            viewer.files(lambda f: f.path.suffix == ".rego", {Path("some")})
+        ) == [Path("some/dir/to/file.rego")]
+
+
+def test_commit_viewer_get_node(local_repo: Repo):
+    repo: Repo = local_repo
+
+    with CommitViewer(repo.head.commit) as viewer:
+        file = viewer.get_file(Path("some/dir/to/file.rego"))
+        assert file is not None and file.path == Path("some/dir/to/file.rego")
+        assert "package" in file.read()
+        assert viewer.get_directory(Path("some/dir/to/file.rego")) is None
+
+        directory = viewer.get_directory(Path("some/dir"))
+        assert directory is not None and directory.path == Path("some/dir")
+        assert viewer.get_directory(Path(".")).path == Path(".")
+
+        assert viewer.exists(Path("other/abac.rego"))
+        assert not viewer.exists(Path("other/missing.rego"))
+        assert not viewer.exists(Path("rbac.rego/nested"))
+        assert not viewer.exists(Path("/rbac.rego"))
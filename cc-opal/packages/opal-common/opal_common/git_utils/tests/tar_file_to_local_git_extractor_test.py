@@ -0,0 +1,117 @@
+import os
+import sys
+
+import pytest
+
+# Add root opal dir to use local src as package for tests (i.e, no need for python -m pytest)
+root_dir = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+        os.path.pardir,
+    )
+)
+sys.path.append(root_dir)
+
+import io
+import tarfile
+from pathlib import Path
+from typing import Dict
+
+from opal_common.git_utils.tar_file_to_local_git_extractor import (
+    TarFileToLocalGitExtractor,
+)
+
+
+def write_bundle(path: Path, files: Dict[str, bytes], executables=()):
+    with tarfile.open(path, "w:gz") as tar_file:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mode = 0o755 if name in executables else 0o644
+            tar_file.addfile(info, io.BytesIO(content))
+
+
+def committed_files(commit) -> Dict[str, bytes]:
+    return {
+        blob.path: blob.data_stream.read()
+        for blob in commit.tree.traverse()
+        if blob.type == "blob"
+    }
+
+
+@pytest.fixture
+def bundle_files():
+    return {
+        "rbac.rego": b"package rbac\n",
+        "data.json": b'{"roles": []}',
+        "some/dir/policy.rego": b"package some.dir\n",
+        "some/other/policy.rego": b"package some.other\n",
+    }
+
+
+@pytest.fixture
+def extractor(tmp_path: Path, bundle_files):
+    bundle_path = tmp_path / "bundle.tar.gz"
+    write_bundle(bundle_path, bundle_files)
+    extractor = TarFileToLocalGitExtractor(str(tmp_path / "repo"), bundle_path)
+    extractor.create_local_git()
+    return extractor
+
+
+def test_extract_bundle_only_rewrites_changed_files(extractor, bundle_files):
+    repo_path = Path(extractor.local_clone_path)
+    unchanged = repo_path / "some" / "dir" / "policy.rego"
+    unchanged_stat = unchanged.stat()
+
+    bundle_files["rbac.rego"] = b"package rbac\n\ndefault allow = false\n"
+    bundle_files["new/policy.rego"] = b"package new\n"
+    del bundle_files["some/other/policy.rego"]
+    write_bundle(extractor.tmp_bundle_path, bundle_files)
+
+    local_git, prev_commit, new_commit = extractor.extract_bundle_to_local_git(
+        "new version"
+    )
+
+    assert committed_files(new_commit) == bundle_files
+    changed = {diff.b_path or diff.a_path for diff in prev_commit.diff(new_commit)}
+    assert changed == {"rbac.rego", "new/policy.rego", "some/other/policy.rego"}
+    # files that did not change are not written again
+    assert unchanged.stat().st_mtime_ns == unchanged_stat.st_mtime_ns
+    assert unchanged.stat().st_ino == unchanged_stat.st_ino
+    # files removed from the bundle are removed from the working tree
+    assert not (repo_path / "some" / "other").exists()
+    assert (repo_path / "rbac.rego").read_bytes() == bundle_files["rbac.rego"]
+
+
+def test_extract_identical_bundle_commits_same_tree(extractor, bundle_files):
+    write_bundle(extractor.tmp_bundle_path, bundle_files)
+    _, prev_commit, new_commit = extractor.extract_bundle_to_local_git("same")
+    assert new_commit.tree.binsha == prev_commit.tree.binsha
+
+
+def test_extract_bundle_detects_mode_changes(extractor, bundle_files):
+    write_bundle(extractor.tmp_bundle_path, bundle_files, executables={"rbac.rego"})
+    _, prev_commit, new_commit = extractor.extract_bundle_to_local_git("chmod")
+    assert new_commit.tree["rbac.rego"].mode == 0o100755
+    assert [diff.b_path for diff in prev_commit.diff(new_commit)] == ["rbac.rego"]
+
+
+def test_extract_bundle_respects_add_pattern(tmp_path: Path):
+    bundle_path = tmp_path / "bundle.tar.gz"
+    files = {"policies/a.rego": b"package a\n", "docs/readme.md": b"docs\n"}
+    write_bundle(bundle_path, files)
+    extractor = TarFileToLocalGitExtractor(
+        str(tmp_path / "repo"), bundle_path, "policies"
+    )
+    extractor.create_local_git()
+
+    files["policies/a.rego"] = b"package a2\n"
+    files["docs/readme.md"] = b"more docs\n"
+    write_bundle(bundle_path, files)
+    _, _, new_commit = extractor.extract_bundle_to_local_git("update")
+
+    assert committed_files(new_commit) == {"policies/a.rego": b"package a2\n"}
+    # files outside of the pattern are still extracted, just not committed
+    assert (tmp_path / "repo" / "docs" / "readme.md").read_bytes() == b"more docs\n"
@@ -1,4 +1,6 @@
-from typing import Union
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+from urllib.parse import urlparse
 
 import aiohttp
 import httpx
@@ -15,3 +17,134 @@ def is_http_error_response(
     )
 
     return status >= 400
+
+
+def url_origin(url: str) -> str:
+    """Returns the scheme://host:port part of a url (used as connection pool
+    key)."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+class HttpSessionPool:
+    """Keeps long-lived http client sessions, one per target origin.
+
+    Each session owns its own connection pool (limited to `pool_size` connections),
+    so repeated requests to the same target reuse open (keep-alive) connections
+    instead of paying connection setup on every request.
+
+    The pool is owned by whoever created it, who must call close() on shutdown.
+    """
+
+    def __init__(
+        self,
+        client: str = "aiohttp",
+        pool_size: int = 100,
+        keepalive_timeout: float = 15,
+    ):
+        """
+        Args:
+            client (str): "httpx" for httpx.AsyncClient sessions, otherwise aiohttp.ClientSession is used.
+            pool_size (int): max number of open connections per target (0 means unlimited for aiohttp).
+            keepalive_timeout (float): seconds an idle connection is kept open.
+        """
+        self._client = client
+        self._pool_size = pool_size
+        self._keepalive_timeout = keepalive_timeout
+        self._sessions: Dict[str, Union[aiohttp.ClientSession, httpx.AsyncClient]] = {}
+
+    @property
+    def client(self) -> str:
+        return self._client
+
+    def _create_session(self) -> Union[aiohttp.ClientSession, httpx.AsyncClient]:
+        if self._client == "httpx":
+            return httpx.AsyncClient(
+                trust_env=True,
+                limits=httpx.Limits(
+                    max_connections=self._pool_size or None,
+                    max_keepalive_connections=self._pool_size or None,
+                    keepalive_expiry=self._keepalive_timeout,
+                ),
+            )
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self._pool_size,
+                keepalive_timeout=self._keepalive_timeout,
+            ),
+            trust_env=True,
+        )
+
+    @staticmethod
+    def _is_closed(session: Union[aiohttp.ClientSession, httpx.AsyncClient]) -> bool:
+        if isinstance(session, httpx.AsyncClient):
+            return session.is_closed
+        return session.closed
+
+    def get(self, url: str) -> Union[aiohttp.ClientSession, httpx.AsyncClient]:
+        """Returns the shared session for the origin of the given url
+        (creating it on first use)."""
+        origin = url_origin(url)
+        session = self._sessions.get(origin, None)
+        if session is None or self._is_closed(session):
+            session = self._create_session()
+            self._sessions[origin] = session
+        return session
+
+    async def close(self):
+        """Closes all sessions (and their open connections)."""
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            if isinstance(session, httpx.AsyncClient):
+                await session.aclose()
+            else:
+                await session.close()
+
+
+class HttpValidatorsCache:
+    """Remembers the validators (ETag / Last-Modified) of the last response
+    fetched under a key, so the next fetch under that key can be sent as a
+    conditional request (If-None-Match / If-Modified-Since) the server may
+    answer with 304 Not Modified.
+
+    Only the last `max_entries` keys are kept.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self._max_entries = max(max_entries, 1)
+        self._validators: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        """The headers making a request under key conditional (empty if
+        nothing was remembered under key)."""
+        validators = self._validators.get(key)
+        if validators is None:
+            return {}
+        self._validators.move_to_end(key)
+        headers = {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last-modified" in validators:
+            headers["If-Modified-Since"] = validators["last-modified"]
+        return headers
+
+    def remember(
+        self, key: str, response: Union[aiohttp.ClientResponse, httpx.Response]
+    ):
+        """Remembers the validators of a (successful) response under key."""
+        validators = {
+            name: response.headers[name]
+            for name in ["etag", "last-modified"]
+            if name in response.headers
+        }
+        if not validators:
+            self.forget(key)
+            return
+        self._validators[key] = validators
+        self._validators.move_to_end(key)
+        while len(self._validators) > self._max_entries:
+            self._validators.popitem(last=False)
+
+    def forget(self, key: str):
+        """Forgets the validators of key (the next request is unconditional)."""
+        self._validators.pop(key, None)
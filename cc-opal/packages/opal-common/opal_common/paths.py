@@ -1,5 +1,7 @@
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set, Union
+from typing import List, Optional, Set, Tuple, Union
 
 from opal_common.utils import sorted_list_from_set
 
@@ -85,6 +87,10 @@ class PathUtils:
         Check if given path matches any of the match_paths either via glob style matching or by being nested under - when the match path ends with "/**"
         return the match path if there's a match, and None otherwise
         """
+        return _compiled_glob_matcher(tuple(match_paths)).match(path)
+
+    @staticmethod
+    def _glob_style_match_path_to_list(path: str, match_paths: List[str]):
         # check if any of our ignore paths match the given path
         for match_path in match_paths:
             # if the path is the root "/", then it matches any path
@@ -102,3 +108,108 @@ class PathUtils:
                     return match_path
         # if no match - this path shouldn't be ignored
         return None
+
+
+class GlobStyleMatcher:
+    """A list of glob style match paths (see
+    PathUtils.glob_style_match_path_to_list) compiled into a single regex, so
+    a path is matched against all of them at once.
+
+    Only normalized relative paths (as listed in git trees, i.e:
+    "dir/file.rego") are matched by the regex, other paths fall back to
+    matching each match path in turn.
+    """
+
+    def __init__(self, match_paths: List[str]):
+        self._match_paths = list(match_paths)
+        self._regex: Optional[re.Pattern] = None
+        try:
+            alternatives = [
+                f"(?P<m{i}>{_glob_style_regex(match_path)})"
+                for i, match_path in enumerate(self._match_paths)
+            ]
+        except ValueError:
+            # e.g: an empty glob, the fallback raises when (and if) it's reached
+            return
+        if alternatives:
+            self._regex = re.compile("|".join(alternatives))
+
+    def match(self, path: str) -> Optional[str]:
+        """Returns the first match path that matches the given path, or
+        None."""
+        if not self._match_paths:
+            return None
+        if self._regex is None or not _is_normalized_relative_path(path):
+            return PathUtils._glob_style_match_path_to_list(path, self._match_paths)
+        match = self._regex.fullmatch(path)
+        if match is None:
+            return None
+        return self._match_paths[int(match.lastgroup[1:])]
+
+
+@lru_cache(maxsize=128)
+def _compiled_glob_matcher(match_paths: Tuple[str, ...]) -> GlobStyleMatcher:
+    return GlobStyleMatcher(list(match_paths))
+
+
+def _is_normalized_relative_path(path: str) -> bool:
+    return (
+        path not in ("", ".")
+        and not path.startswith(("/", "./"))
+        and not path.endswith(("/", "/."))
+        and "//" not in path
+        and "/./" not in path
+    )
+
+
+def _glob_style_regex(match_path: str) -> str:
+    """The regex matching the same normalized relative paths as match_path
+    (with the semantics of PathUtils._glob_style_match_path_to_list)."""
+    if match_path == "/" or match_path == "/**":
+        return ".*"
+    if match_path.endswith("/**"):
+        return re.escape(match_path[:-3]) + "(?:/.*)?"
+    # Path.match() semantics: the glob is matched part by part from the right
+    parts = Path(match_path).parts
+    if not parts:
+        raise ValueError("empty pattern")
+    if parts[0] == "/":
+        # an absolute glob never matches a relative path
+        return "(?!)"
+    return "(?:.*/)?" + "/".join(_glob_part_regex(part) for part in parts)
+
+
+def _glob_part_regex(part: str) -> str:
+    """Translates a glob of a single path part to a regex (like
+    fnmatch.translate, but wildcards never match a "/")."""
+    i, n = 0, len(part)
+    regex = []
+    while i < n:
+        c = part[i]
+        i += 1
+        if c == "*":
+            if not regex or regex[-1] != "[^/]*":
+                regex.append("[^/]*")
+        elif c == "?":
+            regex.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and part[j] == "!":
+                j += 1
+            if j < n and part[j] == "]":
+                j += 1
+            while j < n and part[j] != "]":
+                j += 1
+            if j >= n:
+                regex.append("\\[")
+            else:
+                chars = part[i:j].replace("\\", "\\\\")
+                i = j + 1
+                if chars[0] == "!":
+                    chars = "^/" + chars[1:]
+                elif chars[0] in ("^", "["):
+                    chars = "\\" + chars
+                regex.append(f"[{chars}]")
+        else:
+            regex.append(re.escape(c))
+    return "".join(regex)
@@ -1,3 +1,5 @@
+import hashlib
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple
@@ -6,6 +8,7 @@ from urllib.parse import urlparse
 import aiohttp
 from fastapi import status
 from fastapi.exceptions import HTTPException
+from opal_common.async_utils import run_sync
 from opal_common.git_utils.tar_file_to_local_git_extractor import (
     TarFileToLocalGitExtractor,
 )
@@ -14,7 +17,6 @@ from opal_common.sources.base_policy_source import BasePolicySource
 from opal_common.utils import (
     build_aws_rest_auth_headers,
     get_authorization_header,
-    hash_file,
     throw_if_bad_status_code,
     tuple_to_dict,
 )
@@ -24,6 +26,9 @@ from tenacity.wait import wait_fixed
 
 BundleHash = str
 
+# bundles are streamed to disk (and hashed) in chunks of this size
+BUNDLE_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class ApiPolicySource(BasePolicySource):
     """Watches an OPA-like bundle server for changes and can trigger callbacks
@@ -108,8 +113,8 @@ class ApiPolicySource(BasePolicySource):
                             self.local_git,
                             prev_commit,
                             new_commit,
-                        ) = self.tar_to_git.extract_bundle_to_local_git(
-                            commit_msg=commit_msg
+                        ) = await run_sync(
+                            self.tar_to_git.extract_bundle_to_local_git, commit_msg
                         )
                         return (
                             True,
@@ -206,16 +211,15 @@ class ApiPolicySource(BasePolicySource):
                         response, expected=[status.HTTP_200_OK], logger=logger
                     )
                     current_etag = response.headers.get("ETag", None)
-                    response_bytes = await response.read()
                     tmp_file_path = self.tmp_bundle_path
-                    with open(tmp_file_path, "wb") as file:
-                        file.write(response_bytes)
+                    current_bundle_hash = await self._download_bundle(
+                        response, tmp_file_path
+                    )
 
                     if not current_etag:
                         logger.info(
                             "Etag is turned off, you may want to turn it on at your bundle server"
                         )
-                        current_bundle_hash = hash_file(tmp_file_path)
                         logger.info("Bundle hash is {hash}", hash=current_bundle_hash)
                         if self.bundle_hash == current_bundle_hash:
                             logger.info(
@@ -255,6 +259,37 @@ class ApiPolicySource(BasePolicySource):
                 logger.error("unexpected server connection error: {err}", err=repr(e))
                 raise
 
+    async def _download_bundle(
+        self, response: aiohttp.ClientResponse, bundle_path: Path
+    ) -> BundleHash:
+        """Streams the response body to bundle_path, hashing it on the fly.
+
+        The bundle is written to a temporary file that replaces
+        bundle_path only once fully downloaded, so a failed download
+        never leaves a truncated bundle behind.
+
+        Returns:
+            BundleHash: the sha256 hex digest of the bundle
+        """
+        sha256_hash = hashlib.sha256()
+        partial_path = bundle_path.with_name(f"{bundle_path.name}.part")
+        file = await run_sync(open, partial_path, "wb")
+        try:
+            try:
+                async for chunk in response.content.iter_chunked(
+                    BUNDLE_DOWNLOAD_CHUNK_SIZE
+                ):
+                    sha256_hash.update(chunk)
+                    await run_sync(file.write, chunk)
+            finally:
+                await run_sync(file.close)
+            os.replace(partial_path, bundle_path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        return sha256_hash.hexdigest()
+
     async def check_for_changes(self):
         """Calling this method will trigger an api check to the remote.
 
@@ -1,92 +1,259 @@
 import asyncio
+import itertools
 from contextlib import asynccontextmanager
-from typing import Set
+from typing import Dict, Iterator, List, Optional
 
 from loguru import logger
 
 
+class _Waiter:
+    __slots__ = ("seq", "task", "shared", "future")
+
+    def __init__(self, seq: int, task: asyncio.Task, shared: bool):
+        self.seq = seq
+        self.task = task
+        self.shared = shared
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class _Node:
+    """A path segment in the lock trie."""
+
+    __slots__ = (
+        "parent",
+        "key",
+        "children",
+        "exclusive",
+        "shared",
+        "subtree_exclusive",
+        "subtree_shared",
+        "waiters",
+        "subtree_waiters",
+    )
+
+    def __init__(self, parent: Optional["_Node"] = None, key: str = ""):
+        self.parent = parent
+        self.key = key
+        self.children: Dict[str, "_Node"] = {}
+        # holders of this exact path
+        self.exclusive = 0
+        self.shared = 0
+        # holders of this path or any of its descendants
+        self.subtree_exclusive = 0
+        self.subtree_shared = 0
+        # tasks waiting to lock this exact path (in arrival order)
+        self.waiters: List[_Waiter] = []
+        # number of waiters on this path or any of its descendants
+        self.subtree_waiters = 0
+
+    def ancestors(self) -> Iterator["_Node"]:
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def is_unused(self) -> bool:
+        return (
+            not self.children
+            and self.subtree_exclusive == 0
+            and self.subtree_shared == 0
+            and self.subtree_waiters == 0
+        )
+
+
 class HierarchicalLock:
     """A hierarchical lock for asyncio.
 
     - If a path is locked, no ancestor or descendant path can be locked.
     - Conversely, if a child path is locked, the parent path cannot be locked
       until all child paths are released.
+
+    Paths are split into segments by "/" (so "/users" and "/users2" don't conflict,
+    and "" locks the whole hierarchy). Locks are tracked in a trie of path segments,
+    where every node counts the holders of its subtree, so checking for conflicts
+    is O(depth). A release only wakes waiters on the released path, its ancestors
+    and its descendants (those that may have become free).
+
+    A path can optionally be locked as shared: shared holders don't conflict with
+    each other, only with exclusive holders of the same path, its ancestors or its
+    descendants.
     """
 
     def __init__(self):
-        # locked_paths: set of currently locked string paths
-        self._locked_paths: Set[str] = set()
-        # Map of tasks to their acquired locks for re-entrant protection
-        self._task_locks: dict[asyncio.Task, Set[str]] = {}
-        # Internal lock for synchronizing access to locked_paths
-        self._lock = asyncio.Lock()
-        # Condition to wake up tasks when a path is released
-        self._cond = asyncio.Condition(self._lock)
+        self._root = _Node()
+        # Map of tasks to their acquired locks (path -> shared) for re-entrant protection
+        self._task_locks: Dict[asyncio.Task, Dict[str, bool]] = {}
+        self._seq = itertools.count()
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        return [segment for segment in path.split("/") if segment]
+
+    def _find(self, path: str) -> Optional[_Node]:
+        node = self._root
+        for segment in self._split(path):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def _get_or_create(self, path: str) -> _Node:
+        node = self._root
+        for segment in self._split(path):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node(node, segment)
+            node = child
+        return node
+
+    @staticmethod
+    def _is_conflicting(node: _Node, shared: bool) -> bool:
+        """Checks a lock request on node against the holders of its subtree
+        and ancestors."""
+        if node.subtree_exclusive or (not shared and node.subtree_shared):
+            return True
+        for ancestor in node.ancestors():
+            if ancestor.exclusive or (not shared and ancestor.shared):
+                return True
+        return False
+
+    @staticmethod
+    def _hold(node: _Node, shared: bool, delta: int):
+        if shared:
+            node.shared += delta
+        else:
+            node.exclusive += delta
+        current: Optional[_Node] = node
+        while current is not None:
+            if shared:
+                current.subtree_shared += delta
+            else:
+                current.subtree_exclusive += delta
+            current = current.parent
+
+    @staticmethod
+    def _add_waiter(node: _Node, waiter: _Waiter):
+        node.waiters.append(waiter)
+        current: Optional[_Node] = node
+        while current is not None:
+            current.subtree_waiters += 1
+            current = current.parent
 
     @staticmethod
-    def _is_conflicting(p1: str, p2: str) -> bool:
-        """Check if two paths conflict with each other."""
-        return p1 == p2 or p1.startswith(p2) or p2.startswith(p1)
+    def _remove_waiter(node: _Node, waiter: _Waiter):
+        node.waiters.remove(waiter)
+        current: Optional[_Node] = node
+        while current is not None:
+            current.subtree_waiters -= 1
+            current = current.parent
 
-    async def acquire(self, path: str):
+    @staticmethod
+    def _prune(node: _Node):
+        """Removes nodes that no longer hold any lock or waiter."""
+        while node.parent is not None and node.is_unused():
+            del node.parent.children[node.key]
+            node = node.parent
+
+    def _waiters_affected_by(self, node: _Node) -> List[tuple]:
+        """Waiters that may be unblocked by a release of node: waiters on the
+        node, its ancestors and its descendants."""
+        affected = [(waiter, node) for waiter in node.waiters]
+        for ancestor in node.ancestors():
+            affected.extend((waiter, ancestor) for waiter in ancestor.waiters)
+        stack = [child for child in node.children.values() if child.subtree_waiters]
+        while stack:
+            descendant = stack.pop()
+            affected.extend((waiter, descendant) for waiter in descendant.waiters)
+            stack.extend(
+                child for child in descendant.children.values() if child.subtree_waiters
+            )
+        affected.sort(key=lambda item: item[0].seq)
+        return affected
+
+    def _grant(self, node: _Node, path: str, task: asyncio.Task, shared: bool):
+        self._hold(node, shared, 1)
+        self._task_locks.setdefault(task, {})[path] = shared
+
+    def _wake_waiters(self, node: _Node):
+        for waiter, waiter_node in self._waiters_affected_by(node):
+            if waiter.future.done() or self._is_conflicting(waiter_node, waiter.shared):
+                continue
+            self._remove_waiter(waiter_node, waiter)
+            self._hold(waiter_node, waiter.shared, 1)
+            waiter.future.set_result(None)
+
+    async def acquire(self, path: str, shared: bool = False):
         """Acquire the lock for the given hierarchical path.
 
-        If an ancestor or descendant path is locked, this will wait
-        until it is released.
+        If an ancestor or descendant path is locked (in a conflicting
+        mode), this will wait until it is released.
         """
         task = asyncio.current_task()
         if task is None:
             raise RuntimeError("acquire() must be called from within a task.")
 
-        async with self._lock:
-            # Prevent re-entrant locking by the same task
-            if path in self._task_locks.get(task, set()):
-                raise RuntimeError(f"Task {task} cannot re-acquire lock on '{path}'.")
-
-            # Wait until there is no conflict with existing locked paths
-            while any(self._is_conflicting(path, lp) for lp in self._locked_paths):
-                logger.debug(
-                    f"Found conflicting path with {path!r}, waiting for release to check again..."
-                )
-                # Condition.wait() releases the lock and waits for notify_all()
-                await self._cond.wait()
-
-            # Acquire the path
-            self._locked_paths.add(path)
-            if task not in self._task_locks:
-                self._task_locks[task] = set()
-            self._task_locks[task].add(path)
-            logger.debug("Acquired lock for path: {}", path)
+        # Prevent re-entrant locking by the same task
+        if path in self._task_locks.get(task, {}):
+            raise RuntimeError(f"Task {task} cannot re-acquire lock on '{path}'.")
+
+        node = self._get_or_create(path)
+        if self._is_conflicting(node, shared):
+            logger.debug(
+                f"Found conflicting path with {path!r}, waiting for release..."
+            )
+            waiter = _Waiter(next(self._seq), task, shared)
+            self._add_waiter(node, waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # the lock was granted just as we were cancelled, give it back
+                    self._hold(node, shared, -1)
+                    self._wake_waiters(node)
+                else:
+                    self._remove_waiter(node, waiter)
+                self._prune(node)
+                raise
+            self._task_locks.setdefault(task, {})[path] = shared
+        else:
+            self._grant(node, path, task, shared)
+        logger.debug("Acquired lock for path: {}", path)
 
     async def release(self, path: str):
-        """Release the lock for the given path and notify waiting tasks."""
+        """Release the lock for the given path and wake the waiting tasks it
+        blocked."""
         task = asyncio.current_task()
         if task is None:
             raise RuntimeError("release() must be called from within a task.")
 
-        async with self._lock:
-            if path not in self._locked_paths:
-                raise RuntimeError(f"Cannot release path '{path}' that is not locked.")
+        node = self._find(path)
+        if node is None or (node.exclusive == 0 and node.shared == 0):
+            raise RuntimeError(f"Cannot release path '{path}' that is not locked.")
+
+        task_locks = self._task_locks.get(task, {})
+        if path not in task_locks:
+            raise RuntimeError(
+                f"Task {task} cannot release lock on '{path}' it does not hold."
+            )
 
-            if path not in self._task_locks.get(task, set()):
-                raise RuntimeError(
-                    f"Task {task} cannot release lock on '{path}' it does not hold."
-                )
+        shared = task_locks.pop(path)
+        if not task_locks:
+            del self._task_locks[task]
 
-            # Remove the path from locked paths and task locks
-            self._locked_paths.remove(path)
-            self._task_locks[task].remove(path)
-            if not self._task_locks[task]:
-                del self._task_locks[task]
+        self._hold(node, shared, -1)
+        self._wake_waiters(node)
+        self._prune(node)
+        logger.debug("Released lock for path: {}", path)
 
-            # Notify all tasks that something was released
-            self._cond.notify_all()
-            logger.debug("Released lock for path: {}", path)
+    def is_locked(self, path: str) -> bool:
+        """Whether the given path (exactly) is currently held."""
+        node = self._find(path)
+        return node is not None and (node.exclusive > 0 or node.shared > 0)
 
     @asynccontextmanager
-    async def lock(self, path: str) -> "HierarchicalLock":
+    async def lock(self, path: str, shared: bool = False) -> "HierarchicalLock":
         """Acquire the lock for the given path and return a context manager."""
-        await self.acquire(path)
+        await self.acquire(path, shared=shared)
         try:
             yield self
         finally:
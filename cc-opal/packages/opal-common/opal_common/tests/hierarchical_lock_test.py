@@ -45,8 +45,8 @@ async def test_siblings_do_not_block():
         async with lock.lock(path):
             await asyncio.sleep(0.1)
 
-    t1 = lock_sibling("alice.age")
-    t2 = lock_sibling("alice.name")
+    t1 = lock_sibling("alice/age")
+    t2 = lock_sibling("alice/name")
 
     duration = await measure_duration(
         asyncio.wait_for(
@@ -69,7 +69,7 @@ async def test_conflict_do_not_block_unrelated():
             return path
 
     parent = asyncio.create_task(lock_sibling("parent", 0.2))
-    child = lock_sibling("parent.child", 0.1)
+    child = lock_sibling("parent/child", 0.1)
     unrelated = lock_sibling("unrelated", 0.1)
 
     # Wait for all tasks to complete, in the order they complete
@@ -79,7 +79,7 @@ async def test_conflict_do_not_block_unrelated():
     assert order == [
         "unrelated",
         "parent",
-        "parent.child",
+        "parent/child",
     ], "Unrelated paths should not block"
 
 
@@ -97,9 +97,9 @@ async def test_parent_blocks_child():
 
     async def lock_child():
         await asyncio.sleep(0.1)  # wait a moment so parent acquires first
-        await lock.acquire("alice.age")
+        await lock.acquire("alice/age")
         got_lock_child.set()
-        await lock.release("alice.age")
+        await lock.release("alice/age")
 
     parent_task = lock_parent()
     child_task = lock_child()
@@ -131,8 +131,8 @@ async def test_children_block_parent():
         async with lock.lock("alice"):
             got_lock_parent.set()
 
-    c1 = lock_child("alice.age", 0)
-    c2 = lock_child("alice.name", 0)
+    c1 = lock_child("alice/age", 0)
+    c2 = lock_child("alice/name", 0)
     p = lock_parent()
 
     # Wait some time so the parent tries to acquire
@@ -193,12 +193,12 @@ async def test_parent_waits_for_new_child():
         async with lock.lock("alice"):
             parent_acquired = True
 
-    c1 = child_locker("alice.age", hold=0.2, delay=0.0)
-    c2 = child_locker("alice.name", hold=0.2, delay=0.0)
+    c1 = child_locker("alice/age", hold=0.2, delay=0.0)
+    c2 = child_locker("alice/name", hold=0.2, delay=0.0)
     p = parent_locker()
 
     # after a short moment, start new child 'alice.height'
-    c3 = child_locker("alice.height", hold=0.2, delay=0.1)
+    c3 = child_locker("alice/height", hold=0.2, delay=0.1)
 
     await asyncio.gather(c1, c2, c3, p)
 
@@ -233,3 +233,76 @@ async def test_same_task_reacquire_same_key_deadlock():
         same_task(),
         timeout=10,
     )
+
+
+@pytest.mark.asyncio
+async def test_path_prefix_is_not_a_parent():
+    lock = HierarchicalLock()
+
+    async def lock_path(path):
+        async with lock.lock(path):
+            await asyncio.sleep(0.1)
+
+    duration = await measure_duration(
+        asyncio.wait_for(
+            asyncio.gather(lock_path("/users"), lock_path("/users2")),
+            timeout=10,
+        )
+    )
+    assert duration < 0.2, "Paths sharing a string prefix are not related"
+
+
+@pytest.mark.asyncio
+async def test_root_path_blocks_everything():
+    lock = HierarchicalLock()
+
+    await lock.acquire("")
+    child = asyncio.create_task(lock.acquire("/users/bob"))
+    await asyncio.sleep(0.05)
+    assert not child.done(), "Root lock should block any path"
+
+    await lock.release("")
+    await asyncio.wait_for(child, timeout=1)
+    assert lock.is_locked("/users/bob")
+
+
+@pytest.mark.asyncio
+async def test_shared_locks():
+    lock = HierarchicalLock()
+
+    async def hold(path, shared):
+        async with lock.lock(path, shared=shared):
+            await asyncio.sleep(0.1)
+
+    # shared holders of related paths don't block each other
+    duration = await measure_duration(
+        asyncio.gather(hold("/users", True), hold("/users/bob", True))
+    )
+    assert duration < 0.2
+
+    # an exclusive holder blocks shared holders of related paths (and vice versa)
+    duration = await measure_duration(
+        asyncio.gather(hold("/users", False), hold("/users/bob", True))
+    )
+    assert duration >= 0.2
+    duration = await measure_duration(
+        asyncio.gather(hold("/users/bob", True), hold("/users", False))
+    )
+    assert duration >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_hold_lock():
+    lock = HierarchicalLock()
+
+    await lock.acquire("/users")
+    waiter = asyncio.create_task(lock.acquire("/users/bob"))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await lock.release("/users")
+
+    assert not lock.is_locked("/users/bob")
+    await lock.acquire("/users")
+    await lock.release("/users")
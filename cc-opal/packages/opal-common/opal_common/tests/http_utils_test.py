@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+# Add root opal dir to use local src as package for tests (i.e, no need for python -m pytest)
+root_dir = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+    )
+)
+sys.path.append(root_dir)
+
+import httpx
+from opal_common.http_utils import HttpSessionPool, HttpValidatorsCache, url_origin
+
+
+def test_url_origin():
+    assert url_origin("http://localhost:8181/v1/data/a/b") == "http://localhost:8181"
+    assert url_origin("https://api.example.com/x?y=z") == "https://api.example.com"
+
+
+@pytest.mark.asyncio
+async def test_session_pool_reuses_session_per_origin():
+    pool = HttpSessionPool()
+    try:
+        a = pool.get("http://localhost:8181/v1/data/a")
+        b = pool.get("http://localhost:8181/v1/policies/b")
+        c = pool.get("http://localhost:7002/data/config")
+        assert a is b
+        assert a is not c
+        assert a.connector.limit == 100
+    finally:
+        await pool.close()
+
+    assert a.closed and c.closed
+    # a closed pool hands out fresh sessions
+    d = pool.get("http://localhost:8181/v1/data/a")
+    assert d is not a and not d.closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_session_pool_httpx_client():
+    pool = HttpSessionPool(client="httpx", pool_size=5)
+    session = pool.get("http://localhost:8181/v1/data")
+    assert isinstance(session, httpx.AsyncClient)
+    assert pool.get("http://localhost:8181/other") is session
+    await pool.close()
+    assert session.is_closed
+
+
+def test_validators_cache():
+    cache = HttpValidatorsCache(max_entries=2)
+    response = httpx.Response(
+        200, headers={"ETag": '"abc"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    )
+    cache.remember("a", response)
+    assert cache.conditional_headers("a") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert cache.conditional_headers("b") == {}
+
+    # a response without validators can't be fetched conditionally
+    cache.remember("a", httpx.Response(200))
+    assert cache.conditional_headers("a") == {}
+
+    for key in ["a", "b", "c"]:
+        cache.remember(key, response)
+    assert cache.conditional_headers("a") == {}
+    cache.forget("c")
+    assert cache.conditional_headers("c") == {}
+    assert cache.conditional_headers("b") != {}
@@ -308,3 +308,31 @@ def test_sort_paths_according_to_explicit_sorting():
         # explicitly sorted items move to the beginning of the list
         # other items remain in the original sorting
     ) == to_paths(["world.rego", ".", "lib.rego", "more/path.rego", "even/more"])
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "rbac.rego",
+        "policies/rbac.rego",
+        "policies/tests/rbac_test.rego",
+        "data/tenants/data.json",
+        "data/x1.json",
+        "./policies/rbac.rego",
+    ],
+)
+def test_glob_style_match_path_to_list_compiled(path: str):
+    match_paths = [
+        "/a/*.rego",
+        "*_test.rego",
+        "data/x?.json",
+        "policies/tests/**",
+        "[!p]*/*/data.json",
+        "*.rego",
+    ]
+    # the compiled matcher returns the first match path that matches, like matching them in turn
+    for i in range(len(match_paths)):
+        paths = match_paths[i:]
+        assert PathUtils.glob_style_match_path_to_list(
+            path, paths
+        ) == PathUtils._glob_style_match_path_to_list(path, paths)
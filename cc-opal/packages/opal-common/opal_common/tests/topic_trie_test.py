@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+# Add root opal dir to use local src as package for tests (i.e, no need for python -m pytest)
+root_dir = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        os.path.pardir,
+        os.path.pardir,
+    )
+)
+sys.path.append(root_dir)
+
+from opal_common.topics.trie import TopicTrie, topic_path
+
+
+def test_topic_path():
+    assert topic_path("policy_data") == ["policy_data"]
+    assert topic_path("policy_data/users/keys") == ["policy_data", "users", "keys"]
+    assert topic_path("x:a/b") == ["x:a", "b"]
+    # only the part after the right-most colon is hierarchical
+    assert topic_path("x:y/z:a/b") == ["x:y/z:a", "b"]
+
+
+def test_match_returns_topic_and_ancestors():
+    trie = TopicTrie()
+    trie.add("policy_data", "client-1", "sub-1")
+    trie.add("policy_data/users", "client-2", "sub-2")
+    trie.add("policy_data/users/keys", "client-3", "sub-3")
+    trie.add("policy_data/roles", "client-4", "sub-4")
+    trie.add("scope:policy_data", "client-5", "sub-5")
+
+    matched = [entries for entries in trie.match("policy_data/users/keys/1")]
+    assert matched == [
+        {"client-1": ["sub-1"]},
+        {"client-2": ["sub-2"]},
+        {"client-3": ["sub-3"]},
+    ]
+    assert list(trie.match("policy_data")) == [{"client-1": ["sub-1"]}]
+    assert list(trie.match("scope:policy_data/users")) == [{"client-5": ["sub-5"]}]
+    # no partial segment matches
+    assert list(trie.match("policy_data2")) == []
+    assert trie.covers("policy_data/anything")
+    assert not trie.covers("other")
+
+
+def test_remove_prunes_empty_nodes():
+    trie = TopicTrie()
+    trie.add("a/b/c", "client-1", 1)
+    trie.add("a/b/c", "client-1", 2)
+    trie.add("a/b/c", "client-2", 3)
+    assert trie.get("a/b/c") == {"client-1": [1, 2], "client-2": [3]}
+
+    assert trie.remove("a/b/c", "client-1")
+    assert not trie.remove("a/b/c", "client-1")
+    assert not trie.remove("a/x", "client-2")
+    assert trie.get("a/b/c") == {"client-2": [3]}
+
+    assert trie.remove("a/b/c", "client-2")
+    assert trie._root.children == {}
@@ -0,0 +1,99 @@
+from typing import Dict, Generic, Hashable, Iterator, List, Optional, TypeVar
+
+from opal_common.topics.utils import PREFIX_DELIMITER, TOPIC_DELIMITER
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def topic_path(topic: str) -> List[str]:
+    """Splits a hierarchical topic into its segments, e.g.
+    "policy_data/users/keys" -> ["policy_data", "users", "keys"]
+
+    If a colon (':') is present, only the part after the right-most one is
+    split, and the prefix before it stays part of the first segment, e.g.
+    "data:policy_data/users/keys" -> ["data:policy_data", "users", "keys"]
+    """
+    prefix = None
+    if PREFIX_DELIMITER in topic:
+        prefix, topic = topic.rsplit(PREFIX_DELIMITER, 1)
+    segments = topic.split(TOPIC_DELIMITER)
+    if prefix is not None:
+        segments[0] = f"{prefix}{PREFIX_DELIMITER}{segments[0]}"
+    return segments
+
+
+class _TopicNode(Generic[K, V]):
+    __slots__ = ("parent", "segment", "children", "entries")
+
+    def __init__(self, parent: Optional["_TopicNode"] = None, segment: str = ""):
+        self.parent = parent
+        self.segment = segment
+        self.children: Dict[str, "_TopicNode[K, V]"] = {}
+        self.entries: Dict[K, List[V]] = {}
+
+
+class TopicTrie(Generic[K, V]):
+    """Maps hierarchical topics (see topic_path) to entries, grouped by key
+    (e.g. subscriptions by subscriber id).
+
+    A topic matches the entries of the topic itself and of all of its
+    ancestors ("policy_data/users" matches "policy_data" and
+    "policy_data/users"), which are found in a single walk down the trie.
+    """
+
+    def __init__(self):
+        self._root: _TopicNode[K, V] = _TopicNode()
+
+    def _find(self, topic: str) -> Optional[_TopicNode[K, V]]:
+        node = self._root
+        for segment in topic_path(topic):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def add(self, topic: str, key: K, value: V):
+        node = self._root
+        for segment in topic_path(topic):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _TopicNode(node, segment)
+            node = child
+        node.entries.setdefault(key, []).append(value)
+
+    def remove(self, topic: str, key: K) -> bool:
+        """Removes the entries of key on the given topic (exactly).
+
+        Returns whether there were any.
+        """
+        node = self._find(topic)
+        if node is None or node.entries.pop(key, None) is None:
+            return False
+        # prune nodes left without entries
+        while node.parent is not None and not node.entries and not node.children:
+            del node.parent.children[node.segment]
+            node = node.parent
+        return True
+
+    def get(self, topic: str) -> Dict[K, List[V]]:
+        """The entries of the given topic (exactly)."""
+        node = self._find(topic)
+        return node.entries if node is not None else {}
+
+    def match(self, topic: str) -> Iterator[Dict[K, List[V]]]:
+        """Yields the entries of the given topic and of each of its
+        ancestors."""
+        node = self._root
+        for segment in topic_path(topic):
+            node = node.children.get(segment)
+            if node is None:
+                return
+            if node.entries:
+                yield node.entries
+
+    def covers(self, topic: str) -> bool:
+        """Whether the given topic or any of its ancestors has entries."""
+        for _ in self.match(topic):
+            return True
+        return False
@@ -4,6 +4,10 @@ from typing import List
 from opal_common.paths import PathUtils
 
 POLICY_PREFIX = "policy:"
+# sub topics of a hierarchical topic are delimited by TOPIC_DELIMITER, after an optional
+# prefix ending with the right-most PREFIX_DELIMITER (e.g. "data:policy_data/users")
+TOPIC_DELIMITER = "/"
+PREFIX_DELIMITER = ":"
 
 
 def policy_topics(paths: List[Path]) -> List[str]:
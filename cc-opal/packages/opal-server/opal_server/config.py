@@ -57,6 +57,13 @@ class OpalServerConfig(Confi):
         True,
         description="Enable experimental bugfix for broadcast connection loss",
     )
+    PUBSUB_CLIENT_SEND_QUEUE_SIZE = confi.int(
+        "PUBSUB_CLIENT_SEND_QUEUE_SIZE",
+        1000,
+        description="Max number of notifications queued for sending to a single connected client. "
+        "A client that falls further behind is disconnected (and resyncs when it reconnects), "
+        "so a slow client can't stall notifications to the others",
+    )
 
     # server security
     AUTH_PRIVATE_KEY_FORMAT = confi.enum(
@@ -276,6 +283,29 @@ class OpalServerConfig(Confi):
         description="URL to trigger data update events",
     )
 
+    DATA_PROXY_ENABLED = confi.bool(
+        "DATA_PROXY_ENABLED",
+        False,
+        description="If set, the server fetches the (http) data sources of its data config and of "
+        "published data updates on behalf of the clients, once per update, and serves the "
+        "cached results to the clients (compressed, with ETags)",
+    )
+    DATA_PROXY_ROUTE = confi.str(
+        "DATA_PROXY_ROUTE",
+        "/data/proxy",
+        description="The route clients fetch proxied data sources from",
+    )
+    DATA_PROXY_URL = confi.str(
+        "DATA_PROXY_URL",
+        confi.delay("http://localhost:7002{DATA_PROXY_ROUTE}"),
+        description="The url clients fetch proxied data sources from (the server's DATA_PROXY_ROUTE as reachable by the clients)",
+    )
+    DATA_PROXY_MAX_SOURCES = confi.int(
+        "DATA_PROXY_MAX_SOURCES",
+        1000,
+        description="How many data sources the data proxy remembers (and caches the data of)",
+    )
+
     # Git service webhook (Default is Github)
     POLICY_REPO_WEBHOOK_SECRET = confi.str(
         "POLICY_REPO_WEBHOOK_SECRET",
@@ -305,12 +335,39 @@ class OpalServerConfig(Confi):
         description="Parameters for processing the incoming webhook",
     )
 
+    POLICY_REPO_WEBHOOK_COALESCE_WINDOW = confi.float(
+        "POLICY_REPO_WEBHOOK_COALESCE_WINDOW",
+        1.0,
+        description="Seconds to wait after a webhook before refreshing the policy repo (or scope). "
+        "Webhooks arriving in the meantime (e.g. a burst of pushes or retried deliveries) "
+        "are handled by the same refresh",
+    )
+    POLICY_REPO_WEBHOOK_MAX_CONCURRENT_REFRESHES = confi.int(
+        "POLICY_REPO_WEBHOOK_MAX_CONCURRENT_REFRESHES",
+        4,
+        description="Max number of webhook triggered refreshes (of different scopes) running at once",
+    )
+
     POLICY_REPO_POLLING_INTERVAL = confi.int(
         "POLICY_REPO_POLLING_INTERVAL",
         0,
         description="The polling interval for the policy repository",
     )
 
+    POLICY_BUNDLE_SHARED_CACHE_MAX_ENTRIES = confi.int(
+        "POLICY_BUNDLE_SHARED_CACHE_MAX_ENTRIES",
+        64,
+        description="Max number of rendered policy bundles kept in the cache shared by the server workers "
+        "of a host (each bundle is built once per host, by the leader after a policy update or by the first "
+        "worker requested for it, and memory mapped by the others). Set to 0 to disable the cache",
+    )
+    POLICY_BUNDLE_SHARED_CACHE_PATH = confi.str(
+        "POLICY_BUNDLE_SHARED_CACHE_PATH",
+        None,
+        description="Directory of the shared policy bundle cache, "
+        "defaults to opal_server_bundles under /dev/shm (or the temp directory if there's no /dev/shm)",
+    )
+
     ALLOWED_ORIGINS = confi.list(
         "ALLOWED_ORIGINS", ["*"], description="List of allowed origins for CORS"
     )
@@ -366,6 +423,12 @@ class OpalServerConfig(Confi):
         description="The max number of local clones to use for the same repo (reused across scopes)",
     )
 
+    SCOPES_SYNC_CONCURRENCY = confi.int(
+        "SCOPES_SYNC_CONCURRENCY",
+        10,
+        description="The max number of scope repos fetched (or cloned) concurrently when syncing all scopes",
+    )
+
     REDIS_URL = confi.str(
         "REDIS_URL",
         default="redis://localhost",
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from fastapi.responses import RedirectResponse
 from opal_common.authentication.authz import (
     require_peer_type,
@@ -20,14 +20,29 @@ from opal_common.schemas.security import PeerType
 from opal_common.urls import set_url_query_param
 from opal_server.config import opal_server_config
 from opal_server.data.data_update_publisher import DataUpdatePublisher
+from opal_server.data.proxy import DataProxy
 
 
 def init_data_updates_router(
     data_update_publisher: DataUpdatePublisher,
     data_sources_config: ServerDataSourceConfig,
     authenticator: JWTAuthenticator,
+    data_proxy: Optional[DataProxy] = None,
 ):
     router = APIRouter()
+    if data_proxy is not None and data_sources_config.config is not None:
+        # registers the config's sources (in every worker), clients get the proxied config
+        data_sources_config = data_sources_config.copy(
+            update={"config": data_proxy.proxy_config(data_sources_config.config)}
+        )
+    # the (static) data sources config, rendered once instead of on every request
+    rendered_config = {}
+
+    def render_data_sources_config(config: DataSourceConfig) -> bytes:
+        if rendered_config.get("config") is not config:
+            rendered_config["config"] = config
+            rendered_config["content"] = config.json().encode()
+        return rendered_config["content"]
 
     @router.get(opal_server_config.ALL_DATA_ROUTE)
     async def default_all_data():
@@ -86,7 +101,10 @@ def init_data_updates_router(
         token = get_token_from_header(authorization)
         if data_sources_config.config is not None:
             logger.info("Serving source configuration")
-            return data_sources_config.config
+            return Response(
+                content=render_data_sources_config(data_sources_config.config),
+                media_type="application/json",
+            )
         elif data_sources_config.external_source_url is not None:
             url = str(data_sources_config.external_source_url)
             short_token = token[:5] + "..." + token[-5:]
@@ -104,6 +122,49 @@ def init_data_updates_router(
                 detail="Did not find a data source configuration!",
             )
 
+    if data_proxy is not None:
+
+        @router.get(
+            f"{opal_server_config.DATA_PROXY_ROUTE}/{{source_id}}",
+            dependencies=[Depends(authenticator)],
+        )
+        async def get_proxied_data(
+            source_id: str, request: Request, update_id: Optional[str] = None
+        ):
+            """Serves the data of a data source fetched by the server on behalf
+            of the clients (@see DataProxy)."""
+            try:
+                data = await data_proxy.get(source_id, update_id)
+            except Exception as e:
+                logger.warning(
+                    "Data proxy failed to fetch source {source_id}: {err}",
+                    source_id=source_id,
+                    err=repr(e),
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail="Failed to fetch the data source",
+                )
+            if data is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Unknown data source",
+                )
+            headers = {"ETag": data.etag, "Vary": "Accept-Encoding"}
+            if request.headers.get("if-none-match") == data.etag:
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+                )
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                return Response(
+                    content=data.compressed,
+                    media_type="application/json",
+                    headers={**headers, "Content-Encoding": "gzip"},
+                )
+            return Response(
+                content=data.content, media_type="application/json", headers=headers
+            )
+
     @router.post(opal_server_config.DATA_CONFIG_ROUTE)
     async def publish_data_update_event(
         update: DataUpdate, claims: JWTClaims = Depends(authenticator)
@@ -1,6 +1,6 @@
 import asyncio
 import os
-from typing import List
+from typing import List, Optional
 
 from fastapi_utils.tasks import repeat_every
 from opal_common.logger import logger
@@ -10,14 +10,17 @@ from opal_common.schemas.data import (
     ServerDataSourceConfig,
 )
 from opal_common.topics.publisher import TopicPublisher
-
-TOPIC_DELIMITER = "/"
-PREFIX_DELIMITER = ":"
+from opal_common.topics.utils import PREFIX_DELIMITER, TOPIC_DELIMITER
+from opal_server.data.proxy import DATA_PROXY_SOURCES_TOPIC, DataProxy
 
 
 class DataUpdatePublisher:
-    def __init__(self, publisher: TopicPublisher) -> None:
+    def __init__(
+        self, publisher: TopicPublisher, data_proxy: Optional[DataProxy] = None
+    ) -> None:
         self._publisher = publisher
+        # if set, the published entries are fetched by the clients through the data proxy
+        self._data_proxy = data_proxy
 
     @staticmethod
     def get_topic_combos(topic: str) -> List[str]:
@@ -70,7 +73,7 @@ class DataUpdatePublisher:
             topics (List[str]): topics (with hierarchy) to notify subscribers of
             update (DataUpdate): update data-source configuration for subscribers to fetch data from
         """
-        all_topic_combos = set()
+        all_topics = set()
 
         # a nicer format of entries to the log
         logged_entries = [
@@ -84,14 +87,15 @@ class DataUpdatePublisher:
             for entry in update.entries
         ]
 
-        # Expand the topics for each event to include sub topic combos (e.g. publish 'a/b/c' as 'a' , 'a/b', and 'a/b/c')
         for entry in update.entries:
             topic_combos = []
             if entry.topics:
+                all_topics.update(entry.topics)
                 for topic in entry.topics:
                     topic_combos.extend(DataUpdatePublisher.get_topic_combos(topic))
-                entry.topics = topic_combos  # Update entry with the exhaustive list, so client won't have to expand it again
-                all_topic_combos.update(topic_combos)
+                # Expand the entry's topics to include sub topic combos (e.g. 'a/b/c' as 'a' , 'a/b', and 'a/b/c'),
+                # clients match entries by the exact topics they subscribed to
+                entry.topics = topic_combos
             else:
                 logger.warning(
                     "[{pid}] No topics were provided for the following entry: {entry}",
@@ -99,15 +103,22 @@ class DataUpdatePublisher:
                     entry=entry,
                 )
 
-        # publish all topics with all their sub combinations
+        # no need to publish the sub topic combos, the pub/sub server routes a topic to
+        # the subscribers of all of its ancestors (e.g. 'a/b/c' to subscribers of 'a' and 'a/b')
         logger.info(
             "[{pid}] Publishing data update to topics: {topics}, reason: {reason}, entries: {entries}",
             pid=os.getpid(),
-            topics=all_topic_combos,
+            topics=all_topics,
             reason=update.reason,
             entries=logged_entries,
         )
 
-        await self._publisher.publish(
-            list(all_topic_combos), update.dict(by_alias=True)
-        )
+        if self._data_proxy is not None:
+            proxied_sources = self._data_proxy.proxy_update(update)
+            if proxied_sources:
+                # let the other workers know the sources before clients ask them for it
+                await self._publisher.publish(
+                    [DATA_PROXY_SOURCES_TOPIC], proxied_sources
+                )
+
+        await self._publisher.publish(list(all_topics), update.dict(by_alias=True))
@@ -0,0 +1,291 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from fastapi_websocket_pubsub import PubSubEndpoint
+from opal_common.config import opal_common_config
+from opal_common.fetcher import FetchingEngine
+from opal_common.logger import logger
+from opal_common.schemas.data import DataSourceConfig, DataSourceEntry, DataUpdate
+from opal_common.urls import set_url_query_param
+from opal_server.config import opal_server_config
+from opal_server.policy.bundles.shared_cache import cache_key
+
+# internal topic the server workers share the proxied sources of published updates on
+DATA_PROXY_SOURCES_TOPIC = "__opal_data_proxy_sources__"
+# how many of the (latest) updates a proxied source remembers it was fetched for
+MAX_SOURCE_UPDATE_IDS = 16
+
+
+class ProxiedData:
+    """The data of a source, rendered (and compressed) once for all the
+    clients fetching it."""
+
+    def __init__(self, content: bytes):
+        self.digest = hashlib.sha256(content).hexdigest()
+        self.etag = f'"{self.digest}"'
+        self.content = content
+        self.compressed = gzip.compress(content)
+
+
+class ProxiedSource:
+    """A data source the proxy fetches on behalf of the clients."""
+
+    def __init__(
+        self,
+        url: str,
+        config: Optional[dict],
+        polling_interval: Optional[float] = None,
+        pinned: bool = False,
+    ):
+        self.url = url
+        self.config = config
+        # the data of polled sources is refetched once it is older than their interval
+        self.polling_interval = polling_interval
+        # sources of the data config are never evicted
+        self.pinned = pinned
+        self.data: Optional[ProxiedData] = None
+        self.fetched_at = 0.0
+        # set once an update of the source's url was published, until the next fetch
+        self.stale = False
+        # the updates the current data is fresh for
+        self.update_ids: "OrderedDict[str, None]" = OrderedDict()
+        # published updates of the source not fetched yet
+        self.pending_update_ids: Set[str] = set()
+        self.fetching: Optional[asyncio.Task] = None
+
+    def is_fresh(self, update_id: Optional[str]) -> bool:
+        if self.data is None:
+            return False
+        if update_id is not None:
+            return update_id in self.update_ids
+        if self.stale:
+            return False
+        return (
+            self.polling_interval is None
+            or time.monotonic() - self.fetched_at < self.polling_interval
+        )
+
+
+class DataProxy:
+    """Fetches data sources on behalf of the OPAL clients.
+
+    The http data sources of the data config and of published data
+    updates are rewritten to point at the proxy route, where the server
+    fetches each source once per update (clients of the same update wait
+    for the same fetch) and serves the result to all of its clients, so
+    the load on the backends does not grow with the number of clients.
+    Identical results are kept once (by content hash), and are served
+    gzip compressed with their hash as ETag.
+
+    A published update marks the cached data of its sources' urls stale,
+    and the proxied url of an updated entry carries the update id, so its
+    clients never get data fetched before the update. The server workers
+    share the sources of the updates they publish over the broadcast
+    channel, so any worker can serve any proxied url.
+    """
+
+    def __init__(
+        self,
+        proxy_url: str = None,
+        max_sources: int = None,
+        fetching_engine: Optional[FetchingEngine] = None,
+    ):
+        self._proxy_url = (proxy_url or opal_server_config.DATA_PROXY_URL).rstrip("/")
+        self._max_sources = max(
+            max_sources or opal_server_config.DATA_PROXY_MAX_SOURCES, 1
+        )
+        self._engine = fetching_engine or FetchingEngine(
+            worker_count=opal_common_config.FETCHING_WORKER_COUNT,
+            callback_timeout=opal_common_config.FETCHING_CALLBACK_TIMEOUT,
+            enqueue_timeout=opal_common_config.FETCHING_ENQUEUE_TIMEOUT,
+        )
+        self._sources: "OrderedDict[str, ProxiedSource]" = OrderedDict()
+        # the data of all the sources, by content hash (identical data is kept once)
+        self._contents: "weakref.WeakValueDictionary[str, ProxiedData]" = (
+            weakref.WeakValueDictionary()
+        )
+        self.fetches = 0
+
+    async def start(self, endpoint: Optional[PubSubEndpoint] = None):
+        """Starts fetching, and (if given the server's pub/sub endpoint)
+        listening to the sources published by other workers."""
+        self._engine.start_workers()
+        if endpoint is not None:
+            await endpoint.subscribe(
+                [DATA_PROXY_SOURCES_TOPIC], self._on_published_sources
+            )
+
+    async def stop(self):
+        await self._engine.terminate_workers()
+
+    @staticmethod
+    def source_id(url: str, config: Optional[dict]) -> str:
+        return cache_key(url, config)
+
+    def is_proxied(self, entry: DataSourceEntry) -> bool:
+        """Only http sources whose json result the proxy can serve as is are
+        proxied, other sources are fetched by the clients themselves."""
+        if entry.data is not None or entry.url.startswith(self._proxy_url):
+            return False
+        if not entry.url.startswith(("http://", "https://")):
+            return False
+        config = entry.config or {}
+        return (
+            config.get("fetcher") in (None, "HttpFetchProvider")
+            and str(config.get("method", "get")).lower() == "get"
+            and config.get("data") is None
+            and config.get("is_json", True)
+            and config.get("process_data", True)
+        )
+
+    def register(
+        self,
+        url: str,
+        config: Optional[dict],
+        update_id: Optional[str] = None,
+        polling_interval: Optional[float] = None,
+        pinned: bool = False,
+    ) -> str:
+        """Registers a source (and an update of it), returns its id."""
+        source_id = self.source_id(url, config)
+        source = self._sources.get(source_id)
+        if source is None:
+            source = self._sources[source_id] = ProxiedSource(
+                url, config, polling_interval, pinned
+            )
+        else:
+            source.pinned = source.pinned or pinned
+            if polling_interval is not None:
+                source.polling_interval = polling_interval
+        self._sources.move_to_end(source_id)
+        self._evict(keep=source_id)
+        if update_id is not None and update_id not in source.update_ids:
+            source.pending_update_ids.add(update_id)
+            # the update may change the data of any source of the same url
+            for other in self._sources.values():
+                if other.url == url:
+                    other.stale = True
+        return source_id
+
+    def _evict(self, keep: str):
+        """Forgets the least recently used sources beyond max sources."""
+        if len(self._sources) <= self._max_sources:
+            return
+        for source_id in list(self._sources):
+            if len(self._sources) <= self._max_sources:
+                break
+            if source_id != keep and not self._sources[source_id].pinned:
+                del self._sources[source_id]
+
+    def proxy_entry(
+        self, entry: DataSourceEntry, update_id: Optional[str] = None
+    ) -> DataSourceEntry:
+        """Returns the entry fetching its data through the proxy (or the
+        entry as is, if it is not proxied)."""
+        if not self.is_proxied(entry):
+            return entry
+        polling_interval = getattr(entry, "periodic_update_interval", None)
+        source_id = self.register(
+            entry.url,
+            entry.config,
+            update_id=update_id,
+            polling_interval=polling_interval,
+            pinned=update_id is None,
+        )
+        url = f"{self._proxy_url}/{source_id}"
+        if update_id is not None:
+            url = set_url_query_param(url, "update_id", update_id)
+        return entry.copy(update={"url": url, "config": None})
+
+    def proxy_config(self, config: DataSourceConfig) -> DataSourceConfig:
+        return config.copy(
+            update={"entries": [self.proxy_entry(entry) for entry in config.entries]}
+        )
+
+    def proxy_update(self, update: DataUpdate) -> Dict[str, dict]:
+        """Makes the entries of a data update fetch through the proxy (giving
+        the update an id if it has none), and returns the update's proxied
+        sources (to share with the other workers)."""
+        if update.id is None:
+            update.id = uuid.uuid4().hex
+        sources = {}
+        entries = []
+        for entry in update.entries:
+            proxied = self.proxy_entry(entry, update_id=update.id)
+            if proxied is not entry:
+                sources[self.source_id(entry.url, entry.config)] = {
+                    "url": entry.url,
+                    "config": entry.config,
+                    "update_id": update.id,
+                }
+            entries.append(proxied)
+        update.entries = entries
+        return sources
+
+    async def _on_published_sources(self, subscription, sources: Dict[str, dict]):
+        for source in sources.values():
+            self.register(
+                source["url"], source.get("config"), update_id=source["update_id"]
+            )
+
+    async def get(
+        self, source_id: str, update_id: Optional[str] = None
+    ) -> Optional[ProxiedData]:
+        """Returns the data of a source (fresh for the given update), or
+        None if the source is unknown.
+
+        Raises the fetch error if the source could not be fetched.
+        """
+        source = self._sources.get(source_id)
+        if source is None:
+            return None
+        self._sources.move_to_end(source_id)
+        while not source.is_fresh(update_id):
+            fetch_started = source.fetching is None
+            if fetch_started:
+                source.fetching = asyncio.create_task(self._fetch(source, update_id))
+            # shielded, a client disconnecting must not cancel the fetch of the others
+            await asyncio.shield(source.fetching)
+            if fetch_started:
+                # fetched after the request, as fresh as it gets
+                break
+        return source.data
+
+    async def _fetch(self, source: ProxiedSource, update_id: Optional[str]):
+        # the fetch is fresh for all the updates published before it started
+        update_ids = source.pending_update_ids
+        if update_id is not None:
+            update_ids.add(update_id)
+        source.pending_update_ids = set()
+        stale = source.stale
+        source.stale = False
+        try:
+            logger.info("Data proxy fetching: {url}", url=source.url)
+            result = await self._engine.handle_url(source.url, config=source.config)
+            self.fetches += 1
+            if result is None:
+                raise ValueError(f"Fetched no data from {source.url}")
+            content = json.dumps(result).encode()
+            digest = hashlib.sha256(content).hexdigest()
+            data = self._contents.get(digest)
+            if data is None:
+                data = self._contents[digest] = ProxiedData(content)
+        except BaseException:
+            source.pending_update_ids |= update_ids
+            source.stale = source.stale or stale
+            raise
+        finally:
+            source.fetching = None
+        source.data = data
+        source.fetched_at = time.monotonic()
+        for fetched_update_id in update_ids:
+            source.update_ids[fetched_update_id] = None
+        while len(source.update_ids) > MAX_SOURCE_UPDATE_IDS:
+            source.update_ids.popitem(last=False)
@@ -0,0 +1,143 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opal_common.schemas.data import (
+    DataSourceConfig,
+    DataSourceEntry,
+    DataUpdate,
+    ServerDataSourceConfig,
+)
+from opal_server.config import opal_server_config
+from opal_server.data.api import init_data_updates_router
+from opal_server.data.proxy import DataProxy
+
+PROXY_URL = "http://opal-server:7002/data/proxy"
+BACKEND_URL = "http://pap:8000/opal/pip-data"
+
+
+class FakeFetchingEngine:
+    def __init__(self):
+        self.fetches = []
+        self.data = {"users": ["alice"]}
+
+    def start_workers(self):
+        pass
+
+    async def terminate_workers(self):
+        pass
+
+    async def handle_url(self, url, config=None):
+        self.fetches.append(url)
+        await asyncio.sleep(0.01)
+        return self.data
+
+
+def make_proxy():
+    engine = FakeFetchingEngine()
+    return DataProxy(proxy_url=PROXY_URL, fetching_engine=engine), engine
+
+
+def source_id_of(url: str) -> str:
+    return url[len(PROXY_URL) + 1 :].split("?")[0]
+
+
+def test_only_http_json_sources_are_proxied():
+    proxy, _ = make_proxy()
+    config = DataSourceConfig(
+        entries=[
+            {"url": BACKEND_URL, "topics": ["a"], "config": {"headers": {"X": "1"}}},
+            {"url": BACKEND_URL, "topics": ["b"], "config": {"method": "post"}},
+            {"url": "postgresql://db", "topics": ["c"]},
+        ]
+    )
+    proxied = proxy.proxy_config(config)
+
+    assert proxied.entries[0].url.startswith(PROXY_URL)
+    assert proxied.entries[0].config is None
+    assert proxied.entries[0].topics == ["a"]
+    assert proxied.entries[1:] == config.entries[1:]
+
+
+@pytest.mark.asyncio
+async def test_source_is_fetched_once_per_update():
+    proxy, engine = make_proxy()
+    entry = DataSourceEntry(url=BACKEND_URL, topics=["a"])
+    config_entry = DataSourceEntry(
+        url=BACKEND_URL, topics=["a"], config={"headers": {"X-Tenant": "1"}}
+    )
+    config_source = source_id_of(proxy.proxy_entry(config_entry).url)
+
+    results = await asyncio.gather(*(proxy.get(config_source) for _ in range(20)))
+    assert len(engine.fetches) == 1
+    assert all(data is results[0] for data in results)
+
+    update = DataUpdate(entries=[entry])
+    proxy.proxy_update(update)
+    assert f"update_id={update.id}" in update.entries[0].url
+    update_source = source_id_of(update.entries[0].url)
+
+    engine.data = {"users": ["alice", "bob"]}
+    results = await asyncio.gather(
+        *(proxy.get(update_source, update.id) for _ in range(20))
+    )
+    assert len(engine.fetches) == 2
+    assert json.loads(results[0].content) == {"users": ["alice", "bob"]}
+    # the update makes the cached data of other sources of the same url stale
+    assert (await proxy.get(config_source)).content == results[0].content
+    assert len(engine.fetches) == 3
+    # identical data is kept once
+    assert len(proxy._contents) == 1
+
+    assert await proxy.get("unknown") is None
+
+
+@pytest.mark.asyncio
+async def test_sources_published_by_other_workers():
+    proxy, engine = make_proxy()
+    other_worker, _ = make_proxy()
+    update = DataUpdate(entries=[DataSourceEntry(url=BACKEND_URL, topics=["a"])])
+    sources = other_worker.proxy_update(update)
+
+    await proxy._on_published_sources(None, sources)
+    data = await proxy.get(source_id_of(update.entries[0].url), update.id)
+    assert json.loads(data.content) == engine.data
+
+
+def test_proxy_route_serves_compressed_data_with_etag():
+    proxy, _ = make_proxy()
+    app = FastAPI()
+    app.include_router(
+        init_data_updates_router(
+            None,
+            ServerDataSourceConfig(
+                config=DataSourceConfig(entries=[{"url": BACKEND_URL}])
+            ),
+            lambda: None,
+            data_proxy=proxy,
+        )
+    )
+    client = TestClient(app)
+    config = client.get(opal_server_config.DATA_CONFIG_ROUTE).json()
+    proxied_url = config["entries"][0]["url"]
+    route = proxied_url[len("http://opal-server:7002") :]
+
+    response = client.get(route)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == {"users": ["alice"]}
+    etag = response.headers["etag"]
+
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get(route, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == gzip.decompress(proxy._contents[etag[1:-1]].compressed)
+
+    assert (
+        client.get(f"{opal_server_config.DATA_PROXY_ROUTE}/unknown").status_code == 404
+    )
@@ -1,10 +1,13 @@
 import os
+from functools import partial
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 
 import fastapi.responses
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from git.objects import Commit
 from git.repo import Repo
+from opal_common.async_utils import run_sync
 from opal_common.confi.confi import load_conf_if_none
 from opal_common.git_utils.bundle_maker import BundleMaker
 from opal_common.git_utils.commit_viewer import CommitViewer
@@ -12,10 +15,14 @@ from opal_common.git_utils.repo_cloner import RepoClonePathFinder
 from opal_common.logger import logger
 from opal_common.schemas.policy import PolicyBundle
 from opal_server.config import opal_server_config
-from starlette.responses import RedirectResponse
+from opal_server.policy.bundles.shared_cache import cache_key, get_shared_bundle_cache
+from starlette.responses import RedirectResponse, StreamingResponse
 
 router = APIRouter()
 
+# size of the chunks rendered bundles are streamed in
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
 
 async def get_repo(
     base_clone_path: str = None,
@@ -91,6 +98,94 @@ async def get_input_paths_or_throw(
     return paths
 
 
+def make_policy_bundle(
+    repo: Repo,
+    input_paths: List[Path],
+    commit: Commit,
+    old_commit: Optional[Commit] = None,
+) -> PolicyBundle:
+    maker = BundleMaker(
+        repo,
+        in_directories=set(input_paths),
+        extensions=opal_server_config.FILTER_FILE_EXTENSIONS,
+        root_manifest_path=opal_server_config.POLICY_REPO_MANIFEST_PATH,
+        bundle_ignore=opal_server_config.BUNDLE_IGNORE,
+    )
+    if old_commit is None:
+        return maker.make_bundle(commit)
+    return maker.make_diff_bundle(old_commit, commit)
+
+
+def policy_bundle_cache_key(
+    repo_path: str,
+    input_paths: List[Path],
+    commit_hash: str,
+    old_commit_hash: Optional[str] = None,
+) -> str:
+    return cache_key(
+        "policy",
+        repo_path,
+        sorted(str(path) for path in input_paths),
+        commit_hash,
+        old_commit_hash,
+        opal_server_config.FILTER_FILE_EXTENSIONS,
+        opal_server_config.POLICY_REPO_MANIFEST_PATH,
+        opal_server_config.BUNDLE_IGNORE,
+    )
+
+
+def render_policy_bundle(
+    repo_path: str,
+    input_paths: List[Path],
+    commit_hash: str,
+    old_commit_hash: Optional[str] = None,
+) -> bytes:
+    """Makes the bundle (in a repo object of its own, may run in an executor)
+    and serializes it."""
+    repo = Repo(repo_path)
+    old_commit = repo.commit(old_commit_hash) if old_commit_hash else None
+    bundle = make_policy_bundle(repo, input_paths, repo.commit(commit_hash), old_commit)
+    return bundle.json().encode()
+
+
+async def get_shared_policy_bundle(
+    repo_path: str,
+    input_paths: List[Path],
+    commit_hash: str,
+    old_commit_hash: Optional[str] = None,
+) -> Optional[Union[bytes, memoryview]]:
+    """The rendered bundle from the host's shared bundle cache (built by the
+    first worker asking for it), or None if the cache is disabled or
+    failing."""
+    cache = get_shared_bundle_cache()
+    if cache is None:
+        return None
+    try:
+        return await cache.get_or_build(
+            policy_bundle_cache_key(
+                repo_path, input_paths, commit_hash, old_commit_hash
+            ),
+            partial(
+                render_policy_bundle,
+                repo_path,
+                input_paths,
+                commit_hash,
+                old_commit_hash,
+            ),
+        )
+    except OSError as e:
+        logger.warning(
+            "Shared bundle cache failed, making the bundle: {err}", err=repr(e)
+        )
+        return None
+
+
+async def _iter_chunks(content: Union[bytes, memoryview]):
+    view = memoryview(content)
+    for offset in range(0, len(view), RESPONSE_CHUNK_SIZE):
+        yield bytes(view[offset : offset + RESPONSE_CHUNK_SIZE])
+
+
 @router.get("/policy", response_model=PolicyBundle)
 async def get_policy(
     repo: Repo = Depends(get_repo),
@@ -100,13 +195,6 @@ async def get_policy(
         description="hash of previous bundle already downloaded, server will return a diff bundle.",
     ),
 ):
-    maker = BundleMaker(
-        repo,
-        in_directories=set(input_paths),
-        extensions=opal_server_config.FILTER_FILE_EXTENSIONS,
-        root_manifest_path=opal_server_config.POLICY_REPO_MANIFEST_PATH,
-        bundle_ignore=opal_server_config.BUNDLE_IGNORE,
-    )
     # check if commit exist in the repo
     revision = None
     if base_hash:
@@ -115,13 +203,28 @@ async def get_policy(
         except ValueError:
             logger.warning(f"base_hash {base_hash} not exist in the repo")
 
-    if revision is None:
-        return maker.make_bundle(repo.head.commit)
-    try:
-        old_commit = repo.commit(base_hash)
-        return maker.make_diff_bundle(old_commit, repo.head.commit)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"commit with hash {base_hash} was not found in the policy repo!",
-        )
+    old_commit = None
+    if revision is not None:
+        try:
+            old_commit = repo.commit(base_hash)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"commit with hash {base_hash} was not found in the policy repo!",
+            )
+
+    commit = repo.head.commit
+    rendered = await get_shared_policy_bundle(
+        repo.working_dir,
+        input_paths,
+        commit.hexsha,
+        old_commit.hexsha if old_commit is not None else None,
+    )
+    if rendered is None:
+        return make_policy_bundle(repo, input_paths, commit, old_commit)
+    # streamed from the mapped rendering, a chunk at a time
+    return StreamingResponse(
+        _iter_chunks(rendered),
+        media_type="application/json",
+        headers={"Content-Length": str(len(rendered))},
+    )
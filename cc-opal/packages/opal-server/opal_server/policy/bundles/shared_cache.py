@@ -0,0 +1,185 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from opal_common.async_utils import run_sync
+from opal_common.logger import logger
+from opal_common.synchronization.named_lock import NamedLock
+from opal_server.config import opal_server_config
+
+# how often a worker waiting for another worker's build checks the build lock
+BUILD_LOCK_ATTEMPT_INTERVAL = 0.02
+# number of build lock files (by key prefix), they are never removed
+BUILD_LOCK_BUCKETS = 256
+
+
+def cache_key(*parts) -> str:
+    """A cache key (file name safe) for json serializable parts."""
+    return hashlib.sha256(
+        json.dumps(parts, default=str, sort_keys=True).encode()
+    ).hexdigest()
+
+
+class SharedBundleCache:
+    """Per-host cache of rendered (serialized) bundles, shared by all the
+    server workers on the host.
+
+    Renderings are stored content-addressed (by their sha256) under `path`
+    (memory backed when under /dev/shm), and a small file per key points at
+    the rendering of that key. Workers mmap the renderings they serve, so
+    they share the host's page cache instead of each holding its own copy.
+
+    The first worker missing a key builds it while holding the file lock of
+    the key's bucket, other workers asking for the same key wait for the lock
+    and then map its result, so each bundle is built once per host. Lock files
+    are shared by the keys of a bucket, and are never pruned.
+    """
+
+    def __init__(self, path: str, max_entries: int = 64):
+        self._path = Path(path)
+        self._objects_dir = self._path / "objects"
+        self._keys_dir = self._path / "keys"
+        self._locks_dir = self._path / "locks"
+        for directory in [self._objects_dir, self._keys_dir, self._locks_dir]:
+            directory.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max(max_entries, 1)
+        # renderings mapped by this worker, by digest
+        self._mapped: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """A (read only) view of the rendering of key, mapped from the cache
+        file."""
+        try:
+            digest = (self._keys_dir / key).read_text()
+        except FileNotFoundError:
+            return None
+        return self._read_object(digest)
+
+    def put(self, key: str, content: bytes):
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._objects_dir / digest
+        if not object_path.exists():
+            self._write_atomic(object_path, content)
+        self._write_atomic(self._keys_dir / key, digest.encode())
+        self._prune()
+
+    async def get_or_build(
+        self, key: str, build: Callable[[], bytes]
+    ) -> Union[bytes, memoryview]:
+        """Returns the rendering of key, building (in an executor) and storing
+        it if no worker on this host did yet."""
+        content = self.get(key)
+        if content is None:
+            async with NamedLock(
+                str(self._lock_path(key)), attempt_interval=BUILD_LOCK_ATTEMPT_INTERVAL
+            ):
+                # another worker may have built it while we waited for the lock
+                content = self.get(key)
+                if content is None:
+                    content = await run_sync(build)
+                    self.builds += 1
+                    try:
+                        self.put(key, content)
+                    except OSError as e:
+                        # i.e: /dev/shm is full, served without caching
+                        logger.warning(
+                            "Could not store bundle in the shared bundle cache: {err}",
+                            err=repr(e),
+                        )
+                    return content
+        self.hits += 1
+        return content
+
+    def _lock_path(self, key: str) -> Path:
+        bucket = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16)
+        return self._locks_dir / f"{bucket % BUILD_LOCK_BUCKETS:03d}.lock"
+
+    def _read_object(self, digest: str) -> Optional[memoryview]:
+        mapped = self._mapped.get(digest)
+        if mapped is None:
+            try:
+                with open(self._objects_dir / digest, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return memoryview(b"")
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                # pruned by another worker
+                return None
+            self._mapped[digest] = mapped
+            while len(self._mapped) > self._max_entries:
+                _, evicted = self._mapped.popitem(last=False)
+                try:
+                    evicted.close()
+                except BufferError:
+                    # still being served, unmapped once its views are released
+                    pass
+        else:
+            self._mapped.move_to_end(digest)
+        return memoryview(mapped)
+
+    def _write_atomic(self, path: Path, content: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self._path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _prune(self):
+        """Removes the oldest entries beyond max_entries.
+
+        Removing a rendering another worker has mapped is safe, its
+        mapping remains valid until it is unmapped. Lock files are never
+        removed, a worker may be holding them.
+        """
+        for directory in [self._objects_dir, self._keys_dir]:
+            entries = list(os.scandir(directory))
+            if len(entries) <= self._max_entries:
+                continue
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[: len(entries) - self._max_entries]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+_shared_bundle_cache: Optional[SharedBundleCache] = None
+_shared_bundle_cache_unavailable = False
+
+
+def get_shared_bundle_cache() -> Optional[SharedBundleCache]:
+    """The bundle cache of this host, or None if disabled (or unusable)."""
+    global _shared_bundle_cache, _shared_bundle_cache_unavailable
+    if (
+        _shared_bundle_cache is None
+        and not _shared_bundle_cache_unavailable
+        and opal_server_config.POLICY_BUNDLE_SHARED_CACHE_MAX_ENTRIES > 0
+    ):
+        path = opal_server_config.POLICY_BUNDLE_SHARED_CACHE_PATH
+        if path is None:
+            base_dir = (
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            )
+            path = os.path.join(base_dir, "opal_server_bundles")
+        try:
+            _shared_bundle_cache = SharedBundleCache(
+                path, opal_server_config.POLICY_BUNDLE_SHARED_CACHE_MAX_ENTRIES
+            )
+        except OSError as e:
+            logger.warning(
+                "Shared bundle cache is disabled, cannot use {path}: {err}",
+                path=path,
+                err=repr(e),
+            )
+            _shared_bundle_cache_unavailable = True
+    return _shared_bundle_cache
@@ -18,6 +18,7 @@ from opal_common.schemas.policy import (
 )
 from opal_common.topics.publisher import TopicPublisher
 from opal_common.topics.utils import policy_topics
+from opal_server.policy.bundles.api import get_shared_policy_bundle
 
 
 async def create_update_all_directories_in_repo(
@@ -120,3 +121,21 @@ async def publish_changed_directories(
             await publisher.publish(
                 topics=notification.topics, data=notification.update.dict()
             )
+
+
+async def prebuild_policy_bundles(old_commit: Optional[Commit], new_commit: Commit):
+    """Builds the bundles clients tracking the whole repo ask for after a
+    policy update (the complete bundle and the diff from the previous commit)
+    into the host's shared bundle cache, so no worker builds them on
+    request."""
+    repo_path = new_commit.repo.working_dir
+    old_hashes = [None]
+    if old_commit is not None and old_commit != new_commit:
+        old_hashes.append(old_commit.hexsha)
+    for old_hash in old_hashes:
+        try:
+            await get_shared_policy_bundle(
+                repo_path, [Path(".")], new_commit.hexsha, old_hash
+            )
+        except Exception:
+            logger.exception("Failed to prebuild policy bundle")
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Callable, Coroutine, Dict, Hashable, Optional
+
+from opal_common.logger import logger
+
+Refresh = Callable[[Any], Coroutine]
+MergeData = Callable[[Any, Any], Any]
+
+
+def keep_latest(pending: Any, new: Any) -> Any:
+    return new
+
+
+class _PendingRefresh:
+    __slots__ = ("data", "dirty", "task")
+
+    def __init__(self, data: Any):
+        self.data = data
+        # whether there are triggers not yet handled by a refresh
+        self.dirty = True
+        self.task: Optional[asyncio.Task] = None
+
+
+class RefreshCoalescer:
+    """Collapses bursts of refresh triggers (e.g. webhooks) into as few
+    refreshes as possible.
+
+    Triggers are grouped by key (e.g. a scope id). The first trigger of a key
+    schedules a refresh after `window` seconds, and every trigger of that key
+    arriving until the refresh starts is folded into it (their data merged
+    with `merge`). A trigger arriving while the key's refresh runs schedules
+    exactly one more (trailing) refresh, so the last trigger is never lost.
+    Refreshes of different keys run concurrently, up to `max_concurrent`.
+    """
+
+    def __init__(
+        self,
+        refresh: Refresh,
+        window: float = 0,
+        max_concurrent: int = 1,
+        merge: MergeData = keep_latest,
+    ):
+        self._refresh = refresh
+        self._window = window
+        self._semaphore = asyncio.Semaphore(max(max_concurrent, 1))
+        self._merge = merge
+        self._pending: Dict[Hashable, _PendingRefresh] = {}
+        self.triggers_received = 0
+        self.refreshes_performed = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "triggers_received": self.triggers_received,
+            "refreshes_performed": self.refreshes_performed,
+            "refreshes_pending": len(self._pending),
+        }
+
+    def trigger(self, key: Hashable = None, data: Any = None):
+        self.triggers_received += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingRefresh(data)
+            pending.task = asyncio.create_task(self._run(key, pending))
+        else:
+            pending.data = self._merge(pending.data, data) if pending.dirty else data
+            pending.dirty = True
+
+    async def _run(self, key: Hashable, pending: _PendingRefresh):
+        try:
+            while pending.dirty:
+                await asyncio.sleep(self._window)
+                async with self._semaphore:
+                    data, pending.data, pending.dirty = pending.data, None, False
+                    self.refreshes_performed += 1
+                    try:
+                        await self._refresh(data)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        logger.exception("Triggered refresh failed")
+        finally:
+            del self._pending[key]
+
+    async def stop(self):
+        """Cancels pending and running refreshes."""
+        tasks = [pending.task for pending in self._pending.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -9,7 +9,10 @@ from opal_common.sources.api_policy_source import ApiPolicySource
 from opal_common.sources.git_policy_source import GitPolicySource
 from opal_common.topics.publisher import TopicPublisher
 from opal_server.config import PolicySourceTypes, opal_server_config
-from opal_server.policy.watcher.callbacks import publish_changed_directories
+from opal_server.policy.watcher.callbacks import (
+    prebuild_policy_bundles,
+    publish_changed_directories,
+)
 from opal_server.policy.watcher.task import BasePolicyWatcherTask, PolicyWatcherTask
 from opal_server.scopes.task import ScopesPolicyWatcherTask
 
@@ -140,4 +143,6 @@ def setup_watcher_task(
             bundle_ignore=bundle_ignore,
         )
     )
+    if opal_server_config.POLICY_BUNDLE_SHARED_CACHE_MAX_ENTRIES > 0:
+        watcher.add_on_new_policy_callback(prebuild_policy_bundles)
     return PolicyWatcherTask(watcher, pubsub_endpoint)
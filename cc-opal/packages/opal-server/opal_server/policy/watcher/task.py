@@ -1,13 +1,14 @@
 import asyncio
 import os
 import signal
-from typing import Any, Coroutine, List, Optional
+from typing import Any, Coroutine, Dict, Hashable, List, Optional
 
 from fastapi_websocket_pubsub import Topic
 from fastapi_websocket_pubsub.pub_sub_server import PubSubEndpoint
 from opal_common.logger import logger
 from opal_common.sources.base_policy_source import BasePolicySource
 from opal_server.config import opal_server_config
+from opal_server.policy.watcher.coalescer import RefreshCoalescer
 
 
 class BasePolicyWatcherTask:
@@ -17,7 +18,7 @@ class BasePolicyWatcherTask:
         self._tasks: List[asyncio.Task] = []
         self._should_stop: Optional[asyncio.Event] = None
         self._pubsub_endpoint = pubsub_endpoint
-        self._webhook_tasks: List[asyncio.Task] = []
+        self._webhook_refreshes: Optional[RefreshCoalescer] = None
 
     async def __aenter__(self):
         await self.start()
@@ -27,13 +28,31 @@ class BasePolicyWatcherTask:
         await self.stop()
 
     async def _on_webhook(self, topic: Topic, data: Any):
-        logger.info(f"Webhook listener triggered ({len(self._webhook_tasks)})")
-        for task in self._webhook_tasks:
-            if task.done():
-                # Clean references to finished tasks
-                self._webhook_tasks.remove(task)
+        self._webhook_refreshes.trigger(self._webhook_refresh_key(data), (topic, data))
+        logger.info("Webhook listener triggered ({stats})", stats=self.webhook_stats)
 
-        self._webhook_tasks.append(asyncio.create_task(self.trigger(topic, data)))
+    def _webhook_refresh_key(self, data: Any) -> Hashable:
+        """Webhooks with the same key are coalesced into a single refresh."""
+        return None
+
+    def _merge_webhook_data(self, pending: Any, new: Any) -> Any:
+        """Merges the data of a webhook into the data of a (coalesced) webhook
+        of the same key still waiting to be handled."""
+        return new
+
+    def _merge_webhook(self, pending: tuple, new: tuple) -> tuple:
+        (_, pending_data), (topic, data) = pending, new
+        return topic, self._merge_webhook_data(pending_data, data)
+
+    async def _on_webhook_refresh(self, webhook: tuple):
+        await self.trigger(*webhook)
+
+    @property
+    def webhook_stats(self) -> Dict[str, int]:
+        """Counters of webhooks received vs. refreshes they triggered."""
+        if self._webhook_refreshes is None:
+            return {}
+        return self._webhook_refreshes.stats
 
     async def _listen_to_webhook_notifications(self):
         # Webhook api route can be hit randomly in all workers, so it publishes a message to the webhook topic.
@@ -64,15 +83,23 @@ class BasePolicyWatcherTask:
         """Starts the policy watcher and registers a failure callback to
         terminate gracefully."""
         logger.info("Launching policy watcher")
+        self._webhook_refreshes = RefreshCoalescer(
+            self._on_webhook_refresh,
+            window=opal_server_config.POLICY_REPO_WEBHOOK_COALESCE_WINDOW,
+            max_concurrent=opal_server_config.POLICY_REPO_WEBHOOK_MAX_CONCURRENT_REFRESHES,
+            merge=self._merge_webhook,
+        )
         self._tasks.append(asyncio.create_task(self._listen_to_webhook_notifications()))
         self._init_should_stop()
 
     async def stop(self):
         """Stops all policy watcher tasks."""
         logger.info("Stopping policy watcher")
-        for task in self._tasks + self._webhook_tasks:
+        for task in self._tasks:
             if not task.done():
                 task.cancel()
+        if self._webhook_refreshes is not None:
+            await self._webhook_refreshes.stop()
         await asyncio.gather(*self._tasks, return_exceptions=True)
 
     async def trigger(self, topic: Topic, data: Any):
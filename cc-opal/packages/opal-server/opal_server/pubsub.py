@@ -1,8 +1,10 @@
+import asyncio
+import json
 import time
 from contextlib import contextmanager
 from contextvars import ContextVar
 from threading import Lock
-from typing import Dict, Generator, List, Optional, Set, Tuple, Union, cast
+from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union, cast
 from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, WebSocket
@@ -16,11 +18,14 @@ from fastapi_websocket_pubsub.event_notifier import (
     EventCallback,
     SubscriberId,
     Subscription,
+    Topic,
 )
+from fastapi_websocket_pubsub.rpc_event_methods import RpcEventServerMethods
 from fastapi_websocket_pubsub.websocket_rpc_event_notifier import (
     WebSocketRpcEventNotifier,
 )
 from fastapi_websocket_rpc import RpcChannel
+from fastapi_websocket_rpc.utils import gen_uid
 from opal_common.authentication.deps import WebsocketJWTAuthenticator
 from opal_common.authentication.signer import JWTSigner
 from opal_common.authentication.types import JWTClaims
@@ -28,8 +33,10 @@ from opal_common.authentication.verifier import Unauthorized
 from opal_common.confi.confi import load_conf_if_none
 from opal_common.config import opal_common_config
 from opal_common.logger import logger
+from opal_common.topics.trie import TopicTrie
 from opal_server.config import opal_server_config
 from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
 from starlette.datastructures import QueryParams
 
 OPAL_CLIENT_INFO_PARAM_PREFIX = "__opal_"
@@ -117,6 +124,284 @@ class ClientTracker:
             client_info.subscribed_topics.difference_update(topics)
 
 
+class EncodedNotification:
+    """The data of a notification, json encoded once (on first use) and
+    shared by the messages sent to all subscribers."""
+
+    def __init__(self, data: Any):
+        self.data = data
+        self._json: Optional[str] = None
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self.data, default=pydantic_encoder)
+        return self._json
+
+    def rpc_message(self, subscription: Subscription) -> "EncodedRpcMessage":
+        """The (pre-serialized) rpc message calling the subscriber's notify
+        method."""
+        subscription_json = json.dumps(
+            {
+                "id": subscription.id,
+                "subscriber_id": subscription.subscriber_id,
+                "topic": subscription.topic,
+                "notifier_id": subscription.notifier_id,
+            },
+            default=pydantic_encoder,
+        )
+        return EncodedRpcMessage(
+            '{"request": {"method": "notify", "arguments": {"subscription": '
+            + subscription_json
+            + ', "data": '
+            + self.json
+            + '}, "call_id": "'
+            + gen_uid()
+            + '"}, "response": null}'
+        )
+
+
+class EncodedRpcMessage(str):
+    """An already serialized rpc message (the rpc channel serializes what it
+    sends with .json())."""
+
+    def json(self, **kwargs) -> str:
+        return str(self)
+
+    model_dump_json = json
+
+
+# The notification currently being published (set by the notifier for the subscriber callbacks)
+current_notification: ContextVar[EncodedNotification] = ContextVar(
+    "current_notification"
+)
+
+
+class OpalEventNotifier(WebSocketRpcEventNotifier):
+    """Event notifier that routes notifications by topic hierarchy, and
+    encodes the data of each notification once for all of its subscribers.
+
+    Subscriptions are stored in a topic trie, so a published topic reaches the
+    subscribers of the topic and of all of its ancestors (e.g. "policy_data/users"
+    reaches the subscribers of "policy_data") in a single walk, and publishers don't
+    have to publish every ancestor topic as well. A subscription is notified at
+    most once per notification, even if it matches several of its topics.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._subscriptions: TopicTrie[SubscriberId, Subscription] = TopicTrie()
+        self._all_topics_subscriptions: Dict[SubscriberId, List[Subscription]] = {}
+        # the topics of each subscriber (to unsubscribe it from all of them)
+        self._subscriber_topics: Dict[SubscriberId, Set[Topic]] = {}
+
+    async def subscribe(
+        self,
+        subscriber_id: SubscriberId,
+        topics: Union[TopicList, ALL_TOPICS],
+        callback: EventCallback,
+        channel: Optional[RpcChannel] = None,
+    ) -> List[Subscription]:
+        if channel:
+            for restriction in self._channel_restrictions:
+                await restriction(topics, channel)
+
+        new_subscriptions = []
+        async with self._get_subscribers_lock():
+            if topics == ALL_TOPICS:
+                topics = [ALL_TOPICS]
+            for topic in topics:
+                subscription = Subscription(
+                    id=self.gen_subscription_id(),
+                    subscriber_id=subscriber_id,
+                    topic=topic,
+                    callback=callback,
+                )
+                if topic == ALL_TOPICS:
+                    self._all_topics_subscriptions.setdefault(subscriber_id, []).append(
+                        subscription
+                    )
+                else:
+                    self._subscriptions.add(topic, subscriber_id, subscription)
+                self._subscriber_topics.setdefault(subscriber_id, set()).add(topic)
+                new_subscriptions.append(subscription)
+            await self.trigger_events(self._on_subscribe_events, subscriber_id, topics)
+            return new_subscriptions
+
+    async def unsubscribe(
+        self, subscriber_id: SubscriberId, topics: Union[TopicList, None] = None
+    ):
+        async with self._get_subscribers_lock():
+            subscriber_topics = self._subscriber_topics.get(subscriber_id, set())
+            # if no topics are given then unsubscribe from all of the subscriber's topics
+            if topics is None:
+                topics = list(subscriber_topics)
+            for topic in topics:
+                if topic == ALL_TOPICS:
+                    self._all_topics_subscriptions.pop(subscriber_id, None)
+                else:
+                    self._subscriptions.remove(topic, subscriber_id)
+                subscriber_topics.discard(topic)
+            if not subscriber_topics:
+                self._subscriber_topics.pop(subscriber_id, None)
+            await self.trigger_events(
+                self._on_unsubscribe_events, subscriber_id, topics
+            )
+
+    async def _callback_subscriptions(
+        self, notifications: List[Tuple[Topic, Subscription]], data
+    ):
+        for topic, subscription in notifications:
+            try:
+                await self.trigger_callback(
+                    data, topic, subscription.subscriber_id, subscription
+                )
+            except Exception:
+                logger.exception(
+                    f"Failed to notify subscriber sub_id={subscription.subscriber_id} with topic={topic}"
+                )
+
+    async def notify(
+        self,
+        topics: Union[TopicList, Topic],
+        data=None,
+        notifier_id=None,
+        channel: Optional[RpcChannel] = None,
+    ):
+        # allow caller to pass a single topic without a list
+        if isinstance(topics, str):
+            topics = [topics]
+
+        if channel:
+            for restriction in self._channel_restrictions:
+                await restriction(topics, channel)
+
+        notified = set()
+        notifications: List[Tuple[Topic, Subscription]] = []
+        all_topics_notifications: List[Tuple[Topic, Subscription]] = []
+        async with self._get_subscribers_lock():
+            for topic in topics:
+                for subscribers in self._subscriptions.match(topic):
+                    for subscriber_id, subscriptions in subscribers.items():
+                        # Don't notify the notifier
+                        if subscriber_id == notifier_id:
+                            continue
+                        for subscription in subscriptions:
+                            if subscription.id not in notified:
+                                notified.add(subscription.id)
+                                notifications.append((topic, subscription))
+                # ALL_TOPICS subscribers are notified per topic, with the actual topic
+                for (
+                    subscriber_id,
+                    subscriptions,
+                ) in self._all_topics_subscriptions.items():
+                    if subscriber_id == notifier_id:
+                        continue
+                    for subscription in subscriptions:
+                        event = subscription.copy()
+                        event.topic = topic
+                        all_topics_notifications.append((topic, event))
+
+        # subscriber callbacks run in tasks created here, so they inherit the context
+        token = current_notification.set(EncodedNotification(data))
+        try:
+            # call the subscribers outside of the lock - if they disconnect in the middle of the handling the with statement may fail
+            await asyncio.gather(
+                self._callback_subscriptions(notifications, data),
+                self._callback_subscriptions(all_topics_notifications, data),
+            )
+        finally:
+            current_notification.reset(token)
+
+
+class OpalRpcEventServerMethods(RpcEventServerMethods):
+    """Server side pub/sub rpc methods (a copy is bound to each client
+    channel).
+
+    Notifications are queued to a bounded per-client send queue instead of being
+    sent (and awaited) by the publisher, and are written to the socket as
+    pre-serialized messages (see EncodedNotification). If a client falls more than
+    the queue size behind, it is disconnected (it resyncs when it reconnects).
+    """
+
+    def __init__(self, event_notifier, rpc_channel_get_remote_id: bool = False):
+        super().__init__(event_notifier, rpc_channel_get_remote_id)
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._sender_task: Optional[asyncio.Task] = None
+        self._disconnecting = False
+
+    def _queue_notification(self, subscription: Subscription, data: Any):
+        if self._disconnecting:
+            return
+        notification = current_notification.get(None)
+        if notification is None or notification.data is not data:
+            notification = EncodedNotification(data)
+
+        if self._send_queue is None:
+            self._send_queue = asyncio.Queue(
+                maxsize=opal_server_config.PUBSUB_CLIENT_SEND_QUEUE_SIZE
+            )
+            self._sender_task = asyncio.create_task(self._send_notifications())
+            self.channel.register_disconnect_handler([self._on_disconnect])
+
+        try:
+            self._send_queue.put_nowait(notification.rpc_message(subscription))
+        except asyncio.QueueFull:
+            logger.warning(
+                "Client channel {channel_id} is too far behind ({size} notifications queued), disconnecting it",
+                channel_id=self.channel.id,
+                size=self._send_queue.qsize(),
+            )
+            self._disconnecting = True
+            self._stop_sender()
+            asyncio.create_task(self.channel.close())
+
+    async def _send_notifications(self):
+        while True:
+            message = await self._send_queue.get()
+            try:
+                await self.channel.send(message)
+            except Exception as e:
+                logger.info(
+                    "Failed to send notification to channel {channel_id}: {err}",
+                    channel_id=self.channel.id,
+                    err=repr(e),
+                )
+                return
+
+    def _stop_sender(self):
+        if self._sender_task is not None:
+            self._sender_task.cancel()
+
+    async def _on_disconnect(self, channel: RpcChannel):
+        self._disconnecting = True
+        self._stop_sender()
+
+    async def subscribe(self, topics: TopicList = []) -> bool:
+        try:
+
+            async def callback(subscription: Subscription, data):
+                self._queue_notification(subscription, data)
+
+            if self._rpc_channel_get_remote_id:
+                # We'll use the remote channel id as our subscriber id
+                sub_id = await self.channel.get_other_channel_id() or self.channel.id
+            else:
+                # We'll use our channel id as our subscriber id
+                sub_id = self.channel.id
+            await self.event_notifier.subscribe(sub_id, topics, callback, self.channel)
+            return True
+        except Exception as err:
+            logger.exception("Failed to subscribe to RPC events notifier")
+            return False
+
+    async def unsubscribe(self, topics: TopicList = []) -> bool:
+        # topics the client isn't subscribed to are ignored by the notifier
+        sub_id = await self._get_channel_id_()
+        await self.event_notifier.unsubscribe(sub_id, topics)
+        return True
+
+
 class PubSub:
     """Wrapper for the Pub/Sub channel used for both policy and data
     updates."""
@@ -133,7 +418,7 @@ class PubSub:
         self.pubsub_router = APIRouter()
         self.api_router = APIRouter()
         # Pub/Sub Internals
-        self.notifier = WebSocketRpcEventNotifier()
+        self.notifier = OpalEventNotifier()
         self.notifier.add_channel_restriction(type(self)._verify_permitted_topics)
         self.client_tracker = ClientTracker()
         self.notifier.register_subscribe_event(self.client_tracker.on_subscribe)
@@ -152,6 +437,7 @@ class PubSub:
 
         # The server endpoint
         self.endpoint = PubSubEndpoint(
+            methods_class=OpalRpcEventServerMethods,
             broadcaster=self.broadcaster,
             notifier=self.notifier,
             rpc_channel_get_remote_id=opal_common_config.STATISTICS_ENABLED,
@@ -206,11 +492,20 @@ class PubSub:
     async def _verify_permitted_topics(
         topics: Union[TopicList, ALL_TOPICS], channel: RpcChannel
     ):
-        if "permitted_topics" not in channel.context.get("claims", {}):
+        claims = channel.context.get("claims", {})
+        if "permitted_topics" not in claims:
             return
-        unauthorized_topics = set(topics).difference(
-            channel.context["claims"]["permitted_topics"]
-        )
+        # a permitted topic permits its sub topics as well (their notifications reach its subscribers anyway)
+        permitted_topics: TopicTrie = channel.context.get("permitted_topics_trie")
+        if permitted_topics is None:
+            permitted_topics = channel.context["permitted_topics_trie"] = TopicTrie()
+            for topic in claims["permitted_topics"]:
+                permitted_topics.add(topic, topic, topic)
+        if isinstance(topics, str):
+            topics = [topics]
+        unauthorized_topics = {
+            topic for topic in topics if not permitted_topics.covers(topic)
+        }
         if unauthorized_topics:
             raise Unauthorized(
                 description=f"Invalid 'topics' to subscribe {unauthorized_topics}"
@@ -1,5 +1,7 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Optional, Set
 
+from opal_common.logger import logger
 from opal_common.schemas.scopes import Scope
 from opal_server.redis_utils import RedisDB
 
@@ -13,39 +15,208 @@ class ScopeNotFoundError(Exception):
 
 
 class ScopeRepository:
+    """Stores scopes in Redis.
+
+    Besides the scopes themselves (a key per scope), the repository maintains an
+    index of all scope ids and a secondary index of scope ids by policy repo url,
+    so listing scopes is a SMEMBERS + MGET instead of a SCAN of the keyspace.
+
+    Parsed scopes are cached in-process. Every write publishes the written scope
+    id on an invalidation channel, and the cache is only used while this process
+    is subscribed to it (so scopes written by other servers are never served stale
+    from the cache, beyond the pub/sub delivery delay).
+    """
+
+    MGET_CHUNK_SIZE = 1000
+    INVALIDATION_RETRY_INTERVAL = 5
+
     def __init__(self, redis_db: RedisDB):
         self._redis_db = redis_db
         self._prefix = "permit.io/Scope"
+        self._index_key = "permit.io/ScopeIndex"
+        self._url_index_prefix = "permit.io/ScopeUrlIndex"
+        self._invalidation_channel = "permit.io/ScopeInvalidation"
+        self._index_ready = False
+        self._cache: Dict[str, Scope] = {}
+        self._cache_enabled = False
+        # bumped on every invalidation, so values read before it aren't cached
+        self._cache_generation = 0
+        self._invalidation_task: Optional[asyncio.Task] = None
+        self._closed = False
 
     @property
     def db(self) -> RedisDB:
         return self._redis_db
 
     async def all(self) -> List[Scope]:
-        scopes = []
-
-        async for value in self._redis_db.scan(f"{self._prefix}:*"):
-            scope = Scope.parse_raw(value)
-            scopes.append(scope)
-
-        return scopes
+        await self._ensure_index()
+        scope_ids = await self._redis_db.redis_connection.smembers(self._index_key)
+        return await self._get_many(sorted(_decode(scope_id) for scope_id in scope_ids))
 
     async def get(self, scope_id: str) -> Scope:
+        self._ensure_invalidation_listener()
+        scope = self._cache.get(scope_id)
+        if scope is not None:
+            return scope
+
         key = self._redis_key(scope_id)
+        generation = self._cache_generation
         value = await self._redis_db.get(key)
 
         if value:
-            return Scope.parse_raw(value)
+            scope = Scope.parse_raw(value)
+            self._cache_scope(scope, generation)
+            return scope
         else:
             raise ScopeNotFoundError(scope_id)
 
+    async def get_ids_by_url(self, url: str) -> Set[str]:
+        """Returns the ids of all scopes whose policy repo is at the given
+        url."""
+        await self._ensure_index()
+        scope_ids = await self._redis_db.redis_connection.smembers(
+            self._url_index_key(url)
+        )
+        return {_decode(scope_id) for scope_id in scope_ids}
+
     async def put(self, scope: Scope):
+        await self._ensure_index()
         key = self._redis_key(scope.scope_id)
-        await self._redis_db.set(key, scope)
+        previous = await self._redis_db.get(key)
+
+        pipe = self._redis_db.redis_connection.pipeline(transaction=True)
+        if previous:
+            previous_url = Scope.parse_raw(previous).policy.url
+            if previous_url != scope.policy.url:
+                pipe.srem(self._url_index_key(previous_url), scope.scope_id)
+        pipe.set(key, scope.json())
+        pipe.sadd(self._index_key, scope.scope_id)
+        pipe.sadd(self._url_index_key(scope.policy.url), scope.scope_id)
+        pipe.publish(self._invalidation_channel, scope.scope_id)
+        generation = self._cache_generation
+        await pipe.execute()
+
+        self._cache_scope(scope, generation)
 
     async def delete(self, scope_id: str):
+        await self._ensure_index()
         key = self._redis_key(scope_id)
-        await self._redis_db.delete(key)
+        previous = await self._redis_db.get(key)
+
+        pipe = self._redis_db.redis_connection.pipeline(transaction=True)
+        if previous:
+            pipe.srem(
+                self._url_index_key(Scope.parse_raw(previous).policy.url), scope_id
+            )
+        pipe.delete(key)
+        pipe.srem(self._index_key, scope_id)
+        pipe.publish(self._invalidation_channel, scope_id)
+        await pipe.execute()
+
+        self._cache.pop(scope_id, None)
 
     def _redis_key(self, scope_id: str):
         return f"{self._prefix}:{scope_id}"
+
+    def _url_index_key(self, url: str):
+        return f"{self._url_index_prefix}:{url}"
+
+    async def _get_many(self, scope_ids: List[str]) -> List[Scope]:
+        self._ensure_invalidation_listener()
+        scopes: Dict[str, Scope] = {}
+        missing = []
+        for scope_id in scope_ids:
+            scope = self._cache.get(scope_id)
+            if scope is not None:
+                scopes[scope_id] = scope
+            else:
+                missing.append(scope_id)
+
+        for i in range(0, len(missing), self.MGET_CHUNK_SIZE):
+            chunk = missing[i : i + self.MGET_CHUNK_SIZE]
+            generation = self._cache_generation
+            values = await self._redis_db.redis_connection.mget(
+                [self._redis_key(scope_id) for scope_id in chunk]
+            )
+            for value in values:
+                # the scope might have been deleted since the index was read
+                if value:
+                    scope = Scope.parse_raw(value)
+                    self._cache_scope(scope, generation)
+                    scopes[scope.scope_id] = scope
+
+        return [scopes[scope_id] for scope_id in scope_ids if scope_id in scopes]
+
+    async def _ensure_index(self):
+        """Builds the indices from the stored scopes (once, for scopes stored
+        before the indices were maintained)."""
+        if self._index_ready:
+            return
+
+        redis = self._redis_db.redis_connection
+        if not await redis.exists(self._index_key):
+            pipe = redis.pipeline(transaction=False)
+            async for value in self._redis_db.scan(f"{self._prefix}:*"):
+                if not value:
+                    continue
+                scope = Scope.parse_raw(value)
+                pipe.sadd(self._index_key, scope.scope_id)
+                pipe.sadd(self._url_index_key(scope.policy.url), scope.scope_id)
+            if len(pipe):
+                logger.info("OPAL Scopes: building scope indices")
+                await pipe.execute()
+        self._index_ready = True
+
+    def _cache_scope(self, scope: Scope, generation: int):
+        if self._cache_enabled and generation == self._cache_generation:
+            self._cache[scope.scope_id] = scope
+
+    async def close(self):
+        """Stops listening for invalidations (scopes are no longer cached)."""
+        self._closed = True
+        task, self._invalidation_task = self._invalidation_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _ensure_invalidation_listener(self):
+        if self._closed:
+            return
+        if self._invalidation_task is None or self._invalidation_task.done():
+            self._invalidation_task = asyncio.create_task(
+                self._listen_for_invalidations()
+            )
+
+    async def _listen_for_invalidations(self):
+        while True:
+            pubsub = self._redis_db.redis_connection.pubsub()
+            try:
+                await pubsub.subscribe(self._invalidation_channel)
+                # only cache scopes while we're notified about writes by others
+                self._cache_enabled = True
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._cache_generation += 1
+                        self._cache.pop(_decode(message["data"]), None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"OPAL Scopes: lost scope invalidation channel ({e!r}), scopes cache is disabled until reconnected"
+                )
+            finally:
+                self._cache_enabled = False
+                self._cache_generation += 1
+                self._cache.clear()
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.INVALIDATION_RETRY_INTERVAL)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -1,8 +1,10 @@
+import asyncio
 import datetime
 import shutil
+from enum import Enum
 from functools import partial
 from pathlib import Path
-from typing import List, Optional, Set, cast
+from typing import Dict, Iterable, List, Optional, Set, cast
 
 import git
 from ddtrace import tracer
@@ -12,6 +14,7 @@ from opal_common.logger import logger
 from opal_common.schemas.policy import PolicyUpdateMessageNotification
 from opal_common.schemas.policy_source import GitPolicyScopeSource
 from opal_common.topics.publisher import ScopedServerSideTopicPublisher
+from opal_server.config import opal_server_config
 from opal_server.git_fetcher import GitPolicyFetcher, PolicyFetcherCallbacks
 from opal_server.policy.watcher.callbacks import (
     create_policy_update,
@@ -99,16 +102,70 @@ class NewCommitsCallbacks(PolicyFetcherCallbacks):
             await publisher.publish(notification.topics, notification.update)
 
 
+class ScopeSyncState(str, Enum):
+    pending = "pending"
+    syncing = "syncing"
+    ready = "ready"
+    failed = "failed"
+
+
+class ScopesSyncProgress:
+    """Tracks the progress of a sync of all scopes (the sync state of each
+    scope)."""
+
+    def __init__(self, scope_ids: Iterable[str]):
+        self._states: Dict[str, ScopeSyncState] = {
+            scope_id: ScopeSyncState.pending for scope_id in scope_ids
+        }
+
+    def set_state(self, scope_id: str, state: ScopeSyncState):
+        self._states[scope_id] = state
+
+    def state(self, scope_id: str) -> Optional[ScopeSyncState]:
+        return self._states.get(scope_id)
+
+    def is_ready(self, scope_id: str) -> bool:
+        return self._states.get(scope_id) == ScopeSyncState.ready
+
+    @property
+    def total(self) -> int:
+        return len(self._states)
+
+    @property
+    def done(self) -> int:
+        return sum(
+            1
+            for state in self._states.values()
+            if state in (ScopeSyncState.ready, ScopeSyncState.failed)
+        )
+
+    def counts(self) -> Dict[ScopeSyncState, int]:
+        counts = {state: 0 for state in ScopeSyncState}
+        for state in self._states.values():
+            counts[state] += 1
+        return counts
+
+
 class ScopesService:
     def __init__(
         self,
         base_dir: Path,
         scopes: ScopeRepository,
         pubsub_endpoint: PubSubEndpoint,
+        sync_concurrency: Optional[int] = None,
     ):
         self._base_dir = base_dir
         self._scopes = scopes
         self._pubsub_endpoint = pubsub_endpoint
+        self._sync_concurrency = (
+            sync_concurrency or opal_server_config.SCOPES_SYNC_CONCURRENCY
+        )
+        self._sync_progress: Optional[ScopesSyncProgress] = None
+
+    @property
+    def sync_progress(self) -> Optional[ScopesSyncProgress]:
+        """Progress of the last (or currently running) sync of all scopes."""
+        return self._sync_progress
 
     async def sync_scope(
         self,
@@ -119,6 +176,8 @@ class ScopesService:
         notify_on_changes: bool = True,
         req_time: datetime.datetime = None,
     ):
+        """Syncs the policy repo of a scope, returns whether the sync
+        succeeded."""
         if scope is None:
             assert scope_id, ValueError("scope_id not set for sync_scope")
             scope = await self._scopes.get(scope_id)
@@ -126,7 +185,7 @@ class ScopesService:
         with tracer.trace("scopes_service.sync_scope", resource=scope.scope_id):
             if not isinstance(scope.policy, GitPolicyScopeSource):
                 logger.warning("Non-git scopes are currently not supported!")
-                return
+                return False
             source = cast(GitPolicyScopeSource, scope.policy)
 
             logger.debug(
@@ -157,6 +216,8 @@ class ScopesService:
                 logger.exception(
                     f"Could not fetch policy for scope {scope.scope_id}, got error: {e}"
                 )
+                return False
+            return True
 
     async def delete_scope(self, scope_id: str):
         with tracer.trace("scopes_service.delete_scope", resource=scope_id):
@@ -164,13 +225,12 @@ class ScopesService:
             scope = await self._scopes.get(scope_id)
             url = scope.policy.url
 
-            scopes = await self._scopes.all()
             remove_repo_clone = True
 
-            for scope in scopes:
-                if scope.scope_id != scope_id and scope.policy.url == url:
+            for other_scope_id in await self._scopes.get_ids_by_url(url):
+                if other_scope_id != scope_id:
                     logger.info(
-                        f"found another scope with same remote url ({scope.scope_id}), skipping clone deletion"
+                        f"found another scope with same remote url ({other_scope_id}), skipping clone deletion"
                     )
                     remove_repo_clone = False
                     break
@@ -184,44 +244,83 @@ class ScopesService:
             await self._scopes.delete(scope_id)
 
     async def sync_scopes(self, only_poll_updates=False, notify_on_changes=True):
+        """Syncs all scopes.
+
+        Scopes are grouped by their repo clone (source id): each repo is fetched
+        once, by the first scope in its group, and the other scopes of the group
+        then only check the fetched clone for changes. Groups are synced
+        concurrently (up to the configured sync concurrency).
+        """
         with tracer.trace("scopes_service.sync_scopes"):
             scopes = await self._scopes.all()
             if only_poll_updates:
                 # Only sync scopes that have polling enabled (in a periodic check)
                 scopes = [scope for scope in scopes if scope.policy.poll_updates]
 
+            sources: Dict[str, List[Scope]] = {}
+            for scope in scopes:
+                sources.setdefault(GitPolicyFetcher.source_id(scope.policy), []).append(
+                    scope
+                )
+
             logger.info(
-                f"OPAL Scopes: syncing {len(scopes)} scopes in the background (polling updates: {only_poll_updates})"
+                f"OPAL Scopes: syncing {len(scopes)} scopes ({len(sources)} repos) in the background (polling updates: {only_poll_updates})"
             )
 
-            fetched_source_ids = set()
-            skipped_scopes = []
-            for scope in scopes:
-                src_id = GitPolicyFetcher.source_id(scope.policy)
-
-                # Give priority to scopes that have a unique url per shard (so we'll clone all repos asap)
-                if src_id in fetched_source_ids:
-                    skipped_scopes.append(scope)
-                    continue
+            progress = ScopesSyncProgress(scope.scope_id for scope in scopes)
+            self._sync_progress = progress
+            semaphore = asyncio.Semaphore(self._sync_concurrency)
 
-                try:
-                    await self.sync_scope(
-                        scope=scope,
+            async def sync_source(source_scopes: List[Scope]):
+                first, dependents = source_scopes[0], source_scopes[1:]
+                async with semaphore:
+                    await self._sync_scope_with_progress(
+                        first,
+                        progress,
                         force_fetch=True,
                         notify_on_changes=notify_on_changes,
                     )
-                except Exception as e:
-                    logger.exception(f"sync_scope failed for {scope.scope_id}")
 
-                fetched_source_ids.add(src_id)
-
-            for scope in skipped_scopes:
-                # No need to refetch the same repo, just check for changes
-                try:
-                    await self.sync_scope(
-                        scope=scope,
+                for scope in dependents:
+                    # No need to refetch the same repo, just check for changes
+                    await self._sync_scope_with_progress(
+                        scope,
+                        progress,
                         force_fetch=False,
                         notify_on_changes=notify_on_changes,
                     )
-                except Exception as e:
-                    logger.exception(f"sync_scope failed for {scope.scope_id}")
+
+                logger.info(
+                    f"OPAL Scopes: synced {progress.done}/{progress.total} scopes"
+                )
+
+            await asyncio.gather(
+                *(sync_source(source_scopes) for source_scopes in sources.values())
+            )
+
+            counts = progress.counts()
+            logger.info(
+                f"OPAL Scopes: sync done, {counts[ScopeSyncState.ready]} scopes are ready, {counts[ScopeSyncState.failed]} failed"
+            )
+
+    async def _sync_scope_with_progress(
+        self,
+        scope: Scope,
+        progress: ScopesSyncProgress,
+        force_fetch: bool,
+        notify_on_changes: bool,
+    ):
+        progress.set_state(scope.scope_id, ScopeSyncState.syncing)
+        try:
+            synced = await self.sync_scope(
+                scope=scope,
+                force_fetch=force_fetch,
+                notify_on_changes=notify_on_changes,
+            )
+        except Exception as e:
+            logger.exception(f"sync_scope failed for {scope.scope_id}")
+            synced = False
+
+        progress.set_state(
+            scope.scope_id, ScopeSyncState.ready if synced else ScopeSyncState.failed
+        )
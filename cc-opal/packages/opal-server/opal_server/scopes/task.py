@@ -1,7 +1,7 @@
 import asyncio
 import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Hashable
 
 from fastapi_websocket_pubsub import Topic
 from opal_common.logger import logger
@@ -16,9 +16,10 @@ class ScopesPolicyWatcherTask(BasePolicyWatcherTask):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        self._scopes = ScopeRepository(RedisDB(opal_server_config.REDIS_URL))
         self._service = ScopesService(
             base_dir=Path(opal_server_config.BASE_DIR),
-            scopes=ScopeRepository(RedisDB(opal_server_config.REDIS_URL)),
+            scopes=self._scopes,
             pubsub_endpoint=self._pubsub_endpoint,
         )
 
@@ -30,7 +31,10 @@ class ScopesPolicyWatcherTask(BasePolicyWatcherTask):
             self._tasks.append(asyncio.create_task(self._periodic_polling()))
 
     async def stop(self):
-        return await super().stop()
+        try:
+            return await super().stop()
+        finally:
+            await self._scopes.close()
 
     async def _periodic_polling(self):
         try:
@@ -47,6 +51,22 @@ class ScopesPolicyWatcherTask(BasePolicyWatcherTask):
         except asyncio.CancelledError:
             logger.info("Periodic sync cancelled")
 
+    def _webhook_refresh_key(self, data: Any) -> Hashable:
+        # webhooks of a single scope are coalesced per scope
+        if isinstance(data, dict):
+            return ("scope", data.get("scope_id"))
+        return None
+
+    def _merge_webhook_data(self, pending: Any, new: Any) -> Any:
+        if not isinstance(pending, dict) or not isinstance(new, dict):
+            # a refresh of all scopes covers the other
+            return pending if not isinstance(pending, dict) else new
+        return {
+            **new,
+            "force_fetch": pending.get("force_fetch", False)
+            or new.get("force_fetch", False),
+        }
+
     async def trigger(self, topic: Topic, data: Any):
         if data is not None and isinstance(data, dict):
             # Refresh single scope
@@ -75,11 +95,19 @@ class ScopesPolicyWatcherTask(BasePolicyWatcherTask):
         if opal_server_config.SCOPES:
             logger.info("Preloading repo clones for scopes")
 
+            scopes = ScopeRepository(RedisDB(opal_server_config.REDIS_URL))
             service = ScopesService(
                 base_dir=Path(opal_server_config.BASE_DIR),
-                scopes=ScopeRepository(RedisDB(opal_server_config.REDIS_URL)),
+                scopes=scopes,
                 pubsub_endpoint=None,
             )
-            asyncio.run(service.sync_scopes(notify_on_changes=False))
+
+            async def preload():
+                try:
+                    await service.sync_scopes(notify_on_changes=False)
+                finally:
+                    await scopes.close()
+
+            asyncio.run(preload())
 
             logger.warning("Finished preloading repo clones for scopes.")
@@ -25,6 +25,7 @@ from opal_common.topics.publisher import (
 from opal_server.config import opal_server_config
 from opal_server.data.api import init_data_updates_router
 from opal_server.data.data_update_publisher import DataUpdatePublisher
+from opal_server.data.proxy import DataProxy
 from opal_server.loadlimiting import init_loadlimit_router
 from opal_server.policy.bundles.api import router as bundles_router
 from opal_server.policy.watcher.factory import setup_watcher_task
@@ -165,13 +166,19 @@ class OpalServer:
         else:
             self.opal_statistics = None
 
-        # if stats are enabled, the server workers must be listening on the broadcast
-        # channel for their own synchronization, not just for their clients. therefore
+        self.data_proxy: Optional[DataProxy] = None
+        if opal_server_config.DATA_PROXY_ENABLED:
+            self.data_proxy = DataProxy()
+
+        # if stats (or the data proxy) are enabled, the server workers must be listening on the
+        # broadcast channel for their own synchronization, not just for their clients. therefore
         # we need a "global" listening context
         self.broadcast_listening_context: Optional[
             EventBroadcasterContextManager
         ] = None
-        if self.broadcaster_uri is not None and opal_common_config.STATISTICS_ENABLED:
+        if self.broadcaster_uri is not None and (
+            opal_common_config.STATISTICS_ENABLED or self.data_proxy is not None
+        ):
             self.broadcast_listening_context = (
                 self.pubsub.endpoint.broadcaster.get_listening_context()
             )
@@ -223,11 +230,16 @@ class OpalServer:
 
         data_update_publisher: Optional[DataUpdatePublisher] = None
         if self.publisher is not None:
-            data_update_publisher = DataUpdatePublisher(self.publisher)
+            data_update_publisher = DataUpdatePublisher(
+                self.publisher, data_proxy=self.data_proxy
+            )
 
         # Init api routers with required dependencies
         data_updates_router = init_data_updates_router(
-            data_update_publisher, self.data_sources_config, authenticator
+            data_update_publisher,
+            self.data_sources_config,
+            authenticator,
+            data_proxy=self.data_proxy,
         )
         webhook_router = init_git_webhook_router(self.pubsub.endpoint, authenticator)
         security_router = init_security_router(
@@ -315,22 +327,26 @@ class OpalServer:
 
         all workers will start these tasks:
         - publisher: a client that is used to publish updates to the client.
+        - data proxy (if enabled): fetches data sources on behalf of the clients.
 
         only the leader worker (first to obtain leadership lock) will start these tasks:
         - (repo) watcher: monitors the policy git repository for changes.
         """
         if self.publisher is not None:
             async with self.publisher:
-                if self.opal_statistics is not None:
-                    if self.broadcast_listening_context is not None:
-                        logger.info(
-                            "listening on broadcast channel for statistics events..."
-                        )
-                        await self.broadcast_listening_context.__aenter__()
+                if self.broadcast_listening_context is not None:
+                    logger.info(
+                        "listening on broadcast channel for server synchronization events..."
+                    )
+                    await self.broadcast_listening_context.__aenter__()
+                    if self.opal_statistics is not None:
                         # if the broadcast channel is closed, we want to restart worker process because statistics can't be reliable anymore
                         self.broadcast_listening_context._event_broadcaster.get_reader_task().add_done_callback(
                             lambda _: self._graceful_shutdown()
                         )
+                if self.data_proxy is not None:
+                    await self.data_proxy.start(self.pubsub.endpoint)
+                if self.opal_statistics is not None:
                     asyncio.create_task(self.opal_statistics.run())
                     self.pubsub.endpoint.notifier.register_unsubscribe_event(
                         self.opal_statistics.remove_client
@@ -370,13 +386,10 @@ class OpalServer:
                             # Worker should restart when watcher stops
                             self._graceful_shutdown()
 
-                if (
-                    self.opal_statistics is not None
-                    and self.broadcast_listening_context is not None
-                ):
+                if self.broadcast_listening_context is not None:
                     await self.broadcast_listening_context.__aexit__()
                     logger.info(
-                        "stopped listening for statistics events on the broadcast channel"
+                        "stopped listening for server synchronization events on the broadcast channel"
                     )
 
     async def stop_server_background_tasks(self):
@@ -392,6 +405,10 @@ class OpalServer:
             tasks.append(asyncio.create_task(self.broadcast_keepalive.stop()))
         if self.opal_statistics is not None:
             tasks.append(asyncio.create_task(self.opal_statistics.stop()))
+        if self.data_proxy is not None:
+            tasks.append(asyncio.create_task(self.data_proxy.stop()))
+        if opal_server_config.SCOPES:
+            tasks.append(asyncio.create_task(self._scopes.close()))
 
         try:
             await asyncio.gather(*tasks)
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sys
+from typing import Any, List
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from fastapi_websocket_pubsub import Topic
+from opal_server.config import opal_server_config
+from opal_server.policy.watcher.coalescer import RefreshCoalescer
+from opal_server.policy.watcher.task import BasePolicyWatcherTask
+from opal_server.scopes.task import ScopesPolicyWatcherTask
+
+
+class RecordingRefresh:
+    def __init__(self, duration: float = 0):
+        self.calls: List[Any] = []
+        self.running = 0
+        self.max_running = 0
+        self._duration = duration
+
+    async def __call__(self, data: Any):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self._duration)
+            self.calls.append(data)
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_into_one_refresh():
+    refresh = RecordingRefresh()
+    coalescer = RefreshCoalescer(refresh, window=0.05)
+    for i in range(50):
+        coalescer.trigger("repo", i)
+    await asyncio.sleep(0.1)
+
+    assert refresh.calls == [49]
+    assert coalescer.stats == {
+        "triggers_received": 50,
+        "refreshes_performed": 1,
+        "refreshes_pending": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_trigger_during_refresh_runs_trailing_refresh():
+    refresh = RecordingRefresh(duration=0.05)
+    coalescer = RefreshCoalescer(refresh, window=0.01)
+    coalescer.trigger("repo", "first")
+    await asyncio.sleep(0.03)
+    # the first refresh is running, these must not be lost
+    coalescer.trigger("repo", "second")
+    coalescer.trigger("repo", "third")
+    await asyncio.sleep(0.15)
+
+    assert refresh.calls == ["first", "third"]
+    assert coalescer.refreshes_performed == 2
+
+
+@pytest.mark.asyncio
+async def test_refreshes_of_different_keys_are_capped():
+    refresh = RecordingRefresh(duration=0.02)
+    coalescer = RefreshCoalescer(refresh, window=0, max_concurrent=2)
+    for i in range(6):
+        coalescer.trigger(f"scope-{i}", i)
+    await asyncio.sleep(0.15)
+
+    assert sorted(refresh.calls) == list(range(6))
+    assert refresh.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_does_not_stop_coalescer():
+    calls = []
+
+    async def failing_refresh(data):
+        calls.append(data)
+        raise RuntimeError("fetch failed")
+
+    coalescer = RefreshCoalescer(failing_refresh, window=0)
+    coalescer.trigger(None, 1)
+    await asyncio.sleep(0.01)
+    coalescer.trigger(None, 2)
+    await asyncio.sleep(0.01)
+    assert calls == [1, 2]
+
+
+class RecordingWatcherTask(BasePolicyWatcherTask):
+    def __init__(self):
+        super().__init__(pubsub_endpoint=None)
+        self.triggered = []
+
+    async def trigger(self, topic: Topic, data: Any):
+        self.triggered.append((topic, data))
+
+    async def _listen_to_webhook_notifications(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_watcher_coalesces_webhooks(monkeypatch):
+    monkeypatch.setattr(opal_server_config, "POLICY_REPO_WEBHOOK_COALESCE_WINDOW", 0.05)
+    watcher = RecordingWatcherTask()
+    await watcher.start()
+    for _ in range(10):
+        await watcher._on_webhook("webhook", None)
+    await asyncio.sleep(0.1)
+    await watcher.stop()
+
+    assert watcher.triggered == [("webhook", None)]
+    assert watcher.webhook_stats["triggers_received"] == 10
+    assert watcher.webhook_stats["refreshes_performed"] == 1
+
+
+def test_scope_webhooks_merge():
+    watcher = ScopesPolicyWatcherTask.__new__(ScopesPolicyWatcherTask)
+    first = {"scope_id": "a", "force_fetch": True, "hinted_hash": "1"}
+    second = {"scope_id": "a", "hinted_hash": "2"}
+
+    assert watcher._webhook_refresh_key(first) == watcher._webhook_refresh_key(second)
+    assert watcher._webhook_refresh_key(first) != watcher._webhook_refresh_key(
+        {"scope_id": "b"}
+    )
+    assert watcher._merge_webhook_data(first, second) == {
+        "scope_id": "a",
+        "force_fetch": True,
+        "hinted_hash": "2",
+    }
+    assert watcher._merge_webhook_data(None, {"scope_id": None}) is None
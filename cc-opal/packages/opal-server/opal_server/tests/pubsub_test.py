@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from fastapi_websocket_pubsub import ALL_TOPICS
+from opal_common.authentication.verifier import Unauthorized
+from opal_server.config import opal_server_config
+from opal_server.pubsub import OpalEventNotifier, OpalRpcEventServerMethods, PubSub
+
+
+class FakeChannel:
+    def __init__(self, id: str, blocked: bool = False):
+        self.id = id
+        self.sent = []
+        self.closed = False
+        self._blocked = asyncio.Event()
+        if not blocked:
+            self._blocked.set()
+        self._disconnect_handlers = []
+
+    def register_disconnect_handler(self, coros):
+        self._disconnect_handlers.extend(coros)
+
+    async def send(self, message):
+        await self._blocked.wait()
+        self.sent.append(message.json())
+
+    async def close(self):
+        self.closed = True
+        for handler in self._disconnect_handlers:
+            await handler(self)
+
+
+async def connect(notifier, channel: FakeChannel, topics):
+    methods = OpalRpcEventServerMethods(notifier)._copy_()
+    methods._set_channel_(channel)
+    assert await methods.subscribe(topics)
+    return methods
+
+
+@pytest.mark.asyncio
+async def test_notification_is_sent_to_all_subscribers_without_waiting():
+    notifier = OpalEventNotifier()
+    channels = [FakeChannel(f"client-{i}") for i in range(3)]
+    for channel in channels:
+        await connect(notifier, channel, ["policy_data"])
+
+    await notifier.notify(["policy_data"], {"id": "update-1", "entries": [1, 2]})
+    await asyncio.sleep(0.01)
+
+    for channel in channels:
+        assert len(channel.sent) == 1
+        message = json.loads(channel.sent[0])
+        request = message["request"]
+        assert request["method"] == "notify"
+        assert request["arguments"]["data"] == {"id": "update-1", "entries": [1, 2]}
+        assert request["arguments"]["subscription"]["topic"] == "policy_data"
+        assert request["arguments"]["subscription"]["subscriber_id"] == channel.id
+    # every client gets its own call id
+    call_ids = {
+        json.loads(channel.sent[0])["request"]["call_id"] for channel in channels
+    }
+    assert len(call_ids) == 3
+
+
+@pytest.mark.asyncio
+async def test_slow_client_is_disconnected_when_its_queue_is_full(monkeypatch):
+    monkeypatch.setattr(opal_server_config, "PUBSUB_CLIENT_SEND_QUEUE_SIZE", 2)
+    notifier = OpalEventNotifier()
+    fast = FakeChannel("fast")
+    slow = FakeChannel("slow", blocked=True)
+    await connect(notifier, fast, ["policy"])
+    await connect(notifier, slow, ["policy"])
+
+    for i in range(5):
+        await notifier.notify(["policy"], {"id": i})
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    assert [json.loads(m)["request"]["arguments"]["data"]["id"] for m in fast.sent] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert slow.closed
+    assert not fast.closed
+
+
+class RecordingSubscriber:
+    def __init__(self):
+        self.notifications = []
+
+    async def callback(self, subscription, data):
+        self.notifications.append((subscription.topic, data))
+
+
+@pytest.mark.asyncio
+async def test_notification_reaches_subscribers_of_ancestor_topics():
+    notifier = OpalEventNotifier()
+    subscribers = {
+        topic: RecordingSubscriber()
+        for topic in ["policy_data", "policy_data/users", "policy_data/roles"]
+    }
+    for topic, subscriber in subscribers.items():
+        await notifier.subscribe(topic, [topic], subscriber.callback)
+    everything = RecordingSubscriber()
+    await notifier.subscribe("broadcaster", ALL_TOPICS, everything.callback)
+
+    await notifier.notify(["policy_data/users/1", "policy_data/users/2"], "update")
+
+    # notified once, even though both published topics match the subscription
+    assert subscribers["policy_data"].notifications == [("policy_data", "update")]
+    assert subscribers["policy_data/users"].notifications == [
+        ("policy_data/users", "update")
+    ]
+    assert subscribers["policy_data/roles"].notifications == []
+    assert everything.notifications == [
+        ("policy_data/users/1", "update"),
+        ("policy_data/users/2", "update"),
+    ]
+
+    await notifier.unsubscribe("policy_data")
+    await notifier.notify(["policy_data/users"], "update")
+    assert len(subscribers["policy_data"].notifications) == 1
+    assert len(subscribers["policy_data/users"].notifications) == 2
+
+
+@pytest.mark.asyncio
+async def test_permitted_topics_cover_sub_topics():
+    channel = FakeChannel("client")
+    channel.context = {"claims": {"permitted_topics": ["tenant-1:data:policy_data"]}}
+
+    await PubSub._verify_permitted_topics(
+        ["tenant-1:data:policy_data", "tenant-1:data:policy_data/users"], channel
+    )
+    with pytest.raises(Unauthorized):
+        await PubSub._verify_permitted_topics(
+            ["tenant-2:data:policy_data/users"], channel
+        )
+    with pytest.raises(Unauthorized):
+        await PubSub._verify_permitted_topics(ALL_TOPICS, channel)
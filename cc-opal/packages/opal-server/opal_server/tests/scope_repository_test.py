@@ -0,0 +1,230 @@
+import asyncio
+import fnmatch
+import os
+import sys
+from collections import defaultdict
+from typing import Dict, List, Set
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_common.schemas.policy_source import GitPolicyScopeSource, NoAuthData
+from opal_common.schemas.scopes import Scope
+from opal_server.redis_utils import RedisDB
+from opal_server.scopes.scope_repository import ScopeNotFoundError, ScopeRepository
+
+
+class InMemoryRedisServer:
+    """The keys and channels shared by the connections of several servers."""
+
+    def __init__(self):
+        self.values: Dict[str, bytes] = {}
+        self.sets: Dict[str, Set[bytes]] = defaultdict(set)
+        self.subscribers: Dict[str, List[asyncio.Queue]] = defaultdict(list)
+
+
+class InMemoryPipeline:
+    def __init__(self, connection: "InMemoryRedis"):
+        self._connection = connection
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self._commands.append((name, args))
+
+        return queue
+
+    def __len__(self):
+        return len(self._commands)
+
+    async def execute(self):
+        return [
+            await getattr(self._connection, name)(*args)
+            for name, args in self._commands
+        ]
+
+
+class InMemoryPubSub:
+    def __init__(self, server: InMemoryRedisServer):
+        self._server = server
+        self._channel = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str):
+        self._channel = channel
+        self._server.subscribers[channel].append(self._queue)
+        self._queue.put_nowait({"type": "subscribe", "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        if self._channel is not None:
+            self._server.subscribers[self._channel].remove(self._queue)
+            self._channel = None
+
+
+class InMemoryRedis:
+    """Implements the (asyncio) redis commands used by ScopeRepository."""
+
+    def __init__(self, server: InMemoryRedisServer):
+        self._server = server
+
+    async def get(self, key: str):
+        return self._server.values.get(key)
+
+    async def set(self, key: str, value: str):
+        self._server.values[key] = value.encode()
+
+    async def delete(self, key: str):
+        self._server.values.pop(key, None)
+
+    async def exists(self, key: str) -> int:
+        return int(key in self._server.values or bool(self._server.sets.get(key)))
+
+    async def mget(self, keys: List[str]):
+        return [self._server.values.get(key) for key in keys]
+
+    async def scan(self, cursor, match: str):
+        return 0, [key for key in self._server.values if fnmatch.fnmatch(key, match)]
+
+    async def sadd(self, key: str, member: str):
+        self._server.sets[key].add(member.encode())
+
+    async def srem(self, key: str, member: str):
+        self._server.sets[key].discard(member.encode())
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        return set(self._server.sets.get(key, ()))
+
+    async def publish(self, channel: str, message: str):
+        for queue in self._server.subscribers[channel]:
+            queue.put_nowait({"type": "message", "data": message.encode()})
+
+    def pipeline(self, transaction: bool = True):
+        return InMemoryPipeline(self)
+
+    def pubsub(self):
+        return InMemoryPubSub(self._server)
+
+
+class InMemoryRedisDB(RedisDB):
+    def __init__(self, server: InMemoryRedisServer):
+        self._url = "memory://"
+        self._redis = InMemoryRedis(server)
+
+
+def make_scope(scope_id: str, url: str, branch: str = "main") -> Scope:
+    return Scope(
+        scope_id=scope_id,
+        policy=GitPolicyScopeSource(
+            source_type="git", url=url, auth=NoAuthData(), branch=branch
+        ),
+    )
+
+
+async def wait_for_listener(repository: ScopeRepository):
+    for _ in range(100):
+        if repository._cache_enabled:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("scope invalidation listener didn't subscribe")
+
+
+@pytest.mark.asyncio
+async def test_indices_follow_writes():
+    repository = ScopeRepository(InMemoryRedisDB(InMemoryRedisServer()))
+    await repository.put(make_scope("b", "https://git/one"))
+    await repository.put(make_scope("a", "https://git/one"))
+    await repository.put(make_scope("c", "https://git/two"))
+
+    assert [scope.scope_id for scope in await repository.all()] == ["a", "b", "c"]
+    assert await repository.get_ids_by_url("https://git/one") == {"a", "b"}
+
+    # moving a scope to another repo moves it between the url indices
+    await repository.put(make_scope("b", "https://git/two"))
+    assert await repository.get_ids_by_url("https://git/one") == {"a"}
+    assert await repository.get_ids_by_url("https://git/two") == {"b", "c"}
+
+    await repository.delete("c")
+    assert [scope.scope_id for scope in await repository.all()] == ["a", "b"]
+    assert await repository.get_ids_by_url("https://git/two") == {"b"}
+    with pytest.raises(ScopeNotFoundError):
+        await repository.get("c")
+
+    await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_indices_built_for_existing_scopes():
+    server = InMemoryRedisServer()
+    db = InMemoryRedisDB(server)
+    # stored before the indices were maintained
+    for scope in [
+        make_scope("a", "https://git/one"),
+        make_scope("b", "https://git/two"),
+    ]:
+        await db.set(f"permit.io/Scope:{scope.scope_id}", scope)
+
+    repository = ScopeRepository(db)
+    assert [scope.scope_id for scope in await repository.all()] == ["a", "b"]
+    assert await repository.get_ids_by_url("https://git/two") == {"b"}
+
+    await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_of_other_workers_invalidate_cache():
+    server = InMemoryRedisServer()
+    worker, other_worker = (
+        ScopeRepository(InMemoryRedisDB(server)),
+        ScopeRepository(InMemoryRedisDB(server)),
+    )
+    await other_worker.put(make_scope("a", "https://git/one"))
+
+    await worker.get("a")
+    await wait_for_listener(worker)
+    assert (await worker.get("a")).policy.branch == "main"
+    assert "a" in worker._cache
+
+    await other_worker.put(make_scope("a", "https://git/one", branch="dev"))
+    await asyncio.sleep(0.01)
+    assert "a" not in worker._cache
+    assert (await worker.get("a")).policy.branch == "dev"
+    assert [scope.policy.branch for scope in await worker.all()] == ["dev"]
+
+    await other_worker.delete("a")
+    await asyncio.sleep(0.01)
+    with pytest.raises(ScopeNotFoundError):
+        await worker.get("a")
+
+    await worker.close()
+    await other_worker.close()
+
+
+@pytest.mark.asyncio
+async def test_close_stops_invalidation_listener():
+    server = InMemoryRedisServer()
+    repository = ScopeRepository(InMemoryRedisDB(server))
+    await repository.put(make_scope("a", "https://git/one"))
+    await repository.get("a")
+    await wait_for_listener(repository)
+    task = repository._invalidation_task
+
+    await repository.close()
+
+    assert task.done()
+    assert repository._invalidation_task is None
+    assert not repository._cache_enabled
+    assert server.subscribers["permit.io/ScopeInvalidation"] == []
+
+    # still readable, but not cached or listened for anymore
+    assert (await repository.get("a")).scope_id == "a"
+    assert repository._invalidation_task is None
+    assert repository._cache == {}
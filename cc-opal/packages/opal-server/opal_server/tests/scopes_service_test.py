@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from opal_common.schemas.policy_source import GitPolicyScopeSource, NoAuthData
+from opal_common.schemas.scopes import Scope
+from opal_server.scopes.service import ScopesService, ScopeSyncState
+
+
+class InMemoryScopes:
+    def __init__(self, scopes: List[Scope]):
+        self._scopes = scopes
+
+    async def all(self) -> List[Scope]:
+        return self._scopes
+
+
+class RecordingScopesService(ScopesService):
+    """Records syncs instead of fetching repos."""
+
+    def __init__(self, scopes: List[Scope], sync_concurrency: int):
+        super().__init__(Path("/tmp"), InMemoryScopes(scopes), None, sync_concurrency)
+        self.fetches = []
+        self.checks = []
+        self.running = 0
+        self.max_running = 0
+
+    async def sync_scope(
+        self, scope: Scope = None, force_fetch: bool = False, **kwargs
+    ):
+        if force_fetch:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.05)
+            self.running -= 1
+            self.fetches.append(scope.scope_id)
+        else:
+            self.checks.append(scope.scope_id)
+        if scope.scope_id.startswith("broken"):
+            raise RuntimeError("fetch failed")
+        return True
+
+
+def make_scope(scope_id: str, url: str) -> Scope:
+    return Scope(
+        scope_id=scope_id,
+        policy=GitPolicyScopeSource(
+            source_type="git", url=url, auth=NoAuthData(), branch="main"
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_sync_scopes_fetches_each_repo_once_concurrently():
+    scopes = [make_scope(f"scope-{i}", f"https://git/repo-{i % 6}") for i in range(18)]
+    service = RecordingScopesService(scopes, sync_concurrency=3)
+
+    await service.sync_scopes()
+
+    # one fetch per repo, the other scopes of a repo only check for changes
+    assert len(service.fetches) == 6
+    assert len(service.checks) == 12
+    assert service.max_running == 3
+    assert service.sync_progress.total == 18
+    assert all(service.sync_progress.is_ready(scope.scope_id) for scope in scopes)
+
+
+@pytest.mark.asyncio
+async def test_sync_scopes_reports_failed_scopes():
+    scopes = [
+        make_scope("broken", "https://git/a"),
+        make_scope("ok-1", "https://git/a"),
+        make_scope("ok-2", "https://git/b"),
+    ]
+    service = RecordingScopesService(scopes, sync_concurrency=2)
+
+    await service.sync_scopes()
+
+    progress = service.sync_progress
+    assert progress.state("broken") == ScopeSyncState.failed
+    assert progress.is_ready("ok-1") and progress.is_ready("ok-2")
+    assert progress.counts()[ScopeSyncState.failed] == 1
@@ -0,0 +1,153 @@
+import asyncio
+import errno
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent path to use local src as package for tests
+root_dir = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.path.pardir, os.path.pardir)
+)
+sys.path.append(root_dir)
+
+from git import Actor, Repo
+from opal_server.policy.bundles.api import (
+    get_shared_policy_bundle,
+    make_policy_bundle,
+    render_policy_bundle,
+)
+from opal_server.policy.bundles.shared_cache import SharedBundleCache, cache_key
+
+
+@pytest.mark.asyncio
+async def test_each_key_is_built_once_per_host(tmp_path: Path):
+    # two workers on the same host
+    workers = [SharedBundleCache(str(tmp_path)), SharedBundleCache(str(tmp_path))]
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return b'{"manifest": []}'
+
+    key = cache_key("policy", "abc")
+    results = await asyncio.gather(
+        *(worker.get_or_build(key, build) for worker in workers * 3)
+    )
+
+    assert builds == [1]
+    assert results == [b'{"manifest": []}'] * 6
+    assert sum(worker.builds for worker in workers) == 1
+    assert sum(worker.hits for worker in workers) == 5
+
+
+@pytest.mark.asyncio
+async def test_identical_renderings_are_stored_once(tmp_path: Path):
+    cache = SharedBundleCache(str(tmp_path))
+    cache.put(cache_key("a"), b"same")
+    cache.put(cache_key("b"), b"same")
+    assert cache.get(cache_key("a")) == cache.get(cache_key("b")) == b"same"
+    assert len(os.listdir(tmp_path / "objects")) == 1
+    assert cache.get(cache_key("c")) is None
+
+
+def test_oldest_entries_are_pruned(tmp_path: Path):
+    reader = SharedBundleCache(str(tmp_path), max_entries=2)
+    writer = SharedBundleCache(str(tmp_path), max_entries=2)
+    writer.put("k1", b"one")
+    # mapped by another worker before being pruned
+    assert reader.get("k1") == b"one"
+    for i, key in enumerate(["k2", "k3"]):
+        time.sleep(0.01)
+        writer.put(key, f"content {i}".encode())
+
+    assert sorted(os.listdir(tmp_path / "keys")) == ["k2", "k3"]
+    assert len(os.listdir(tmp_path / "objects")) == 2
+    assert writer.get("k1") is None
+    assert writer.get("k3") == b"content 1"
+
+
+def make_repo(path: Path) -> Repo:
+    repo = Repo.init(path)
+    author = Actor("opal", "opal@example.com")
+    (path / "rbac.rego").write_text("package rbac\n")
+    repo.index.add(["rbac.rego"])
+    repo.index.commit("first", author=author, committer=author)
+    (path / "data.json").write_text('{"roles": []}')
+    repo.index.add(["data.json"])
+    repo.index.commit("second", author=author, committer=author)
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_shared_policy_bundle_matches_bundle(tmp_path: Path, monkeypatch):
+    repo = make_repo(tmp_path / "repo")
+    cache = SharedBundleCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        "opal_server.policy.bundles.api.get_shared_bundle_cache", lambda: cache
+    )
+    head, first = repo.head.commit, repo.head.commit.parents[0]
+
+    for old_commit in [None, first]:
+        expected = make_policy_bundle(repo, [Path(".")], head, old_commit)
+        old_hash = old_commit.hexsha if old_commit is not None else None
+        rendered = await get_shared_policy_bundle(
+            repo.working_dir, [Path(".")], head.hexsha, old_hash
+        )
+        assert json.loads(rendered) == json.loads(expected.json())
+        assert rendered == render_policy_bundle(
+            repo.working_dir, [Path(".")], head.hexsha, old_hash
+        )
+    assert cache.builds == 2
+
+
+def test_renderings_are_served_from_the_mapping(tmp_path: Path):
+    cache = SharedBundleCache(str(tmp_path))
+    cache.put("k1", b"content")
+    content = cache.get("k1")
+    assert isinstance(content, memoryview)
+    assert content.readonly
+    assert content == b"content"
+
+
+@pytest.mark.asyncio
+async def test_lock_files_are_not_pruned(tmp_path: Path):
+    cache = SharedBundleCache(str(tmp_path), max_entries=1)
+    for i in range(5):
+        await cache.get_or_build(cache_key(i), lambda: f"content {i}".encode())
+
+    assert len(os.listdir(tmp_path / "keys")) == 1
+    locks = os.listdir(tmp_path / "locks")
+    assert 1 <= len(locks) <= 5
+    assert all(lock.endswith(".lock") for lock in locks)
+
+
+@pytest.mark.asyncio
+async def test_full_cache_falls_back_to_built_bundle(tmp_path: Path, monkeypatch):
+    repo = make_repo(tmp_path / "repo")
+    cache = SharedBundleCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        "opal_server.policy.bundles.api.get_shared_bundle_cache", lambda: cache
+    )
+
+    def no_space(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    # storing the built rendering fails, it is served anyway
+    monkeypatch.setattr(cache, "put", no_space)
+    head = repo.head.commit
+    rendered = await get_shared_policy_bundle(
+        repo.working_dir, [Path(".")], head.hexsha
+    )
+    assert rendered == render_policy_bundle(repo.working_dir, [Path(".")], head.hexsha)
+
+    # reading the cache fails, no rendering (the bundle is made without the cache)
+    monkeypatch.setattr(cache, "get", no_space)
+    assert (
+        await get_shared_policy_bundle(repo.working_dir, [Path(".")], head.hexsha)
+        is None
+    )
@@ -48,10 +48,29 @@ class Settings(BaseSettings):
         "custom": 10
     }
     TENANT_ISOLATION_LEVEL: str = "database"  # database, schema, table
+    TENANT_TEMPLATE_SCHEMA: str = "tenant_template"  # cloned into the schema of every new tenant
+    TENANT_MIGRATION_CONCURRENCY: int = 8  # tenant schemas migrated at a time
+    TENANT_MIGRATION_BATCH_SIZE: int = 500
+    TENANT_LIMITS_CACHE_TTL: int = 60  # seconds, limits are also invalidated on tenant updates
+    QUOTA_RECONCILE_INTERVAL: int = 3600  # seconds between recounts of the tenant usage ledger
+    TENANT_CONTEXT_CACHE_TTL: int = 30  # seconds, contexts are also invalidated on tenant and user changes
+    TENANT_CONTEXT_CACHE_SIZE: int = 10000
+    
+    # Bouncer connection probes
+    BOUNCER_PROBE_CONCURRENCY: int = 100
+    BOUNCER_PROBE_PER_HOST: int = 4  # probes at a time against the same bouncer host
+    BOUNCER_PROBE_TIMEOUT: float = 10  # seconds
+    BOUNCER_PROBE_INTERVAL: int = 300  # seconds between probes of every tenant's connections
+    BOUNCER_PROBE_RETENTION_DAYS: int = 30  # days the probe results are kept
     
     # Monitoring settings
     MONITORING_ENABLED: bool = True
     METRICS_ENABLED: bool = True
+    # Retention of the metric buckets, per resolution
+    METRICS_MINUTE_RETENTION_DAYS: int = 2
+    METRICS_HOUR_RETENTION_DAYS: int = 30
+    METRICS_DAY_RETENTION_DAYS: int = 400
+    METRICS_AUDIT_FLUSH_INTERVAL: int = 10  # seconds between merges of the audit logs counted by each process
     LOG_LEVEL: str = "INFO"
     
     # AWS settings
@@ -6,6 +6,11 @@ from app.database import get_db, engine, Base
 from app.routers import tenants, policies, resources, bouncers, auth, monitoring, tenant_isolation, bouncer_connections, context_ingestion, ai_integration_settings
 from app.middleware import TenantMiddleware, RateLimitMiddleware
 from app.config import settings
+from app.services.quota_ledger import reconcile_periodically
+from app.services.metrics_pipeline import prune_periodically, flush_audit_events_periodically
+from app.services.bouncer_probe import bouncer_prober, probe_periodically
+from app.services.tenant_schema_manager import migrate_tenant_schemas
+import asyncio
 import logging
 
 # Create database tables
@@ -56,6 +61,50 @@ app.include_router(bouncer_connections.router, prefix="/api/v1/bouncer-connectio
 app.include_router(context_ingestion.router, prefix="/api/v1", tags=["context-ingestion"])
 app.include_router(ai_integration_settings.router, prefix="/api/v1/ai-integration", tags=["ai-integration-settings"])
 
+@app.on_event("startup")
+async def start_quota_reconciler():
+    # Starts the ledgers of the tenants created before it, and corrects drifted counters
+    app.state.quota_reconciler = asyncio.create_task(reconcile_periodically())
+
+@app.on_event("shutdown")
+async def stop_quota_reconciler():
+    app.state.quota_reconciler.cancel()
+
+@app.on_event("startup")
+async def start_metrics_pruner():
+    # Drops the metric buckets past the retention of their resolution
+    app.state.metrics_pruner = asyncio.create_task(prune_periodically())
+
+@app.on_event("shutdown")
+async def stop_metrics_pruner():
+    app.state.metrics_pruner.cancel()
+
+@app.on_event("startup")
+async def start_audit_event_flusher():
+    # Adds the audit logs counted in memory to the metric buckets
+    app.state.audit_event_flusher = asyncio.create_task(flush_audit_events_periodically())
+
+@app.on_event("shutdown")
+async def stop_audit_event_flusher():
+    app.state.audit_event_flusher.cancel()
+    await asyncio.gather(app.state.audit_event_flusher, return_exceptions=True)
+
+@app.on_event("startup")
+async def start_bouncer_probes():
+    # Keeps the latency history of every tenant's bouncer connections
+    app.state.bouncer_probes = asyncio.create_task(probe_periodically())
+
+@app.on_event("shutdown")
+async def stop_bouncer_probes():
+    app.state.bouncer_probes.cancel()
+    await bouncer_prober.close()
+
+@app.on_event("startup")
+async def start_tenant_schema_migrations():
+    # Tenant schemas only exist on PostgreSQL, every instance may run this, schemas are locked while migrated
+    if engine.dialect.name == "postgresql":
+        app.state.tenant_schema_migrations = asyncio.create_task(migrate_tenant_schemas())
+
 @app.get("/")
 async def root():
     return {
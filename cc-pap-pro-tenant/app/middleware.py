@@ -1,45 +1,92 @@
-from fastapi import Request, HTTPException, status
+from fastapi import Request, status
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.responses import Response, JSONResponse
+from starlette.concurrency import run_in_threadpool
 import time
 import logging
 from typing import Optional
-from app.database import get_redis
+from app.database import get_redis, SessionLocal
 from app.config import settings
+from app.services.tenant_context import TenantContext, tenant_context_cache
 
 logger = logging.getLogger(__name__)
 
+def count_request(key: str, window: int) -> int:
+    """Count a request in a fixed window, in a single round trip to Redis"""
+    pipeline = get_redis().pipeline()
+    pipeline.incr(key)
+    pipeline.expire(key, window)
+    count, _ = pipeline.execute()
+    return count
+
 class TenantMiddleware(BaseHTTPMiddleware):
     """Middleware to handle tenant isolation"""
     
     async def dispatch(self, request: Request, call_next):
-        # Extract tenant information from request
-        tenant_id = self.extract_tenant_id(request)
+        # Extract tenant information from request, the host's subdomain or else the tenant id
+        subdomain = self.extract_tenant_subdomain(request)
+        tenant_id = subdomain or self.extract_tenant_id(request)
         
         if tenant_id:
-            # Add tenant context to request state
-            request.state.tenant_id = tenant_id
+            context = await self.resolve_tenant(tenant_id, by_subdomain=subdomain is not None)
+            
+            # Add tenant context to request state, subdomains resolved to the tenant id
+            request.state.tenant_id = context.tenant_id if context else tenant_id
+            request.state.tenant_context = context
             request.state.tenant_domain = self.extract_tenant_domain(request)
             
             # Validate tenant access
-            if not await self.validate_tenant_access(tenant_id, request):
-                raise HTTPException(
+            if context is not None and not context.is_active:
+                return JSONResponse(
                     status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Tenant access denied"
+                    content={"detail": "Tenant access denied"}
+                )
+            if not await self.validate_tenant_access(request.state.tenant_id, request):
+                return JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Tenant rate limit exceeded"}
                 )
         
         response = await call_next(request)
         return response
     
-    def extract_tenant_id(self, request: Request) -> Optional[str]:
-        """Extract tenant ID from request"""
-        # Try to get tenant ID from subdomain
+    async def resolve_tenant(self, identifier: str, by_subdomain: bool = False) -> Optional[TenantContext]:
+        """Resolve a tenant id, or subdomain, from the tenant context cache"""
+        if by_subdomain:
+            key = tenant_context_cache.subdomain_key(identifier)
+        else:
+            key = tenant_context_cache.id_key(identifier)
+        cached, context = tenant_context_cache.get_cached(key)
+        if cached:
+            return context
+        
+        def load():
+            db = SessionLocal()
+            try:
+                if by_subdomain:
+                    return tenant_context_cache.get_by_subdomain(db, identifier)
+                return tenant_context_cache.get(db, identifier)
+            finally:
+                db.close()
+        
+        try:
+            return await run_in_threadpool(load)
+        except Exception as e:
+            # The routers still check the tenant themselves
+            logger.error(f"Error resolving tenant {identifier}: {e}")
+            return None
+    
+    def extract_tenant_subdomain(self, request: Request) -> Optional[str]:
+        """Extract tenant subdomain from the request's host"""
         host = request.headers.get("host", "")
         if "." in host:
             subdomain = host.split(".")[0]
             if subdomain != "www" and subdomain != "api":
                 return subdomain
-        
+        return None
+    
+    def extract_tenant_id(self, request: Request) -> Optional[str]:
+        """Extract tenant ID from request"""
         # Try to get tenant ID from header
         tenant_id = request.headers.get("x-tenant-id")
         if tenant_id:
@@ -60,9 +107,7 @@ class TenantMiddleware(BaseHTTPMiddleware):
     async def validate_tenant_access(self, tenant_id: str, request: Request) -> bool:
         """Validate tenant access"""
         try:
-            # Check if tenant exists and is active
-            # This would typically query the database
-            # For now, we'll do a simple validation
+            # Tenant status is checked on the resolved context
             
             # Check rate limiting
             if not await self.check_rate_limit(tenant_id, request):
@@ -77,19 +122,9 @@ class TenantMiddleware(BaseHTTPMiddleware):
     async def check_rate_limit(self, tenant_id: str, request: Request) -> bool:
         """Check rate limiting for tenant"""
         try:
-            redis_client = get_redis()
-            key = f"rate_limit:{tenant_id}:{int(time.time() // 3600)}"
-            
-            current_requests = redis_client.get(key)
-            if current_requests is None:
-                redis_client.setex(key, 3600, 1)
-                return True
-            
-            if int(current_requests) >= settings.RATE_LIMIT_REQUESTS:
-                return False
-            
-            redis_client.incr(key)
-            return True
+            window = settings.RATE_LIMIT_WINDOW
+            key = f"rate_limit:{tenant_id}:{int(time.time() // window)}"
+            return count_request(key, window) <= settings.RATE_LIMIT_REQUESTS
             
         except Exception as e:
             logger.error(f"Error checking rate limit: {e}")
@@ -117,19 +152,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     async def check_rate_limit(self, client_ip: str, request: Request) -> bool:
         """Check rate limit for client IP"""
         try:
-            redis_client = get_redis()
             key = f"rate_limit:ip:{client_ip}:{int(time.time() // 60)}"
-            
-            current_requests = redis_client.get(key)
-            if current_requests is None:
-                redis_client.setex(key, 60, 1)
-                return True
-            
-            if int(current_requests) >= 100:  # 100 requests per minute per IP
-                return False
-            
-            redis_client.incr(key)
-            return True
+            return count_request(key, 60) <= 100  # 100 requests per minute per IP
             
         except Exception as e:
             logger.error(f"Error checking rate limit: {e}")
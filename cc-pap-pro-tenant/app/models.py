@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -154,6 +154,30 @@ class TenantMetrics(Base):
     # Relationships
     tenant = relationship("Tenant")
 
+class TenantUsage(Base):
+    __tablename__ = "tenant_usage"
+    
+    # Quota ledger, kept in step with the tenant's rows by app.services.quota_ledger
+    tenant_id = Column(String, ForeignKey("tenants.id"), primary_key=True)
+    resource_type = Column(String, primary_key=True)  # policies, resources, bouncers, users
+    count = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime, default=func.now())
+
+class TenantMetricBucket(Base):
+    __tablename__ = "tenant_metric_buckets"
+    
+    # Decision samples aggregated per time bucket, by app.services.metrics_pipeline
+    tenant_id = Column(String, ForeignKey("tenants.id"), primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # bucket length in seconds: 60, 3600, 86400
+    bucket_start = Column(DateTime, primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    allowed = Column(Integer, nullable=False, default=0)
+    denied = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    latency_sum_ms = Column(Float, nullable=False, default=0.0)
+    latency_histogram = Column(JSON, nullable=False)  # counts per metrics_pipeline.LATENCY_BOUNDS_MS
+    audit_events = Column(Integer, nullable=False, default=0)
+
 class TenantSubscription(Base):
     __tablename__ = "tenant_subscriptions"
     
@@ -171,6 +195,17 @@ class TenantSubscription(Base):
     # Relationships
     tenant = relationship("Tenant")
 
+class TenantSchema(Base):
+    __tablename__ = "tenant_schemas"
+    
+    schema_name = Column(String, primary_key=True)
+    tenant_id = Column(String, nullable=True, index=True)  # None for the template schema
+    version = Column(Integer, nullable=False, default=0)  # last tenant migration applied
+    status = Column(String, default="current")  # current, failed
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    migrated_at = Column(DateTime, nullable=True)
+
 class TenantBouncerConnection(Base):
     __tablename__ = "tenant_bouncer_connections"
     
@@ -228,3 +263,9 @@ class TenantBouncerMetrics(Base):
     
     # Relationships
     connection = relationship("TenantBouncerConnection", back_populates="metrics")
+    
+    # Probe history of a connection, read by time range, and pruned by age
+    __table_args__ = (
+        Index("ix_tenant_bouncer_metrics_connection_timestamp", "connection_id", "timestamp"),
+        Index("ix_tenant_bouncer_metrics_timestamp", "timestamp"),
+    )
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from app.database import get_db
@@ -6,6 +7,7 @@ from app.routers.auth import get_current_user
 from app.services.bouncer_connection_service import BouncerConnectionService
 from app.schemas import BouncerConnectionCreate, BouncerConnectionUpdate, BouncerConnectionResponse
 import logging
+import json
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -37,6 +39,29 @@ async def get_bouncer_connections(
     
     return connections
 
+@router.post("/test")
+async def test_bouncer_connections(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Test all bouncer connections of current tenant, streaming a JSON line per connection as tests complete"""
+    tenant_id = getattr(request.state, 'tenant_id', None)
+    if not tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tenant ID not found in request"
+        )
+    
+    connection_service = BouncerConnectionService(db)
+    test_results = connection_service.test_bouncer_connections(tenant_id)
+    
+    async def results():
+        async for result in test_results:
+            yield json.dumps(result, default=str) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.get("/{connection_id}", response_model=BouncerConnectionResponse)
 async def get_bouncer_connection(
     connection_id: str,
@@ -158,7 +183,7 @@ async def test_bouncer_connection(
         )
     
     connection_service = BouncerConnectionService(db)
-    test_result = connection_service.test_bouncer_connection(connection_id, tenant_id)
+    test_result = await connection_service.test_bouncer_connection(connection_id, tenant_id)
     
     return test_result
 
@@ -178,7 +203,7 @@ async def sync_bouncer_connection(
         )
     
     connection_service = BouncerConnectionService(db)
-    sync_result = connection_service.sync_bouncer_connection(connection_id, tenant_id)
+    sync_result = await connection_service.sync_bouncer_connection(connection_id, tenant_id)
     
     return sync_result
 
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from app.database import get_db
 from app.models import TenantMetrics, TenantAuditLog
-from app.schemas import MetricCreate, MetricResponse, AuditLogResponse, DashboardStats, TenantDashboard
+from app.schemas import MetricCreate, MetricResponse, AuditLogResponse, DashboardStats, TenantDashboard, DecisionSampleBatch
 from app.routers.auth import get_current_user
 from app.services.monitoring_service import MonitoringService
 import logging
@@ -80,6 +80,26 @@ async def create_metric(
     
     return metric
 
+@router.post("/samples")
+async def ingest_samples(
+    batch: DecisionSampleBatch,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Ingest a batch of bouncer decision samples"""
+    tenant_id = getattr(request.state, 'tenant_id', None)
+    if not tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tenant ID not found in request"
+        )
+    
+    monitoring_service = MonitoringService(db)
+    accepted = monitoring_service.ingest_samples(tenant_id, batch.samples)
+    
+    return {"accepted": accepted}
+
 @router.get("/audit-logs", response_model=List[AuditLogResponse])
 async def get_audit_logs(
     request: Request,
@@ -199,7 +219,13 @@ async def get_performance_metrics(
         )
     
     monitoring_service = MonitoringService(db)
-    performance = monitoring_service.get_performance_metrics(tenant_id, time_range)
+    try:
+        performance = monitoring_service.get_performance_metrics(tenant_id, time_range)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return performance
 
@@ -219,6 +245,12 @@ async def get_usage_metrics(
         )
     
     monitoring_service = MonitoringService(db)
-    usage = monitoring_service.get_usage_metrics(tenant_id, time_range)
+    try:
+        usage = monitoring_service.get_usage_metrics(tenant_id, time_range)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return usage
@@ -102,10 +102,10 @@ async def get_tenant_limits(
         "tenant_id": tenant_id,
         "limits": limits,
         "usage": {
-            "policies": isolation_service._get_current_usage(tenant_id, "policies"),
-            "resources": isolation_service._get_current_usage(tenant_id, "resources"),
-            "bouncers": isolation_service._get_current_usage(tenant_id, "bouncers"),
-            "users": isolation_service._get_current_usage(tenant_id, "users")
+            "policies": isolation_service.get_usage(tenant_id, "policies"),
+            "resources": isolation_service.get_usage(tenant_id, "resources"),
+            "bouncers": isolation_service.get_usage(tenant_id, "bouncers"),
+            "users": isolation_service.get_usage(tenant_id, "users")
         }
     }
 
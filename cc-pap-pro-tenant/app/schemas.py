@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum
+import uuid
 
 class PlanType(str, Enum):
     PRO = "pro"
@@ -18,6 +19,14 @@ class UserRole(str, Enum):
     USER = "user"
     VIEWER = "viewer"
 
+def is_uuid_like(value: str) -> bool:
+    """Whether a value parses as a UUID, the form of tenant ids"""
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
 # Tenant Schemas
 class TenantBase(BaseModel):
     name: str
@@ -28,6 +37,14 @@ class TenantBase(BaseModel):
 class TenantCreate(TenantBase):
     stripe_price_id: str
 
+    @field_validator("subdomain")
+    @classmethod
+    def subdomain_not_uuid(cls, value: str) -> str:
+        # Subdomains and tenant ids must never be mistaken for one another
+        if is_uuid_like(value):
+            raise ValueError("subdomain cannot be a UUID")
+        return value
+
 class TenantUpdate(BaseModel):
     name: Optional[str] = None
     domain: Optional[str] = None
@@ -196,6 +213,16 @@ class MetricResponse(MetricBase):
     class Config:
         from_attributes = True
 
+class DecisionSample(BaseModel):
+    decision: str = "allow"  # allow, deny
+    latency_ms: float
+    error: bool = False
+    timestamp: Optional[datetime] = None  # defaults to the time received
+    bouncer_id: Optional[str] = None
+
+class DecisionSampleBatch(BaseModel):
+    samples: List[DecisionSample]
+
 # Subscription Schemas
 class SubscriptionBase(BaseModel):
     plan_type: PlanType
@@ -1,15 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select, func, case, cast, Float
 from app.models import TenantBouncerConnection, TenantBouncerCertificate, TenantBouncerMetrics
 from app.schemas import BouncerConnectionCreate, BouncerConnectionUpdate
-from typing import List, Optional, Dict, Any
+from app.services.bouncer_probe import bouncer_prober, record_probe_results, PROBE_METRIC
+from app.services.metrics_pipeline import parse_time_range
+from typing import List, Optional, Dict, Any, AsyncIterator
 import uuid
 import logging
 from datetime import datetime
-import requests
-import ssl
-import socket
-import json
+
+# Most recent data points returned with the metrics of a connection, the statistics cover the whole range
+MAX_METRIC_DATA_POINTS = 1000
 
 logger = logging.getLogger(__name__)
 
@@ -119,132 +120,32 @@ class BouncerConnectionService:
             logger.error(f"Error deleting bouncer connection: {e}")
             raise
     
-    def test_bouncer_connection(self, connection_id: str, tenant_id: str) -> Dict[str, Any]:
+    async def test_bouncer_connection(self, connection_id: str, tenant_id: str) -> Dict[str, Any]:
         """Test bouncer connection"""
         try:
             connection = self.get_bouncer_connection_by_id(connection_id, tenant_id)
             if not connection:
                 return {"success": False, "error": "Connection not found"}
             
-            # Test connection based on type
-            if connection.connection_type == "http":
-                return self._test_http_connection(connection)
-            elif connection.connection_type == "https":
-                return self._test_https_connection(connection)
-            elif connection.connection_type == "tcp":
-                return self._test_tcp_connection(connection)
-            elif connection.connection_type == "tls":
-                return self._test_tls_connection(connection)
-            else:
-                return {"success": False, "error": f"Unsupported connection type: {connection.connection_type}"}
+            result = await bouncer_prober.probe(connection)
+            record_probe_results(self.db, [result])
+            return result
                 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error testing bouncer connection: {e}")
             return {"success": False, "error": str(e)}
     
-    def _test_http_connection(self, connection: TenantBouncerConnection) -> Dict[str, Any]:
-        """Test HTTP connection"""
-        try:
-            url = f"http://{connection.bouncer_host}:{connection.bouncer_port}/health"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                return {
-                    "success": True,
-                    "status_code": response.status_code,
-                    "response_time": response.elapsed.total_seconds(),
-                    "message": "HTTP connection successful"
-                }
-            else:
-                return {
-                    "success": False,
-                    "status_code": response.status_code,
-                    "error": f"HTTP connection failed with status {response.status_code}"
-                }
-                
-        except requests.exceptions.Timeout:
-            return {"success": False, "error": "Connection timeout"}
-        except requests.exceptions.ConnectionError:
-            return {"success": False, "error": "Connection refused"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    def _test_https_connection(self, connection: TenantBouncerConnection) -> Dict[str, Any]:
-        """Test HTTPS connection"""
-        try:
-            url = f"https://{connection.bouncer_host}:{connection.bouncer_port}/health"
-            response = requests.get(url, timeout=10, verify=True)
-            
-            if response.status_code == 200:
-                return {
-                    "success": True,
-                    "status_code": response.status_code,
-                    "response_time": response.elapsed.total_seconds(),
-                    "message": "HTTPS connection successful"
-                }
-            else:
-                return {
-                    "success": False,
-                    "status_code": response.status_code,
-                    "error": f"HTTPS connection failed with status {response.status_code}"
-                }
-                
-        except requests.exceptions.SSLError as e:
-            return {"success": False, "error": f"SSL error: {str(e)}"}
-        except requests.exceptions.Timeout:
-            return {"success": False, "error": "Connection timeout"}
-        except requests.exceptions.ConnectionError:
-            return {"success": False, "error": "Connection refused"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    def _test_tcp_connection(self, connection: TenantBouncerConnection) -> Dict[str, Any]:
-        """Test TCP connection"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)
-            result = sock.connect_ex((connection.bouncer_host, connection.bouncer_port))
-            sock.close()
-            
-            if result == 0:
-                return {
-                    "success": True,
-                    "message": "TCP connection successful"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"TCP connection failed with error code {result}"
-                }
-                
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    def _test_tls_connection(self, connection: TenantBouncerConnection) -> Dict[str, Any]:
-        """Test TLS connection"""
-        try:
-            context = ssl.create_default_context()
-            with socket.create_connection((connection.bouncer_host, connection.bouncer_port), timeout=10) as sock:
-                with context.wrap_socket(sock, server_hostname=connection.bouncer_host) as ssock:
-                    return {
-                        "success": True,
-                        "message": "TLS connection successful",
-                        "certificate": {
-                            "subject": ssock.getpeercert().get('subject', []),
-                            "issuer": ssock.getpeercert().get('issuer', []),
-                            "version": ssock.getpeercert().get('version', 0),
-                            "serial_number": ssock.getpeercert().get('serialNumber', ''),
-                            "not_before": ssock.getpeercert().get('notBefore', ''),
-                            "not_after": ssock.getpeercert().get('notAfter', '')
-                        }
-                    }
-                    
-        except ssl.SSLError as e:
-            return {"success": False, "error": f"SSL error: {str(e)}"}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    def test_bouncer_connections(self, tenant_id: str, status: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Test all the bouncer connections of the tenant concurrently, the results are yielded as they complete"""
+        query = self.db.query(TenantBouncerConnection).filter(TenantBouncerConnection.tenant_id == tenant_id)
+        if status:
+            query = query.filter(TenantBouncerConnection.status == status)
+        
+        # Loaded now, the tests do not use the session
+        return bouncer_prober.probe_and_record(query.all())
     
-    def sync_bouncer_connection(self, connection_id: str, tenant_id: str) -> Dict[str, Any]:
+    async def sync_bouncer_connection(self, connection_id: str, tenant_id: str) -> Dict[str, Any]:
         """Sync bouncer connection"""
         try:
             connection = self.get_bouncer_connection_by_id(connection_id, tenant_id)
@@ -252,7 +153,7 @@ class BouncerConnectionService:
                 return {"success": False, "error": "Connection not found"}
             
             # Test connection first
-            test_result = self.test_bouncer_connection(connection_id, tenant_id)
+            test_result = await self.test_bouncer_connection(connection_id, tenant_id)
             if not test_result["success"]:
                 return test_result
             
@@ -349,10 +250,26 @@ class BouncerConnectionService:
             if not connection:
                 return {"error": "Connection not found"}
             
-            # Get metrics from database
-            metrics = self.db.query(TenantBouncerMetrics).filter(
-                TenantBouncerMetrics.connection_id == connection_id
-            ).order_by(TenantBouncerMetrics.timestamp.desc()).limit(1000).all()
+            since = datetime.utcnow() - parse_time_range(time_range)
+            in_range = and_(
+                TenantBouncerMetrics.connection_id == connection_id,
+                TenantBouncerMetrics.timestamp >= since
+            )
+            
+            # Latency and availability from the probe history, aggregated by the database
+            succeeded = TenantBouncerMetrics.labels["success"].as_boolean()
+            probes, successes, average_response_time = self.db.execute(
+                select(
+                    func.count(),
+                    func.count(case((succeeded, 1))),
+                    func.avg(case((succeeded, cast(TenantBouncerMetrics.metric_value, Float))))
+                ).where(and_(in_range, TenantBouncerMetrics.metric_name == PROBE_METRIC))
+            ).one()
+            
+            # Get the most recent data points from database
+            metrics = self.db.query(TenantBouncerMetrics).filter(in_range).order_by(
+                TenantBouncerMetrics.timestamp.desc()
+            ).limit(MAX_METRIC_DATA_POINTS + 1).all()
             
             # Process metrics
             processed_metrics = {
@@ -360,15 +277,17 @@ class BouncerConnectionService:
                 "time_range": time_range,
                 "metrics": {
                     "requests_per_second": 0,
-                    "average_response_time": 0,
-                    "error_rate": 0,
-                    "uptime": 0,
-                    "throughput": 0
+                    "average_response_time": round(float(average_response_time), 2) if average_response_time is not None else 0,
+                    "error_rate": round((probes - successes) / probes * 100, 2) if probes else 0,
+                    "uptime": round(successes / probes * 100, 2) if probes else 0,
+                    "throughput": 0,
+                    "probes": probes
                 },
-                "data_points": []
+                "data_points": [],
+                "data_points_truncated": len(metrics) > MAX_METRIC_DATA_POINTS
             }
             
-            for metric in metrics:
+            for metric in metrics[:MAX_METRIC_DATA_POINTS]:
                 processed_metrics["data_points"].append({
                     "timestamp": metric.timestamp.isoformat(),
                     "metric_name": metric.metric_name,
@@ -0,0 +1,305 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, and_
+from app.models import TenantBouncerConnection, TenantBouncerMetrics
+from app.database import SessionLocal
+from app.config import settings
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Iterable, AsyncIterator, Tuple
+from datetime import datetime, timedelta
+import aiohttp
+import asyncio
+import logging
+import ssl
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# The metric recording the probes of a connection, one point per probe
+PROBE_METRIC = "probe_latency_ms"
+
+def record_probe_results(db: Session, results: List[Dict[str, Any]]):
+    """Add probe results to the latency history of their connections"""
+    if not results:
+        return
+    db.execute(insert(TenantBouncerMetrics.__table__), [
+        {
+            "id": str(uuid.uuid4()),
+            "connection_id": result["connection_id"],
+            "metric_name": PROBE_METRIC,
+            "metric_value": str(round(result["response_time"] * 1000, 2)),
+            "metric_type": "gauge",
+            "labels": {
+                "success": result["success"],
+                "connection_type": result["connection_type"],
+                "status_code": result.get("status_code"),
+                "error": result.get("error")
+            },
+            "timestamp": result["checked_at"]
+        }
+        for result in results
+    ])
+    db.commit()
+
+def prune_probe_results(db: Session) -> int:
+    """Delete the probe results older than BOUNCER_PROBE_RETENTION_DAYS"""
+    metrics = TenantBouncerMetrics.__table__
+    cutoff = datetime.utcnow() - timedelta(days=settings.BOUNCER_PROBE_RETENTION_DAYS)
+    deleted = db.execute(
+        delete(metrics).where(and_(metrics.c.metric_name == PROBE_METRIC, metrics.c.timestamp < cutoff))
+    ).rowcount
+    db.commit()
+    return deleted
+
+class BouncerProber:
+    """Tests bouncer connections concurrently, a few at a time per bouncer host
+
+    HTTP(S) probes share keep-alive connections, and TLS probes resume the
+    last session of their bouncer, so that repeated probes skip the handshakes.
+    """
+
+    def __init__(self, concurrency: int = None, per_host: int = None, timeout: float = None,
+                 ssl_context: ssl.SSLContext = None):
+        self.concurrency = concurrency or settings.BOUNCER_PROBE_CONCURRENCY
+        self.per_host = per_host or settings.BOUNCER_PROBE_PER_HOST
+        self.timeout = timeout or settings.BOUNCER_PROBE_TIMEOUT
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        # Last TLS session of each bouncer, by (host, port)
+        self._tls_sessions: Dict[Tuple[str, int], ssl.SSLSession] = {}
+
+        # Bound to the event loop they were created in
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    async def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            previous_loop, previous_session = self._loop, self._http_session
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._host_semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(ssl=self.ssl_context, limit=self.concurrency, limit_per_host=self.per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            if previous_session is not None and not previous_session.closed:
+                await self._close_session(previous_session, previous_loop)
+
+    @staticmethod
+    async def _close_session(session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop):
+        """Close a session of another event loop, on that loop while it runs, its connections are bound to it"""
+        try:
+            if loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+            else:
+                # The connections went with their loop, this releases the connector
+                await session.close()
+        except Exception as e:
+            logger.warning(f"Error closing the HTTP session of a previous event loop: {e}")
+
+    async def close(self):
+        if self._http_session is not None:
+            await self._http_session.close()
+        self._loop = None
+        self._http_session = None
+
+    async def probe(self, connection) -> Dict[str, Any]:
+        """Test a connection (a TenantBouncerConnection or a row of its columns)"""
+        await self._bind()
+        async with self._semaphore, self._host_semaphores[connection.bouncer_host]:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._probe(connection), self.timeout)
+            except asyncio.TimeoutError:
+                result = {"success": False, "error": "Connection timeout"}
+            except (ssl.SSLError, aiohttp.ClientSSLError) as e:
+                result = {"success": False, "error": f"SSL error: {str(e)}"}
+            except (ConnectionRefusedError, aiohttp.ClientConnectorError):
+                result = {"success": False, "error": "Connection refused"}
+            except Exception as e:
+                result = {"success": False, "error": str(e) or type(e).__name__}
+            result.setdefault("response_time", time.perf_counter() - start)
+
+        result["response_time"] = round(result["response_time"], 4)
+        result["connection_id"] = connection.id
+        result["tenant_id"] = connection.tenant_id
+        result["connection_type"] = connection.connection_type
+        result["checked_at"] = datetime.utcnow()
+        return result
+
+    async def probe_all(self, connections: Iterable[Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Test connections concurrently, yielding the results as they complete"""
+        tasks = [asyncio.ensure_future(self.probe(connection)) for connection in connections]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The consumer stopped early
+            for task in tasks:
+                task.cancel()
+
+    async def probe_and_record(self, connections: Iterable[Any], batch_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """probe_all, recording the results in the latency history in batches"""
+        loop = asyncio.get_running_loop()
+
+        def record(batch):
+            db = SessionLocal()
+            try:
+                record_probe_results(db, batch)
+            finally:
+                db.close()
+
+        batch = []
+        async for result in self.probe_all(connections):
+            batch.append(result)
+            yield result
+            if len(batch) >= batch_size:
+                await loop.run_in_executor(None, record, batch)
+                batch = []
+        if batch:
+            await loop.run_in_executor(None, record, batch)
+
+    async def probe_tenants(self, tenant_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Test the connections of the given tenants, or of every tenant, returns the counts"""
+        loop = asyncio.get_running_loop()
+
+        def load():
+            db = SessionLocal()
+            try:
+                query = select(
+                    TenantBouncerConnection.id, TenantBouncerConnection.tenant_id,
+                    TenantBouncerConnection.bouncer_host, TenantBouncerConnection.bouncer_port,
+                    TenantBouncerConnection.connection_type
+                ).where(TenantBouncerConnection.status != "inactive")
+                if tenant_ids is not None:
+                    query = query.where(TenantBouncerConnection.tenant_id.in_(tenant_ids))
+                return db.execute(query).all()
+            finally:
+                db.close()
+
+        counts = {"tested": 0, "failed": 0}
+        async for result in self.probe_and_record(await loop.run_in_executor(None, load)):
+            counts["tested"] += 1
+            if not result["success"]:
+                counts["failed"] += 1
+        return counts
+
+    async def _probe(self, connection) -> Dict[str, Any]:
+        if connection.connection_type in ["http", "https"]:
+            return await self._probe_http(connection)
+        elif connection.connection_type == "tcp":
+            return await self._probe_tcp(connection)
+        elif connection.connection_type == "tls":
+            return await self._probe_tls(connection)
+        else:
+            return {"success": False, "error": f"Unsupported connection type: {connection.connection_type}"}
+
+    async def _probe_http(self, connection) -> Dict[str, Any]:
+        scheme = connection.connection_type
+        url = f"{scheme}://{connection.bouncer_host}:{connection.bouncer_port}/health"
+        async with self._http_session.get(url) as response:
+            await response.read()
+            if response.status == 200:
+                return {
+                    "success": True,
+                    "status_code": response.status,
+                    "message": f"{scheme.upper()} connection successful"
+                }
+            return {
+                "success": False,
+                "status_code": response.status,
+                "error": f"{scheme.upper()} connection failed with status {response.status}"
+            }
+
+    async def _probe_tcp(self, connection) -> Dict[str, Any]:
+        _, writer = await asyncio.open_connection(connection.bouncer_host, connection.bouncer_port)
+        writer.close()
+        return {"success": True, "message": "TCP connection successful"}
+
+    async def _probe_tls(self, connection) -> Dict[str, Any]:
+        """Handshake over memory BIOs, asyncio's own TLS transport cannot resume sessions"""
+        start = time.perf_counter()
+        key = (connection.bouncer_host, connection.bouncer_port)
+        reader, writer = await asyncio.open_connection(*key)
+        try:
+            incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+            ssl_object = self.ssl_context.wrap_bio(
+                incoming, outgoing, server_hostname=connection.bouncer_host, session=self._tls_sessions.get(key)
+            )
+            await self._tls_exchange(ssl_object.do_handshake, incoming, outgoing, reader, writer)
+            response_time = time.perf_counter() - start
+            certificate = ssl_object.getpeercert()
+            session_reused = ssl_object.session_reused
+
+            # TLS 1.3 session tickets arrive after the handshake, before the reply to close_notify
+            try:
+                await asyncio.wait_for(self._tls_exchange(ssl_object.unwrap, incoming, outgoing, reader, writer), 1)
+            except (ssl.SSLError, ConnectionError, asyncio.TimeoutError):
+                pass
+            session = ssl_object.session
+            if session is not None and (session.has_ticket or ssl_object.version() != "TLSv1.3"):
+                self._tls_sessions[key] = session
+        finally:
+            writer.close()
+
+        return {
+            "success": True,
+            "message": "TLS connection successful",
+            "response_time": response_time,
+            "session_reused": session_reused,
+            "certificate": {
+                "subject": certificate.get('subject', []),
+                "issuer": certificate.get('issuer', []),
+                "version": certificate.get('version', 0),
+                "serial_number": certificate.get('serialNumber', ''),
+                "not_before": certificate.get('notBefore', ''),
+                "not_after": certificate.get('notAfter', '')
+            }
+        }
+
+    async def _tls_exchange(self, operation, incoming: ssl.MemoryBIO, outgoing: ssl.MemoryBIO,
+                            reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            try:
+                operation()
+                break
+            except ssl.SSLWantReadError:
+                if outgoing.pending:
+                    writer.write(outgoing.read())
+                    await writer.drain()
+                data = await reader.read(16384)
+                if not data:
+                    raise ConnectionResetError("Connection closed during the TLS exchange")
+                incoming.write(data)
+        if outgoing.pending:
+            writer.write(outgoing.read())
+            await writer.drain()
+
+# Shared by the connection tests and the periodic probes, so that they share the per-host limits
+bouncer_prober = BouncerProber()
+
+async def probe_periodically():
+    """Test every tenant's bouncer connections every BOUNCER_PROBE_INTERVAL seconds, dropping the expired results"""
+    loop = asyncio.get_running_loop()
+
+    def prune():
+        db = SessionLocal()
+        try:
+            return prune_probe_results(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            counts = await bouncer_prober.probe_tenants()
+            if counts["failed"]:
+                logger.warning(f"{counts['failed']} of {counts['tested']} bouncer connections failed their probe")
+        except Exception as e:
+            logger.error(f"Error probing bouncer connections: {e}")
+        try:
+            await loop.run_in_executor(None, prune)
+        except Exception as e:
+            logger.error(f"Error pruning bouncer probe results: {e}")
+        await asyncio.sleep(settings.BOUNCER_PROBE_INTERVAL)
@@ -0,0 +1,311 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, update, insert, delete, and_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from app.models import TenantMetricBucket, TenantAuditLog
+from app.schemas import DecisionSample
+from app.database import SessionLocal, engine
+from app.config import settings
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional
+from datetime import datetime, timedelta
+import asyncio
+import calendar
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, the last bucket counts the slower samples
+LATENCY_BOUNDS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+# Every sample is aggregated at all the resolutions, each kept for its own retention
+RESOLUTIONS = [MINUTE, HOUR, DAY]
+
+COUNTERS = ["requests", "allowed", "denied", "errors", "latency_sum_ms", "audit_events"]
+
+def retention_days(resolution: int) -> int:
+    return {
+        MINUTE: settings.METRICS_MINUTE_RETENTION_DAYS,
+        HOUR: settings.METRICS_HOUR_RETENTION_DAYS,
+        DAY: settings.METRICS_DAY_RETENTION_DAYS
+    }[resolution]
+
+def parse_time_range(time_range: str) -> timedelta:
+    """Parse a time range like 15m, 1h, 7d"""
+    match = re.fullmatch(r"(\d+)([mhd])", time_range or "")
+    if not match:
+        raise ValueError(f"Invalid time range {time_range}, expected e.g. 15m, 1h or 7d")
+    amount, unit = int(match.group(1)), match.group(2)
+    if amount <= 0:
+        raise ValueError(f"Invalid time range {time_range}, it must be positive")
+    return timedelta(minutes=amount) if unit == "m" else timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
+
+def resolution_for(span: timedelta) -> int:
+    """The finest resolution that keeps a chart of the span to a few hundred points"""
+    if span <= timedelta(hours=6):
+        return MINUTE
+    if span <= timedelta(days=14):
+        return HOUR
+    return DAY
+
+def bucket_start(timestamp: int, resolution: int) -> datetime:
+    return datetime.utcfromtimestamp(timestamp - timestamp % resolution)
+
+def _epoch(timestamp: Optional[datetime]) -> int:
+    if timestamp is None:
+        return int(time.time())
+    # Naive timestamps are UTC, like the rest of the tenant data
+    return calendar.timegm(timestamp.utctimetuple())
+
+def _empty_aggregate() -> Dict[str, Any]:
+    aggregate = {counter: 0 for counter in COUNTERS}
+    aggregate["latency_sum_ms"] = 0.0
+    aggregate["latency_histogram"] = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+    return aggregate
+
+def _histogram_index(latency_ms: float) -> int:
+    for index, bound in enumerate(LATENCY_BOUNDS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BOUNDS_MS)
+
+def aggregate_samples(samples: Iterable[DecisionSample]) -> Dict[tuple, Dict[str, Any]]:
+    """Aggregate samples per (resolution, bucket start)"""
+    aggregates = defaultdict(_empty_aggregate)
+    for sample in samples:
+        timestamp = _epoch(sample.timestamp)
+        index = _histogram_index(max(sample.latency_ms, 0.0))
+        for resolution in RESOLUTIONS:
+            aggregate = aggregates[(resolution, bucket_start(timestamp, resolution))]
+            aggregate["requests"] += 1
+            if sample.error:
+                aggregate["errors"] += 1
+            elif sample.decision == "deny":
+                aggregate["denied"] += 1
+            else:
+                aggregate["allowed"] += 1
+            aggregate["latency_sum_ms"] += max(sample.latency_ms, 0.0)
+            aggregate["latency_histogram"][index] += 1
+    return aggregates
+
+def merge_aggregates(connection: Connection, tenant_id: str, aggregates: Dict[tuple, Dict[str, Any]]):
+    """Add aggregates to the tenant's buckets, in the connection's transaction"""
+    buckets = TenantMetricBucket.__table__
+    for (resolution, start), aggregate in sorted(aggregates.items()):
+        key = and_(
+            buckets.c.tenant_id == tenant_id,
+            buckets.c.resolution == resolution,
+            buckets.c.bucket_start == start
+        )
+        # Twice at most, if the bucket is inserted concurrently the second pass adds to it
+        for _ in range(2):
+            # Locked, concurrent batches of the same bucket add up instead of overwriting each other
+            row = connection.execute(select(buckets).where(key).with_for_update()).first()
+            if row is not None:
+                histogram = [a + b for a, b in zip(row.latency_histogram, aggregate["latency_histogram"])]
+                connection.execute(update(buckets).where(key).values(
+                    latency_histogram=histogram,
+                    **{counter: getattr(row, counter) + aggregate[counter] for counter in COUNTERS}
+                ))
+                break
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(buckets).values(
+                        tenant_id=tenant_id, resolution=resolution, bucket_start=start, **aggregate
+                    ))
+                break
+            except IntegrityError:
+                continue
+
+def summarize(rows: Iterable[Any]) -> Dict[str, Any]:
+    """Totals, rates and latency percentiles of buckets"""
+    total = _empty_aggregate()
+    for row in rows:
+        for counter in COUNTERS:
+            total[counter] += getattr(row, counter)
+        total["latency_histogram"] = [a + b for a, b in zip(total["latency_histogram"], row.latency_histogram)]
+    requests = total["requests"]
+    total["average_latency_ms"] = round(total["latency_sum_ms"] / requests, 2) if requests else 0.0
+    total["error_rate"] = round(total["errors"] / requests * 100, 3) if requests else 0.0
+    for name, quantile in [("p50_latency_ms", 0.5), ("p95_latency_ms", 0.95), ("p99_latency_ms", 0.99)]:
+        total[name] = round(percentile(total["latency_histogram"], quantile), 2)
+    return total
+
+def percentile(histogram: List[int], quantile: float) -> float:
+    """Estimate a latency percentile, interpolating within its histogram bucket"""
+    rank = quantile * sum(histogram)
+    if not rank:
+        return 0.0
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BOUNDS_MS[index - 1] if index else 0
+            # Samples over the last bound are reported at it
+            upper = LATENCY_BOUNDS_MS[index] if index < len(LATENCY_BOUNDS_MS) else lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(LATENCY_BOUNDS_MS[-1])
+
+class AuditEventCounter:
+    """Audit logs committed by this process, added to the buckets by flush()
+
+    Counted in memory, so that the transactions writing audit logs do not lock
+    the tenant's shared bucket rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[tuple, int] = defaultdict(int)
+
+    def add(self, tenant_id: str, count: int):
+        now = int(time.time())
+        with self._lock:
+            for resolution in RESOLUTIONS:
+                self._counts[(tenant_id, resolution, bucket_start(now, resolution))] += count
+
+    def flush(self) -> int:
+        """Add the counted audit logs to the buckets, returns how many were added"""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        if not counts:
+            return 0
+
+        per_tenant = defaultdict(dict)
+        for (tenant_id, resolution, start), count in counts.items():
+            aggregate = per_tenant[tenant_id][(resolution, start)] = _empty_aggregate()
+            aggregate["audit_events"] = count
+        try:
+            with engine.begin() as connection:
+                # In the same order in every process, concurrent flushes do not deadlock
+                for tenant_id in sorted(per_tenant):
+                    merge_aggregates(connection, tenant_id, per_tenant[tenant_id])
+        except Exception:
+            # Counted again on the next flush
+            with self._lock:
+                for key, count in counts.items():
+                    self._counts[key] += count
+            raise
+        return sum(count for (_, resolution, _), count in counts.items() if resolution == MINUTE)
+
+audit_event_counter = AuditEventCounter()
+
+@event.listens_for(Session, "after_flush")
+def _collect_audit_events(session: Session, flush_context):
+    """Count the audit logs written, so that dashboards do not scan them"""
+    for instance in session.new:
+        if isinstance(instance, TenantAuditLog):
+            per_tenant = session.info.setdefault("audit_events", defaultdict(int))
+            per_tenant[instance.tenant_id] += 1
+
+@event.listens_for(Session, "after_commit")
+def _count_audit_events(session: Session):
+    for tenant_id, count in session.info.pop("audit_events", {}).items():
+        audit_event_counter.add(tenant_id, count)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_audit_events(session: Session):
+    session.info.pop("audit_events", None)
+
+class MetricsPipeline:
+    """Per-tenant decision metrics, aggregated into time buckets as samples are ingested"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingest(self, tenant_id: str, samples: List[DecisionSample]) -> int:
+        """Aggregate a batch of decision samples into the tenant's buckets"""
+        try:
+            merge_aggregates(self.db.connection(), tenant_id, aggregate_samples(samples))
+            self.db.commit()
+            return len(samples)
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error ingesting metric samples: {e}")
+            raise
+
+    def get_buckets(self, tenant_id: str, resolution: int, since: datetime) -> List[Any]:
+        buckets = TenantMetricBucket.__table__
+        return self.db.execute(
+            select(buckets).where(and_(
+                buckets.c.tenant_id == tenant_id,
+                buckets.c.resolution == resolution,
+                buckets.c.bucket_start >= bucket_start(_epoch(since), resolution)
+            )).order_by(buckets.c.bucket_start)
+        ).all()
+
+    def get_summary(self, tenant_id: str, span: timedelta, resolution: Optional[int] = None) -> Dict[str, Any]:
+        """Summary of the last span, from buckets of the given resolution (by default the span's)"""
+        resolution = resolution or resolution_for(span)
+        return summarize(self.get_buckets(tenant_id, resolution, datetime.utcnow() - span))
+
+    def get_series(self, tenant_id: str, span: timedelta) -> Dict[str, Any]:
+        """Per bucket rates over the last span, empty buckets included"""
+        resolution = resolution_for(span)
+        now = int(time.time())
+        rows = {row.bucket_start: row for row in self.get_buckets(tenant_id, resolution, datetime.utcnow() - span)}
+        series = {"resolution": resolution, "timestamps": [], "requests_per_second": [], "response_time": [], "error_rate": []}
+        start = now - int(span.total_seconds())
+        for timestamp in range(start - start % resolution, now + 1, resolution):
+            bucket = bucket_start(timestamp, resolution)
+            summary = summarize([rows[bucket]] if bucket in rows else [])
+            # The current bucket has only lasted until now
+            elapsed = min(resolution, now - timestamp) or 1
+            series["timestamps"].append(bucket.isoformat())
+            series["requests_per_second"].append(round(summary["requests"] / elapsed, 3))
+            series["response_time"].append(summary["p95_latency_ms"])
+            series["error_rate"].append(summary["error_rate"])
+        return series
+
+    def prune(self) -> int:
+        """Delete the buckets past the retention of their resolution"""
+        buckets = TenantMetricBucket.__table__
+        deleted = 0
+        for resolution in RESOLUTIONS:
+            cutoff = datetime.utcnow() - timedelta(days=retention_days(resolution))
+            deleted += self.db.execute(
+                delete(buckets).where(and_(buckets.c.resolution == resolution, buckets.c.bucket_start < cutoff))
+            ).rowcount
+        self.db.commit()
+        return deleted
+
+async def flush_audit_events_periodically():
+    """Add the audit logs counted by this process to the buckets every METRICS_AUDIT_FLUSH_INTERVAL seconds"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            await asyncio.sleep(settings.METRICS_AUDIT_FLUSH_INTERVAL)
+            try:
+                await loop.run_in_executor(None, audit_event_counter.flush)
+            except Exception as e:
+                logger.error(f"Error flushing audit event counts: {e}")
+    finally:
+        # On shutdown, the counts since the last flush
+        try:
+            audit_event_counter.flush()
+        except Exception as e:
+            logger.error(f"Error flushing audit event counts: {e}")
+
+async def prune_periodically():
+    """Prune expired metric buckets hourly"""
+    loop = asyncio.get_running_loop()
+
+    def prune():
+        db = SessionLocal()
+        try:
+            return MetricsPipeline(db).prune()
+        finally:
+            db.close()
+
+    while True:
+        try:
+            deleted = await loop.run_in_executor(None, prune)
+            if deleted:
+                logger.info(f"Pruned {deleted} expired metric buckets")
+        except Exception as e:
+            logger.error(f"Error pruning metric buckets: {e}")
+        await asyncio.sleep(3600)
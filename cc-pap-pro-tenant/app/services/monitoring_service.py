@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc
 from app.models import TenantMetrics, TenantAuditLog, Tenant, TenantPolicy, TenantResource, TenantBouncer
-from app.schemas import MetricCreate, DashboardStats, TenantDashboard
+from app.schemas import MetricCreate, DashboardStats, TenantDashboard, DecisionSample
+from app.services.metrics_pipeline import MetricsPipeline, parse_time_range, HOUR, DAY
+from app.services.quota_ledger import QuotaLedger
 from typing import List, Optional, Dict, Any
 import uuid
 import logging
@@ -13,6 +15,14 @@ logger = logging.getLogger(__name__)
 class MonitoringService:
     def __init__(self, db: Session):
         self.db = db
+        self.metrics_pipeline = MetricsPipeline(db)
+        self.quota_ledger = QuotaLedger(db)
+    
+    def ingest_samples(self, tenant_id: str, samples: List[DecisionSample]) -> int:
+        """Ingest a batch of bouncer decision samples"""
+        accepted = self.metrics_pipeline.ingest(tenant_id, samples)
+        logger.debug(f"Ingested {accepted} decision samples for tenant {tenant_id}")
+        return accepted
     
     def create_metric(self, tenant_id: str, metric_data: MetricCreate) -> TenantMetrics:
         """Create a new metric"""
@@ -180,22 +190,20 @@ class MonitoringService:
     def get_performance_metrics(self, tenant_id: str, time_range: str) -> Dict[str, Any]:
         """Get performance metrics"""
         try:
-            # In a real implementation, this would query actual performance data
-            # For now, return mock performance metrics
+            span = parse_time_range(time_range)
+            summary = self.metrics_pipeline.get_summary(tenant_id, span)
+            
             return {
                 "time_range": time_range,
                 "metrics": {
-                    "requests_per_second": 45.2,
-                    "average_response_time": "15ms",
-                    "error_rate": "0.1%",
-                    "uptime": "99.9%",
-                    "throughput": "2.5MB/s"
-                },
-                "trends": {
-                    "requests_per_second": [40, 42, 45, 48, 45, 43, 45],
-                    "response_time": [12, 13, 15, 16, 15, 14, 15],
-                    "error_rate": [0.1, 0.2, 0.1, 0.0, 0.1, 0.1, 0.1]
+                    "requests_per_second": round(summary["requests"] / span.total_seconds(), 3),
+                    "average_response_time": summary["average_latency_ms"],
+                    "p50_response_time": summary["p50_latency_ms"],
+                    "p95_response_time": summary["p95_latency_ms"],
+                    "p99_response_time": summary["p99_latency_ms"],
+                    "error_rate": summary["error_rate"]
                 },
+                "trends": self.metrics_pipeline.get_series(tenant_id, span),
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -206,29 +214,29 @@ class MonitoringService:
     def get_usage_metrics(self, tenant_id: str, time_range: str) -> Dict[str, Any]:
         """Get usage metrics"""
         try:
-            # In a real implementation, this would query actual usage data
-            # For now, return mock usage metrics
+            summary = self.metrics_pipeline.get_summary(tenant_id, parse_time_range(time_range))
+            last_hour = self.metrics_pipeline.get_summary(tenant_id, timedelta(hours=1))
+            limits = self.quota_ledger.get_limits(tenant_id)
+            active_users = self.quota_ledger.get_usage(tenant_id, "users")
+            
+            utilization = {}
+            if limits.get("policy_evaluations_per_hour"):
+                utilization["policy_evaluations"] = round(last_hour["requests"] / limits["policy_evaluations_per_hour"] * 100, 2)
+            if limits.get("max_users"):
+                utilization["users"] = round(active_users / limits["max_users"] * 100, 2)
+            
             return {
                 "time_range": time_range,
                 "usage": {
-                    "api_calls": 12500,
-                    "policy_evaluations": 45000,
-                    "data_transferred": "2.5GB",
-                    "storage_used": "1.2GB",
-                    "active_users": 15
-                },
-                "limits": {
-                    "api_calls": 100000,
-                    "policy_evaluations": 500000,
-                    "storage": "10GB",
-                    "users": 100
-                },
-                "utilization": {
-                    "api_calls": 12.5,
-                    "policy_evaluations": 9.0,
-                    "storage": 12.0,
-                    "users": 15.0
+                    "policy_evaluations": summary["requests"],
+                    "allowed": summary["allowed"],
+                    "denied": summary["denied"],
+                    "errors": summary["errors"],
+                    "policy_evaluations_last_hour": last_hour["requests"],
+                    "active_users": active_users
                 },
+                "limits": limits,
+                "utilization": utilization,
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -239,18 +247,11 @@ class MonitoringService:
     def _get_tenant_statistics(self, tenant_id: str) -> DashboardStats:
         """Get tenant statistics"""
         try:
-            # Get counts for different resources
-            total_policies = self.db.query(TenantPolicy).filter(
-                TenantPolicy.tenant_id == tenant_id
-            ).count()
-            
-            total_resources = self.db.query(TenantResource).filter(
-                TenantResource.tenant_id == tenant_id
-            ).count()
-            
-            total_bouncers = self.db.query(TenantBouncer).filter(
-                TenantBouncer.tenant_id == tenant_id
-            ).count()
+            # Counts from the usage ledger
+            total_policies = self.quota_ledger.get_usage(tenant_id, "policies")
+            total_resources = self.quota_ledger.get_usage(tenant_id, "resources")
+            total_bouncers = self.quota_ledger.get_usage(tenant_id, "bouncers")
+            total_users = self.quota_ledger.get_usage(tenant_id, "users")
             
             active_bouncers = self.db.query(TenantBouncer).filter(
                 and_(
@@ -259,22 +260,15 @@ class MonitoringService:
                 )
             ).count()
             
-            # Get user count (mock for now)
-            total_users = 15
-            
-            # Get recent audit logs count
-            recent_audit_logs = self.db.query(TenantAuditLog).filter(
-                and_(
-                    TenantAuditLog.tenant_id == tenant_id,
-                    TenantAuditLog.timestamp >= datetime.utcnow() - timedelta(hours=24)
-                )
-            ).count()
-            
-            # Get policy evaluations today (mock)
-            policy_evaluations_today = 45000
+            # Audit logs of the last 24 hours, from the hourly metric buckets
+            recent_audit_logs = self.metrics_pipeline.get_summary(
+                tenant_id, timedelta(hours=24), resolution=HOUR
+            )["audit_events"]
             
-            # Get average response time (mock)
-            average_response_time = 15.5
+            # Today's decisions, from the daily metric bucket
+            today = self.metrics_pipeline.get_summary(tenant_id, timedelta(0), resolution=DAY)
+            policy_evaluations_today = today["requests"]
+            average_response_time = today["average_latency_ms"]
             
             return DashboardStats(
                 total_policies=total_policies,
@@ -0,0 +1,171 @@
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import event, select, update, insert, func, and_, literal
+from sqlalchemy.exc import IntegrityError
+from app.models import Tenant, TenantUser, TenantPolicy, TenantResource, TenantBouncer, TenantUsage
+from app.database import SessionLocal
+from app.config import settings
+from collections import defaultdict
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# The rows counted against the tenant limits, by resource type
+COUNTED_MODELS = {
+    "policies": TenantPolicy,
+    "resources": TenantResource,
+    "bouncers": TenantBouncer,
+    "users": TenantUser
+}
+RESOURCE_TYPES = {model: resource_type for resource_type, model in COUNTED_MODELS.items()}
+
+# Tenant limits by tenant id, with the time they expire at
+_limits_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _is_counted(instance) -> bool:
+    # Only active users count against the limits
+    return not isinstance(instance, TenantUser) or instance.is_active is not False
+
+def _count_query(resource_type: str, tenant_id):
+    model = COUNTED_MODELS[resource_type]
+    query = select(func.count()).select_from(model).where(model.tenant_id == tenant_id)
+    if model is TenantUser:
+        query = query.where(TenantUser.is_active == True)
+    return query.scalar_subquery()
+
+def invalidate_limits(tenant_id: str):
+    _limits_cache.pop(tenant_id, None)
+
+@event.listens_for(Session, "after_flush")
+def _update_ledger(session: Session, flush_context):
+    """Apply the creates and deletes of the flush to the ledger, in the same transaction"""
+    deltas = defaultdict(int)
+    new_tenants = set()
+    for instance in session.new:
+        resource_type = RESOURCE_TYPES.get(type(instance))
+        if resource_type and _is_counted(instance):
+            deltas[(instance.tenant_id, resource_type)] += 1
+        elif isinstance(instance, Tenant):
+            new_tenants.add(instance.id)
+    for instance in session.deleted:
+        resource_type = RESOURCE_TYPES.get(type(instance))
+        if resource_type and _is_counted(instance):
+            deltas[(instance.tenant_id, resource_type)] -= 1
+        elif isinstance(instance, Tenant):
+            session.info.setdefault("updated_tenants", set()).add(instance.id)
+    for instance in session.dirty:
+        if isinstance(instance, TenantUser):
+            history = attributes.get_history(instance, "is_active")
+            if history.deleted and bool(history.deleted[0]) != bool(instance.is_active):
+                deltas[(instance.tenant_id, "users")] += 1 if instance.is_active else -1
+        elif isinstance(instance, Tenant) and session.is_modified(instance):
+            session.info.setdefault("updated_tenants", set()).add(instance.id)
+
+    connection = session.connection()
+    # New tenants start their ledger, existing ones get theirs from reconcile()
+    for tenant_id in new_tenants:
+        connection.execute(insert(TenantUsage.__table__), [
+            {"tenant_id": tenant_id, "resource_type": resource_type, "count": deltas.pop((tenant_id, resource_type), 0)}
+            for resource_type in COUNTED_MODELS
+        ])
+    for (tenant_id, resource_type), delta in deltas.items():
+        if delta:
+            connection.execute(
+                update(TenantUsage.__table__)
+                .where(and_(TenantUsage.tenant_id == tenant_id, TenantUsage.resource_type == resource_type))
+                .values(count=TenantUsage.count + delta)
+            )
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_updated_limits(session: Session):
+    for tenant_id in session.info.pop("updated_tenants", ()):
+        invalidate_limits(tenant_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_updated_tenants(session: Session):
+    session.info.pop("updated_tenants", None)
+
+class QuotaLedger:
+    """Per-tenant usage counters, so that checking a limit does not count the tenant's rows"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_limits(self, tenant_id: str) -> Dict[str, Any]:
+        """Get tenant limits, cached until the tenant is updated"""
+        cached = _limits_cache.get(tenant_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        # Selected rather than loaded, the session's copy of the tenant may be stale
+        row = self.db.execute(select(Tenant.limits).where(Tenant.id == tenant_id)).first()
+        limits = (row[0] or {}) if row else {}
+        _limits_cache[tenant_id] = (time.monotonic() + settings.TENANT_LIMITS_CACHE_TTL, limits)
+        return limits
+
+    def get_usage(self, tenant_id: str, resource_type: str) -> int:
+        """Get current usage for resource type"""
+        if resource_type not in COUNTED_MODELS:
+            return 0
+        count = self.db.execute(
+            select(TenantUsage.count).where(and_(
+                TenantUsage.tenant_id == tenant_id,
+                TenantUsage.resource_type == resource_type
+            ))
+        ).scalar()
+        if count is None:
+            # Not reconciled yet, counted
+            count = self.db.execute(select(_count_query(resource_type, tenant_id))).scalar()
+        return count
+
+    def reconcile(self) -> int:
+        """Recount the usage of all the tenants, returns how many counters were off"""
+        usage = TenantUsage.__table__
+        drifted = 0
+        for resource_type in COUNTED_MODELS:
+            count = _count_query(resource_type, usage.c.tenant_id)
+            drifted += self.db.execute(
+                update(usage)
+                .where(and_(usage.c.resource_type == resource_type, usage.c.count != count))
+                .values(count=count, reconciled_at=func.now())
+            ).rowcount
+            self.db.commit()
+
+            # Tenants without a ledger yet
+            missing = select(
+                Tenant.id, literal(resource_type), _count_query(resource_type, Tenant.id), func.now()
+            ).where(~select(usage.c.tenant_id).where(and_(
+                usage.c.tenant_id == Tenant.id,
+                usage.c.resource_type == resource_type
+            )).exists())
+            try:
+                self.db.execute(insert(usage).from_select(
+                    ["tenant_id", "resource_type", "count", "reconciled_at"], missing
+                ))
+                self.db.commit()
+            except IntegrityError:
+                # Started concurrently by a new tenant, reconciled next time
+                self.db.rollback()
+        return drifted
+
+async def reconcile_periodically():
+    """Reconcile the ledger every QUOTA_RECONCILE_INTERVAL seconds"""
+    loop = asyncio.get_running_loop()
+
+    def reconcile():
+        db = SessionLocal()
+        try:
+            return QuotaLedger(db).reconcile()
+        finally:
+            db.close()
+
+    while True:
+        try:
+            drifted = await loop.run_in_executor(None, reconcile)
+            if drifted:
+                logger.warning(f"Reconciled {drifted} drifted tenant usage counters")
+        except Exception as e:
+            logger.error(f"Error reconciling tenant usage: {e}")
+        await asyncio.sleep(settings.QUOTA_RECONCILE_INTERVAL)
@@ -0,0 +1,162 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, and_
+from app.models import Tenant, TenantUser
+from app.config import settings
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class TenantContext:
+    """A tenant and its active members, as resolved for a request"""
+
+    def __init__(self, tenant_id: str, subdomain: str, status: str, plan_type: str,
+                 limits: Dict[str, Any], members: Dict[str, str]):
+        self.tenant_id = tenant_id
+        self.subdomain = subdomain
+        self.status = status
+        self.plan_type = plan_type
+        self.limits = limits
+        # Roles of the active members, by user id
+        self.members = members
+
+    @property
+    def is_active(self) -> bool:
+        return self.status not in ["suspended", "inactive"]
+
+    def is_member(self, user_id: str) -> bool:
+        return user_id in self.members
+
+    def is_admin(self, user_id: str) -> bool:
+        return self.members.get(user_id) == "admin"
+
+class TenantContextCache:
+    """Tenant contexts by tenant id and by subdomain, kept for TENANT_CONTEXT_CACHE_TTL seconds
+
+    Ids and subdomains are cached under separate keys (id_key and subdomain_key),
+    so that a subdomain never resolves to the tenant having it as id, or the reverse.
+    Contexts are dropped as soon as a commit changes their tenant or its users,
+    so the TTL only bounds how long other instances serve a stale context.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = settings.TENANT_CONTEXT_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.TENANT_CONTEXT_CACHE_SIZE
+        self._entries: "OrderedDict[str, Tuple[float, Optional[TenantContext]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def id_key(tenant_id: str) -> str:
+        return f"id:{tenant_id}"
+
+    @staticmethod
+    def subdomain_key(subdomain: str) -> str:
+        return f"sub:{subdomain}"
+
+    def get_cached(self, key: str) -> Tuple[bool, Optional[TenantContext]]:
+        """Get a cached context by id_key or subdomain_key without touching the database, returns (cached, context)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+        return False, None
+
+    def get(self, db: Session, tenant_id: str) -> Optional[TenantContext]:
+        """Get the context of a tenant by id, None if there is no such tenant"""
+        return self._get(db, self.id_key(tenant_id), Tenant.id == tenant_id)
+
+    def get_by_subdomain(self, db: Session, subdomain: str) -> Optional[TenantContext]:
+        """Get the context of a tenant by subdomain, None if there is no such tenant"""
+        return self._get(db, self.subdomain_key(subdomain), Tenant.subdomain == subdomain)
+
+    def _get(self, db: Session, key: str, criterion) -> Optional[TenantContext]:
+        cached, context = self.get_cached(key)
+        if cached:
+            return context
+
+        self.misses += 1
+        context = self._load(db, criterion)
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl
+            keys = [key] if context is None else {
+                key, self.id_key(context.tenant_id), self.subdomain_key(context.subdomain)
+            }
+            for key in keys:
+                self._entries[key] = (expires_at, context)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return context
+
+    def _load(self, db: Session, criterion) -> Optional[TenantContext]:
+        # Selected rather than loaded, the session's copies may be stale
+        tenant = db.execute(
+            select(Tenant.id, Tenant.subdomain, Tenant.status, Tenant.plan_type, Tenant.limits).where(criterion)
+        ).first()
+        if tenant is None:
+            return None
+
+        members = db.execute(
+            select(TenantUser.user_id, TenantUser.role).where(and_(
+                TenantUser.tenant_id == tenant.id,
+                TenantUser.is_active == True
+            ))
+        ).all()
+        return TenantContext(
+            tenant_id=tenant.id,
+            subdomain=tenant.subdomain,
+            status=tenant.status,
+            plan_type=tenant.plan_type,
+            limits=tenant.limits or {},
+            members={member.user_id: member.role for member in members}
+        )
+
+    def invalidate(self, tenant_id: str):
+        """Drop the cached context of a tenant, under all its keys"""
+        key = self.id_key(tenant_id)
+        with self._lock:
+            for cached_key, (_, context) in list(self._entries.items()):
+                if cached_key == key or (context is not None and context.tenant_id == tenant_id):
+                    del self._entries[cached_key]
+
+    def invalidate_subdomain(self, subdomain: str):
+        """Drop what is cached under a subdomain, a tenant may have been cached as missing there"""
+        with self._lock:
+            self._entries.pop(self.subdomain_key(subdomain), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Shared by the middleware and the services checking tenant membership
+tenant_context_cache = TenantContextCache()
+
+@event.listens_for(Session, "after_flush")
+def _track_changed_tenants(session: Session, flush_context):
+    changed = session.info.setdefault("changed_tenant_contexts", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Tenant):
+            changed.add(("id", instance.id))
+            # A new or renamed tenant may have been cached as missing under its subdomain
+            changed.add(("subdomain", instance.subdomain))
+        elif isinstance(instance, TenantUser):
+            changed.add(("id", instance.tenant_id))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tenants(session: Session):
+    for kind, identifier in session.info.pop("changed_tenant_contexts", ()):
+        if kind == "id":
+            tenant_context_cache.invalidate(identifier)
+        else:
+            tenant_context_cache.invalidate_subdomain(identifier)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_tenants(session: Session):
+    session.info.pop("changed_tenant_contexts", None)
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import text, create_engine
 from app.models import Tenant, TenantUser, TenantPolicy, TenantResource, TenantBouncer
+from app.services.quota_ledger import QuotaLedger
+from app.services.tenant_context import tenant_context_cache
+from app.services.tenant_schema_manager import TenantSchemaManager
 from app.config import settings
 from typing import Dict, Any, List, Optional
 import logging
@@ -14,6 +17,7 @@ logger = logging.getLogger(__name__)
 class TenantIsolationService:
     def __init__(self, db: Session):
         self.db = db
+        self.quota_ledger = QuotaLedger(db)
     
     def create_tenant_isolation(self, tenant: Tenant) -> Dict[str, Any]:
         """Create complete tenant isolation infrastructure"""
@@ -43,16 +47,9 @@ class TenantIsolationService:
     def _create_database_schema(self, tenant: Tenant) -> Dict[str, Any]:
         """Create isolated database schema for tenant"""
         try:
-            schema_name = f"tenant_{tenant.id.replace('-', '_')}"
-            
-            # Create schema
-            self.db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
-            
-            # Create tenant-specific tables
-            self._create_tenant_tables(schema_name)
-            
-            # Set up row-level security
-            self._setup_row_level_security(schema_name, tenant.id)
+            # Cloned from the template schema, at the latest tenant migration
+            schema = TenantSchemaManager(self.db).create_tenant_schema(tenant.id)
+            schema_name = schema["schema_name"]
             
             return {
                 "schema_name": schema_name,
@@ -65,118 +62,6 @@ class TenantIsolationService:
             logger.error(f"Error creating database schema: {e}")
             raise
     
-    def _create_tenant_tables(self, schema_name: str):
-        """Create tenant-specific tables"""
-        try:
-            # Create policies table
-            self.db.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS {schema_name}.policies (
-                    id VARCHAR(255) PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    policy_content TEXT NOT NULL,
-                    status VARCHAR(50) DEFAULT 'draft',
-                    version VARCHAR(50) DEFAULT '1.0.0',
-                    created_by VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    category VARCHAR(100),
-                    tags JSONB DEFAULT '[]',
-                    priority INTEGER DEFAULT 0
-                )
-            """))
-            
-            # Create resources table
-            self.db.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS {schema_name}.resources (
-                    id VARCHAR(255) PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    url VARCHAR(500) NOT NULL,
-                    resource_type VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    is_protected BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    config JSONB DEFAULT '{}',
-                    health_check_url VARCHAR(500),
-                    last_health_check TIMESTAMP,
-                    health_status VARCHAR(50) DEFAULT 'unknown'
-                )
-            """))
-            
-            # Create bouncers table
-            self.db.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS {schema_name}.bouncers (
-                    id VARCHAR(255) PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    bouncer_id VARCHAR(255) UNIQUE NOT NULL,
-                    status VARCHAR(50) DEFAULT 'inactive',
-                    version VARCHAR(50) DEFAULT 'latest',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_sync TIMESTAMP,
-                    config JSONB DEFAULT '{}',
-                    target_hosts JSONB DEFAULT '[]',
-                    policies JSONB DEFAULT '[]'
-                )
-            """))
-            
-            # Create audit_logs table
-            self.db.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS {schema_name}.audit_logs (
-                    id VARCHAR(255) PRIMARY KEY,
-                    user_id VARCHAR(255),
-                    action VARCHAR(255) NOT NULL,
-                    resource VARCHAR(255),
-                    result VARCHAR(50) NOT NULL,
-                    details JSONB DEFAULT '{}',
-                    ip_address VARCHAR(45),
-                    user_agent TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            
-            # Create metrics table
-            self.db.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS {schema_name}.metrics (
-                    id VARCHAR(255) PRIMARY KEY,
-                    metric_name VARCHAR(255) NOT NULL,
-                    metric_value VARCHAR(255) NOT NULL,
-                    metric_type VARCHAR(50) NOT NULL,
-                    labels JSONB DEFAULT '{}',
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            
-            logger.info(f"Created tenant tables for schema {schema_name}")
-            
-        except Exception as e:
-            logger.error(f"Error creating tenant tables: {e}")
-            raise
-    
-    def _setup_row_level_security(self, schema_name: str, tenant_id: str):
-        """Set up row-level security for tenant data"""
-        try:
-            # Enable RLS on all tables
-            tables = ['policies', 'resources', 'bouncers', 'audit_logs', 'metrics']
-            
-            for table in tables:
-                # Enable RLS
-                self.db.execute(text(f"ALTER TABLE {schema_name}.{table} ENABLE ROW LEVEL SECURITY"))
-                
-                # Create policy for tenant isolation
-                self.db.execute(text(f"""
-                    CREATE POLICY tenant_isolation_{table} ON {schema_name}.{table}
-                    FOR ALL TO PUBLIC
-                    USING (tenant_id = '{tenant_id}')
-                """))
-            
-            logger.info(f"Set up row-level security for schema {schema_name}")
-            
-        except Exception as e:
-            logger.error(f"Error setting up row-level security: {e}")
-            raise
-    
     def _create_redis_namespace(self, tenant: Tenant) -> Dict[str, Any]:
         """Create isolated Redis namespace for tenant"""
         try:
@@ -360,13 +245,8 @@ class TenantIsolationService:
         """Validate user access to tenant"""
         try:
             # Check if user is member of tenant
-            tenant_user = self.db.query(TenantUser).filter(
-                TenantUser.tenant_id == tenant_id,
-                TenantUser.user_id == user_id,
-                TenantUser.is_active == True
-            ).first()
-            
-            return tenant_user is not None
+            context = tenant_context_cache.get(self.db, tenant_id)
+            return context is not None and context.is_member(user_id)
             
         except Exception as e:
             logger.error(f"Error validating tenant access: {e}")
@@ -375,11 +255,7 @@ class TenantIsolationService:
     def get_tenant_limits(self, tenant_id: str) -> Dict[str, Any]:
         """Get tenant resource limits"""
         try:
-            tenant = self.db.query(Tenant).filter(Tenant.id == tenant_id).first()
-            if not tenant:
-                return {}
-            
-            return tenant.limits or {}
+            return self.quota_ledger.get_limits(tenant_id)
             
         except Exception as e:
             logger.error(f"Error getting tenant limits: {e}")
@@ -392,13 +268,10 @@ class TenantIsolationService:
             if not limits:
                 return True  # No limits set
             
-            # Get current usage
-            current_usage = self._get_current_usage(tenant_id, resource_type)
-            
-            # Check against limits
+            # Check against limits, from the usage ledger
             limit_key = f"max_{resource_type}"
             if limit_key in limits:
-                return current_usage < limits[limit_key]
+                return self.get_usage(tenant_id, resource_type) < limits[limit_key]
             
             return True
             
@@ -406,8 +279,17 @@ class TenantIsolationService:
             logger.error(f"Error checking tenant limits: {e}")
             return True
     
+    def get_usage(self, tenant_id: str, resource_type: str) -> int:
+        """Get current usage for resource type, from the usage ledger"""
+        try:
+            return self.quota_ledger.get_usage(tenant_id, resource_type)
+            
+        except Exception as e:
+            logger.error(f"Error getting tenant usage: {e}")
+            return self._get_current_usage(tenant_id, resource_type)
+    
     def _get_current_usage(self, tenant_id: str, resource_type: str) -> int:
-        """Get current usage for resource type"""
+        """Count current usage for resource type"""
         try:
             if resource_type == "policies":
                 return self.db.query(TenantPolicy).filter(
@@ -446,7 +328,7 @@ class TenantIsolationService:
             # Clean up database schema
             if "database_schema" in isolation_config:
                 schema_name = isolation_config["database_schema"]["schema_name"]
-                self.db.execute(text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE"))
+                TenantSchemaManager(self.db).drop_tenant_schema(schema_name)
             
             # Clean up Redis namespace
             if "redis_namespace" in isolation_config:
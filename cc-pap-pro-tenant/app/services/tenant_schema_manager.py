@@ -0,0 +1,273 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy.dialects.postgresql import insert
+from app.models import TenantSchema
+from app.database import engine, SessionLocal
+from app.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Migrations of the tenant schemas, in order, as (version, description, statements).
+# Statements are formatted with the quoted schema name, new migrations are appended with the next version.
+TENANT_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Create the tenant tables", [
+        """
+        CREATE TABLE {schema}.policies (
+            id VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            policy_content TEXT NOT NULL,
+            status VARCHAR(50) DEFAULT 'draft',
+            version VARCHAR(50) DEFAULT '1.0.0',
+            created_by VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category VARCHAR(100),
+            tags JSONB DEFAULT '[]',
+            priority INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE {schema}.resources (
+            id VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            url VARCHAR(500) NOT NULL,
+            resource_type VARCHAR(100) NOT NULL,
+            description TEXT,
+            is_protected BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            config JSONB DEFAULT '{{}}',
+            health_check_url VARCHAR(500),
+            last_health_check TIMESTAMP,
+            health_status VARCHAR(50) DEFAULT 'unknown'
+        )
+        """,
+        """
+        CREATE TABLE {schema}.bouncers (
+            id VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            bouncer_id VARCHAR(255) UNIQUE NOT NULL,
+            status VARCHAR(50) DEFAULT 'inactive',
+            version VARCHAR(50) DEFAULT 'latest',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_sync TIMESTAMP,
+            config JSONB DEFAULT '{{}}',
+            target_hosts JSONB DEFAULT '[]',
+            policies JSONB DEFAULT '[]'
+        )
+        """,
+        """
+        CREATE TABLE {schema}.audit_logs (
+            id VARCHAR(255) PRIMARY KEY,
+            user_id VARCHAR(255),
+            action VARCHAR(255) NOT NULL,
+            resource VARCHAR(255),
+            result VARCHAR(50) NOT NULL,
+            details JSONB DEFAULT '{{}}',
+            ip_address VARCHAR(45),
+            user_agent TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE {schema}.metrics (
+            id VARCHAR(255) PRIMARY KEY,
+            metric_name VARCHAR(255) NOT NULL,
+            metric_value VARCHAR(255) NOT NULL,
+            metric_type VARCHAR(50) NOT NULL,
+            labels JSONB DEFAULT '{{}}',
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    ]),
+]
+
+HEAD_VERSION = TENANT_MIGRATIONS[-1][0]
+
+# Copies the tables of a schema with their defaults, constraints and indexes, in a single round trip.
+# Tables with serial columns would share the sequences of the template, tenant tables use string ids.
+CLONE_SCHEMA_FUNCTION = """
+CREATE OR REPLACE FUNCTION clone_tenant_schema(source TEXT, target TEXT) RETURNS void AS $$
+DECLARE
+    source_table RECORD;
+BEGIN
+    EXECUTE format('CREATE SCHEMA %I', target);
+    FOR source_table IN SELECT tablename FROM pg_tables WHERE schemaname = source LOOP
+        EXECUTE format('CREATE TABLE %I.%I (LIKE %I.%I INCLUDING ALL)', target, source_table.tablename, source, source_table.tablename);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+def schema_name_for(tenant_id: str) -> str:
+    return f"tenant_{tenant_id.replace('-', '_')}"
+
+def quote_schema(schema_name: str) -> str:
+    """Quote a schema name for the statements it is formatted into, as format's %I does in the clone function"""
+    return engine.dialect.identifier_preparer.quote_identifier(schema_name)
+
+def migrate_schema(schema_name: str) -> str:
+    """Apply the pending migrations of a schema, each in its own transaction
+
+    Returns migrated, current (nothing to apply), failed or missing (not a tenant schema).
+    """
+    schemas = TenantSchema.__table__
+    applied = 0
+    for version, description, statements in TENANT_MIGRATIONS:
+        with engine.begin() as connection:
+            # Locked, concurrent runners wait and then find the migration applied
+            current = connection.execute(
+                select(schemas.c.version).where(schemas.c.schema_name == schema_name).with_for_update()
+            ).scalar()
+            if current is None:
+                return "missing"
+            if current >= version:
+                continue
+
+            try:
+                with connection.begin_nested():
+                    for statement in statements:
+                        connection.exec_driver_sql(statement.format(schema=quote_schema(schema_name)))
+            except Exception as e:
+                logger.error(f"Migration {version} ({description}) of schema {schema_name} failed: {e}")
+                connection.execute(update(schemas).where(schemas.c.schema_name == schema_name).values(
+                    status="failed", error_message=f"Migration {version}: {e}"
+                ))
+                return "failed"
+
+            connection.execute(update(schemas).where(schemas.c.schema_name == schema_name).values(
+                version=version, status="current", error_message=None, migrated_at=func.now()
+            ))
+            applied += 1
+    return "migrated" if applied else "current"
+
+class TenantSchemaManager:
+    """Creates tenant schemas by cloning a template schema, and migrates all the schemas to HEAD_VERSION
+
+    The version of every schema is tracked in tenant_schemas, the template
+    schema included, so that the schemas behind are found with one query.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.template_schema = settings.TENANT_TEMPLATE_SCHEMA
+
+    def ensure_template(self):
+        """Create the template schema if needed, and bring it to the latest version"""
+        schemas = TenantSchema.__table__
+        with engine.begin() as connection:
+            version = connection.execute(
+                select(schemas.c.version).where(schemas.c.schema_name == self.template_schema)
+            ).scalar()
+            if version is None:
+                # Serializes the first tenant creations, racing to create the template
+                connection.execute(select(func.pg_advisory_xact_lock(func.hashtext(self.template_schema))))
+                connection.exec_driver_sql(CLONE_SCHEMA_FUNCTION)
+                connection.exec_driver_sql(f"CREATE SCHEMA IF NOT EXISTS {quote_schema(self.template_schema)}")
+                connection.execute(insert(schemas).values(
+                    schema_name=self.template_schema, tenant_id=None, version=0, status="current"
+                ).on_conflict_do_nothing())
+
+        if version is None or version < HEAD_VERSION:
+            if migrate_schema(self.template_schema) == "failed":
+                raise RuntimeError(f"Migrating the template schema {self.template_schema} failed")
+
+    def create_tenant_schema(self, tenant_id: str) -> Dict[str, Any]:
+        """Create the schema of a tenant from the template, in the session's transaction"""
+        schemas = TenantSchema.__table__
+        schema_name = schema_name_for(tenant_id)
+        if self.db.execute(select(schemas.c.schema_name).where(schemas.c.schema_name == schema_name)).first():
+            # Created before, brought up to date
+            migrate_schema(schema_name)
+            return {"schema_name": schema_name, "cloned": False}
+
+        self.ensure_template()
+        # Shared lock, the template is not migrated while it is cloned
+        version = self.db.execute(
+            select(schemas.c.version).where(schemas.c.schema_name == self.template_schema).with_for_update(read=True)
+        ).scalar()
+        self.db.execute(select(func.clone_tenant_schema(self.template_schema, schema_name)))
+        self.db.execute(insert(schemas).values(
+            schema_name=schema_name, tenant_id=tenant_id, version=version, status="current", migrated_at=func.now()
+        ))
+        logger.info(f"Created schema {schema_name} at version {version} from {self.template_schema}")
+        return {"schema_name": schema_name, "cloned": True, "version": version}
+
+    def drop_tenant_schema(self, schema_name: str):
+        """Drop a tenant schema and its version, in the session's transaction"""
+        self.db.execute(delete(TenantSchema.__table__).where(TenantSchema.schema_name == schema_name))
+        self.db.connection().exec_driver_sql(f"DROP SCHEMA IF EXISTS {quote_schema(schema_name)} CASCADE")
+
+    def migrate_all(self, concurrency: int = None, batch_size: int = None) -> Dict[str, int]:
+        """Migrate the template, then the tenant schemas behind it, in batches of concurrently migrated schemas"""
+        concurrency = concurrency or settings.TENANT_MIGRATION_CONCURRENCY
+        batch_size = batch_size or settings.TENANT_MIGRATION_BATCH_SIZE
+        schemas = TenantSchema.__table__
+        self.ensure_template()
+
+        counts = {"migrated": 0, "current": 0, "failed": 0, "missing": 0}
+        last_schema = ""
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                # Paged by name, the schemas failing a migration are not fetched again
+                with engine.connect() as connection:
+                    batch = connection.execute(
+                        select(schemas.c.schema_name).where(and_(
+                            schemas.c.version < HEAD_VERSION,
+                            schemas.c.schema_name > last_schema,
+                            schemas.c.schema_name != self.template_schema
+                        )).order_by(schemas.c.schema_name).limit(batch_size)
+                    ).scalars().all()
+                if not batch:
+                    break
+
+                for status in executor.map(migrate_schema, batch):
+                    counts[status] += 1
+                last_schema = batch[-1]
+                logger.info(f"Migrated tenant schemas up to {last_schema}: {counts}")
+        return counts
+
+    def get_versions(self) -> Dict[str, Any]:
+        """Number of tenant schemas per version and status"""
+        schemas = TenantSchema.__table__
+        rows = self.db.execute(
+            select(schemas.c.version, schemas.c.status, func.count())
+            .where(schemas.c.schema_name != self.template_schema)
+            .group_by(schemas.c.version, schemas.c.status)
+        ).all()
+        return {
+            "head_version": HEAD_VERSION,
+            "schemas": [{"version": version, "status": status, "count": count} for version, status, count in rows]
+        }
+
+async def migrate_tenant_schemas():
+    """Bring every tenant schema to the latest version, in the background"""
+    loop = asyncio.get_running_loop()
+
+    def migrate():
+        db = SessionLocal()
+        try:
+            return TenantSchemaManager(db).migrate_all()
+        finally:
+            db.close()
+
+    try:
+        counts = await loop.run_in_executor(None, migrate)
+        logger.info(f"Tenant schemas migrated to version {HEAD_VERSION}: {counts}")
+    except Exception as e:
+        logger.error(f"Error migrating tenant schemas: {e}")
+
+if __name__ == "__main__":
+    # Migrate from a deployment job: python -m app.services.tenant_schema_manager
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        print(TenantSchemaManager(db).migrate_all())
+    finally:
+        db.close()
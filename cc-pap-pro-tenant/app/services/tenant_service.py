@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from app.models import Tenant, TenantUser, TenantSubscription, TenantPolicy, TenantResource, TenantBouncer
-from app.schemas import TenantCreate, TenantUpdate, TenantUserCreate
+from app.models import Tenant, TenantUser, TenantSubscription, TenantPolicy, TenantResource, TenantBouncer, TenantUsage
+from app.schemas import TenantCreate, TenantUpdate, TenantUserCreate, is_uuid_like
+from app.services.tenant_context import tenant_context_cache
 from typing import List, Optional
 import uuid
 import logging
@@ -15,6 +16,9 @@ class TenantService:
     
     def create_tenant(self, name: str, domain: str, subdomain: str, plan_type: str, user_id: str) -> Tenant:
         """Create a new tenant"""
+        if is_uuid_like(subdomain):
+            raise ValueError(f"Subdomain {subdomain} cannot be a UUID")
+        
         try:
             tenant = Tenant(
                 id=str(uuid.uuid4()),
@@ -106,6 +110,7 @@ class TenantService:
             self.db.query(TenantPolicy).filter(TenantPolicy.tenant_id == tenant_id).delete()
             self.db.query(TenantResource).filter(TenantResource.tenant_id == tenant_id).delete()
             self.db.query(TenantBouncer).filter(TenantBouncer.tenant_id == tenant_id).delete()
+            self.db.query(TenantUsage).filter(TenantUsage.tenant_id == tenant_id).delete()
             
             # Delete tenant
             self.db.delete(tenant)
@@ -190,28 +195,13 @@ class TenantService:
     
     def is_user_member(self, tenant_id: str, user_id: str) -> bool:
         """Check if user is a member of the tenant"""
-        tenant_user = self.db.query(TenantUser).filter(
-            and_(
-                TenantUser.tenant_id == tenant_id,
-                TenantUser.user_id == user_id,
-                TenantUser.is_active == True
-            )
-        ).first()
-        
-        return tenant_user is not None
+        context = tenant_context_cache.get(self.db, tenant_id)
+        return context is not None and context.is_member(user_id)
     
     def is_user_admin(self, tenant_id: str, user_id: str) -> bool:
         """Check if user is an admin of the tenant"""
-        tenant_user = self.db.query(TenantUser).filter(
-            and_(
-                TenantUser.tenant_id == tenant_id,
-                TenantUser.user_id == user_id,
-                TenantUser.role == "admin",
-                TenantUser.is_active == True
-            )
-        ).first()
-        
-        return tenant_user is not None
+        context = tenant_context_cache.get(self.db, tenant_id)
+        return context is not None and context.is_admin(user_id)
     
     def update_tenant_stripe_info(self, tenant_id: str, stripe_customer_id: str, stripe_subscription_id: str):
         """Update tenant with Stripe information"""
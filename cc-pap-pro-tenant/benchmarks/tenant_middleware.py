@@ -0,0 +1,179 @@
+"""Benchmark of the per-request overhead of TenantMiddleware.
+
+Sends --requests requests (--concurrency of them at a time) to an endpoint
+that, like the tenant routers, checks that the user is a member of the
+request's tenant. The tenants, --tenants of them with --users users each,
+are addressed by subdomain. Compares the previous middleware (rate limit
+checked with a GET then a SETEX or INCR, membership queried by the router on
+every request) with the current one (tenant resolved from the tenant context
+cache, rate limit counted in a single round trip), reporting the requests per
+second and the time per request over the endpoint without middleware.
+
+Needs a Redis server to count the rate limits in, the database is a temporary
+SQLite database.
+
+usage:
+    python benchmarks/tenant_middleware.py [--requests 5000] [--concurrency 16] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DATABASE_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_DIR}/benchmark.db"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app import database
+from app.config import settings
+from app.database import SessionLocal, engine, get_db, get_redis
+from app.middleware import TenantMiddleware
+from app.models import Base, Tenant, TenantUser
+from app.services.tenant_context import tenant_context_cache
+from app.services.tenant_service import TenantService
+
+
+class PreviousTenantMiddleware(TenantMiddleware):
+    """The previous TenantMiddleware, not resolving the tenant."""
+
+    async def dispatch(self, request: Request, call_next):
+        tenant_id = self.extract_tenant_subdomain(request) or self.extract_tenant_id(request)
+        if tenant_id:
+            request.state.tenant_id = tenant_id
+            request.state.tenant_domain = self.extract_tenant_domain(request)
+            if not await self.validate_tenant_access(tenant_id, request):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tenant access denied")
+        return await call_next(request)
+
+    async def check_rate_limit(self, tenant_id: str, request: Request) -> bool:
+        redis_client = get_redis()
+        key = f"rate_limit:{tenant_id}:{int(time.time() // 3600)}"
+        current_requests = redis_client.get(key)
+        if current_requests is None:
+            redis_client.setex(key, 3600, 1)
+            return True
+        if int(current_requests) >= settings.RATE_LIMIT_REQUESTS:
+            return False
+        redis_client.incr(key)
+        return True
+
+
+def previous_is_user_member(db: Session, tenant_id: str, user_id: str) -> bool:
+    """The previous TenantService.is_user_member, tenants were looked up by the raw identifier."""
+    tenant = db.query(Tenant).filter((Tenant.id == tenant_id) | (Tenant.subdomain == tenant_id)).first()
+    return tenant is not None and db.query(TenantUser).filter(
+        and_(
+            TenantUser.tenant_id == tenant.id,
+            TenantUser.user_id == user_id,
+            TenantUser.is_active == True
+        )
+    ).first() is not None
+
+
+def create_app(middleware, previous: bool) -> FastAPI:
+    app = FastAPI()
+    if middleware:
+        app.add_middleware(middleware)
+
+    @app.get("/api/v1/policies")
+    def list_policies(request: Request, user_id: str, db: Session = Depends(get_db)):
+        tenant_id = getattr(request.state, "tenant_id", None) or request.headers["host"].split(".")[0]
+        if previous:
+            member = previous_is_user_member(db, tenant_id, user_id)
+        else:
+            member = TenantService(db).is_user_member(tenant_id, user_id)
+        if not member:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+        return []
+
+    return app
+
+
+def create_tenants(tenants: int, users: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for index in range(tenants):
+            tenant_id = str(uuid.uuid4())
+            db.add(Tenant(
+                id=tenant_id, name=f"Tenant {index}", domain=f"tenant{index}.example.com",
+                subdomain=f"tenant{index}", plan_type="pro", status="active", limits={}
+            ))
+            db.add_all(
+                TenantUser(
+                    id=str(uuid.uuid4()), tenant_id=tenant_id, user_id=f"user{user}",
+                    email=f"user{user}@tenant{index}.example.com", name=f"User {user}", role="user"
+                )
+                for user in range(users)
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(app: FastAPI, requests: int, concurrency: int, tenants: int, users: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api.example.com") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(index: int):
+            async with semaphore:
+                response = await client.get(
+                    "/api/v1/policies",
+                    params={"user_id": f"user{index % users}"},
+                    headers={"host": f"tenant{index % tenants}.example.com"}
+                )
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request(index) for index in range(requests)))
+        return time.perf_counter() - start
+
+
+def main(requests: int, concurrency: int, tenants: int, users: int, redis_url: str):
+    settings.RATE_LIMIT_REQUESTS = requests * 2
+    database.redis_client = None
+    settings.REDIS_URL = redis_url
+    get_redis().ping()
+    create_tenants(tenants, users)
+
+    runs = [
+        ("no middleware", None, True),
+        ("previous implementation", PreviousTenantMiddleware, True),
+        ("current", TenantMiddleware, False),
+    ]
+    baseline = None
+    for label, middleware, previous in runs:
+        get_redis().flushdb()
+        tenant_context_cache.clear()
+        elapsed = asyncio.run(run(create_app(middleware, previous), requests, concurrency, tenants, users))
+        if baseline is None:
+            baseline = elapsed
+            overhead = ""
+        else:
+            overhead = f"  {(elapsed - baseline) / requests * 1e6:>+7.0f}us/request"
+        print(f"{label:<24} {elapsed:>7.2f}s  {requests / elapsed:>9.0f} requests/second{overhead}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    main(args.requests, args.concurrency, args.tenants, args.users, args.redis_url)
@@ -2,6 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import signup, pro_provisioning, downloads, stripe_webhooks
 from app.database import engine, Base
+from app.services.provisioning_queue import provisioning_queue
+from app.services.telemetry_service import telemetry_shipper
+from app.services.stripe_webhook_queue import stripe_webhook_queue
 import os
 
 # Create database tables
@@ -29,6 +32,33 @@ app.include_router(pro_provisioning.router)
 app.include_router(downloads.router)
 app.include_router(stripe_webhooks.router)
 
+@app.on_event("startup")
+async def start_provisioning_queue():
+    # Resumes the provisioning jobs interrupted by the last shutdown
+    await provisioning_queue.start()
+
+@app.on_event("shutdown")
+async def stop_provisioning_queue():
+    await provisioning_queue.stop()
+
+@app.on_event("startup")
+async def start_stripe_webhook_queue():
+    # Processes the Stripe events received but not processed before the last shutdown
+    await stripe_webhook_queue.start()
+
+@app.on_event("shutdown")
+async def stop_stripe_webhook_queue():
+    await stripe_webhook_queue.stop()
+
+@app.on_event("startup")
+async def start_telemetry_shipper():
+    # Replays the telemetry spooled while the business admin console was unreachable
+    telemetry_shipper.start()
+
+@app.on_event("shutdown")
+async def stop_telemetry_shipper():
+    await telemetry_shipper.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Control Core Signup Service"}
@@ -113,6 +113,36 @@ class ProTenant(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     provisioned_at = Column(DateTime, nullable=True)
 
+class ProvisioningJob(Base):
+    __tablename__ = "provisioning_jobs"
+    
+    id = Column(String, primary_key=True, index=True)
+    tenant_id = Column(String, nullable=False, index=True)
+    status = Column(String, default="queued")  # queued, running, completed, failed
+    params = Column(JSON, nullable=False)  # company_name, subdomain, tier
+    handler = Column(String, nullable=True)  # Name of the handler notified of the job's progress
+    checkpoints = Column(JSON, nullable=True)  # Results of the completed provisioning steps
+    result = Column(JSON, nullable=True)
+    error_message = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime, nullable=True)
+
+class StripeWebhookEvent(Base):
+    __tablename__ = "stripe_webhook_events"
+    
+    id = Column(String, primary_key=True, index=True)  # Stripe event id, received events are processed once
+    event_type = Column(String, nullable=False)
+    customer_id = Column(String, nullable=True, index=True)  # Events of a customer are processed in order
+    payload = Column(JSON, nullable=False)
+    status = Column(String, default="queued")  # queued, processing, processed, failed
+    error_message = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    stripe_created = Column(Integer, nullable=True)  # When Stripe created the event
+    created_at = Column(DateTime, default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
 class OnboardingStep(Base):
     __tablename__ = "onboarding_steps"
     
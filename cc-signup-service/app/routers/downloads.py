@@ -5,12 +5,14 @@ Handles deployment package downloads and management
 
 from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import User, DeploymentPackage
 from app.schemas import DownloadPackageRequest, DownloadPackageResponse, PackageType, PackageFormat
-from app.services.package_generator import PackageGenerator
+from app.services.package_generator import PackageGenerator, PackageBuild, LAZY_PACKAGE_SCHEME, is_lazy_package
 from app.services.telemetry_service import TelemetryService
+import functools
 import logging
 import uuid
 from datetime import datetime, timedelta
@@ -126,9 +128,14 @@ async def generate_download_package(
         db.add(db_package)
         db.commit()
         
+        # Lazily generated packages are built when downloaded from the API
+        download_url = requested_package["download_url"]
+        if is_lazy_package(download_url):
+            download_url = f"{router.prefix}/downloads/{user_id}/{requested_package['package_id']}"
+        
         return DownloadPackageResponse(
             package_id=requested_package["package_id"],
-            download_url=requested_package["download_url"],
+            download_url=download_url,
             file_size=requested_package["file_size"],
             expires_at=db_package.expires_at,
             deployment_instructions=requested_package.get("deployment_instructions", {}),
@@ -187,6 +194,25 @@ async def download_package(
             tier=user.subscription_tier
         )
         
+        # If it's not built yet (or was pruned from the package cache), stream it to the client as it is built
+        if is_lazy_package(package.download_url) or package_generator.is_evicted_package(package.download_url):
+            build = package_generator.build_package(
+                user_id=user_id,
+                tier=user.subscription_tier,
+                package_type=package.package_type,
+                package_format=package.package_format,
+                on_built=functools.partial(
+                    _record_built_package, user_id, package.package_format, package.download_url
+                )
+            )
+            return StreamingResponse(
+                build.stream(),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f'attachment; filename="controlcore-{package.package_type}-{package.package_format}.zip"'
+                }
+            )
+        
         # If it's a local file, serve it directly
         if package.download_url.startswith("file://"):
             file_path = Path(package.download_url.replace("file://", ""))
@@ -297,6 +323,27 @@ async def delete_package(
             detail="Failed to delete package"
         )
 
+def _record_built_package(user_id: str, package_format: str, previous_url: str, build: PackageBuild):
+    """Serve the repeat downloads of a package built on download from the package cache"""
+    # Called once the build is done, after the download's request session was closed
+    db = SessionLocal()
+    try:
+        packages = db.query(DeploymentPackage).filter(
+            DeploymentPackage.user_id == user_id,
+            DeploymentPackage.package_format == package_format,
+            or_(
+                DeploymentPackage.download_url.startswith(LAZY_PACKAGE_SCHEME),
+                DeploymentPackage.download_url == previous_url
+            )
+        ).all()
+        
+        for package in packages:
+            package.download_url = f"file://{build.path}"
+            package.file_size = build.size
+        db.commit()
+    finally:
+        db.close()
+
 async def _generate_deployment_instructions(package: DeploymentPackage, user: User) -> dict:
     """Generate deployment instructions based on package type"""
     base_instructions = {
@@ -8,7 +8,8 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User, ProTenant, SignupEvent
 from app.schemas import ProTenantProvisioningRequest, ProTenantProvisioningResponse, ProTenantStatusResponse
-from app.services.k8s_provisioning_service import K8sProvisioningService
+from app.models import ProvisioningJob
+from app.services.provisioning_queue import provisioning_queue, ProvisioningHandler
 from app.services.telemetry_service import TelemetryService
 import uuid
 import logging
@@ -19,9 +20,21 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["provisioning"])
 
 # Initialize services
-k8s_provisioning_service = K8sProvisioningService()
 telemetry_service = TelemetryService()
 
+# Provisioning job handler of the tenants provisioned from this router
+PROVISIONING_HANDLER = "pro_provisioning"
+
+# Progress steps shown to the user, by provisioning step
+PROGRESS_STEPS = {
+    "namespace": "namespace",
+    "deployment": "deployment",
+    "dns": "dns",
+    "ssl": "ssl",
+    "ready": "database",
+    "initialize": "auth"
+}
+
 @router.post("/provisioning/start", response_model=ProTenantProvisioningResponse)
 async def start_provisioning(
     request: ProTenantProvisioningRequest,
@@ -241,150 +254,91 @@ async def provision_tenant_background(
     stripe_customer_id: str,
     stripe_subscription_id: str
 ):
-    """Background task to provision Pro tenant"""
+    """Background task to queue the provisioning of a Pro tenant"""
+    logger.info(f"Starting background provisioning for tenant {tenant_id}")
+    provisioning_queue.enqueue(
+        tenant_id=tenant_id,
+        company_name=company_name,
+        subdomain=subdomain,
+        tier="pro",
+        handler=PROVISIONING_HANDLER
+    )
+
+async def update_provisioning_step(job: ProvisioningJob, step: str, status: str, detail=None):
+    """Track the progress of a provisioning job in the tenant's provisioning steps"""
+    step_id = PROGRESS_STEPS.get(step)
+    if step_id is None:
+        return
+    
+    # DNS and SSL report failures in their result, they are not critical
+    if status == "completed" and isinstance(detail, dict) and detail.get("success") is False:
+        status, detail = "failed", detail.get("error", f"{step} configuration failed")
+    
+    db = next(get_db())
+    try:
+        tenant = db.query(ProTenant).filter(ProTenant.id == job.tenant_id).first()
+        if tenant:
+            steps = dict(tenant.deployment_config.get("provisioning_steps", {}))
+            if step_id in steps:
+                step_data = dict(steps[step_id], status=status)
+                if status == "in_progress":
+                    step_data["started_at"] = datetime.utcnow().isoformat()
+                elif status == "completed":
+                    step_data["completed_at"] = datetime.utcnow().isoformat()
+                elif status == "failed":
+                    step_data["error_message"] = detail
+                steps[step_id] = step_data
+            tenant.deployment_config = {**tenant.deployment_config, "provisioning_steps": steps}
+            db.commit()
+    finally:
+        db.close()
+
+async def finish_provisioning(job: ProvisioningJob):
+    """Activate the tenant of a completed provisioning job (or mark it failed)"""
+    tenant_id = job.tenant_id
+    subdomain = job.params["subdomain"]
     db = next(get_db())
     
     try:
-        logger.info(f"Starting background provisioning for tenant {tenant_id}")
-        
-        # Update step status
-        def update_step_status(step_id: str, status: str, error_message: str = None):
-            tenant = db.query(ProTenant).filter(ProTenant.id == tenant_id).first()
-            if tenant:
-                steps = tenant.deployment_config.get("provisioning_steps", {})
-                if step_id in steps:
-                    steps[step_id]["status"] = status
-                    if status == "in_progress":
-                        steps[step_id]["started_at"] = datetime.utcnow().isoformat()
-                    elif status == "completed":
-                        steps[step_id]["completed_at"] = datetime.utcnow().isoformat()
-                    elif status == "failed":
-                        steps[step_id]["error_message"] = error_message
-                tenant.deployment_config["provisioning_steps"] = steps
-                db.commit()
-        
-        # Step 1: Create Kubernetes namespace
-        update_step_status("namespace", "in_progress")
-        try:
-            await k8s_provisioning_service._create_namespace(f"tenant-{tenant_id[:8]}")
-            update_step_status("namespace", "completed")
-        except Exception as e:
-            update_step_status("namespace", "failed", str(e))
-            raise
-        
-        # Step 2: Deploy with Helm
-        update_step_status("deployment", "in_progress")
-        try:
-            helm_values = await k8s_provisioning_service._generate_helm_values(
-                tenant_id, company_name, subdomain, "pro"
-            )
-            deployment_result = await k8s_provisioning_service._deploy_with_helm(
-                f"tenant-{tenant_id[:8]}", helm_values
-            )
-            update_step_status("deployment", "completed")
-        except Exception as e:
-            update_step_status("deployment", "failed", str(e))
-            raise
-        
-        # Step 3: Configure DNS
-        update_step_status("dns", "in_progress")
-        try:
-            dns_result = await k8s_provisioning_service._configure_dns(subdomain)
-            if dns_result["success"]:
-                update_step_status("dns", "completed")
-            else:
-                update_step_status("dns", "failed", dns_result.get("error", "DNS configuration failed"))
-        except Exception as e:
-            update_step_status("dns", "failed", str(e))
-            # DNS failure is not critical, continue
-        
-        # Step 4: Request SSL certificate
-        update_step_status("ssl", "in_progress")
-        try:
-            ssl_result = await k8s_provisioning_service._request_ssl_certificate(
-                subdomain, f"tenant-{tenant_id[:8]}"
-            )
-            if ssl_result["success"]:
-                update_step_status("ssl", "completed")
-            else:
-                update_step_status("ssl", "failed", ssl_result.get("error", "SSL certificate failed"))
-        except Exception as e:
-            update_step_status("ssl", "failed", str(e))
-            # SSL failure is not critical, continue
-        
-        # Step 5: Wait for deployment to be ready
-        update_step_status("database", "in_progress")
-        try:
-            await k8s_provisioning_service._wait_for_deployment_ready(f"tenant-{tenant_id[:8]}")
-            update_step_status("database", "completed")
-        except Exception as e:
-            update_step_status("database", "failed", str(e))
-            raise
-        
-        # Step 6: Initialize tenant data
-        update_step_status("auth", "in_progress")
-        try:
-            await k8s_provisioning_service._initialize_tenant_data(tenant_id, f"tenant-{tenant_id[:8]}")
-            update_step_status("auth", "completed")
-        except Exception as e:
-            update_step_status("auth", "failed", str(e))
-            # Auth initialization failure is not critical
-        
-        # Update tenant status to active
         tenant = db.query(ProTenant).filter(ProTenant.id == tenant_id).first()
-        if tenant:
+        if not tenant:
+            logger.error(f"Provisioned tenant {tenant_id} not found")
+            return
+        
+        if job.status == "completed":
+            # Update tenant status to active
             tenant.status = "active"
             tenant.access_url = f"https://{subdomain}"
             tenant.admin_credentials = {
-                "email": f"admin@{generate_company_slug(company_name)}.com",
+                "email": f"admin@{generate_company_slug(job.params['company_name'])}.com",
                 "password": generate_secure_password()
             }
             tenant.provisioned_at = datetime.utcnow()
-            tenant.kubernetes_namespace = f"tenant-{tenant_id[:8]}"
-            tenant.ssl_certificate_status = "active"
-            db.commit()
-        
-        # Log completion event
-        signup_event = SignupEvent(
-            id=str(uuid.uuid4()),
-            user_id=tenant.user_id,
-            event_type="provisioning_completed",
-            event_data={
+            tenant.kubernetes_namespace = job.result["namespace"]
+            tenant.ssl_certificate_status = "active" if job.result["ssl_configured"] else "failed"
+            event_type = "provisioning_completed"
+            event_data = {
                 "tenant_id": tenant_id,
                 "subdomain": subdomain,
                 "access_url": f"https://{subdomain}"
             }
-        )
-        db.add(signup_event)
-        db.commit()
-        
-        # Log to telemetry
-        await telemetry_service.log_provisioning_event(
-            user_id=tenant.user_id,
-            tenant_id=tenant_id,
-            status="completed"
-        )
-        
-        logger.info(f"Successfully provisioned tenant {tenant_id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to provision tenant {tenant_id}: {str(e)}")
-        
-        # Update tenant status to failed
-        tenant = db.query(ProTenant).filter(ProTenant.id == tenant_id).first()
-        if tenant:
+            logger.info(f"Successfully provisioned tenant {tenant_id}")
+        else:
+            # Update tenant status to failed
             tenant.status = "failed"
-            db.commit()
+            event_type = "provisioning_failed"
+            event_data = {
+                "tenant_id": tenant_id,
+                "error": job.error_message
+            }
+            logger.error(f"Failed to provision tenant {tenant_id}: {job.error_message}")
         
-        # Log failure event
+        # Log completion event
         signup_event = SignupEvent(
             id=str(uuid.uuid4()),
             user_id=tenant.user_id,
-            event_type="provisioning_failed",
-            event_data={
-                "tenant_id": tenant_id,
-                "error": str(e)
-            }
+            event_type=event_type,
+            event_data=event_data
         )
         db.add(signup_event)
         db.commit()
@@ -393,9 +347,16 @@ async def provision_tenant_background(
         await telemetry_service.log_provisioning_event(
             user_id=tenant.user_id,
             tenant_id=tenant_id,
-            status="failed",
-            error_message=str(e)
+            status=job.status,
+            error_message=job.error_message
         )
+    finally:
+        db.close()
+
+provisioning_queue.register_handler(
+    PROVISIONING_HANDLER,
+    ProvisioningHandler(on_finished=finish_provisioning, on_step=update_provisioning_step)
+)
 
 async def log_provisioning_telemetry(user_id: str, tenant_id: str, status: str):
     """Log provisioning event to telemetry"""
@@ -6,7 +6,8 @@ from app.schemas import SignupRequest, SignupResponse, SubscriptionTier, Billing
 from app.services.email_service import EmailService
 from app.services.stripe_webhook_handler import StripeWebhookHandler
 from app.services.telemetry_service import TelemetryService
-from app.services.k8s_provisioning_service import K8sProvisioningService
+from app.models import ProvisioningJob
+from app.services.provisioning_queue import provisioning_queue, ProvisioningHandler
 from app.services.package_generator import PackageGenerator
 import uuid
 import secrets
@@ -34,9 +35,11 @@ stripe_service = StripeIntegrationService(
 
 email_service = EmailService()
 telemetry_service = TelemetryService()
-k8s_provisioning_service = K8sProvisioningService()
 package_generator = PackageGenerator()
 
+# Provisioning job handler of the Pro tenants provisioned on signup
+PROVISIONING_HANDLER = "signup"
+
 @router.post("/signup", response_model=SignupResponse)
 async def create_account(
     signup_data: SignupRequest,
@@ -259,14 +262,43 @@ async def provision_pro_tenant(user_id: str, company_name: str, stripe_customer_
         db.add(pro_tenant)
         db.commit()
         
-        # Trigger Kubernetes provisioning
-        provisioning_result = await k8s_provisioning_service.provision_tenant(
+        # Queue Kubernetes provisioning
+        provisioning_queue.enqueue(
             tenant_id=tenant_id,
             company_name=company_name,
             subdomain=subdomain,
-            tier="pro"
+            tier="pro",
+            handler=PROVISIONING_HANDLER
         )
         
+    except Exception as e:
+        logger.error(f"Failed to provision Pro tenant for user {user_id}: {str(e)}")
+        # Update tenant status to failed
+        db = next(get_db())
+        pro_tenant = db.query(ProTenant).filter(ProTenant.user_id == user_id).first()
+        if pro_tenant:
+            pro_tenant.status = "failed"
+            db.commit()
+
+async def finish_pro_tenant_provisioning(job: ProvisioningJob):
+    """Activate a provisioned Pro tenant and send its access details"""
+    db = next(get_db())
+    try:
+        pro_tenant = db.query(ProTenant).filter(ProTenant.id == job.tenant_id).first()
+        if not pro_tenant:
+            logger.error(f"Provisioned Pro tenant {job.tenant_id} not found")
+            return
+        
+        if job.status != "completed":
+            logger.error(f"Failed to provision Pro tenant for user {pro_tenant.user_id}: {job.error_message}")
+            # Update tenant status to failed
+            pro_tenant.status = "failed"
+            db.commit()
+            return
+        
+        subdomain = job.params["subdomain"]
+        company_slug = subdomain.split(".")[0]
+        
         # Update tenant status
         pro_tenant.status = "active"
         pro_tenant.access_url = f"https://{subdomain}"
@@ -275,28 +307,26 @@ async def provision_pro_tenant(user_id: str, company_name: str, stripe_customer_
             "password": secrets.token_urlsafe(12)
         }
         pro_tenant.provisioned_at = datetime.utcnow()
-        pro_tenant.kubernetes_namespace = provisioning_result.get("namespace")
+        pro_tenant.kubernetes_namespace = job.result.get("namespace")
         pro_tenant.ssl_certificate_status = "active"
         
         db.commit()
         
         # Send provisioning complete email
         await email_service.send_pro_tenant_ready(
-            user_id=user_id,
+            user_id=pro_tenant.user_id,
             tenant_url=f"https://{subdomain}",
             admin_credentials=pro_tenant.admin_credentials
         )
         
-        logger.info(f"Successfully provisioned Pro tenant {tenant_id} for user {user_id}")
-        
-    except Exception as e:
-        logger.error(f"Failed to provision Pro tenant for user {user_id}: {str(e)}")
-        # Update tenant status to failed
-        db = next(get_db())
-        pro_tenant = db.query(ProTenant).filter(ProTenant.user_id == user_id).first()
-        if pro_tenant:
-            pro_tenant.status = "failed"
-            db.commit()
+        logger.info(f"Successfully provisioned Pro tenant {job.tenant_id} for user {pro_tenant.user_id}")
+    finally:
+        db.close()
+
+provisioning_queue.register_handler(
+    PROVISIONING_HANDLER,
+    ProvisioningHandler(on_finished=finish_pro_tenant_provisioning)
+)
 
 async def generate_deployment_packages(user_id: str, tier: str):
     """Background task to generate deployment packages"""
@@ -7,14 +7,11 @@ from fastapi import APIRouter, Request, HTTPException, status, Depends
 from fastapi.responses import JSONResponse
 import logging
 import stripe
-from app.services.stripe_webhook_handler import StripeWebhookHandler
+from app.services.stripe_webhook_queue import stripe_webhook_queue
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["stripe-webhooks"])
 
-# Initialize webhook handler
-webhook_handler = StripeWebhookHandler()
-
 @router.post("/webhooks/stripe")
 async def handle_stripe_webhook(request: Request):
     """Handle Stripe webhook events"""
@@ -29,20 +26,29 @@ async def handle_stripe_webhook(request: Request):
                 detail="Missing stripe-signature header"
             )
         
-        # Handle the webhook
-        result = await webhook_handler.handle_webhook(payload, sig_header)
+        # Verify and store the event, it is processed in the background
+        event = stripe_webhook_queue.webhook_handler.verify_event(payload, sig_header)
+        result = stripe_webhook_queue.enqueue(event)
         
         return JSONResponse(
             content=result,
             status_code=200
         )
         
+    except HTTPException:
+        raise
     except stripe.error.SignatureVerificationError as e:
         logger.error(f"Stripe signature verification failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid signature"
         )
+    except ValueError as e:
+        logger.error(f"Invalid Stripe webhook payload: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid payload"
+        )
     except Exception as e:
         logger.error(f"Webhook handling error: {e}")
         raise HTTPException(
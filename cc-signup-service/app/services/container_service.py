@@ -1,37 +1,24 @@
-import os
-import zipfile
 import json
+import functools
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from app.services.package_generator import build_zip
+
+# Stands in for the user id while rendering the skeleton of a tier's package,
+# its first 8 characters stand in for the short user id
+_USER_ID_PREFIX = "\x00cc-uid\x00"
+_USER_ID_PLACEHOLDER = _USER_ID_PREFIX + "\x00cc-user-id\x00"
+
+# Package files to make executable
+_EXECUTABLES = {"setup.sh"}
 
 def generate_deployment_package(user_id: str, tier: str, deployment_preference: str = "on_prem") -> Dict[str, Any]:
     """Generate deployment package for Control Core."""
     
-    # Create package directory
-    package_dir = f"/tmp/controlcore-{user_id}"
-    os.makedirs(package_dir, exist_ok=True)
-    
-    # Generate package contents based on tier
-    if tier == "kickstart":
-        # Kickstart: Full self-hosted deployment (Control Plane + Bouncer)
-        package_contents = generate_kickstart_package(user_id, package_dir)
-    elif tier == "pro":
-        # Pro: Hybrid - Control Plane on AWS, Bouncer self-hosted
-        package_contents = generate_pro_package(user_id, package_dir)
-    else:  # custom
-        # Custom: Full self-hosted deployment (Control Plane + Bouncer)
-        package_contents = generate_custom_package(user_id, package_dir)
-    
     # Create zip file
     zip_filename = f"controlcore-{tier}-{user_id[:8]}.zip"
-    zip_path = f"/tmp/{zip_filename}"
-    
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(package_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, package_dir)
-                zipf.write(file_path, arcname)
+    package = build_deployment_package_zip(user_id, tier)
     
     # Generate download URL (in production, this would be uploaded to S3)
     download_url = f"https://downloads.controlcore.io/{zip_filename}"
@@ -43,12 +30,40 @@ def generate_deployment_package(user_id: str, tier: str, deployment_preference:
         "version": "1.0.0",
         "github_repo": f"controlcore-{user_id[:8]}",
         "download_url": download_url,
-        "package_size": os.path.getsize(zip_path),
+        "package_size": len(package),
         "created_at": datetime.utcnow().isoformat(),
         "expires_at": (datetime.utcnow().timestamp() + 7 * 24 * 3600)  # 7 days
     }
 
-def generate_kickstart_package(user_id: str, package_dir: str) -> Dict[str, Any]:
+def build_deployment_package_zip(user_id: str, tier: str) -> bytes:
+    """Build the deployment package ZIP of a user in memory."""
+    
+    files = []
+    for name, content in _package_skeleton(tier if tier in ("kickstart", "pro") else "custom"):
+        content = content.replace(_USER_ID_PLACEHOLDER, user_id).replace(_USER_ID_PREFIX, user_id[:8])
+        files.append((name, content, 0o755 if name in _EXECUTABLES else 0o644))
+    return build_zip(files)
+
+@functools.lru_cache(maxsize=None)
+def _package_skeleton(tier: str) -> Tuple[Tuple[str, str], ...]:
+    """Render the files of a tier's package once, with placeholders for the user id."""
+    
+    files: Dict[str, str] = {}
+    
+    # Generate package contents based on tier
+    if tier == "kickstart":
+        # Kickstart: Full self-hosted deployment (Control Plane + Bouncer)
+        generate_kickstart_package(_USER_ID_PLACEHOLDER, files)
+    elif tier == "pro":
+        # Pro: Hybrid - Control Plane on AWS, Bouncer self-hosted
+        generate_pro_package(_USER_ID_PLACEHOLDER, files)
+    else:  # custom
+        # Custom: Full self-hosted deployment (Control Plane + Bouncer)
+        generate_custom_package(_USER_ID_PLACEHOLDER, files)
+    
+    return tuple(files.items())
+
+def generate_kickstart_package(user_id: str, files: Dict[str, str]) -> Dict[str, Any]:
     """Generate Kickstart deployment package."""
     
     # Create docker-compose.yml
@@ -203,8 +218,7 @@ volumes:
   acme_data:
 """
     
-    with open(f"{package_dir}/docker-compose.yml", "w") as f:
-        f.write(docker_compose)
+    files["docker-compose.yml"] = docker_compose
     
     # Create setup script
     setup_script = """#!/bin/bash
@@ -282,10 +296,7 @@ echo ""
 echo "🆘 Need help? Contact us at info@controlcore.io"
 """
     
-    with open(f"{package_dir}/setup.sh", "w") as f:
-        f.write(setup_script)
-    
-    os.chmod(f"{package_dir}/setup.sh", 0o755)
+    files["setup.sh"] = setup_script
     
     # Create README
     readme = """# Control Core Kickstart - Dual Environment Setup
@@ -411,8 +422,7 @@ PRODUCTION_API_KEY=sk_live_your_key_here
 Enjoy your Control Core experience!
 """
     
-    with open(f"{package_dir}/README.md", "w") as f:
-        f.write(readme)
+    files["README.md"] = readme
     
     return {
         "package_type": "kickstart",
@@ -421,7 +431,7 @@ Enjoy your Control Core experience!
         "features": ["admin_ui", "policy_management", "demo_app", "dual_environment_bouncers", "opal_sync", "policy_promotion"]
     }
 
-def generate_pro_package(user_id: str, package_dir: str) -> Dict[str, Any]:
+def generate_pro_package(user_id: str, files: Dict[str, str]) -> Dict[str, Any]:
     """Generate Pro deployment package - Hybrid: Control Plane on AWS, Bouncers self-hosted."""
     
     # Create docker-compose.yml for Bouncers (Control Plane is hosted on AWS)
@@ -540,8 +550,7 @@ volumes:
   acme_data:
 """
     
-    with open(f"{package_dir}/docker-compose.yml", "w") as f:
-        f.write(docker_compose)
+    files["docker-compose.yml"] = docker_compose
     
     # Create setup script for Pro
     setup_script = f"""#!/bin/bash
@@ -617,10 +626,7 @@ echo ""
 echo "🆘 Need help? Contact us at info@controlcore.io"
 """
     
-    with open(f"{package_dir}/setup.sh", "w") as f:
-        f.write(setup_script)
-    
-    os.chmod(f"{package_dir}/setup.sh", 0o755)
+    files["setup.sh"] = setup_script
     
     # Create README for Pro
     readme = f"""# Control Core Pro - Hybrid Deployment
@@ -684,8 +690,7 @@ Update the `.env` file with your settings:
 Enjoy your Control Core Pro experience!
 """
     
-    with open(f"{package_dir}/README.md", "w") as f:
-        f.write(readme)
+    files["README.md"] = readme
     
     return {
         "package_type": "pro_hybrid",
@@ -696,7 +701,7 @@ Enjoy your Control Core Pro experience!
         "deployment_type": "hybrid"
     }
 
-def generate_custom_package(user_id: str, package_dir: str) -> Dict[str, Any]:
+def generate_custom_package(user_id: str, files: Dict[str, str]) -> Dict[str, Any]:
     """Generate Custom deployment package - Full self-hosted deployment (Control Plane + Bouncer)."""
     
     # Create docker-compose.yml for full self-hosted deployment
@@ -821,8 +826,7 @@ volumes:
   acme_data:
 """
     
-    with open(f"{package_dir}/docker-compose.yml", "w") as f:
-        f.write(docker_compose)
+    files["docker-compose.yml"] = docker_compose
     
     # Create setup script for Custom
     setup_script = f"""#!/bin/bash
@@ -907,10 +911,7 @@ echo ""
 echo "🆘 Need help? Contact your dedicated account manager or info@controlcore.io"
 """
     
-    with open(f"{package_dir}/setup.sh", "w") as f:
-        f.write(setup_script)
-    
-    os.chmod(f"{package_dir}/setup.sh", 0o755)
+    files["setup.sh"] = setup_script
     
     # Create README for Custom
     readme = f"""# Control Core Custom - Full Self-Hosted Deployment
@@ -981,8 +982,7 @@ Update the `.env` file with your settings:
 Enjoy your Control Core Custom experience!
 """
     
-    with open(f"{package_dir}/README.md", "w") as f:
-        f.write(readme)
+    files["README.md"] = readme
     
     return {
         "package_type": "custom_self_hosted",
@@ -4,11 +4,12 @@ Handles automated deployment of cc-pap-pro-tenant instances
 """
 
 import os
+import json
 import logging
 import yaml
 import subprocess
 import tempfile
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from datetime import datetime
 from pathlib import Path
 import aiohttp
@@ -16,6 +17,18 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Provisioning steps and the steps they depend on: DNS and the certificate
+# request don't need the tenant deployed, so they run while Helm deploys it
+PROVISIONING_STEPS: Dict[str, List[str]] = {
+    "namespace": [],
+    "helm_values": [],
+    "deployment": ["namespace", "helm_values"],
+    "dns": [],
+    "ssl": ["namespace"],
+    "ready": ["deployment"],
+    "initialize": ["ready"]
+}
+
 class K8sProvisioningService:
     def __init__(self):
         self.kubeconfig_path = os.getenv("KUBECONFIG_PATH")
@@ -29,43 +42,86 @@ class K8sProvisioningService:
         self.ssl_email = os.getenv("SSL_EMAIL", "admin@controlcore.io")
         self.letsencrypt_staging = os.getenv("LETSENCRYPT_STAGING", "true").lower() == "true"
     
-    async def provision_tenant(self, tenant_id: str, company_name: str, subdomain: str, tier: str) -> Dict[str, Any]:
-        """Provision a new Pro tenant with Kubernetes deployment"""
-        try:
-            logger.info(f"Starting provisioning for tenant {tenant_id}")
-            
-            # Generate namespace
-            namespace = f"tenant-{tenant_id[:8]}"
-            
-            # Create namespace
+    async def provision_tenant(
+        self,
+        tenant_id: str,
+        company_name: str,
+        subdomain: str,
+        tier: str,
+        checkpoints: Optional[Dict[str, Any]] = None,
+        on_step: Optional[Callable[..., Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Provision a new Pro tenant with Kubernetes deployment
+        
+        Runs the provisioning steps, each as soon as the steps it depends on
+        completed. Steps with results in checkpoints (completed by an
+        interrupted provisioning) are not run again. on_step(step, status,
+        detail) is awaited when a step is in_progress, completed (with its
+        result, to checkpoint) or failed (with the error).
+        """
+        # Generate namespace
+        namespace = f"tenant-{tenant_id[:8]}"
+        results = dict(checkpoints or {})
+        
+        async def create_namespace():
             await self._create_namespace(namespace)
-            
-            # Generate Helm values
-            helm_values = await self._generate_helm_values(tenant_id, company_name, subdomain, tier)
-            
-            # Deploy with Helm
-            deployment_result = await self._deploy_with_helm(namespace, helm_values)
-            
-            # Configure DNS
-            dns_result = await self._configure_dns(subdomain)
-            
-            # Request SSL certificate
-            ssl_result = await self._request_ssl_certificate(subdomain, namespace)
-            
-            # Wait for deployment to be ready
+            return {"namespace": namespace}
+        
+        async def generate_helm_values():
+            # Checkpointed, the database password is only added to the values deployed
+            return await self._generate_helm_values(tenant_id, company_name, subdomain, tier)
+        
+        async def deploy_with_helm():
+            # The password of a release deployed before an interruption, it may have initialized the database
+            database_password = await self._get_release_database_password(namespace) or self._generate_password()
+            return await self._deploy_with_helm(
+                namespace, self._with_database_password(results["helm_values"], tenant_id, database_password)
+            )
+        
+        async def configure_dns():
+            return await self._configure_dns(subdomain)
+        
+        async def request_ssl_certificate():
+            return await self._request_ssl_certificate(subdomain, namespace)
+        
+        async def wait_for_deployment_ready():
             await self._wait_for_deployment_ready(namespace)
+            return {"ready": True}
+        
+        async def initialize_tenant_data():
+            try:
+                await self._initialize_tenant_data(tenant_id, namespace)
+            except Exception as e:
+                # Not critical, the tenant is deployed and ready
+                return {"initialized": False, "success": False, "error": str(e)}
+            return {"initialized": True}
+        
+        steps = {
+            "namespace": create_namespace,
+            "helm_values": generate_helm_values,
+            "deployment": deploy_with_helm,
+            "dns": configure_dns,
+            "ssl": request_ssl_certificate,
+            "ready": wait_for_deployment_ready,
+            "initialize": initialize_tenant_data
+        }
+        
+        try:
+            logger.info(f"Starting provisioning for tenant {tenant_id}")
+            if results:
+                logger.info(f"Resuming provisioning of tenant {tenant_id} after steps {sorted(results)}")
             
-            # Initialize tenant data
-            await self._initialize_tenant_data(tenant_id, namespace)
+            await self._run_steps(steps, results, on_step)
             
             result = {
                 "namespace": namespace,
                 "subdomain": subdomain,
                 "domain": f"https://{subdomain}",
                 "deployment_status": "ready",
-                "dns_configured": dns_result["success"],
-                "ssl_configured": ssl_result["success"],
-                "helm_deployment": deployment_result,
+                "dns_configured": results["dns"]["success"],
+                "ssl_configured": results["ssl"]["success"],
+                "helm_deployment": results["deployment"],
                 "provisioned_at": datetime.utcnow().isoformat()
             }
             
@@ -78,6 +134,42 @@ class K8sProvisioningService:
             await self._cleanup_failed_provisioning(tenant_id, namespace)
             raise
     
+    async def _run_steps(
+        self,
+        steps: Dict[str, Callable[[], Awaitable[Any]]],
+        results: Dict[str, Any],
+        on_step: Optional[Callable[..., Awaitable[None]]]
+    ):
+        """Run the steps without results, concurrently as their dependencies complete"""
+        pending = [step for step in PROVISIONING_STEPS if step not in results]
+        running: Dict[asyncio.Task, str] = {}
+        
+        try:
+            while pending or running:
+                for step in list(pending):
+                    if all(dependency in results for dependency in PROVISIONING_STEPS[step]):
+                        pending.remove(step)
+                        if on_step:
+                            await on_step(step, "in_progress")
+                        running[asyncio.create_task(steps[step]())] = step
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = running.pop(task)
+                    try:
+                        results[step] = task.result()
+                    except Exception as e:
+                        if on_step:
+                            await on_step(step, "failed", str(e))
+                        raise
+                    if on_step:
+                        await on_step(step, "completed", results[step])
+        finally:
+            # Don't leave the other steps running when a step failed (or provisioning was cancelled)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+    
     async def _create_namespace(self, namespace: str):
         """Create Kubernetes namespace"""
         try:
@@ -103,7 +195,7 @@ class K8sProvisioningService:
             raise
     
     async def _generate_helm_values(self, tenant_id: str, company_name: str, subdomain: str, tier: str) -> Dict[str, Any]:
-        """Generate Helm values for tenant deployment"""
+        """Generate Helm values for tenant deployment, without the database password (see _with_database_password)"""
         values = {
             "tenant": {
                 "id": tenant_id,
@@ -125,8 +217,7 @@ class K8sProvisioningService:
             "database": {
                 "enabled": True,
                 "name": f"controlcore-{tenant_id[:8]}",
-                "username": f"cc_{tenant_id[:8]}",
-                "password": self._generate_password()
+                "username": f"cc_{tenant_id[:8]}"
             },
             "redis": {
                 "enabled": True,
@@ -160,7 +251,6 @@ class K8sProvisioningService:
                 "TENANT_ID": tenant_id,
                 "TENANT_NAME": company_name,
                 "TIER": tier,
-                "DATABASE_URL": f"postgresql://cc_{tenant_id[:8]}:{values['database']['password']}@postgres-{tenant_id[:8]}:5432/controlcore-{tenant_id[:8]}",
                 "REDIS_URL": f"redis://redis-{tenant_id[:8]}:6379",
                 "OPA_URL": f"http://opa-{tenant_id[:8]}:8181",
                 "OPAL_URL": f"http://opal-{tenant_id[:8]}:7002"
@@ -169,6 +259,35 @@ class K8sProvisioningService:
         
         return values
     
+    def _with_database_password(self, values: Dict[str, Any], tenant_id: str, database_password: str) -> Dict[str, Any]:
+        """The Helm values with the tenant database password, which is never stored with the provisioning job"""
+        return {
+            **values,
+            "database": {**values["database"], "password": database_password},
+            "env": {
+                **values["env"],
+                "DATABASE_URL": f"postgresql://cc_{tenant_id[:8]}:{database_password}@postgres-{tenant_id[:8]}:5432/controlcore-{tenant_id[:8]}"
+            }
+        }
+    
+    async def _get_release_database_password(self, namespace: str) -> Optional[str]:
+        """The database password of the tenant's Helm release, if it was deployed"""
+        cmd = ["helm", "get", "values", f"tenant-{namespace}", "--namespace", namespace, "--output", "json"]
+        if self.kubeconfig_path:
+            cmd.extend(["--kubeconfig", self.kubeconfig_path])
+        
+        result = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await result.communicate()
+        if result.returncode != 0:
+            # Not deployed yet
+            return None
+        values = json.loads(stdout.decode() or "null") or {}
+        return (values.get("database") or {}).get("password")
+    
     async def _deploy_with_helm(self, namespace: str, values: Dict[str, Any]) -> Dict[str, Any]:
         """Deploy tenant using Helm"""
         try:
@@ -180,7 +299,7 @@ class K8sProvisioningService:
             try:
                 # Helm install command
                 cmd = [
-                    "helm", "install",
+                    "helm", "upgrade", "--install",
                     f"tenant-{namespace}",
                     self.helm_chart_path,
                     "--namespace", namespace,
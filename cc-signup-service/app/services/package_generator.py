@@ -4,11 +4,13 @@ Generates deployment packages for self-hosted users
 """
 
 import os
+import io
+import re
+import asyncio
+import hashlib
 import logging
 import zipfile
-import tempfile
-import shutil
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Union, Callable, Optional, AsyncIterator
 from datetime import datetime, timedelta
 from pathlib import Path
 import yaml
@@ -18,6 +20,158 @@ import string
 
 logger = logging.getLogger(__name__)
 
+PLATFORMS = ["linux-amd64", "linux-arm64", "darwin-amd64", "darwin-arm64", "windows-amd64"]
+
+# Placeholders for the per-user values of package skeletons
+USER_ID_PLACEHOLDER = "__cc_user_id__"
+PLACEHOLDER_PATTERN = re.compile(r"__cc_(?:user_id|secret_\d+)__")
+
+# Download URL of packages described but not built yet (lazy mode)
+LAZY_PACKAGE_SCHEME = "lazy://"
+
+# Size of the chunks packages are streamed in while they are built
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def is_lazy_package(download_url: str) -> bool:
+    """Whether a package is built on its first download"""
+    return download_url.startswith(LAZY_PACKAGE_SCHEME)
+
+
+def write_zip(fileobj, files: List[Tuple[str, Union[str, bytes], int]]):
+    """Write a ZIP archive of (name, content, mode) files to a file object"""
+    date_time = datetime.now().timetuple()[:6]
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, content, mode in files:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.external_attr = (0o100000 | mode) << 16
+            zipf.writestr(info, content, compress_type=zipfile.ZIP_DEFLATED)
+    fileobj.flush()
+
+
+def build_zip(files: List[Tuple[str, Union[str, bytes], int]]) -> bytes:
+    """Build a ZIP archive of (name, content, mode) files in memory"""
+    buffer = io.BytesIO()
+    write_zip(buffer, files)
+    return buffer.getvalue()
+
+
+class ChunkWriter:
+    """Write-only (unseekable) file object handing what is written over in chunks"""
+
+    def __init__(self, on_chunk: Callable[[bytes], Any], chunk_size: int = STREAM_CHUNK_SIZE):
+        self._on_chunk = on_chunk
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._on_chunk(bytes(self._buffer))
+            self._buffer.clear()
+
+
+class PackageBuild:
+    """
+    A package being built on download, streamed to all of its downloads
+    while it is built
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        # The built package, in the package cache
+        self.path: Optional[Path] = None
+        self.task: Optional[asyncio.Task] = None
+        self._progress = asyncio.Event()
+
+    @property
+    def size(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def add_chunk(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, path: Path = None, error: Exception = None):
+        self.path = path
+        self.error = error
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        progress, self._progress = self._progress, asyncio.Event()
+        progress.set()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Stream the package from its beginning, as it is built"""
+        index = 0
+        while True:
+            progress = self._progress
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await progress.wait()
+
+
+class PackageSkeleton:
+    """
+    The files of a package for a tier (and platform), rendered once with
+    placeholders where the per-user values go
+    """
+
+    def __init__(self):
+        # (name, content, mode, is_yaml), bytes content is copied as is
+        self.files: List[Tuple[str, Union[str, bytes], int, bool]] = []
+        self.secret_count = 0
+
+    def secret(self) -> str:
+        """Placeholder for a password generated for each package"""
+        placeholder = f"__cc_secret_{self.secret_count}__"
+        self.secret_count += 1
+        return placeholder
+
+    def add(self, name: str, content: Union[str, bytes], mode: int = 0o644):
+        self.files.append((name, content, mode, False))
+
+    def add_yaml(self, name: str, data: Any, **dump_kwargs):
+        # Placeholders are dumped as plain scalars, and replaced by quoted values
+        self.files.append((name, yaml.dump(data, **dump_kwargs), 0o644, True))
+
+    def render(self, user_id: str, generate_password: Callable[[], str]) -> bytes:
+        """Build the package ZIP for a user"""
+        buffer = io.BytesIO()
+        self.write(buffer, user_id, generate_password)
+        return buffer.getvalue()
+
+    def write(self, fileobj, user_id: str, generate_password: Callable[[], str]):
+        """Write the package ZIP for a user to a file object"""
+        values = {USER_ID_PLACEHOLDER: user_id}
+        for index in range(self.secret_count):
+            values[f"__cc_secret_{index}__"] = generate_password()
+
+        def plain(match):
+            return values[match.group(0)]
+
+        def quoted(match):
+            return json.dumps(values[match.group(0)])
+
+        write_zip(fileobj, [
+            (name, content if isinstance(content, bytes) else PLACEHOLDER_PATTERN.sub(quoted if is_yaml else plain, content), mode)
+            for name, content, mode, is_yaml in self.files
+        ])
+
+
 class PackageGenerator:
     def __init__(self):
         self.templates_dir = Path(__file__).parent.parent / "templates" / "packages"
@@ -25,26 +179,35 @@ class PackageGenerator:
         self.s3_bucket = os.getenv("S3_BUCKET_NAME")
         self.s3_access_key = os.getenv("S3_ACCESS_KEY")
         self.s3_secret_key = os.getenv("S3_SECRET_KEY")
+        self._s3_client = None
+        
+        # Lazy mode: packages are only described on signup, and built on their first download
+        self.lazy = os.getenv("LAZY_PACKAGE_GENERATION", "false").lower() == "true"
+        # Content-addressed cache of the packages built on download, bounded in age and size
+        self.cache_dir = self.output_dir / "cache"
+        # Packages expire 7 days after they are described, older builds are never downloaded again
+        self.cache_max_age = timedelta(days=int(os.getenv("PACKAGE_CACHE_MAX_AGE_DAYS", "7")))
+        self.cache_max_size = int(os.getenv("PACKAGE_CACHE_MAX_SIZE_MB", "2048")) * 1024 * 1024
+        
+        # Package skeletons by (package type, tier, platform)
+        self._skeletons: Dict[Tuple[str, str, Optional[str]], PackageSkeleton] = {}
+        # Packages being built on download, by (user id, tier, package format)
+        self._builds: Dict[Tuple[str, str, str], PackageBuild] = {}
         
         # Ensure output directory exists
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(exist_ok=True)
     
     async def generate_packages(self, user_id: str, tier: str) -> List[Dict[str, Any]]:
         """Generate all deployment packages for a user"""
         try:
-            packages = []
-            
-            # Generate Helm chart package
-            helm_package = await self._generate_helm_package(user_id, tier)
-            packages.append(helm_package)
-            
-            # Generate Docker Compose package
-            docker_package = await self._generate_docker_compose_package(user_id, tier)
-            packages.append(docker_package)
-            
-            # Generate binary packages for different platforms
-            binary_packages = await self._generate_binary_packages(user_id, tier)
-            packages.extend(binary_packages)
+            # Build the Helm chart, Docker Compose and binary packages concurrently
+            helm_package, docker_package, binary_packages = await asyncio.gather(
+                self._generate_helm_package(user_id, tier),
+                self._generate_docker_compose_package(user_id, tier),
+                self._generate_binary_packages(user_id, tier)
+            )
+            packages = [helm_package, docker_package, *binary_packages]
             
             logger.info(f"Generated {len(packages)} packages for user {user_id}")
             return packages
@@ -58,54 +221,19 @@ class PackageGenerator:
         try:
             package_id = f"helm-{user_id[:8]}-{int(datetime.utcnow().timestamp())}"
             
-            # Create temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-                
-                # Copy Helm chart template
-                helm_template_dir = self.templates_dir / "helm"
-                if helm_template_dir.exists():
-                    shutil.copytree(helm_template_dir, temp_path / "controlcore")
-                else:
-                    # Create basic Helm chart structure
-                    await self._create_helm_chart_structure(temp_path / "controlcore", user_id, tier)
-                
-                # Generate values.yaml
-                values = await self._generate_helm_values(user_id, tier)
-                with open(temp_path / "controlcore" / "values.yaml", "w") as f:
-                    yaml.dump(values, f, default_flow_style=False)
-                
-                # Generate README
-                readme_content = await self._generate_helm_readme(user_id, tier)
-                with open(temp_path / "README.md", "w") as f:
-                    f.write(readme_content)
-                
-                # Create ZIP package
-                zip_path = self.output_dir / f"{package_id}.zip"
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file_path in temp_path.rglob('*'):
-                        if file_path.is_file():
-                            arcname = file_path.relative_to(temp_path)
-                            zipf.write(file_path, arcname)
-                
-                # Upload to S3 if configured
-                download_url = await self._upload_to_s3(zip_path, f"{package_id}.zip")
-                
-                return {
-                    "package_id": package_id,
-                    "package_type": "helm",
-                    "package_format": "kubernetes",
-                    "download_url": download_url,
-                    "file_size": zip_path.stat().st_size,
-                    "components": ["cc-pap", "cc-pap-api", "postgresql", "redis", "opa", "opal"],
-                    "requirements": {
-                        "kubernetes": ">=1.20.0",
-                        "helm": ">=3.8.0",
-                        "storage": "10Gi",
-                        "memory": "4Gi",
-                        "cpu": "2 cores"
-                    }
+            return await self._complete_package({
+                "package_id": package_id,
+                "package_type": "helm",
+                "package_format": "kubernetes",
+                "components": ["cc-pap", "cc-pap-api", "postgresql", "redis", "opa", "opal"],
+                "requirements": {
+                    "kubernetes": ">=1.20.0",
+                    "helm": ">=3.8.0",
+                    "storage": "10Gi",
+                    "memory": "4Gi",
+                    "cpu": "2 cores"
                 }
+            }, user_id, tier)
                 
         except Exception as e:
             logger.error(f"Failed to generate Helm package: {e}")
@@ -116,58 +244,19 @@ class PackageGenerator:
         try:
             package_id = f"docker-{user_id[:8]}-{int(datetime.utcnow().timestamp())}"
             
-            # Create temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-                
-                # Generate docker-compose.yml
-                compose_config = await self._generate_docker_compose_config(user_id, tier)
-                with open(temp_path / "docker-compose.yml", "w") as f:
-                    yaml.dump(compose_config, f, default_flow_style=False)
-                
-                # Generate .env file
-                env_config = await self._generate_env_config(user_id, tier)
-                with open(temp_path / ".env", "w") as f:
-                    for key, value in env_config.items():
-                        f.write(f"{key}={value}\n")
-                
-                # Generate deployment script
-                deploy_script = await self._generate_deploy_script("docker")
-                with open(temp_path / "deploy.sh", "w") as f:
-                    f.write(deploy_script)
-                os.chmod(temp_path / "deploy.sh", 0o755)
-                
-                # Generate README
-                readme_content = await self._generate_docker_readme(user_id, tier)
-                with open(temp_path / "README.md", "w") as f:
-                    f.write(readme_content)
-                
-                # Create ZIP package
-                zip_path = self.output_dir / f"{package_id}.zip"
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file_path in temp_path.rglob('*'):
-                        if file_path.is_file():
-                            arcname = file_path.relative_to(temp_path)
-                            zipf.write(file_path, arcname)
-                
-                # Upload to S3 if configured
-                download_url = await self._upload_to_s3(zip_path, f"{package_id}.zip")
-                
-                return {
-                    "package_id": package_id,
-                    "package_type": "docker-compose",
-                    "package_format": "docker",
-                    "download_url": download_url,
-                    "file_size": zip_path.stat().st_size,
-                    "components": ["cc-pap", "cc-pap-api", "postgresql", "redis", "opa", "opal"],
-                    "requirements": {
-                        "docker": ">=20.10.0",
-                        "docker-compose": ">=2.0.0",
-                        "storage": "10GB",
-                        "memory": "4GB",
-                        "cpu": "2 cores"
-                    }
+            return await self._complete_package({
+                "package_id": package_id,
+                "package_type": "docker-compose",
+                "package_format": "docker",
+                "components": ["cc-pap", "cc-pap-api", "postgresql", "redis", "opa", "opal"],
+                "requirements": {
+                    "docker": ">=20.10.0",
+                    "docker-compose": ">=2.0.0",
+                    "storage": "10GB",
+                    "memory": "4GB",
+                    "cpu": "2 cores"
                 }
+            }, user_id, tier)
                 
         except Exception as e:
             logger.error(f"Failed to generate Docker Compose package: {e}")
@@ -175,15 +264,17 @@ class PackageGenerator:
     
     async def _generate_binary_packages(self, user_id: str, tier: str) -> List[Dict[str, Any]]:
         """Generate binary packages for different platforms"""
-        packages = []
-        platforms = ["linux-amd64", "linux-arm64", "darwin-amd64", "darwin-arm64", "windows-amd64"]
+        results = await asyncio.gather(
+            *(self._generate_binary_package(user_id, tier, platform) for platform in PLATFORMS),
+            return_exceptions=True
+        )
         
-        for platform in platforms:
-            try:
-                package = await self._generate_binary_package(user_id, tier, platform)
-                packages.append(package)
-            except Exception as e:
-                logger.error(f"Failed to generate binary package for {platform}: {e}")
+        packages = []
+        for platform, result in zip(PLATFORMS, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to generate binary package for {platform}: {result}")
+            else:
+                packages.append(result)
         
         return packages
     
@@ -192,67 +283,206 @@ class PackageGenerator:
         try:
             package_id = f"binary-{platform}-{user_id[:8]}-{int(datetime.utcnow().timestamp())}"
             
-            # Create temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-                
-                # Generate configuration files
-                config = await self._generate_binary_config(user_id, tier)
-                with open(temp_path / "config.yaml", "w") as f:
-                    yaml.dump(config, f, default_flow_style=False)
-                
-                # Generate .env file
-                env_config = await self._generate_env_config(user_id, tier)
-                with open(temp_path / ".env", "w") as f:
-                    for key, value in env_config.items():
-                        f.write(f"{key}={value}\n")
-                
-                # Generate deployment script
-                deploy_script = await self._generate_deploy_script("binary", platform)
-                script_name = "deploy.sh" if platform != "windows-amd64" else "deploy.bat"
-                with open(temp_path / script_name, "w") as f:
-                    f.write(deploy_script)
-                if platform != "windows-amd64":
-                    os.chmod(temp_path / script_name, 0o755)
-                
-                # Generate README
-                readme_content = await self._generate_binary_readme(user_id, tier, platform)
-                with open(temp_path / "README.md", "w") as f:
-                    f.write(readme_content)
-                
-                # Create ZIP package
-                zip_path = self.output_dir / f"{package_id}.zip"
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file_path in temp_path.rglob('*'):
-                        if file_path.is_file():
-                            arcname = file_path.relative_to(temp_path)
-                            zipf.write(file_path, arcname)
-                
-                # Upload to S3 if configured
-                download_url = await self._upload_to_s3(zip_path, f"{package_id}.zip")
-                
-                return {
-                    "package_id": package_id,
-                    "package_type": "binary",
-                    "package_format": platform,
-                    "download_url": download_url,
-                    "file_size": zip_path.stat().st_size,
-                    "components": ["cc-pap", "cc-pap-api"],
-                    "requirements": {
-                        "os": platform.split('-')[0],
-                        "architecture": platform.split('-')[1],
-                        "storage": "5GB",
-                        "memory": "2GB",
-                        "cpu": "1 core"
-                    }
+            return await self._complete_package({
+                "package_id": package_id,
+                "package_type": "binary",
+                "package_format": platform,
+                "components": ["cc-pap", "cc-pap-api"],
+                "requirements": {
+                    "os": platform.split('-')[0],
+                    "architecture": platform.split('-')[1],
+                    "storage": "5GB",
+                    "memory": "2GB",
+                    "cpu": "1 core"
                 }
+            }, user_id, tier)
                 
         except Exception as e:
             logger.error(f"Failed to generate binary package for {platform}: {e}")
             raise
     
-    async def _generate_helm_values(self, user_id: str, tier: str) -> Dict[str, Any]:
+    async def _complete_package(self, package: Dict[str, Any], user_id: str, tier: str) -> Dict[str, Any]:
+        """Build a described package, in lazy mode only on its first download"""
+        if self.lazy:
+            package["download_url"] = f"{LAZY_PACKAGE_SCHEME}{package['package_id']}"
+            package["file_size"] = 0
+            return package
+        
+        skeleton = await self._get_skeleton(package["package_type"], tier, package["package_format"])
+        content = await self._build_package(skeleton, user_id)
+        
+        # Upload to S3 if configured
+        package["download_url"] = await self._store_package(content, f"{package['package_id']}.zip")
+        package["file_size"] = len(content)
+        return package
+    
+    def build_package(
+        self,
+        user_id: str,
+        tier: str,
+        package_type: str,
+        package_format: str,
+        on_built: Callable[[PackageBuild], Any] = None
+    ) -> PackageBuild:
+        """
+        Build a package on download, or join its build in progress: a
+        package is built once for all of its concurrent downloads
+        """
+        key = (user_id, tier, package_format)
+        build = self._builds.get(key)
+        if build is None:
+            build = self._builds[key] = PackageBuild()
+            build.task = asyncio.create_task(self._run_package_build(key, package_type, build, on_built))
+        return build
+    
+    async def _run_package_build(
+        self,
+        key: Tuple[str, str, str],
+        package_type: str,
+        build: PackageBuild,
+        on_built: Optional[Callable[[PackageBuild], Any]]
+    ):
+        user_id, tier, package_format = key
+        loop = asyncio.get_running_loop()
+        try:
+            skeleton = await self._get_skeleton(package_type, tier, package_format)
+            # Chunks are handed over to the event loop as they are compressed
+            writer = ChunkWriter(lambda chunk: loop.call_soon_threadsafe(build.add_chunk, chunk))
+            await loop.run_in_executor(None, skeleton.write, writer, user_id, self._generate_password)
+            path = await loop.run_in_executor(None, self._cache_package, b"".join(build.chunks))
+        except Exception as e:
+            logger.error(f"Failed to build {package_format} package for user {user_id}: {e}")
+            build.finish(error=e)
+        else:
+            build.finish(path)
+            logger.info(f"Built {package_format} package for user {user_id} on download")
+            if on_built is not None:
+                try:
+                    on_built(build)
+                except Exception as e:
+                    logger.error(f"Failed to record {package_format} package of user {user_id}: {e}")
+        finally:
+            self._builds.pop(key, None)
+    
+    def _cache_package(self, content: bytes) -> Path:
+        """Store a built package in the package cache, by its content hash"""
+        path = self.cache_dir / f"{hashlib.sha256(content).hexdigest()}.zip"
+        if not path.exists():
+            temp_path = path.with_name(f"{path.name}.{secrets.token_hex(8)}.tmp")
+            temp_path.write_bytes(content)
+            os.replace(temp_path, path)
+            self._prune_cache()
+        return path
+    
+    def _prune_cache(self):
+        """Remove the cached packages older than cache_max_age, then the oldest beyond cache_max_size"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.name.endswith(".zip"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        
+        oldest_kept = (datetime.now() - self.cache_max_age).timestamp()
+        total_size = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if mtime >= oldest_kept and total_size <= self.cache_max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+    
+    def is_evicted_package(self, download_url: str) -> bool:
+        """Whether a package built on download was since pruned from the package cache"""
+        if not download_url.startswith("file://"):
+            return False
+        path = Path(download_url[len("file://"):])
+        return path.parent == self.cache_dir and not path.exists()
+    
+    async def _get_skeleton(self, package_type: str, tier: str, package_format: str) -> PackageSkeleton:
+        """Get the skeleton of a package, rendering it on first use"""
+        platform = package_format if package_type == "binary" else None
+        key = (package_type, tier, platform)
+        skeleton = self._skeletons.get(key)
+        if skeleton is None:
+            skeleton = PackageSkeleton()
+            if package_type == "helm":
+                await self._render_helm_skeleton(skeleton, tier)
+            elif package_type == "docker-compose":
+                await self._render_docker_compose_skeleton(skeleton, tier)
+            else:
+                await self._render_binary_skeleton(skeleton, tier, platform)
+            self._skeletons[key] = skeleton
+        return skeleton
+    
+    async def _render_helm_skeleton(self, skeleton: PackageSkeleton, tier: str):
+        """Render the files of the Helm chart package"""
+        # Copy Helm chart template
+        helm_template_dir = self.templates_dir / "helm"
+        if helm_template_dir.exists():
+            for file_path in sorted(helm_template_dir.rglob('*')):
+                relative_path = file_path.relative_to(helm_template_dir)
+                if file_path.is_file() and relative_path != Path("values.yaml"):
+                    skeleton.add(
+                        f"controlcore/{relative_path.as_posix()}",
+                        file_path.read_bytes(),
+                        file_path.stat().st_mode & 0o777
+                    )
+        else:
+            # Create basic Helm chart structure
+            await self._create_helm_chart_structure(skeleton, "controlcore")
+        
+        # Generate values.yaml
+        values = await self._generate_helm_values(USER_ID_PLACEHOLDER, tier, skeleton.secret)
+        skeleton.add_yaml("controlcore/values.yaml", values, default_flow_style=False)
+        
+        # Generate README
+        skeleton.add("README.md", await self._generate_helm_readme(USER_ID_PLACEHOLDER, tier))
+    
+    async def _render_docker_compose_skeleton(self, skeleton: PackageSkeleton, tier: str):
+        """Render the files of the Docker Compose package"""
+        compose_config = await self._generate_docker_compose_config(USER_ID_PLACEHOLDER, tier)
+        skeleton.add_yaml("docker-compose.yml", compose_config, default_flow_style=False)
+        
+        env_config = await self._generate_env_config(USER_ID_PLACEHOLDER, tier, skeleton.secret)
+        skeleton.add(".env", self._format_env(env_config))
+        
+        skeleton.add("deploy.sh", await self._generate_deploy_script("docker"), 0o755)
+        skeleton.add("README.md", await self._generate_docker_readme(USER_ID_PLACEHOLDER, tier))
+    
+    async def _render_binary_skeleton(self, skeleton: PackageSkeleton, tier: str, platform: str):
+        """Render the files of a binary package"""
+        config = await self._generate_binary_config(USER_ID_PLACEHOLDER, tier)
+        skeleton.add_yaml("config.yaml", config, default_flow_style=False)
+        
+        env_config = await self._generate_env_config(USER_ID_PLACEHOLDER, tier, skeleton.secret)
+        skeleton.add(".env", self._format_env(env_config))
+        
+        deploy_script = await self._generate_deploy_script("binary", platform)
+        if platform == "windows-amd64":
+            skeleton.add("deploy.bat", deploy_script)
+        else:
+            skeleton.add("deploy.sh", deploy_script, 0o755)
+        
+        skeleton.add("README.md", await self._generate_binary_readme(USER_ID_PLACEHOLDER, tier, platform))
+    
+    async def _build_package(self, skeleton: PackageSkeleton, user_id: str) -> bytes:
+        """Build the package ZIP for a user, compressing off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, skeleton.render, user_id, self._generate_password)
+    
+    @staticmethod
+    def _format_env(env_config: Dict[str, str]) -> str:
+        return "".join(f"{key}={value}\n" for key, value in env_config.items())
+    
+    async def _generate_helm_values(self, user_id: str, tier: str, generate_password: Callable[[], str] = None) -> Dict[str, Any]:
         """Generate Helm values for user"""
+        generate_password = generate_password or self._generate_password
         return {
             "global": {
                 "user_id": user_id,
@@ -318,9 +548,9 @@ class PackageGenerator:
             "postgresql": {
                 "enabled": True,
                 "auth": {
-                    "postgresPassword": self._generate_password(),
+                    "postgresPassword": generate_password(),
                     "username": "controlcore",
-                    "password": self._generate_password(),
+                    "password": generate_password(),
                     "database": "controlcore"
                 },
                 "primary": {
@@ -334,7 +564,7 @@ class PackageGenerator:
                 "enabled": True,
                 "auth": {
                     "enabled": True,
-                    "password": self._generate_password()
+                    "password": generate_password()
                 },
                 "master": {
                     "persistence": {
@@ -442,15 +672,16 @@ class PackageGenerator:
             }
         }
     
-    async def _generate_env_config(self, user_id: str, tier: str) -> Dict[str, str]:
+    async def _generate_env_config(self, user_id: str, tier: str, generate_password: Callable[[], str] = None) -> Dict[str, str]:
         """Generate environment configuration"""
+        generate_password = generate_password or self._generate_password
         return {
             "USER_ID": user_id,
             "TIER": tier,
-            "POSTGRES_PASSWORD": self._generate_password(),
-            "REDIS_PASSWORD": self._generate_password(),
-            "JWT_SECRET": self._generate_password(),
-            "ENCRYPTION_KEY": self._generate_password(),
+            "POSTGRES_PASSWORD": generate_password(),
+            "REDIS_PASSWORD": generate_password(),
+            "JWT_SECRET": generate_password(),
+            "ENCRYPTION_KEY": generate_password(),
             "TELEMETRY_ENDPOINT": os.getenv("BAC_API_URL", "http://localhost:8001"),
             "TELEMETRY_ENABLED": "true"
         }
@@ -483,10 +714,8 @@ class PackageGenerator:
             }
         }
     
-    async def _create_helm_chart_structure(self, chart_path: Path, user_id: str, tier: str):
+    async def _create_helm_chart_structure(self, skeleton: PackageSkeleton, chart_dir: str):
         """Create basic Helm chart structure"""
-        chart_path.mkdir(parents=True, exist_ok=True)
-        
         # Chart.yaml
         chart_yaml = {
             "apiVersion": "v2",
@@ -497,22 +726,12 @@ class PackageGenerator:
             "appVersion": "2.0.0"
         }
         
-        with open(chart_path / "Chart.yaml", "w") as f:
-            yaml.dump(chart_yaml, f)
-        
-        # Create templates directory
-        templates_dir = chart_path / "templates"
-        templates_dir.mkdir(exist_ok=True)
+        skeleton.add_yaml(f"{chart_dir}/Chart.yaml", chart_yaml)
         
         # Create basic template files (simplified)
-        with open(templates_dir / "deployment.yaml", "w") as f:
-            f.write("# Deployment template would go here\n")
-        
-        with open(templates_dir / "service.yaml", "w") as f:
-            f.write("# Service template would go here\n")
-        
-        with open(templates_dir / "ingress.yaml", "w") as f:
-            f.write("# Ingress template would go here\n")
+        skeleton.add(f"{chart_dir}/templates/deployment.yaml", "# Deployment template would go here\n")
+        skeleton.add(f"{chart_dir}/templates/service.yaml", "# Service template would go here\n")
+        skeleton.add(f"{chart_dir}/templates/ingress.yaml", "# Ingress template would go here\n")
     
     async def _generate_deploy_script(self, package_type: str, platform: str = None) -> str:
         """Generate deployment script"""
@@ -765,38 +984,40 @@ Edit `config.yaml` to customize your deployment:
 - Tier: {tier}
 """
     
-    async def _upload_to_s3(self, file_path: Path, filename: str) -> str:
-        """Upload file to S3 and return signed URL"""
-        if not self.s3_bucket:
-            # Return local file URL if S3 not configured
-            return f"file://{file_path}"
+    async def _store_package(self, content: bytes, filename: str) -> str:
+        """Upload package to S3 (or store it locally) and return its download URL"""
+        loop = asyncio.get_running_loop()
+        if self.s3_bucket:
+            try:
+                return await loop.run_in_executor(None, self._upload_to_s3, content, filename)
+            except Exception as e:
+                logger.error(f"Failed to upload to S3: {e}")
         
-        try:
+        # Return local file URL if S3 not configured (or as fallback)
+        file_path = self.output_dir / filename
+        await loop.run_in_executor(None, file_path.write_bytes, content)
+        return f"file://{file_path}"
+    
+    def _upload_to_s3(self, content: bytes, filename: str) -> str:
+        """Upload package to S3 and return signed URL"""
+        if self._s3_client is None:
             import boto3
-            from botocore.exceptions import ClientError
             
-            s3_client = boto3.client(
+            self._s3_client = boto3.client(
                 's3',
                 aws_access_key_id=self.s3_access_key,
                 aws_secret_access_key=self.s3_secret_key
             )
-            
-            # Upload file
-            s3_client.upload_file(str(file_path), self.s3_bucket, filename)
-            
-            # Generate signed URL (7 days expiry)
-            signed_url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.s3_bucket, 'Key': filename},
-                ExpiresIn=604800  # 7 days
-            )
-            
-            return signed_url
-            
-        except Exception as e:
-            logger.error(f"Failed to upload to S3: {e}")
-            # Return local file URL as fallback
-            return f"file://{file_path}"
+        
+        # Upload package
+        self._s3_client.put_object(Bucket=self.s3_bucket, Key=filename, Body=content)
+        
+        # Generate signed URL (7 days expiry)
+        return self._s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.s3_bucket, 'Key': filename},
+            ExpiresIn=604800  # 7 days
+        )
     
     def _generate_password(self) -> str:
         """Generate a secure password"""
@@ -0,0 +1,175 @@
+"""
+Provisioning Queue for Control Core Pro Tenants
+Runs tenant provisioning jobs on a bounded worker pool, checkpointing every
+completed step so that jobs interrupted by a restart resume where they stopped
+"""
+
+import os
+import uuid
+import logging
+import asyncio
+from typing import Dict, Any, List, Set, Callable, Awaitable, Optional
+from datetime import datetime
+
+from app.database import SessionLocal
+from app.models import ProvisioningJob
+from app.services.k8s_provisioning_service import K8sProvisioningService
+
+logger = logging.getLogger(__name__)
+
+class ProvisioningHandler:
+    """Callbacks notified of the progress of the jobs queued with it"""
+
+    def __init__(
+        self,
+        on_finished: Callable[[ProvisioningJob], Awaitable[None]],
+        on_step: Optional[Callable[..., Awaitable[None]]] = None
+    ):
+        # on_finished(job) once the job completed or failed
+        self.on_finished = on_finished
+        # on_step(job, step, status, detail) as its provisioning steps progress
+        self.on_step = on_step
+
+class ProvisioningQueue:
+    def __init__(self, provisioning_service: K8sProvisioningService = None, session_factory=SessionLocal):
+        self.provisioning_service = provisioning_service or K8sProvisioningService()
+        self.session_factory = session_factory
+        self.workers = max(int(os.getenv("PROVISIONING_WORKERS", "4")), 1)
+
+        # Handlers by name, registered at import time so that they are known
+        # before the jobs interrupted by the last shutdown resume
+        self._handlers: Dict[str, ProvisioningHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def register_handler(self, name: str, handler: ProvisioningHandler):
+        self._handlers[name] = handler
+
+    async def start(self):
+        """Start the workers, resuming the unfinished jobs"""
+        self._queue = asyncio.Queue()
+
+        db = self.session_factory()
+        try:
+            jobs = db.query(ProvisioningJob).filter(
+                ProvisioningJob.status.in_(["queued", "running"])
+            ).order_by(ProvisioningJob.created_at).all()
+            for job in jobs:
+                if job.status == "running":
+                    logger.info(f"Resuming provisioning job {job.id} of tenant {job.tenant_id}")
+                self._put(job.id)
+        finally:
+            db.close()
+
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} provisioning workers")
+
+    async def stop(self):
+        """Stop the workers, running jobs are resumed on the next start"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def enqueue(self, tenant_id: str, company_name: str, subdomain: str, tier: str, handler: str = None) -> str:
+        """Queue the provisioning of a tenant, returns the job id (of the tenant's unfinished job, if any)"""
+        db = self.session_factory()
+        try:
+            job = db.query(ProvisioningJob).filter(
+                ProvisioningJob.tenant_id == tenant_id,
+                ProvisioningJob.status.in_(["queued", "running"])
+            ).first()
+            if job is not None:
+                return job.id
+
+            job = ProvisioningJob(
+                id=str(uuid.uuid4()),
+                tenant_id=tenant_id,
+                status="queued",
+                params={
+                    "company_name": company_name,
+                    "subdomain": subdomain,
+                    "tier": tier
+                },
+                handler=handler,
+                attempts=0
+            )
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        self._put(job_id)
+        logger.info(f"Queued provisioning job {job_id} for tenant {tenant_id}")
+        return job_id
+
+    def _put(self, job_id: str):
+        # Jobs queued before the workers start are picked up by start()
+        if self._queue is not None and job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Provisioning job {job_id} failed unexpectedly: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        db = self.session_factory()
+        try:
+            job = db.query(ProvisioningJob).filter(ProvisioningJob.id == job_id).first()
+            if job is None or job.status not in ["queued", "running"]:
+                return
+
+            job.status = "running"
+            job.attempts = (job.attempts or 0) + 1
+            db.commit()
+            handler = self._handlers.get(job.handler)
+
+            async def on_step(step: str, status: str, detail: Any = None):
+                if status == "completed":
+                    # Checkpoint the step, a restart resumes after it
+                    job.checkpoints = {**(job.checkpoints or {}), step: detail}
+                    db.commit()
+                if handler and handler.on_step:
+                    try:
+                        await handler.on_step(job, step, status, detail)
+                    except Exception as e:
+                        logger.error(f"Provisioning handler {job.handler} failed on step {step}: {e}")
+
+            try:
+                job.result = await self.provisioning_service.provision_tenant(
+                    tenant_id=job.tenant_id,
+                    company_name=job.params["company_name"],
+                    subdomain=job.params["subdomain"],
+                    tier=job.params["tier"],
+                    checkpoints=job.checkpoints,
+                    on_step=on_step
+                )
+                job.status = "completed"
+            except Exception as e:
+                job.status = "failed"
+                job.error_message = str(e)
+            # Only needed to resume the job (and the failed provisioning was cleaned up, a retry starts over)
+            job.checkpoints = None
+            job.completed_at = datetime.utcnow()
+            db.commit()
+
+            if handler:
+                try:
+                    await handler.on_finished(job)
+                except Exception as e:
+                    logger.error(f"Provisioning handler {job.handler} failed on job {job.id}: {e}")
+        finally:
+            db.close()
+
+# Shared by the routers queueing provisioning jobs, started with the app
+provisioning_queue = ProvisioningQueue()
@@ -4,6 +4,8 @@ Handles all Stripe webhook events for subscription management
 """
 
 import os
+import json
+import uuid
 import logging
 import stripe
 from typing import Dict, Any
@@ -25,45 +27,36 @@ class StripeWebhookHandler:
         # Configure Stripe
         stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
     
-    async def handle_webhook(self, payload: bytes, sig_header: str) -> Dict[str, Any]:
-        """Handle incoming Stripe webhook"""
-        try:
-            # Verify webhook signature
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, self.stripe_webhook_secret
-            )
-            
-            # Handle the event
-            event_type = event['type']
-            
-            if event_type == 'customer.subscription.created':
-                await self._handle_subscription_created(event)
-            elif event_type == 'customer.subscription.updated':
-                await self._handle_subscription_updated(event)
-            elif event_type == 'customer.subscription.deleted':
-                await self._handle_subscription_deleted(event)
-            elif event_type == 'invoice.payment_succeeded':
-                await self._handle_payment_succeeded(event)
-            elif event_type == 'invoice.payment_failed':
-                await self._handle_payment_failed(event)
-            elif event_type == 'customer.subscription.trial_will_end':
-                await self._handle_trial_will_end(event)
-            elif event_type == 'payment_method.attached':
-                await self._handle_payment_method_attached(event)
-            else:
-                logger.info(f"Unhandled webhook event type: {event_type}")
-            
-            return {"status": "success", "event_type": event_type}
-            
-        except ValueError as e:
-            logger.error(f"Invalid payload: {e}")
-            raise
-        except stripe.error.SignatureVerificationError as e:
-            logger.error(f"Invalid signature: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Webhook handling error: {e}")
-            raise
+    def verify_event(self, payload: bytes, sig_header: str) -> Dict[str, Any]:
+        """Verify the signature of an incoming Stripe webhook, returns its event"""
+        stripe.Webhook.construct_event(
+            payload, sig_header, self.stripe_webhook_secret
+        )
+        # The verified payload as is, to be stored and processed later
+        return json.loads(payload)
+    
+    async def process_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a verified Stripe webhook event"""
+        event_type = event['type']
+        
+        if event_type == 'customer.subscription.created':
+            await self._handle_subscription_created(event)
+        elif event_type == 'customer.subscription.updated':
+            await self._handle_subscription_updated(event)
+        elif event_type == 'customer.subscription.deleted':
+            await self._handle_subscription_deleted(event)
+        elif event_type == 'invoice.payment_succeeded':
+            await self._handle_payment_succeeded(event)
+        elif event_type == 'invoice.payment_failed':
+            await self._handle_payment_failed(event)
+        elif event_type == 'customer.subscription.trial_will_end':
+            await self._handle_trial_will_end(event)
+        elif event_type == 'payment_method.attached':
+            await self._handle_payment_method_attached(event)
+        else:
+            logger.info(f"Unhandled webhook event type: {event_type}")
+        
+        return {"status": "success", "event_type": event_type}
     
     async def _handle_subscription_created(self, event: Dict[str, Any]):
         """Handle subscription creation"""
@@ -0,0 +1,143 @@
+"""
+Stripe Webhook Queue for Control Core Signup
+Stores verified Stripe events by event id and processes them on a worker pool,
+so that Stripe gets its acknowledgement without waiting for the processing
+"""
+
+import os
+import zlib
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import StripeWebhookEvent
+from app.services.stripe_webhook_handler import StripeWebhookHandler
+
+logger = logging.getLogger(__name__)
+
+def event_customer_id(event: Dict[str, Any]) -> Optional[str]:
+    """The Stripe customer an event is about, if any"""
+    event_object = event.get('data', {}).get('object', {})
+    if event_object.get('object') == 'customer':
+        return event_object.get('id')
+    customer = event_object.get('customer')
+    # Expanded customers are objects
+    return customer.get('id') if isinstance(customer, dict) else customer
+
+class StripeWebhookQueue:
+    def __init__(self, webhook_handler: StripeWebhookHandler = None, session_factory=SessionLocal):
+        self.webhook_handler = webhook_handler or StripeWebhookHandler()
+        self.session_factory = session_factory
+        self.workers = max(int(os.getenv("STRIPE_WEBHOOK_WORKERS", "4")), 1)
+        self.max_attempts = max(int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "5")), 1)
+        self.retry_backoff = float(os.getenv("STRIPE_WEBHOOK_RETRY_BACKOFF", "1"))
+
+        # One queue per worker, the events of a customer always go to the same
+        # worker so that they are processed in the order they were received
+        self._queues: List[asyncio.Queue] = []
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers, resuming the events not processed yet"""
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+
+        db = self.session_factory()
+        try:
+            events = db.query(StripeWebhookEvent).filter(
+                StripeWebhookEvent.status.in_(["queued", "processing"])
+            ).order_by(StripeWebhookEvent.stripe_created, StripeWebhookEvent.created_at).all()
+            for event in events:
+                self._put(event.id, event.customer_id)
+            if events:
+                logger.info(f"Resuming {len(events)} Stripe webhook events")
+        finally:
+            db.close()
+
+        self._worker_tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        logger.info(f"Started {self.workers} Stripe webhook workers")
+
+    async def stop(self):
+        """Stop the workers, events being processed are processed again on the next start"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queues = []
+
+    def enqueue(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a verified event for processing, events already received are ignored"""
+        customer_id = event_customer_id(event)
+        db = self.session_factory()
+        try:
+            db.add(StripeWebhookEvent(
+                id=event['id'],
+                event_type=event['type'],
+                customer_id=customer_id,
+                payload=event,
+                status="queued",
+                attempts=0,
+                stripe_created=event.get('created')
+            ))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            logger.info(f"Ignoring Stripe event {event['id']} received before")
+            return {"status": "duplicate", "event_type": event['type']}
+        finally:
+            db.close()
+
+        self._put(event['id'], customer_id)
+        return {"status": "queued", "event_type": event['type']}
+
+    def _put(self, event_id: str, customer_id: Optional[str]):
+        # Events stored before the workers start are picked up by start()
+        if self._queues:
+            key = customer_id or event_id
+            self._queues[zlib.crc32(key.encode()) % len(self._queues)].put_nowait(event_id)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            event_id = await queue.get()
+            try:
+                await self._process(event_id)
+            except Exception as e:
+                logger.error(f"Stripe event {event_id} failed unexpectedly: {e}")
+            finally:
+                queue.task_done()
+
+    async def _process(self, event_id: str):
+        db = self.session_factory()
+        try:
+            event = db.query(StripeWebhookEvent).filter(StripeWebhookEvent.id == event_id).first()
+            if event is None or event.status not in ["queued", "processing"]:
+                return
+
+            # Retried in place, the customer's later events wait for this one
+            while True:
+                event.status = "processing"
+                event.attempts = (event.attempts or 0) + 1
+                db.commit()
+                try:
+                    await self.webhook_handler.process_event(event.payload)
+                    event.status = "processed"
+                    event.error_message = None
+                    break
+                except Exception as e:
+                    event.error_message = str(e)
+                    if event.attempts >= self.max_attempts:
+                        logger.error(f"Stripe event {event.id} ({event.event_type}) failed after {event.attempts} attempts: {e}")
+                        event.status = "failed"
+                        break
+                    logger.warning(f"Stripe event {event.id} ({event.event_type}) failed, retrying: {e}")
+                    db.commit()
+                    await asyncio.sleep(self.retry_backoff * 2 ** (event.attempts - 1))
+            event.processed_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+# Shared by the webhook router, started with the app
+stripe_webhook_queue = StripeWebhookQueue()
@@ -4,14 +4,213 @@ Handles all telemetry logging to cc-business-admin
 """
 
 import os
+import time
+import gzip
+import random
 import logging
+import asyncio
 import aiohttp
-from typing import Dict, Any
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 
 logger = logging.getLogger(__name__)
 
+BATCH_ENDPOINT = "/api/events/batch"
+
+class TelemetryShipper:
+    """Ships telemetry events to cc-business-admin in the background
+
+    Events are buffered in memory (dropping the oldest once the buffer is
+    full) and posted in gzip compressed batches over a persistent session,
+    retrying with exponential backoff. Batches the console could not take are
+    spooled to disk and replayed, oldest first, once it is reachable again.
+    """
+
+    def __init__(self):
+        self.bac_api_url = os.getenv("BAC_API_URL", "http://localhost:8001")
+        self.bac_api_key = os.getenv("BAC_API_KEY")
+        self.timeout = aiohttp.ClientTimeout(total=30)
+        self.batch_size = max(int(os.getenv("TELEMETRY_BATCH_SIZE", "500")), 1)
+        self.flush_interval = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "2"))
+        self.max_retries = int(os.getenv("TELEMETRY_MAX_RETRIES", "4"))
+        self.retry_backoff = float(os.getenv("TELEMETRY_RETRY_BACKOFF", "0.5"))
+        self.spool_dir = Path(os.getenv("TELEMETRY_SPOOL_DIR", "./telemetry_spool"))
+        self.spool_max_bytes = int(os.getenv("TELEMETRY_SPOOL_MAX_BYTES", str(100 * 1024 * 1024)))
+
+        self._buffer = deque(maxlen=max(int(os.getenv("TELEMETRY_BUFFER_SIZE", "10000")), 1))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        # Set while the console is unreachable, batches go straight to the spool
+        self._unreachable_until = 0.0
+        self._failures = 0
+        self.stats = {
+            "submitted": 0,
+            "sent": 0,
+            "rejected": 0,
+            "spooled": 0,
+            "replayed": 0,
+            # dropped from the full buffer, or from the full spool
+            "dropped_buffer": 0,
+            "dropped_spool": 0
+        }
+
+    def submit(self, endpoint: str, payload: Dict[str, Any]):
+        """Buffer an event, never blocks"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["dropped_buffer"] += 1
+        self._buffer.append({"endpoint": endpoint, "payload": payload})
+        self.stats["submitted"] += 1
+
+        if self._task is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # Outside the app, the events are shipped once it starts
+                return
+            self.start()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._ship())
+
+    async def stop(self):
+        """Stop shipping, flushing the buffered events (to the spool, if the console is unreachable)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        while self._buffer:
+            await self._ship_batch(self._take_batch(), retries=0)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        return [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+
+    async def _ship(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                if self._reachable():
+                    await self._replay_spool()
+                while self._buffer:
+                    await self._ship_batch(self._take_batch())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Telemetry shipper failed: {e}")
+
+    def _reachable(self) -> bool:
+        return time.monotonic() >= self._unreachable_until
+
+    async def _ship_batch(self, batch: List[Dict[str, Any]], retries: int = None):
+        try:
+            if self._reachable() and await self._post_batch(batch, retries):
+                return
+        except asyncio.CancelledError:
+            # Stopped while posting, the batch is replayed on the next start
+            self._write_spool_file(batch)
+            raise
+        await self._spool(batch)
+
+    async def _post_batch(self, batch: List[Dict[str, Any]], retries: int = None) -> bool:
+        """Post a batch, retrying with backoff, returns whether the console took it"""
+        retries = self.max_retries if retries is None else retries
+        body = gzip.compress(json.dumps(batch).encode())
+        if self._session is None or self._session.closed:
+            headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+            if self.bac_api_key:
+                headers["Authorization"] = f"Bearer {self.bac_api_key}"
+            self._session = aiohttp.ClientSession(timeout=self.timeout, headers=headers)
+
+        for attempt in range(retries + 1):
+            if attempt:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            try:
+                async with self._session.post(f"{self.bac_api_url}{BATCH_ENDPOINT}", data=body) as response:
+                    if response.status in [200, 201]:
+                        result = await response.json()
+                        rejected = len(result.get("rejected", []))
+                        self.stats["sent"] += len(batch) - rejected
+                        self.stats["rejected"] += rejected
+                        self._failures = 0
+                        self._unreachable_until = 0.0
+                        return True
+                    error_text = await response.text()
+                    if 400 <= response.status < 500 and response.status not in [408, 429]:
+                        # Retrying or replaying a malformed batch cannot succeed
+                        logger.error(f"BAC rejected a telemetry batch of {len(batch)} events: {response.status} - {error_text}")
+                        self.stats["rejected"] += len(batch)
+                        return True
+                    logger.warning(f"BAC API error: {response.status} - {error_text}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to send telemetry batch to BAC: {e}")
+
+        # Back off the console for up to 5 minutes before trying again
+        self._failures += 1
+        self._unreachable_until = time.monotonic() + min(self.retry_backoff * 2 ** (retries + self._failures), 300)
+        return False
+
+    async def _spool(self, batch: List[Dict[str, Any]]):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_spool_file, batch)
+
+    def _write_spool_file(self, batch: List[Dict[str, Any]]):
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        # Named by time, to replay in order, and by event count, to count drops without reading it
+        name = f"{time.time_ns()}-{len(batch)}.json.gz"
+        tmp_path = self.spool_dir / f".{name}.tmp"
+        tmp_path.write_bytes(gzip.compress(json.dumps(batch).encode()))
+        os.replace(tmp_path, self.spool_dir / name)
+        self.stats["spooled"] += len(batch)
+
+        # Keep the spool bounded, dropping the oldest batches
+        files = self._spool_files()
+        total = sum(path.stat().st_size for path in files)
+        for path in files:
+            if total <= self.spool_max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink()
+            self.stats["dropped_spool"] += int(path.name.split(".")[0].split("-")[1])
+            logger.warning(f"Telemetry spool full, dropped {path.name}")
+
+    def _spool_files(self) -> List[Path]:
+        if not self.spool_dir.exists():
+            return []
+        return sorted(self.spool_dir.glob("*.json.gz"), key=lambda path: int(path.name.split("-")[0]))
+
+    async def _replay_spool(self):
+        loop = asyncio.get_running_loop()
+        for path in await loop.run_in_executor(None, self._spool_files):
+            batch = json.loads(gzip.decompress(await loop.run_in_executor(None, path.read_bytes)))
+            if not await self._post_batch(batch):
+                return
+            path.unlink()
+            self.stats["replayed"] += len(batch)
+            logger.info(f"Replayed {len(batch)} spooled telemetry events")
+
+# Shared by all the telemetry services, started with the app
+telemetry_shipper = TelemetryShipper()
+
 class TelemetryService:
     def __init__(self):
         self.bac_api_url = os.getenv("BAC_API_URL", "http://localhost:8001")
@@ -181,27 +380,5 @@ class TelemetryService:
             return {}
     
     async def _send_to_bac(self, endpoint: str, payload: Dict[str, Any]):
-        """Send payload to business admin console"""
-        try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                headers = {
-                    "Content-Type": "application/json"
-                }
-                
-                if self.bac_api_key:
-                    headers["Authorization"] = f"Bearer {self.bac_api_key}"
-                
-                async with session.post(
-                    f"{self.bac_api_url}{endpoint}",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        error_text = await response.text()
-                        logger.warning(f"BAC API error: {response.status} - {error_text}")
-                    else:
-                        logger.debug(f"Successfully sent to BAC: {endpoint}")
-                        
-        except Exception as e:
-            logger.error(f"Failed to send to BAC {endpoint}: {e}")
-            # Don't raise exception to avoid breaking main flow
+        """Queue payload for the business admin console, shipped in the background"""
+        telemetry_shipper.submit(endpoint, payload)
@@ -0,0 +1,125 @@
+"""Benchmark of the deployment package builds of a signup.
+
+Runs --signups signups (--concurrency of them at a time), each building the
+packages a signup gets: the Helm chart, Docker Compose and binary packages of
+PackageGenerator.generate_packages, and the tier package of
+container_service.generate_deployment_package. Compares the previous builds
+(every package rendered from scratch into a temp dir, zipped from disk, one
+after the other) with the current ones (packages rendered once per tier and
+platform, zipped in memory, platforms built concurrently), reporting the
+signups per minute.
+
+usage:
+    python benchmarks/package_builds.py [--signups 200] [--concurrency 8] [--tier pro]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import container_service
+from app.services.package_generator import (
+    PLACEHOLDER_PATTERN,
+    PLATFORMS,
+    USER_ID_PLACEHOLDER,
+    PackageGenerator,
+    PackageSkeleton,
+)
+
+
+def zip_dir(directory: str, zip_path: Path):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                file_path = os.path.join(root, file)
+                zipf.write(file_path, os.path.relpath(file_path, directory))
+
+
+async def previous_generate_packages(generator: PackageGenerator, user_id: str, tier: str):
+    """The previous package builds of PackageGenerator.generate_packages."""
+    builds = [("helm", None), ("docker-compose", None)] + [("binary", platform) for platform in PLATFORMS]
+    for package_type, platform in builds:
+        # rendered from scratch for every user
+        skeleton = PackageSkeleton()
+        if package_type == "helm":
+            await generator._render_helm_skeleton(skeleton, tier)
+        elif package_type == "docker-compose":
+            await generator._render_docker_compose_skeleton(skeleton, tier)
+        else:
+            await generator._render_binary_skeleton(skeleton, tier, platform)
+
+        def user_value(match):
+            return user_id if match.group(0) == USER_ID_PLACEHOLDER else generator._generate_password()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, content, mode, _ in skeleton.files:
+                file_path = Path(temp_dir) / name
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                if isinstance(content, bytes):
+                    file_path.write_bytes(content)
+                else:
+                    file_path.write_text(PLACEHOLDER_PATTERN.sub(user_value, content))
+                os.chmod(file_path, mode)
+            zip_dir(temp_dir, generator.output_dir / f"{package_type}-{platform}-{user_id}.zip")
+
+
+def previous_generate_deployment_package(output_dir: Path, user_id: str, tier: str):
+    """The previous container_service.generate_deployment_package builds."""
+    files = {}
+    if tier == "kickstart":
+        container_service.generate_kickstart_package(user_id, files)
+    elif tier == "pro":
+        container_service.generate_pro_package(user_id, files)
+    else:
+        container_service.generate_custom_package(user_id, files)
+    package_dir = output_dir / f"controlcore-{user_id}"
+    package_dir.mkdir(exist_ok=True)
+    for name, content in files.items():
+        (package_dir / name).write_text(content)
+    zip_dir(str(package_dir), output_dir / f"controlcore-{tier}-{user_id[:8]}.zip")
+
+
+async def run(signups: int, concurrency: int, tier: str, previous: bool) -> float:
+    with tempfile.TemporaryDirectory() as output_dir:
+        generator = PackageGenerator()
+        generator.output_dir = Path(output_dir)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def signup():
+            user_id = str(uuid.uuid4())
+            async with semaphore:
+                if previous:
+                    await previous_generate_packages(generator, user_id, tier)
+                    previous_generate_deployment_package(Path(output_dir), user_id, tier)
+                else:
+                    await generator.generate_packages(user_id, tier)
+                    container_service.generate_deployment_package(user_id, tier)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(signup() for _ in range(signups)))
+        return time.perf_counter() - start
+
+
+def main(signups: int, concurrency: int, tier: str):
+    for label, previous in [("previous implementation", True), ("current", False)]:
+        elapsed = asyncio.run(run(signups, concurrency, tier, previous))
+        print(f"{label:<24} {elapsed:>7.2f}s  {signups / elapsed * 60:>9.0f} signups/minute")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--signups", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tier", default="pro")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    main(args.signups, args.concurrency, args.tier)